@@ -1,13 +1,68 @@
 """
 API v1 Router - Combines all route modules.
+
+The long-running server imports every route module up front
+(build_api_router). The serverless entry point uses LazyRoutes instead, so
+a route module - and the supabase client, models and services it pulls in -
+is only imported by the first request under its prefix.
 """
-from fastapi import APIRouter
+import importlib
+
+from fastapi import APIRouter, FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# URL prefix (relative to the API prefix) -> module exposing `router`
+ROUTE_MODULES = {
+    "/styles": "app.api.v1.routes.styles",
+    "/users": "app.api.v1.routes.users",
+    "/activity": "app.api.v1.routes.activity",
+    "/documents": "app.api.v1.routes.documents",
+    "/analytics": "app.api.v1.routes.analytics",
+    "/materials": "app.api.v1.routes.materials",
+    "/planning": "app.api.v1.routes.planning",
+    "/packing": "app.api.v1.routes.packing",
+    "/measurements": "app.api.v1.routes.measurements",
+}
+
+
+def build_api_router() -> APIRouter:
+    """Router with all route modules included."""
+    api_router = APIRouter()
+    for module_name in ROUTE_MODULES.values():
+        api_router.include_router(importlib.import_module(module_name).router)
+    return api_router
+
+
+class LazyRoutes:
+    """
+    ASGI middleware that includes a route module into `fastapi_app` on the
+    first request under its prefix. Requests for the OpenAPI schema load
+    every module so the docs are complete.
+    """
 
-from app.api.v1.routes import styles
-from app.api.v1.routes import users
+    def __init__(self, app: ASGIApp, fastapi_app: FastAPI, prefix: str):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.prefix = prefix
+        self.pending = dict(ROUTE_MODULES)
 
-api_router = APIRouter()
+    def load(self, route_prefix: str) -> None:
+        module_name = self.pending.pop(route_prefix, None)
+        if module_name is None:
+            return
+        router = importlib.import_module(module_name).router
+        self.fastapi_app.include_router(router, prefix=self.prefix)
+        self.fastapi_app.openapi_schema = None
 
-# Include all route modules
-api_router.include_router(styles.router)
-api_router.include_router(users.router)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.pending and scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path == self.fastapi_app.openapi_url:
+                for route_prefix in list(self.pending):
+                    self.load(route_prefix)
+            elif path.startswith(self.prefix):
+                route_path = path[len(self.prefix):]
+                for route_prefix in list(self.pending):
+                    if route_path == route_prefix or route_path.startswith(route_prefix + "/"):
+                        self.load(route_prefix)
+        await self.app(scope, receive, send)
@@ -0,0 +1,54 @@
+"""
+Activity log API routes - Read access to the audit trail.
+All endpoints require JWT authentication + admin role.
+"""
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.auth_middleware import require_admin
+from app.services.audit_service import AuditService, get_audit_service
+
+router = APIRouter(prefix="/activity", tags=["activity"])
+
+
+@router.get("")
+async def list_activity(
+    style_id: Optional[str] = None,
+    user_id: Optional[str] = Query(None, description="Target user of a user-management action"),
+    actor_id: Optional[str] = Query(None, description="User who performed the action"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[int] = Query(None, description="Cursor from a previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    audit: AuditService = Depends(get_audit_service),
+    _admin=Depends(require_admin),
+):
+    """
+    Get activity events, newest first.
+    Filter by style, target user, acting user and time range.
+    """
+    if style_id and user_id:
+        raise HTTPException(status_code=400, detail="Filter by style_id or user_id, not both")
+
+    entity_type, entity_id = None, None
+    if style_id:
+        entity_type, entity_id = "style", style_id
+    elif user_id:
+        entity_type, entity_id = "user", user_id
+
+    try:
+        page = await audit.query(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            actor_id=actor_id,
+            since=since,
+            until=until,
+            before=before,
+            limit=limit,
+        )
+        return {"data": page["items"], "next_cursor": page["next_cursor"], "error": None}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
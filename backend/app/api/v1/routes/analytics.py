@@ -0,0 +1,91 @@
+"""
+Analytics API routes - QC reports across all styles.
+"""
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.responses import ORJSONResponse
+from app.services.qc_analytics import QCAnalytics, get_qc_analytics
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+InspectionGroup = Literal["factory", "buyer", "supplier", "type", "month"]
+MeasurementGroup = Literal["factory", "buyer", "supplier", "type", "month", "point", "size"]
+
+
+class ReportFilters:
+    """Filters shared by the QC reports; inspection dates are inclusive."""
+
+    def __init__(
+        self,
+        factory: Optional[str] = None,
+        buyer: Optional[str] = None,
+        supplier: Optional[str] = None,
+        type: Optional[str] = Query(None, description="Inspection type, e.g. Final"),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ):
+        self.values = {"factory": factory, "buyer": buyer, "supplier": supplier, "type": type,
+                       "date_from": date_from, "date_to": date_to}
+
+
+async def _store() -> QCAnalytics:
+    """The analytics store, caught up with the latest style changes."""
+    try:
+        store = get_qc_analytics()
+    except ModuleNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"QC analytics is not available: {e}")
+    await store.sync()
+    return store
+
+
+def _report(rows: List[Dict[str, Any]], store: QCAnalytics) -> ORJSONResponse:
+    return ORJSONResponse({"data": rows, "cursor": store.cursor, "error": None})
+
+
+@router.get("/qc/defects")
+async def get_defect_pareto(
+    limit: int = Query(20, ge=1, le=500),
+    filters: ReportFilters = Depends(ReportFilters),
+):
+    """Defect Pareto: defects by description, most frequent first, with cumulative share."""
+    try:
+        store = await _store()
+        return _report(await asyncio.to_thread(store.defect_pareto, limit, **filters.values), store)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/qc/pass-rates")
+async def get_pass_rates(
+    group_by: List[InspectionGroup] = Query(["factory"]),
+    filters: ReportFilters = Depends(ReportFilters),
+):
+    """Inspection results and AQL pass rate by factory, buyer, supplier, type and/or month."""
+    try:
+        store = await _store()
+        return _report(await asyncio.to_thread(store.pass_rates, group_by, **filters.values), store)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/qc/measurements")
+async def get_measurement_trends(
+    group_by: List[MeasurementGroup] = Query(["month"]),
+    filters: ReportFilters = Depends(ReportFilters),
+):
+    """Out-of-tolerance rate and deviation from standard, by month, point, size and more."""
+    try:
+        store = await _store()
+        return _report(await asyncio.to_thread(store.measurement_trends, group_by, **filters.values), store)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
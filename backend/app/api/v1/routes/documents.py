@@ -0,0 +1,104 @@
+"""
+Documents API routes - PDF invoices, packing lists and inspection reports.
+"""
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.config import get_settings
+from app.core.responses import conditional
+from app.services.document_service import DOCUMENT_SECTIONS, DocumentService, get_document_service
+
+router = APIRouter(prefix="/documents", tags=["documents"])
+
+DocumentKind = Literal["invoice", "packing", "inspection"]
+
+
+class ShipmentDocumentsRequest(BaseModel):
+    """Styles (and document kinds) to bundle into one ZIP."""
+    style_ids: List[str] = Field(alias="styleIds", min_length=1)
+    kinds: List[DocumentKind] = Field(default_factory=lambda: list(DOCUMENT_SECTIONS))
+
+    class Config:
+        populate_by_name = True
+
+
+async def _pdf(
+    request: Request,
+    service: DocumentService,
+    style_id: str,
+    kind: str,
+    item_id: Optional[str] = None,
+) -> Response:
+    try:
+        document = await service.style_document(style_id, kind, item_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail=f"No {kind} document found for style {style_id}")
+        filename, pdf, key = document
+        response = Response(
+            pdf,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'inline; filename="{filename}"'},
+        )
+        return conditional(request, response, f'"{key}"')
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/styles/{style_id}/invoices/{invoice_id}.pdf")
+async def get_invoice_pdf(
+    request: Request,
+    style_id: str,
+    invoice_id: str,
+    service: DocumentService = Depends(get_document_service),
+):
+    """Commercial invoice of a style as PDF."""
+    return await _pdf(request, service, style_id, "invoice", invoice_id)
+
+
+@router.get("/styles/{style_id}/packing.pdf")
+async def get_packing_pdf(
+    request: Request,
+    style_id: str,
+    service: DocumentService = Depends(get_document_service),
+):
+    """Packing list of a style as PDF."""
+    return await _pdf(request, service, style_id, "packing")
+
+
+@router.get("/styles/{style_id}/inspections/{inspection_id}.pdf")
+async def get_inspection_pdf(
+    request: Request,
+    style_id: str,
+    inspection_id: str,
+    service: DocumentService = Depends(get_document_service),
+):
+    """QC inspection report of a style as PDF."""
+    return await _pdf(request, service, style_id, "inspection", inspection_id)
+
+
+@router.post("/shipment.zip")
+async def get_shipment_documents(
+    body: ShipmentDocumentsRequest,
+    service: DocumentService = Depends(get_document_service),
+):
+    """
+    Invoices, packing lists and inspection reports of several styles as one
+    ZIP, a folder per style. Streamed while the documents render.
+    """
+    max_styles = get_settings().documents_batch_max_styles
+    style_ids = list(dict.fromkeys(body.style_ids))
+    if len(style_ids) > max_styles:
+        raise HTTPException(status_code=400, detail=f"At most {max_styles} styles per request")
+
+    filename = f"shipment-documents-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+    return StreamingResponse(
+        service.shipment_zip(style_ids, list(dict.fromkeys(body.kinds))),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
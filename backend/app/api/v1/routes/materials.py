@@ -0,0 +1,43 @@
+"""
+Materials API routes - requirements rollup for purchasing.
+"""
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.responses import ORJSONResponse
+from app.core.supabase import get_supabase
+from app.services.material_service import MaterialService
+
+router = APIRouter(prefix="/materials", tags=["materials"])
+
+
+def get_material_service():
+    """Dependency to get material service."""
+    return MaterialService(get_supabase())
+
+
+@router.get("/requirements")
+async def get_material_requirements(
+    by_week: bool = Query(True, description="Split totals by delivery week (Monday)"),
+    kind: Optional[Literal["yarn", "accessory"]] = None,
+    supplier: Optional[str] = None,
+    week_from: Optional[date] = None,
+    week_to: Optional[date] = None,
+    service: MaterialService = Depends(get_material_service),
+):
+    """
+    Yarn kg and accessory quantities needed by every PRE-PRODUCTION and
+    PRODUCTION style: consumption times order quantity, with wastage,
+    grouped by yarn type / accessory, supplier, unit and delivery week.
+    """
+    try:
+        rows = await service.requirements(
+            by_week=by_week, kind=kind, supplier=supplier, week_from=week_from, week_to=week_to
+        )
+        return ORJSONResponse({"data": rows, "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,103 @@
+"""
+Measurements API routes - tolerance checks and graded spec tables.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from app.core.responses import ORJSONResponse
+from app.core.supabase import get_supabase
+from app.services.measurements import MeasurementService, check_table, grade_spec
+
+router = APIRouter(prefix="/measurements", tags=["measurements"])
+
+
+def get_measurement_service():
+    """Dependency to get measurement service."""
+    return MeasurementService(get_supabase())
+
+
+class CheckRequest(BaseModel):
+    """A measurement table as edited, before it is saved."""
+    qc_measurement_table: Dict[str, Any] = Field(alias="qcMeasurementTable")
+    global_master_tolerance: Optional[str] = Field(None, alias="globalMasterTolerance")
+
+    class Config:
+        populate_by_name = True
+
+
+class GradeRequest(BaseModel):
+    """Sizes to grade to, smallest first, and the grade per size step of each point."""
+    sizes: List[str] = Field(min_length=1)
+    grades: Dict[str, str] = Field(default_factory=dict, description='Point code or label -> grade, e.g. "1/2"')
+    default_grade: str = Field("0", alias="defaultGrade")
+    version: Optional[int] = Field(None, ge=0, description="Measurement version; default: the latest filled in")
+
+    class Config:
+        populate_by_name = True
+
+
+@router.post("/check")
+async def check_measurements(body: CheckRequest):
+    """Out-of-tolerance points of a measurement table that has not been saved yet."""
+    try:
+        report = await asyncio.to_thread(check_table, body.qc_measurement_table, body.global_master_tolerance)
+        return ORJSONResponse({"data": report, "error": None})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _check_item(service: MeasurementService, style_id: str, section: str, item_id: str):
+    try:
+        report = await service.check_item(style_id, section, item_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail=f"Style {style_id} has no {section} item {item_id}")
+        return ORJSONResponse({"data": report, "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/styles/{style_id}/inspections/{inspection_id}")
+async def check_inspection(
+    style_id: str,
+    inspection_id: str,
+    service: MeasurementService = Depends(get_measurement_service),
+):
+    """Every measured point of an inspection against its standard and tolerance, by size and color."""
+    return await _check_item(service, style_id, "inspections", inspection_id)
+
+
+@router.get("/styles/{style_id}/pp-meetings/{meeting_id}")
+async def check_pp_meeting(
+    style_id: str,
+    meeting_id: str,
+    service: MeasurementService = Depends(get_measurement_service),
+):
+    """Every measured point of a PP meeting against its standard and tolerance, by size and color."""
+    return await _check_item(service, style_id, "ppMeetings", meeting_id)
+
+
+@router.post("/styles/{style_id}/pages/{page_id}/grade")
+async def grade_page(
+    style_id: str,
+    page_id: str,
+    body: GradeRequest,
+    service: MeasurementService = Depends(get_measurement_service),
+):
+    """Spec table of a tech pack page graded from its base size to every size given."""
+    try:
+        page = await service.page(style_id, page_id)
+        if page is None:
+            raise HTTPException(status_code=404, detail=f"Style {style_id} has no tech pack page {page_id}")
+        table = grade_spec(page, body.sizes, body.grades, body.default_grade, body.version)
+        return ORJSONResponse({"data": table, "error": None})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
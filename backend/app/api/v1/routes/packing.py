@@ -0,0 +1,79 @@
+"""
+Packing API routes - carton counts and container load plans.
+"""
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.responses import ORJSONResponse
+from app.core.supabase import get_supabase
+from app.services.packing_optimizer import PackingService, parse_ratio
+
+router = APIRouter(prefix="/packing", tags=["packing"])
+
+ContainerCode = Literal["20GP", "40GP", "40HC"]
+
+
+def get_packing_service():
+    """Dependency to get packing service."""
+    return PackingService(get_supabase())
+
+
+class LoadOptions:
+    """Overrides of the packing lists, and how containers are chosen and loaded."""
+
+    def __init__(
+        self,
+        container: Optional[ContainerCode] = Query(None, description="Load only this type; default: recommended mix"),
+        upright: bool = Query(True, description="Keep cartons this side up"),
+        units_per_carton: Optional[int] = Query(None, ge=1, le=1000),
+        ratio: Optional[str] = Query(None, description="Assortment, e.g. S:1,M:2,L:2,XL:1; empty for solid"),
+    ):
+        try:
+            parsed = parse_ratio(ratio) if ratio is not None else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        self.values = {"container": container, "upright": upright,
+                       "units_per_carton": units_per_carton, "ratio": parsed}
+
+
+@router.get("/styles/{style_id}")
+async def get_style_load_plan(
+    style_id: str,
+    options: LoadOptions = Depends(LoadOptions),
+    service: PackingService = Depends(get_packing_service),
+):
+    """
+    Cartons per color (assorted, solid and mixed), CBM and weights of a
+    style, and the containers they load into with their fill.
+    """
+    try:
+        plan = await service.style_plan(style_id, **options.values)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Style not found")
+        return ORJSONResponse({"data": plan, "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/shipments")
+async def get_shipment_load_plans(
+    shipment_date: date,
+    destination: Optional[str] = Query(None, description="Port of the packing list; default: every port"),
+    options: LoadOptions = Depends(LoadOptions),
+    service: PackingService = Depends(get_packing_service),
+):
+    """
+    Load plans of all styles shipping on a date, one per destination port:
+    their cartons loaded together into the recommended container mix.
+    """
+    try:
+        plans = await service.shipment_plans(shipment_date, destination, **options.values)
+        return ORJSONResponse({"data": plans, "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
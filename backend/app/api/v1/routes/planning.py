@@ -0,0 +1,97 @@
+"""
+Planning API routes - knitting machine park and capacity plan.
+"""
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.core.auth_middleware import require_admin
+from app.core.responses import ORJSONResponse
+from app.core.supabase import get_supabase_admin
+from app.services.knitting_planner import KnittingPlanService, get_knitting_plan_service
+
+router = APIRouter(prefix="/planning", tags=["planning"])
+
+
+class KnittingMachine(BaseModel):
+    """A knitting machine of the park."""
+    id: str = Field(min_length=1)
+    name: str = ""
+    machine_no: Optional[str] = Field(None, alias="machineNo")
+    machine_type_no: Optional[str] = Field(None, alias="machineTypeNo")
+    gauge: str = Field(min_length=1, description="e.g. 12GG, or 5/7GG for a multi-gauge machine")
+    hours_per_day: float = Field(20, alias="hoursPerDay", gt=0, le=24)
+    efficiency: float = Field(0.85, gt=0, le=1)
+    is_active: bool = Field(True, alias="isActive")
+
+    class Config:
+        populate_by_name = True
+
+
+@router.get("/knitting")
+async def get_knitting_plan(
+    style_id: Optional[str] = Query(None, description="Only the jobs of this style"),
+    refresh: bool = Query(False, description="Catch up with the latest changes first"),
+    service: KnittingPlanService = Depends(get_knitting_plan_service),
+):
+    """
+    Knitting plan of every PRE-PRODUCTION and PRODUCTION style on the
+    machine park: machines, start and finish per PO, days late against the
+    shipment date, and machine utilization.
+    """
+    try:
+        planner = await service.sync(force=refresh)
+        return ORJSONResponse({"data": planner.report(style_id), "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/machines")
+async def list_machines():
+    """All knitting machines."""
+    try:
+        response = await asyncio.to_thread(
+            lambda: get_supabase_admin().table("knitting_machines").select("*").order("id").execute()
+        )
+        return ORJSONResponse({"data": response.data or [], "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/machines")
+async def replace_machines(
+    machines: List[KnittingMachine],
+    admin=Depends(require_admin),
+    service: KnittingPlanService = Depends(get_knitting_plan_service),
+):
+    """Replace the machine park: machines listed are saved, the others removed."""
+    ids = [machine.id for machine in machines]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Machine ids must be unique")
+
+    def replace():
+        client = get_supabase_admin()
+        existing = client.table("knitting_machines").select("id").execute().data or []
+        removed = [row["id"] for row in existing if row["id"] not in set(ids)]
+        if removed:
+            client.table("knitting_machines").delete().in_("id", removed).execute()
+        if machines:
+            client.table("knitting_machines").upsert(
+                [machine.model_dump() for machine in machines], on_conflict="id"
+            ).execute()
+        return client.table("knitting_machines").select("*").order("id").execute().data or []
+
+    try:
+        rows = await asyncio.to_thread(replace)
+        service.invalidate()
+        return ORJSONResponse({"data": rows, "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,88 +1,344 @@
 """
 Styles/Projects API routes.
 """
-from typing import Any, Dict
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Optional
 
+import orjson
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import get_settings
+from app.core.auth_middleware import bearer_token, token_actor
+from app.core.database import get_database
+from app.core.metrics import record_style_payload
+from app.core.resilience import StaleCache, UpstreamUnavailable
+from app.core.responses import ORJSONResponse, conditional, dumps, envelope, etag
+from app.core.singleflight import SingleFlight
 from app.core.supabase import get_supabase
+from app.core.validation import json_body
+from app.models.project import PROJECT_CREATE, PROJECT_KEYS, PROJECT_UPDATE, READ_ONLY_KEYS
+from app.services import qc_analytics
+from app.services.audit_service import AuditService, get_audit_service
+from app.services.pg_project_service import PgProjectService
 from app.services.project_service import ProjectService
+from app.services.revision_service import RevisionService
 
 router = APIRouter(prefix="/styles", tags=["styles"])
 
+# Concurrent identical reads in this worker share one upstream request and one response body
+style_reads = SingleFlight("styles")
+
+# Write bodies: a malformed document or an unknown section is a 422 before any database call
+create_body = json_body(PROJECT_CREATE, PROJECT_KEYS, exclude=READ_ONLY_KEYS)
+update_body = json_body(PROJECT_UPDATE, PROJECT_KEYS, exclude=READ_ONLY_KEYS)
+
 
 def get_project_service():
     """Dependency to get project service."""
     supabase = get_supabase()
-    return ProjectService(supabase)
+    settings = get_settings()
+    revisions = RevisionService(supabase) if settings.revisions_enabled else None
+    if settings.project_store == "asyncpg":
+        database = get_database()
+        if database is not None:
+            return PgProjectService(database, supabase, revisions=revisions)
+    return ProjectService(supabase, revisions=revisions)
+
+
+@lru_cache()
+def get_stale_styles() -> StaleCache:
+    """Get the process-wide last good copies of style reads."""
+    return StaleCache("styles_stale", get_settings().stale_styles_max_bytes)
+
+
+def remember(key: Hashable, body: bytes, tag: str) -> None:
+    """Keep a style read to serve while Supabase is unavailable."""
+    if get_settings().serve_stale_styles:
+        get_stale_styles().put(key, body, tag)
+
+
+def forget(*keys: Hashable) -> None:
+    """Drop the copies a write has made stale beyond serving."""
+    if get_stale_styles.cache_info().currsize:
+        get_stale_styles().discard(*keys)
+
+
+def serve_stale(request: Request, key: Hashable, error: UpstreamUnavailable) -> Response:
+    """The last good copy of a read (marked stale) while Supabase is unavailable, else the 503 itself."""
+    entry = get_stale_styles().get(key) if get_settings().serve_stale_styles else None
+    if entry is None:
+        raise error
+    body, tag, stored_at = entry
+    headers = get_stale_styles().stale_headers(stored_at)
+    return conditional(request, Response(body, media_type="application/json", headers=headers), tag)
+
+
+def check_payload_budget(style_id: str, body: bytes) -> None:
+    """Record a style document's size; over budget, log its largest sections."""
+    budget = get_settings().style_payload_budget_bytes
+    sections = None
+    if budget and len(body) > budget:
+        sections = {name: len(dumps(value)) for name, value in orjson.loads(body).items()}
+    record_style_payload(style_id, len(body), budget, sections)
 
 
 @router.get("")
-async def list_styles(service: ProjectService = Depends(get_project_service)):
+async def list_styles(request: Request, service: ProjectService = Depends(get_project_service)):
     """
     Get all styles/projects.
     Returns list ordered by updated_at descending.
     """
+    async def render():
+        body = envelope(await service.get_all_json()).body
+        tag = etag(body)
+        remember(("list",), body, tag)
+        return body, tag
+
     try:
-        projects = await service.get_all()
-        return {"data": projects, "error": None}
+        body, tag = await style_reads.do(("list",), render)
+        return conditional(request, Response(body, media_type="application/json"), tag)
+    except UpstreamUnavailable as e:
+        return serve_stale(request, ("list",), e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_styles(service: ProjectService = Depends(get_project_service)):
+    """
+    Export all styles as one JSON document.
+    Streamed page by page (and compressed as it goes) instead of built in memory.
+    """
+    async def body():
+        yield b'{"data":'
+        async for chunk in service.export_json():
+            yield chunk
+        yield b',"error":null}'
+
+    filename = f"styles-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    return StreamingResponse(
+        body(),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/changes")
+async def list_style_changes(
+    since: int = Query(0, ge=0, description="next_cursor from the previous sync; 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    service: ProjectService = Depends(get_project_service)
+):
+    """
+    Styles created or updated after `since` plus the ids of deleted styles
+    (tombstones), for clients that sync incrementally after being offline.
+    """
+    try:
+        settle = get_settings().style_changes_settle_seconds
+        page = await service.changes_since(since, limit=limit, settle_seconds=settle)
+        return ORJSONResponse({
+            "data": page["changes"],
+            "deleted": page["deleted"],
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"],
+            "error": None,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{style_id}")
 async def get_style(
+    request: Request,
     style_id: str,
+    as_of: Optional[datetime] = Query(None, description="Return the style as it was at this time"),
     service: ProjectService = Depends(get_project_service)
 ):
-    """Get a single style/project by ID."""
+    """Get a single style/project by ID, optionally at a point in time."""
+    if as_of and not service.revisions:
+        # Without history the current document would be passed off as the old one
+        raise HTTPException(status_code=404, detail="Revision history is disabled")
+
+    async def render():
+        if as_of:
+            project = await service.get_as_of(style_id, as_of)
+            data = dumps(project) if project else None
+        else:
+            data = await service.get_by_id_json(style_id)
+        if data is None:
+            return None
+        check_payload_budget(style_id, data)
+        body = envelope(data).body
+        tag = etag(body)
+        if not as_of:
+            remember(("get", style_id), body, tag)
+        return body, tag
+
     try:
-        project = await service.get_by_id(style_id)
-        if not project:
+        rendered = await style_reads.do(("get", style_id, as_of), render)
+        if rendered is None:
             raise HTTPException(status_code=404, detail=f"Style {style_id} not found")
-        return {"data": project, "error": None}
+        body, tag = rendered
+        return conditional(request, Response(body, media_type="application/json"), tag)
+    except UpstreamUnavailable as e:
+        if as_of:
+            raise
+        return serve_stale(request, ("get", style_id), e)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{style_id}/history")
+async def get_style_history(
+    style_id: str,
+    section: Optional[str] = None,
+    before: Optional[int] = Query(None, description="Cursor from a previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    service: ProjectService = Depends(get_project_service)
+):
+    """List revisions of a style, newest first, optionally for one section."""
+    if not service.revisions:
+        raise HTTPException(status_code=404, detail="Revision history is disabled")
+    try:
+        column = service.section_column(section) if section else None
+        page = await service.revisions.history(style_id, section=column, before=before, limit=limit)
+        return ORJSONResponse({"data": page["items"], "next_cursor": page["next_cursor"], "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{style_id}/history/{section}")
+async def get_style_section_as_of(
+    style_id: str,
+    section: str,
+    as_of: datetime,
+    service: ProjectService = Depends(get_project_service)
+):
+    """Reconstruct a single section of a style as it was at `as_of`."""
+    if not service.revisions:
+        raise HTTPException(status_code=404, detail="Revision history is disabled")
+    try:
+        column = service.section_column(section)
+        values = await service.revisions.sections_as_of(style_id, as_of, sections=[column])
+        if column not in values:
+            raise HTTPException(status_code=404, detail=f"No history for section {section} of style {style_id}")
+        return ORJSONResponse({"data": values[column], "error": None})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{style_id}/sections/{section}")
+async def get_style_section(
+    style_id: str,
+    section: str,
+    service: ProjectService = Depends(get_project_service)
+):
+    """
+    Get one list section of a style (comments, inspections, invoices,
+    ppMeetings or materialControl) without loading the full document.
+    """
+    try:
+        items = await service.get_section(style_id, section)
+        if items is None:
+            raise HTTPException(status_code=404, detail=f"Style {style_id} not found")
+        return ORJSONResponse({"data": items, "error": None})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("")
 async def create_style(
-    data: Dict[str, Any],
-    service: ProjectService = Depends(get_project_service)
+    background: BackgroundTasks,
+    data: Dict[str, Any] = Depends(create_body),
+    service: ProjectService = Depends(get_project_service),
+    audit: AuditService = Depends(get_audit_service),
+    user: Optional[Dict[str, Any]] = Depends(token_actor),
 ):
     """Create a new style/project."""
     try:
         project = await service.create(data)
-        return {"data": project, "error": None}
+        forget(("list",))
+        audit.record("create", "style", project["id"], actor=user,
+                     sections=service.changed_sections(data))
+        # After the response, so the store can never fail a committed save
+        background.add_task(qc_analytics.style_saved, project)
+        body = dumps(project)
+        check_payload_budget(project["id"], body)
+        return envelope(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{style_id}")
 async def update_style(
+    request: Request,
     style_id: str,
-    data: Dict[str, Any],
-    service: ProjectService = Depends(get_project_service)
+    background: BackgroundTasks,
+    data: Dict[str, Any] = Depends(update_body),
+    service: ProjectService = Depends(get_project_service),
+    audit: AuditService = Depends(get_audit_service),
+    user: Optional[Dict[str, Any]] = Depends(token_actor),
 ):
     """Update a style/project (full update)."""
     try:
-        project = await service.update(style_id, data)
-        return {"data": project, "error": None}
+        # With the caller's token, so the revisions recorded by the database name them
+        project = await service.update(style_id, data, actor=user, token=bearer_token(request) if user else None)
+        forget(("list",), ("get", style_id))
+        audit.record("update", "style", style_id, actor=user,
+                     sections=service.changed_sections(data))
+        # After the response, so the store can never fail a committed save
+        background.add_task(qc_analytics.style_saved, project)
+        body = dumps(project)
+        check_payload_budget(style_id, body)
+        return envelope(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.patch("/{style_id}")
 async def partial_update_style(
+    request: Request,
     style_id: str,
-    data: Dict[str, Any],
-    service: ProjectService = Depends(get_project_service)
+    background: BackgroundTasks,
+    data: Dict[str, Any] = Depends(update_body),
+    service: ProjectService = Depends(get_project_service),
+    audit: AuditService = Depends(get_audit_service),
+    user: Optional[Dict[str, Any]] = Depends(token_actor),
 ):
     """Partially update a style/project."""
     try:
-        project = await service.update(style_id, data)
-        return {"data": project, "error": None}
+        # With the caller's token, so the revisions recorded by the database name them
+        project = await service.update(style_id, data, actor=user, token=bearer_token(request) if user else None)
+        forget(("list",), ("get", style_id))
+        audit.record("update", "style", style_id, actor=user,
+                     sections=service.changed_sections(data))
+        # After the response, so the store can never fail a committed save
+        background.add_task(qc_analytics.style_saved, project)
+        body = dumps(project)
+        check_payload_budget(style_id, body)
+        return envelope(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -90,13 +346,19 @@ async def partial_update_style(
 @router.delete("/{style_id}")
 async def delete_style(
     style_id: str,
-    service: ProjectService = Depends(get_project_service)
+    background: BackgroundTasks,
+    service: ProjectService = Depends(get_project_service),
+    audit: AuditService = Depends(get_audit_service),
+    user: Optional[Dict[str, Any]] = Depends(token_actor),
 ):
     """Delete a style/project."""
     try:
         success = await service.delete(style_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"Style {style_id} not found")
+        forget(("list",), ("get", style_id))
+        audit.record("delete", "style", style_id, actor=user)
+        background.add_task(qc_analytics.style_deleted, style_id)
         return {"message": "Style deleted successfully", "error": None}
     except HTTPException:
         raise
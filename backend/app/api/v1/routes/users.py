@@ -3,15 +3,26 @@ Users API routes - Admin user management.
 Uses service role key to bypass RLS for updating other users' profiles.
 All endpoints require JWT authentication + admin role.
 """
+import asyncio
+import csv
+import io
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from postgrest.types import ReturnMethod
+from pydantic import ValidationError
 
 from app.core.supabase import get_supabase_admin
 from app.config import get_settings
 from app.models.user_models import CreateUserRequest
 from app.core.auth_middleware import require_admin
+from app.core.metrics import instrument_httpx
+from app.core.resilience import guard_httpx
+from app.core.tracing import trace_httpx
+from app.services.audit_service import get_audit_service
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +69,39 @@ DEFAULT_ROLE_ACCESS = {
 }
 
 
+def auth_error(error_msg: str) -> Tuple[int, str]:
+    """Status code and message for a failed Auth admin create_user call."""
+    lowered = error_msg.lower()
+    if "already been registered" in lowered or "already exists" in lowered:
+        return 409, "A user with this email already exists"
+    if "invalid" in lowered and "email" in lowered:
+        return 400, "Invalid email format"
+    if "database error" in lowered:
+        return 400, (
+            f"Database trigger error creating user. "
+            f"Please run the latest migration (006_fix_handle_new_user_trigger.sql) "
+            f"in your Supabase SQL Editor. Raw error: {error_msg}"
+        )
+    return 400, f"Failed to create auth user: {error_msg}"
+
+
+def build_profile(user_id: str, data: CreateUserRequest, now: str) -> Dict[str, Any]:
+    """profiles row for a new user; section access defaults to the role's."""
+    return {
+        "id": user_id,
+        "email": data.email,
+        "name": data.name,
+        "role": data.role,
+        "phone": data.phone,
+        "factory_id": data.factory_id,
+        "section_access": data.section_access or DEFAULT_ROLE_ACCESS.get(data.role, DEFAULT_ROLE_ACCESS["viewer"]),
+        "is_active": True,
+        "updated_at": now,
+    }
+
+
 @router.post("/")
-async def create_user(data: CreateUserRequest, _admin=Depends(require_admin)):
+async def create_user(data: CreateUserRequest, admin=Depends(require_admin)):
     """
     Create a new user via Supabase Admin API.
     Uses service role key to call auth.admin.create_user().
@@ -70,7 +112,7 @@ async def create_user(data: CreateUserRequest, _admin=Depends(require_admin)):
 
         # 1. Create auth user via Admin API
         try:
-            auth_response = supabase.auth.admin.create_user({
+            auth_response = await asyncio.to_thread(supabase.auth.admin.create_user, {
                 "email": data.email,
                 "password": data.password,
                 "email_confirm": True,  # Auto-confirm so user can log in immediately
@@ -83,19 +125,8 @@ async def create_user(data: CreateUserRequest, _admin=Depends(require_admin)):
             error_msg = str(auth_err)
             logger.error(f"Supabase auth.admin.create_user() failed: {error_msg}")
             logger.error(f"Full exception: {repr(auth_err)}")
-            # Handle common Supabase auth errors
-            if "already been registered" in error_msg.lower() or "already exists" in error_msg.lower():
-                raise HTTPException(status_code=409, detail="A user with this email already exists")
-            if "invalid" in error_msg.lower() and "email" in error_msg.lower():
-                raise HTTPException(status_code=400, detail="Invalid email format")
-            if "database error" in error_msg.lower():
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Database trigger error creating user. "
-                           f"Please run the latest migration (006_fix_handle_new_user_trigger.sql) "
-                           f"in your Supabase SQL Editor. Raw error: {error_msg}"
-                )
-            raise HTTPException(status_code=400, detail=f"Failed to create auth user: {error_msg}")
+            status_code, detail = auth_error(error_msg)
+            raise HTTPException(status_code=status_code, detail=detail)
 
         new_user = auth_response.user
         if not new_user:
@@ -103,39 +134,24 @@ async def create_user(data: CreateUserRequest, _admin=Depends(require_admin)):
 
         new_user_id = new_user.id
 
-        # 2. Build section access: use custom if provided, otherwise role defaults
-        section_access = data.section_access if data.section_access else DEFAULT_ROLE_ACCESS.get(data.role, DEFAULT_ROLE_ACCESS["viewer"])
-
-        # 3. Upsert profile (the handle_new_user trigger may have already created a row)
-        profile_data = {
-            "id": new_user_id,
-            "email": data.email,
-            "name": data.name,
-            "role": data.role,
-            "phone": data.phone,
-            "factory_id": data.factory_id,
-            "section_access": section_access,
-            "is_active": True,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }
-
-        profile_response = (
+        # 2. Upsert profile (the handle_new_user trigger may have already created a row);
+        # section access is the custom one if provided, otherwise the role's defaults.
+        # The upsert returns the stored row, so it is not fetched again.
+        profile_data = build_profile(new_user_id, data, datetime.now(timezone.utc).isoformat())
+        profile_response = await asyncio.to_thread(
             supabase.from_("profiles")
             .upsert(profile_data, on_conflict="id")
-            .execute()
+            .execute
         )
 
-        # 4. Fetch and return the created profile
-        fetch_response = (
-            supabase.from_("profiles")
-            .select("*")
-            .eq("id", new_user_id)
-            .single()
-            .execute()
+        get_audit_service().record(
+            "create", "user", new_user_id, actor=admin,
+            sections=profile_data.keys() - {"id", "updated_at"},
+            details={"email": data.email, "role": data.role},
         )
 
         return {
-            "user": fetch_response.data,
+            "user": profile_response.data[0] if profile_response.data else profile_data,
             "error": None,
         }
 
@@ -145,8 +161,201 @@ async def create_user(data: CreateUserRequest, _admin=Depends(require_admin)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _csv_rows(text: str) -> List[Dict[str, Any]]:
+    """Rows of a CSV with a header line; blank cells are treated as not given."""
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    rows = []
+    for record in reader:
+        row = {}
+        for key, value in record.items():
+            if key is None:
+                continue
+            key = key.strip().lower().replace(" ", "_")
+            value = (value or "").strip()
+            if value:
+                row[key] = value
+        if row:
+            rows.append(row)
+    return rows
+
+
+async def _bulk_rows(request: Request) -> List[Dict[str, Any]]:
+    """
+    Users from the request body: a JSON array (or {"users": [...]}), CSV
+    text, or a multipart upload of either in a `file` field.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the user list as a `file` field")
+        body = await upload.read()
+        is_csv = not (upload.filename or "").lower().endswith(".json")
+    else:
+        body = await request.body()
+        is_csv = "csv" in content_type
+
+    try:
+        if is_csv:
+            return _csv_rows(body.decode("utf-8"))
+        document = orjson.loads(body)
+    except (UnicodeDecodeError, csv.Error, orjson.JSONDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read the user list: {e}")
+    rows = document.get("users") if isinstance(document, dict) else document
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=400, detail='Expected a JSON array of users or {"users": [...]}')
+    return rows
+
+
+async def _create_auth_user(
+    client: Any, semaphore: asyncio.Semaphore, data: CreateUserRequest
+) -> Tuple[Optional[str], Optional[Tuple[int, str]]]:
+    """Create one auth user; returns its id, or the (status, message) of the failure."""
+    async with semaphore:
+        try:
+            response = await client.post("/auth/v1/admin/users", json={
+                "email": data.email,
+                "password": data.password,
+                "email_confirm": True,
+                "user_metadata": {"full_name": data.name, "role": data.role},
+            })
+        except Exception as e:
+            return None, (502, f"Failed to create auth user: {e}")
+    if response.status_code in (200, 201):
+        return response.json()["id"], None
+    try:
+        body = response.json()
+        error_msg = body.get("msg") or body.get("message") or body.get("error_description") or response.text
+    except ValueError:
+        error_msg = response.text
+    return None, auth_error(error_msg)
+
+
+async def _delete_auth_user(semaphore: asyncio.Semaphore, user_id: str) -> Optional[str]:
+    """Delete one auth user again; returns None, or why it could not be deleted."""
+    async with semaphore:
+        try:
+            await asyncio.to_thread(get_supabase_admin().auth.admin.delete_user, user_id)
+        except Exception as e:
+            return str(e)
+    return None
+
+
+@router.post("/bulk")
+async def bulk_create_users(request: Request, admin=Depends(require_admin)):
+    """
+    Create many users at once from CSV (columns email, password, name, role,
+    phone, factory_id) or JSON (CreateUserRequest objects).
+    Auth users are created with bounded concurrency and all profiles are
+    written in one upsert. Returns a result per row, in input order: a
+    row that fails does not stop the others.
+    """
+    import httpx
+
+    settings = get_settings()
+    rows = await _bulk_rows(request)
+    if not rows:
+        raise HTTPException(status_code=400, detail="No users given")
+    if len(rows) > settings.user_provisioning_max_rows:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.user_provisioning_max_rows} users per request"
+        )
+
+    results: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, CreateUserRequest]] = []
+    seen = set()
+    for index, row in enumerate(rows):
+        email = row.get("email")
+        result = {"index": index, "email": email, "status": "invalid", "user_id": None, "error": None}
+        results.append(result)
+        try:
+            data = CreateUserRequest(**row)
+        except ValidationError as e:
+            result["error"] = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            continue
+        if data.email.lower() in seen:
+            result["error"] = "Duplicate email in this request"
+            continue
+        seen.add(data.email.lower())
+        result["email"] = data.email
+        valid.append((index, data))
+
+    try:
+        # 1. Auth users, at most user_provisioning_concurrency admin calls in flight
+        key = settings.supabase_service_role_key
+        client = trace_httpx(instrument_httpx(guard_httpx(httpx.AsyncClient(
+            base_url=settings.supabase_url,
+            headers={"Authorization": f"Bearer {key}", "apikey": key},
+            timeout=15.0,
+        ), "supabase_auth"), "supabase_auth"), "supabase_auth")
+        semaphore = asyncio.Semaphore(max(1, settings.user_provisioning_concurrency))
+        async with client:
+            outcomes = await asyncio.gather(*(_create_auth_user(client, semaphore, data) for _, data in valid))
+
+        created: List[Tuple[int, CreateUserRequest, Dict[str, Any]]] = []
+        now = datetime.now(timezone.utc).isoformat()
+        for (index, data), (user_id, failure) in zip(valid, outcomes):
+            result = results[index]
+            if failure:
+                status_code, message = failure
+                result["status"] = "exists" if status_code == 409 else "failed"
+                result["error"] = message
+                continue
+            result["user_id"] = user_id
+            created.append((index, data, build_profile(user_id, data, now)))
+
+        # 2. Every profile in one upsert; the rows are known, so nothing is read back
+        if created:
+            try:
+                await asyncio.to_thread(
+                    lambda: get_supabase_admin().from_("profiles")
+                    .upsert([profile for _, _, profile in created], on_conflict="id",
+                            returning=ReturnMethod.minimal)
+                    .execute()
+                )
+            except Exception as e:
+                logger.error(f"Bulk profile upsert failed for {len(created)} new auth users: {e}")
+                # Remove the auth users again, so the rows can simply be sent once more
+                leftovers = await asyncio.gather(
+                    *(_delete_auth_user(semaphore, profile["id"]) for _, _, profile in created)
+                )
+                for (index, _, profile), leftover in zip(created, leftovers):
+                    result = results[index]
+                    result["status"] = "failed"
+                    if leftover:
+                        logger.error(f"Auth user {profile['id']} without a profile could not be deleted: {leftover}")
+                        result["error"] = f"Profile not saved: {e}; the auth user was kept: {leftover}"
+                    else:
+                        result["user_id"] = None
+                        result["error"] = f"Profile not saved, auth user removed: {e}"
+                created = []
+
+        audit = get_audit_service()
+        for index, data, profile in created:
+            results[index]["status"] = "created"
+            audit.record(
+                "create", "user", profile["id"], actor=admin,
+                sections=profile.keys() - {"id", "updated_at"},
+                details={"email": data.email, "role": data.role, "bulk": True},
+            )
+
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        logger.info(f"Bulk provisioning by {admin.get('email')}: {counts}")
+        return {"results": results, "counts": counts, "error": None}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.patch("/{user_id}")
-async def update_user_profile(user_id: str, data: Dict[str, Any], _admin=Depends(require_admin)):
+async def update_user_profile(user_id: str, data: Dict[str, Any], admin=Depends(require_admin)):
     """
     Update a user's profile (role, section_access, name, etc.).
     Uses service role client to bypass RLS - admin only operation.
@@ -164,11 +373,17 @@ async def update_user_profile(user_id: str, data: Dict[str, Any], _admin=Depends
         # Add updated_at timestamp
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-        response = supabase.from_("profiles").update(update_data).eq("id", user_id).execute()
+        response = await asyncio.to_thread(supabase.from_("profiles").update(update_data).eq("id", user_id).execute)
 
         if hasattr(response, "error") and response.error:
             raise HTTPException(status_code=400, detail=str(response.error))
 
+        get_audit_service().record(
+            "update", "user", user_id, actor=admin,
+            sections=update_data.keys() - {"updated_at"},
+            details={k: update_data[k] for k in ("role", "is_active") if k in update_data},
+        )
+
         return {"success": True, "error": None}
 
     except HTTPException:
@@ -178,7 +393,7 @@ async def update_user_profile(user_id: str, data: Dict[str, Any], _admin=Depends
 
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: str, _admin=Depends(require_admin)):
+async def delete_user(user_id: str, admin=Depends(require_admin)):
     """
     Permanently hard-delete a user from auth.users and profiles.
 
@@ -209,7 +424,10 @@ async def delete_user(user_id: str, _admin=Depends(require_admin)):
     try:
         # ── Step 1: Hard-delete from auth.users via Admin REST API ──────────
         admin_delete_url = f"{supabase_url}/auth/v1/admin/users/{user_id}"
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        admin_client = trace_httpx(instrument_httpx(
+            guard_httpx(httpx.AsyncClient(timeout=15.0), "supabase_auth"), "supabase_auth"
+        ), "supabase_auth")
+        async with admin_client as client:
             response = await client.delete(admin_delete_url, headers=headers)
 
         if response.status_code not in (200, 204):
@@ -229,12 +447,14 @@ async def delete_user(user_id: str, _admin=Depends(require_admin)):
         # The FK cascade should handle this, but we do it explicitly to be safe.
         try:
             supabase_admin = get_supabase_admin()
-            supabase_admin.from_("profiles").delete().eq("id", user_id).execute()
+            await asyncio.to_thread(supabase_admin.from_("profiles").delete().eq("id", user_id).execute)
             logger.info(f"Profile row for {user_id} deleted")
         except Exception as profile_err:
             # Not fatal – cascade may have already removed it
             logger.warning(f"Profile cleanup for {user_id} skipped: {profile_err}")
 
+        get_audit_service().record("delete", "user", user_id, actor=admin)
+
         return {"success": True, "error": None}
 
     except HTTPException:
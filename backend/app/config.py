@@ -2,6 +2,8 @@
 Application configuration settings.
 """
 from functools import lru_cache
+from typing import Any, Dict
+
 from pydantic_settings import BaseSettings
 
 
@@ -13,6 +15,9 @@ class Settings(BaseSettings):
     supabase_anon_key: str = ""
     # Service role key - bypasses RLS (keep secret, server-side only)
     supabase_service_role_key: str = ""
+    # JWT secret (Project Settings > API) - lets the rate limiter and the style
+    # write routes identify users from their access token without an Auth round trip
+    supabase_jwt_secret: str = ""
     
     # Google AI Configuration
     google_api_key: str = ""
@@ -23,6 +28,118 @@ class Settings(BaseSettings):
     # API Configuration
     api_v1_prefix: str = "/api/v1"
     
+    # Audit log - events are buffered in memory and flushed in batches
+    audit_enabled: bool = True
+    audit_flush_interval_seconds: float = 2.0
+    audit_batch_size: int = 200
+    audit_max_buffer: int = 10000
+    
+    # Style revision history (/history, ?as_of=) - recorded by the database (migration 013)
+    revisions_enabled: bool = True
+    
+    # Metrics - Prometheus exposition at /metrics, optional Server-Timing header.
+    # /metrics is served only with a token, to scrapers that send it as a bearer token
+    metrics_enabled: bool = True
+    metrics_token: str = ""
+    metrics_server_timing: bool = False
+    
+    # Tracing - OpenTelemetry; exporter is "console", "otlp" or "memory"
+    tracing_enabled: bool = False
+    tracing_exporter: str = "console"
+    tracing_sample_ratio: float = 1.0
+    tracing_otlp_endpoint: str = ""
+    
+    # Response compression - zstd/brotli are used when their packages are installed
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    
+    # Single style documents above this size (bytes) are logged; 0 disables
+    style_payload_budget_bytes: int = 1048576
+    
+    # Request bodies larger than this (bytes) get 413, checked while they stream
+    # in; per route prefix under the API prefix (longest match wins), as JSON
+    max_body_bytes: int = 1048576
+    max_body_bytes_by_route: Dict[str, int] = {"/styles": 16777216, "/users/bulk": 4194304}
+    
+    # Offline sync - /styles/changes holds back writes younger than this, as they
+    # may still be committing
+    style_changes_settle_seconds: float = 2.0
+    
+    # PDF documents - rendered in this many worker processes (0: a thread of the API
+    # process; the default with lazy routes, i.e. serverless), cached in memory by content hash
+    documents_render_workers: int = 2
+    documents_cache_max_bytes: int = 67108864
+    # Shipment ZIPs load and render this many styles at a time, at most max_styles per request
+    documents_batch_size: int = 20
+    documents_batch_max_styles: int = 200
+    
+    # Bulk user provisioning - concurrent Auth admin calls, and rows per request
+    user_provisioning_concurrency: int = 8
+    user_provisioning_max_rows: int = 1000
+    
+    # QC analytics - inspections flattened into DuckDB ("" keeps it in memory, a file
+    # path persists it), caught up with the style change feed at most this often
+    qc_analytics_path: str = ""
+    qc_analytics_sync_seconds: float = 10.0
+    
+    # Knitting capacity plan - knitting has to finish this many days before a PO
+    # ships, and lots are split so each machine knits at least min_pieces
+    knitting_finish_buffer_days: int = 10
+    knitting_min_pieces_per_machine: int = 100
+    knitting_plan_sync_seconds: float = 10.0
+    
+    # Parsed QC measurement tables kept in memory, by content
+    measurement_cache_entries: int = 512
+    
+    # Packing - defaults for styles whose packing list does not say; cartons
+    # are kept under max_carton_kg gross for manual handling
+    packing_units_per_carton: int = 24
+    packing_piece_weight_kg: float = 0.35
+    packing_carton_tare_kg: float = 1.0
+    packing_max_carton_kg: float = 20.0
+    
+    # Upstream guard - per-call deadline, calls in flight per upstream (waiting at
+    # most queue_timeout for a slot) and a circuit breaker that opens after
+    # failure_threshold consecutive failures for breaker_open_seconds
+    upstream_guard_enabled: bool = True
+    upstream_timeout_seconds: float = 10.0
+    upstream_max_concurrency: int = 32
+    upstream_queue_timeout_seconds: float = 0.5
+    breaker_failure_threshold: int = 5
+    breaker_open_seconds: float = 10.0
+    # While Supabase is unavailable, serve the last good copy of styles read before
+    serve_stale_styles: bool = True
+    stale_styles_max_bytes: int = 67108864
+    
+    # Project store - "postgrest" (supabase-py), or "asyncpg" to list, read and update
+    # styles over a pooled Postgres connection (pip install asyncpg; needs database_url).
+    # Queries run as database_role with request.jwt.claims set, so RLS applies as it
+    # does through PostgREST; prepared statements are cached per connection (0 behind
+    # a transaction-mode pooler)
+    project_store: str = "postgrest"
+    database_url: str = ""
+    database_pool_min_size: int = 2
+    database_pool_max_size: int = 10
+    database_statement_cache_size: int = 100
+    database_role: str = "anon"
+    database_jwt_claims: Dict[str, Any] = {}
+    
+    # Rate limiting - token buckets per user (or client IP when anonymous), shared
+    # through a Redis-protocol store ("redis://host:6379/0") or per process ("memory://":
+    # each worker or serverless instance then allows the full limit on its own)
+    rate_limit_enabled: bool = True
+    rate_limit_storage_url: str = "memory://"
+    rate_limit_per_minute: float = 60
+    rate_limit_burst: float = 60
+    rate_limit_read_cost: float = 1.0
+    rate_limit_write_cost: float = 2.0
+    rate_limit_not_modified_cost: float = 0.2
+    # Key anonymous callers by the first X-Forwarded-For address (behind a trusted proxy)
+    rate_limit_trust_forwarded_for: bool = False
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -4,17 +4,21 @@ Authentication middleware for FastAPI.
 Provides JWT-based authentication using Supabase Auth.
 All user-management endpoints MUST use these dependencies.
 """
+import asyncio
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from fastapi import Depends, HTTPException, Request, status
-from supabase import create_client
 
 from app.config import get_settings
+from app.core.rate_limit import jwt_algorithm, jwt_claims
+from app.core.supabase import create_instrumented_client
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
+@traced("auth.require_auth")
 async def require_auth(request: Request) -> Dict[str, Any]:
     """
     FastAPI dependency that extracts and validates the JWT from the
@@ -45,8 +49,8 @@ async def require_auth(request: Request) -> Dict[str, Any]:
     settings = get_settings()
     try:
         # Use the service role client to validate any user's token
-        client = create_client(settings.supabase_url, settings.supabase_service_role_key)
-        user_response = client.auth.get_user(token)
+        client = create_instrumented_client(settings.supabase_url, settings.supabase_service_role_key)
+        user_response = await asyncio.to_thread(client.auth.get_user, token)
         if not user_response or not user_response.user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,6 +73,7 @@ async def require_auth(request: Request) -> Dict[str, Any]:
         )
 
 
+@traced("auth.require_admin")
 async def require_admin(user: Dict[str, Any] = Depends(require_auth)) -> Dict[str, Any]:
     """
     FastAPI dependency that requires the caller to be an admin or super_admin.
@@ -83,13 +88,13 @@ async def require_admin(user: Dict[str, Any] = Depends(require_auth)) -> Dict[st
     try:
         # Fetch the profile from DB to get the authoritative role
         # (user_metadata.role can be stale)
-        client = create_client(settings.supabase_url, settings.supabase_service_role_key)
-        profile_resp = (
+        client = create_instrumented_client(settings.supabase_url, settings.supabase_service_role_key)
+        profile_resp = await asyncio.to_thread(
             client.from_("profiles")
             .select("role")
             .eq("id", user["id"])
             .single()
-            .execute()
+            .execute
         )
         db_role = profile_resp.data.get("role", "viewer") if profile_resp.data else "viewer"
     except Exception:
@@ -104,3 +109,55 @@ async def require_admin(user: Dict[str, Any] = Depends(require_auth)) -> Dict[st
 
     user["role"] = db_role
     return user
+
+
+async def optional_auth(request: Request) -> Optional[Dict[str, Any]]:
+    """
+    FastAPI dependency that identifies the caller when an Authorization
+    header is present and returns None otherwise.  Used where the caller's
+    identity is recorded (e.g. the audit log) but not required.
+    An invalid token still raises 401.
+    """
+    if not request.headers.get("Authorization"):
+        return None
+    return await require_auth(request)
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    """The bearer token of a request, or None when it has none."""
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.removeprefix("Bearer ").strip() or None
+
+
+async def token_actor(request: Request) -> Optional[Dict[str, Any]]:
+    """
+    optional_auth() without the Auth round trip: the caller is read from
+    the claims of its JWT, verified locally with the project's JWT secret
+    (as the rate limiter identifies callers). Used on the style write path,
+    where only the actor recorded with a change is needed. Falls back to
+    optional_auth() when no JWT secret is configured, or for tokens not
+    signed with it (asymmetric JWT signing keys: RS256, ES256).
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return None
+    token = auth_header.removeprefix("Bearer ").strip()
+    secret = get_settings().supabase_jwt_secret
+    if not secret or jwt_algorithm(token) not in (None, "HS256"):
+        return await optional_auth(request)
+
+    claims = jwt_claims(token, secret)
+    if not claims or not claims.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    metadata = claims.get("user_metadata") if isinstance(claims.get("user_metadata"), dict) else {}
+    return {
+        "id": str(claims["sub"]),
+        "email": claims.get("email"),
+        "role": metadata.get("role", "viewer"),
+    }
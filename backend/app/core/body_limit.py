@@ -0,0 +1,90 @@
+"""
+Request body size limits, enforced before a body is buffered.
+
+BodyLimitMiddleware answers 413 straight away when the declared
+Content-Length is over the route's limit, without reading the body. A body
+sent without a length (chunked) is counted as it streams in, and reading
+fails with BodyTooLarge (a 413 HTTPException) as soon as it passes the
+limit, so an oversized payload is never held in memory or parsed.
+"""
+from typing import Mapping
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.responses import ORJSONResponse
+
+
+class BodyTooLarge(HTTPException):
+    """The request body is over the route's limit."""
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+
+class BodyLimitMiddleware:
+    """Caps request bodies at `default_limit` bytes, or the limit of the longest matching route prefix."""
+
+    def __init__(self, app: ASGIApp, default_limit: int, route_limits: Mapping[str, int], prefix: str = ""):
+        self.app = app
+        self.default_limit = default_limit
+        self.route_limits = sorted(
+            ((prefix + route.rstrip("/"), limit) for route, limit in route_limits.items()),
+            key=lambda item: -len(item[0]),
+        )
+
+    def limit_for(self, path: str) -> int:
+        for route, limit in self.route_limits:
+            if path == route or path.startswith(route + "/"):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        declared = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                declared = int(value) if value.isdigit() else None
+                break
+        if declared is not None:
+            if declared > limit:
+                await self._reject(scope, receive, send, limit)
+            else:
+                # The server stops reading at Content-Length
+                await self.app(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge(limit)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except BodyTooLarge:
+            if started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        error = BodyTooLarge(limit)
+        response = ORJSONResponse({"detail": error.detail}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
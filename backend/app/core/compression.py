@@ -0,0 +1,221 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware picks zstd, brotli or gzip from the request's
+Accept-Encoding (q-values are honoured; zstd and brotli are offered only
+when the optional `zstandard` / `brotli` packages are installed) and
+compresses responses of at least `minimum_size` bytes.
+
+Responses sent in one body message are compressed in one go. Streaming
+responses (exports) are compressed incrementally and flushed after every
+chunk, so the client starts receiving data immediately and nothing is
+buffered beyond the current chunk.
+"""
+import zlib
+from typing import Callable, Dict, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import record_compression
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+# Media types worth compressing; everything else (images, PDFs, ZIPs) is sent as is
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> Sequence[str]:
+    """Supported content codings in server preference order."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    Choose a content coding from an Accept-Encoding header.
+    The highest q-value wins; ties go to the earliest entry of `encodings`.
+    Returns None when the response should be sent uncompressed.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing compressible responses of at least `minimum_size` bytes."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        exclude_paths: tuple = ("/metrics",),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude_paths = exclude_paths
+        self.encodings = available_encodings()
+        self._factories: Dict[str, Callable[[], object]] = {
+            "gzip": lambda: _GzipEncoder(gzip_level),
+            "br": lambda: _BrotliEncoder(brotli_quality),
+            "zstd": lambda: _ZstdEncoder(zstd_level),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request state: holds the start message until the first body chunk decides."""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: Optional[str]):
+        self.middleware = middleware
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+        self.uncompressed_bytes = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        self.uncompressed_bytes += len(body)
+
+        if self.start is not None:
+            await self._first_chunk(body, more_body)
+        elif self.passthrough:
+            await self.downstream(message)
+        else:
+            data = self.encoder.compress(body)
+            data += self.encoder.flush() if more_body else self.encoder.finish()
+            await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        if not more_body:
+            encoding = "identity" if self.passthrough else self.encoding
+            record_compression(self.scope, encoding, self.uncompressed_bytes)
+
+    async def _first_chunk(self, body: bytes, more_body: bool) -> None:
+        start, self.start = self.start, None
+        headers = MutableHeaders(scope=start)
+        compressible = headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        if (
+            self.encoding is None
+            or not compressible
+            or "content-encoding" in headers
+            or start["status"] in (204, 304)
+            or (not more_body and len(body) < self.middleware.minimum_size)
+        ):
+            self.passthrough = True
+            await self.downstream(start)
+            await self.downstream({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        self.encoder = self.middleware._factories[self.encoding]()
+        headers["content-encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed representation is no longer byte-identical
+            headers["etag"] = "W/" + etag
+
+        if more_body:
+            del headers["content-length"]
+            data = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            data = self.encoder.compress(body) + self.encoder.finish()
+            headers["content-length"] = str(len(data))
+        await self.downstream(start)
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,154 @@
+"""
+Direct Postgres connection pool (asyncpg) for the hot style paths.
+
+Optional: used when `project_store` is "asyncpg" and needs the `asyncpg`
+package and a `database_url`. Without either, get_database() returns None
+and styles keep going through PostgREST.
+
+Connections are pooled and asyncpg prepares each statement once per
+connection (statement_cache_size; set it to 0 behind a transaction-mode
+pooler such as Supavisor on port 6543). json values come back as the raw
+bytes Postgres sent (binary format, nothing decoded) so documents built by
+the query can be passed straight through; jsonb values are decoded from the
+binary format with orjson.
+
+Every call runs like a PostgREST request would: in a transaction that
+switches to `database_role` and sets `request.jwt.claims`, so the same RLS
+policies (auth.role(), auth.uid()) apply as with the anon key. With an
+empty role the connection's own login role is used and reads need no
+transaction. Calls go through the "postgres" upstream guard (deadline,
+concurrency limit, circuit breaker) like the Supabase HTTP calls.
+"""
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional
+
+import orjson
+
+from app.config import get_settings
+from app.core.resilience import UpstreamGuard, get_upstream_guard
+
+logger = logging.getLogger(__name__)
+
+# Same as PostgREST: local to the transaction, so a pooled connection carries nothing over
+_SET_REQUEST = "SELECT set_config('role', $1, true), set_config('request.jwt.claims', $2, true)"
+_SET_CLAIMS = "SELECT set_config('request.jwt.claims', $1, true)"
+
+# jsonb in binary format is a version byte (1) followed by the JSON text
+_JSONB_VERSION = b"\x01"
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return _JSONB_VERSION + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(data[1:])
+
+
+async def _init_connection(conn: Any) -> None:
+    await conn.set_type_codec("jsonb", schema="pg_catalog", format="binary",
+                              encoder=_encode_jsonb, decoder=_decode_jsonb)
+    await conn.set_type_codec("json", schema="pg_catalog", format="binary",
+                              encoder=orjson.dumps, decoder=bytes)
+
+
+class Database:
+    """A lazily created asyncpg pool whose connections act as `role` with `claims`."""
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10, statement_cache_size: int = 100,
+                 role: str = "anon", claims: Optional[Dict[str, Any]] = None,
+                 guard: Optional[UpstreamGuard] = None, timeout: float = 10.0):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.role = role
+        self._claims = {"role": role, **(claims or {})} if role else dict(claims or {})
+        self.claims = orjson.dumps(self._claims).decode()
+        self.guard = guard
+        self.timeout = timeout
+        self._pool: Any = None
+        self._lock = asyncio.Lock()
+
+    async def pool(self) -> Any:
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    # Deferred import: only deployments with the asyncpg store pay for it
+                    import asyncpg
+
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        statement_cache_size=self.statement_cache_size,
+                        command_timeout=self.timeout,
+                        init=_init_connection,
+                    )
+        return self._pool
+
+    def _guarded(self):
+        if self.guard is None:
+            return nullcontext()
+        import asyncpg
+
+        return self.guard.calling((
+            TimeoutError, OSError,
+            asyncpg.exceptions.PostgresConnectionError,
+            asyncpg.exceptions.ConnectionDoesNotExistError,
+            asyncpg.exceptions.CannotConnectNowError,
+            asyncpg.exceptions.TooManyConnectionsError,
+        ))
+
+    @asynccontextmanager
+    async def connection(self, write: bool = False, claims: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        """
+        A pooled connection set up as the configured role and claims, plus
+        `claims` for this call (e.g. the caller's sub). Writes (and every
+        call when a role is set or claims are given) run in one
+        transaction, committed when the block exits without an error.
+        """
+        request_claims = orjson.dumps({**self._claims, **claims}).decode() if claims else self.claims
+        async with self._guarded():
+            pool = await self.pool()
+            async with pool.acquire(timeout=self.timeout) as conn:
+                if not (write or self.role or claims):
+                    yield conn
+                    return
+                async with conn.transaction():
+                    if self.role:
+                        await conn.execute(_SET_REQUEST, self.role, request_claims)
+                    else:
+                        await conn.execute(_SET_CLAIMS, request_claims)
+                    yield conn
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+@lru_cache()
+def get_database() -> Optional[Database]:
+    """Get the process-wide pool, or None when the asyncpg store is not configured or not installed."""
+    settings = get_settings()
+    if not settings.database_url:
+        logger.warning("project_store is asyncpg but DATABASE_URL is not set; using PostgREST")
+        return None
+    if importlib.util.find_spec("asyncpg") is None:
+        logger.warning("project_store asyncpg needs the 'asyncpg' package; using PostgREST")
+        return None
+    return Database(
+        settings.database_url,
+        min_size=settings.database_pool_min_size,
+        max_size=settings.database_pool_max_size,
+        statement_cache_size=settings.database_statement_cache_size,
+        role=settings.database_role,
+        claims=settings.database_jwt_claims,
+        guard=get_upstream_guard("postgres") if settings.upstream_guard_enabled else None,
+        timeout=settings.upstream_timeout_seconds,
+    )
@@ -0,0 +1,84 @@
+"""
+Table-driven camelCase <-> snake_case row mapping.
+
+A ColumnMapper is generated once from a pydantic model whose field names
+are the table's columns and whose aliases are the API keys (see
+app.models.project.Project). All key tables are built at construction, so
+mapping a row is a single dict build with no per-key string work.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+# (API key, column, default factory or None)
+Column = Tuple[str, str, Optional[Callable[[], Any]]]
+
+
+def _constant(value: Any) -> Callable[[], Any]:
+    return lambda: value
+
+
+class ColumnMapper:
+    """Maps rows between API (camelCase) and database (snake_case) keys."""
+
+    def __init__(self, columns: Iterable[Column]):
+        self.columns: Tuple[Column, ...] = tuple(columns)
+        self.api_keys = tuple(api for api, _, _ in self.columns)
+        self.db_columns = tuple(column for _, column, _ in self.columns)
+        # Keys the API spells differently; anything else passes through as is
+        self.to_db_keys: Dict[str, str] = {api: column for api, column, _ in self.columns if api != column}
+        self.from_db_keys: Dict[str, str] = {column: api for api, column, _ in self.columns}
+        # PostgREST select that renames columns server-side (rows come back in the API shape)
+        self.select = ",".join(api if api == column else f"{api}:{column}" for api, column, _ in self.columns)
+        self._column_set = frozenset(self.db_columns)
+        self._renames = tuple((column, api) for api, column, _ in self.columns if api != column)
+
+    @classmethod
+    def from_model(cls, model: Type[BaseModel]) -> "ColumnMapper":
+        """Build a mapper from a model's fields (column) and aliases (API key)."""
+        columns = []
+        for name, field in model.model_fields.items():
+            if field.default_factory is not None:
+                default = field.default_factory
+            elif field.default not in (None, PydanticUndefined):
+                default = _constant(field.default)
+            else:
+                default = None
+            columns.append((field.alias or name, name, default))
+        return cls(columns)
+
+    def to_db(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """API keys to columns, dropping None values (they mean "not sent")."""
+        keys = self.to_db_keys
+        return {keys.get(key, key): value for key, value in data.items() if value is not None}
+
+    def column(self, key: str) -> str:
+        """Column for an API key or column name."""
+        return self.to_db_keys.get(key, key)
+
+    def from_db(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Row to API keys. Every column of the model is present in the result;
+        columns missing from the row get the field default. Values are not copied.
+        """
+        return {
+            api: row[column] if column in row else (default() if default else None)
+            for api, column, default in self.columns
+        }
+
+    def from_db_many(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Map a list of freshly fetched rows. Rows of one PostgREST response
+        share their keys, so when the first row has exactly the model's
+        columns every row is renamed in place (only the keys the API spells
+        differently are touched) and the same list is returned. Otherwise
+        each row is rebuilt with from_db.
+        """
+        if rows and rows[0].keys() == self._column_set:
+            renames = self._renames
+            for row in rows:
+                for column, api in renames:
+                    row[api] = row.pop(column)
+            return rows
+        return [self.from_db(row) for row in rows]
@@ -0,0 +1,299 @@
+"""
+Request and upstream performance metrics.
+
+Provides:
+- MetricsMiddleware: per-route latency, request/response payload sizes and
+  an optional Server-Timing header breaking a request down by upstream.
+- instrument_client(): httpx event hooks on a Supabase client so every
+  PostgREST and Auth call is counted and timed without touching call sites.
+- record_cache_lookup(): hit/miss counters for in-process caches.
+- record_compression() / record_style_payload(): pre-compression body sizes
+  per route and a size budget for single style documents.
+- record_rate_limit(): rate limiter decisions by caller kind (user / ip).
+- record_coalesced(): single-flight leaders vs. requests that joined one.
+- record_upstream_rejection() / record_breaker_state(): calls turned away
+  by the upstream guards and the state of their circuit breakers.
+- metrics_response(): the Prometheus text exposition served at /metrics.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    "fcbl_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+REQUEST_SIZE = Histogram(
+    "fcbl_http_request_size_bytes", "HTTP request body size by route",
+    ["method", "route"], buckets=_SIZE_BUCKETS, registry=REGISTRY,
+)
+RESPONSE_SIZE = Histogram(
+    "fcbl_http_response_size_bytes", "HTTP response body size by route, as sent (after compression)",
+    ["method", "route"], buckets=_SIZE_BUCKETS, registry=REGISTRY,
+)
+RESPONSE_UNCOMPRESSED_SIZE = Histogram(
+    "fcbl_http_response_uncompressed_size_bytes", "HTTP response body size by route before compression",
+    ["method", "route", "encoding"], buckets=_SIZE_BUCKETS, registry=REGISTRY,
+)
+STYLE_PAYLOAD_SIZE = Histogram(
+    "fcbl_style_payload_bytes", "Encoded size of single style documents served or written",
+    buckets=_SIZE_BUCKETS, registry=REGISTRY,
+)
+STYLE_OVER_BUDGET = Counter(
+    "fcbl_style_payload_over_budget_total", "Single style documents larger than the payload budget",
+    registry=REGISTRY,
+)
+UPSTREAM_CALLS = Counter(
+    "fcbl_upstream_calls_total", "Outbound calls by upstream, operation and status class",
+    ["upstream", "operation", "status"], registry=REGISTRY,
+)
+UPSTREAM_LATENCY = Histogram(
+    "fcbl_upstream_call_duration_seconds", "Outbound call latency (until response headers)",
+    ["upstream", "operation"], buckets=_LATENCY_BUCKETS, registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "fcbl_cache_lookups_total", "In-process cache lookups",
+    ["cache", "result"], registry=REGISTRY,
+)
+COALESCED_REQUESTS = Counter(
+    "fcbl_coalesced_requests_total",
+    "Single-flight calls by role: leader (went upstream) or follower (shared a leader's result)",
+    ["group", "role"], registry=REGISTRY,
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "fcbl_rate_limit_decisions_total", "Rate limiter decisions (allowed, limited, error) by caller kind",
+    ["result", "caller"], registry=REGISTRY,
+)
+UPSTREAM_REJECTIONS = Counter(
+    "fcbl_upstream_rejections_total",
+    "Upstream calls refused or failed by the upstream guard (circuit open, too many concurrent calls, "
+    "timed out, connection failed)",
+    ["upstream", "reason"], registry=REGISTRY,
+)
+BREAKER_OPEN = Gauge(
+    "fcbl_upstream_breaker_open", "1 while an upstream's circuit breaker is open or half-open",
+    ["upstream"], registry=REGISTRY,
+)
+
+# Per-request accumulator of upstream time, read by the middleware for Server-Timing.
+# Holds {upstream: [total_seconds, call_count]}.
+_request_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_timings", default=None)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss."""
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_coalesced(group: str, leader: bool) -> None:
+    """Count a single-flight call as the one going upstream or one sharing its result."""
+    COALESCED_REQUESTS.labels(group=group, role="leader" if leader else "follower").inc()
+
+
+def record_rate_limit(result: str, key: str) -> None:
+    """Count a rate limiter decision for a bucket key ("user:..." or "ip:...")."""
+    RATE_LIMIT_DECISIONS.labels(result=result, caller=key.split(":", 1)[0]).inc()
+
+
+def record_upstream_rejection(upstream: str, reason: str) -> None:
+    """Count an upstream call the guard refused or failed."""
+    UPSTREAM_REJECTIONS.labels(upstream=upstream, reason=reason).inc()
+
+
+def record_breaker_state(upstream: str, state: str) -> None:
+    """Set the breaker gauge of an upstream from its state ("closed", "open", "half_open")."""
+    BREAKER_OPEN.labels(upstream=upstream).set(0 if state == "closed" else 1)
+
+
+def record_upstream_call(upstream: str, operation: str, status: str, elapsed: float) -> None:
+    """Record one outbound call (also used by callers that do not go through httpx)."""
+    UPSTREAM_CALLS.labels(upstream=upstream, operation=operation, status=status).inc()
+    UPSTREAM_LATENCY.labels(upstream=upstream, operation=operation).observe(elapsed)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(upstream, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+
+
+def record_compression(scope: Scope, encoding: str, uncompressed_bytes: int) -> None:
+    """Record a response body size before compression ("identity" if sent as is)."""
+    RESPONSE_UNCOMPRESSED_SIZE.labels(
+        method=scope["method"], route=route_template(scope), encoding=encoding,
+    ).observe(uncompressed_bytes)
+
+
+def record_style_payload(style_id: str, size_bytes: int, budget_bytes: int,
+                         sections: Optional[Dict[str, int]] = None) -> None:
+    """
+    Observe the size of one style document and log a warning when it is over
+    `budget_bytes` (0 disables the check). `sections` maps section name to
+    its encoded size and is included in the warning, largest first.
+    """
+    STYLE_PAYLOAD_SIZE.observe(size_bytes)
+    if not budget_bytes or size_bytes <= budget_bytes:
+        return
+    STYLE_OVER_BUDGET.inc()
+    largest = ""
+    if sections:
+        top = sorted(sections.items(), key=lambda item: item[1], reverse=True)[:3]
+        largest = "; largest sections: " + ", ".join(f"{name}={size}" for name, size in top)
+    logger.warning(f"Style {style_id} is {size_bytes} bytes, over the {budget_bytes} byte budget{largest}")
+
+
+def upstream_operation(path: str) -> str:
+    """Low-cardinality operation label from a Supabase URL path."""
+    parts = path.strip("/").split("/")
+    if parts[:2] == ["rest", "v1"] and len(parts) > 2:
+        return "/".join(parts[2:4]) if parts[2] == "rpc" else parts[2]
+    if parts[:2] == ["auth", "v1"] and len(parts) > 2:
+        return "auth/" + "/".join(parts[2:4])
+    return parts[0] if parts else ""
+
+
+def _event_hooks(upstream: str, is_async: bool) -> Dict[str, list]:
+    def on_request(request: "httpx.Request") -> None:
+        request.extensions["fcbl_start"] = time.perf_counter()
+
+    def on_response(response: "httpx.Response") -> None:
+        start = response.request.extensions.get("fcbl_start")
+        if start is None:
+            return
+        record_upstream_call(
+            upstream,
+            f"{response.request.method} {upstream_operation(response.request.url.path)}",
+            f"{response.status_code // 100}xx",
+            time.perf_counter() - start,
+        )
+
+    if not is_async:
+        return {"request": [on_request], "response": [on_response]}
+
+    async def on_request_async(request: "httpx.Request") -> None:
+        on_request(request)
+
+    async def on_response_async(response: "httpx.Response") -> None:
+        on_response(response)
+
+    return {"request": [on_request_async], "response": [on_response_async]}
+
+
+def instrument_httpx(client: Any, upstream: str) -> Any:
+    """Attach metrics event hooks to an httpx.Client or httpx.AsyncClient."""
+    import httpx  # deferred: only needed once a client exists (serverless cold start)
+
+    hooks = _event_hooks(upstream, isinstance(client, httpx.AsyncClient))
+    client.event_hooks = {
+        "request": list(client.event_hooks["request"]) + hooks["request"],
+        "response": list(client.event_hooks["response"]) + hooks["response"],
+    }
+    return client
+
+
+def instrument_client(client: Any) -> Any:
+    """Instrument the PostgREST and Auth HTTP sessions of a supabase-py client."""
+    instrument_httpx(client.postgrest.session, "supabase")
+    instrument_httpx(client.auth._http_client, "supabase_auth")
+    return client
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and payload sizes per route template
+    (e.g. /api/v1/styles/{style_id}), so label cardinality stays bounded.
+    With `server_timing` enabled, each response carries a Server-Timing
+    header with total app time and time spent in each upstream.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False, exclude_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.server_timing = server_timing
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, list] = {}
+        token = _request_timings.set(timings)
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    header = self._server_timing_header(time.perf_counter() - start, timings)
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", header.encode())]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route_path = route_template(scope)
+
+            REQUEST_LATENCY.labels(method=method, route=route_path, status=str(status_code)).observe(elapsed)
+            RESPONSE_SIZE.labels(method=method, route=route_path).observe(response_bytes)
+            content_length = _header(scope, b"content-length")
+            if content_length is not None and content_length.isdigit():
+                REQUEST_SIZE.labels(method=method, route=route_path).observe(int(content_length))
+
+    @staticmethod
+    def _server_timing_header(total: float, timings: Dict[str, list]) -> str:
+        parts = [f"app;dur={total * 1000:.1f}"]
+        for upstream, (seconds, count) in timings.items():
+            parts.append(f'{upstream};dur={seconds * 1000:.1f};desc="{count} calls"')
+        return ", ".join(parts)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the matched route, e.g. /api/v1/styles/{style_id}.
+    Routes from included routers may carry only their router-relative path,
+    in which case the prefix is taken from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    extra = path.rstrip("/").count("/") - template.rstrip("/").count("/")
+    if extra > 0:
+        template = "/".join(path.split("/")[:extra + 1]) + template
+    return template
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def metrics_response() -> Response:
+    """Render all metrics in the Prometheus text format."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,270 @@
+"""
+Shared token-bucket rate limiting.
+
+RateLimitMiddleware charges every API request against a token bucket keyed
+by the caller: the user id (`sub`) of a Supabase JWT verified locally with
+the project's JWT secret, or the client IP when the request is anonymous or
+the token cannot be verified. Buckets live in a store:
+
+- RedisStore ("redis://..." / "rediss://..."): one atomic Lua script per
+  decision, timed by the server clock, so any Redis-protocol server works
+  (Redis, Valkey, Upstash, a local container). Shared by all workers and
+  serverless instances, so the limit does not multiply with their count.
+  Needs the optional `redis` package.
+- MemoryStore ("memory://", the default): the same algorithm in process.
+  Every worker and serverless instance has its own buckets, so a caller
+  gets the limit once per process; for local runs and single-worker
+  deployments only.
+
+Reads cost `read_cost` tokens and writes `write_cost`. A read answered with
+304 Not Modified is refunded down to `not_modified_cost`, so clients that
+revalidate with If-None-Match can poll much more often than clients that
+download style documents again.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import importlib.util
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import record_rate_limit
+from app.core.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# (allowed, tokens left, seconds until `cost` tokens are available)
+Decision = Tuple[bool, float, float]
+
+# KEYS[1] bucket; ARGV rate (tokens/s), burst, cost. A negative cost refunds.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = math.min(burst, tokens - cost)
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class MemoryStore:
+    """Token buckets in this process (not shared between workers)."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def take(self, key: str, cost: float, rate: float, burst: float) -> Decision:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now, rate, burst)
+            bucket = self._buckets[key] = [burst, now]
+        tokens = min(burst, bucket[0] + max(0.0, now - bucket[1]) * rate)
+        allowed, retry_after = tokens >= cost, 0.0
+        if allowed:
+            tokens = min(burst, tokens - cost)
+        else:
+            retry_after = (cost - tokens) / rate
+        bucket[0], bucket[1] = tokens, now
+        return allowed, tokens, retry_after
+
+    def _prune(self, now: float, rate: float, burst: float) -> None:
+        # Full buckets carry no state; if that is not enough, drop the oldest half
+        for key in [k for k, (tokens, ts) in self._buckets.items() if tokens + (now - ts) * rate >= burst]:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            for key in list(self._buckets)[:len(self._buckets) // 2]:
+                del self._buckets[key]
+
+
+class RedisStore:
+    """Token buckets in a Redis-protocol server, shared by every instance."""
+
+    def __init__(self, url: str, key_prefix: str = "fcbl:ratelimit:"):
+        self.url = url
+        self.key_prefix = key_prefix
+        self._script: Any = None
+
+    async def take(self, key: str, cost: float, rate: float, burst: float) -> Decision:
+        if self._script is None:
+            # Deferred import: only deployments with a Redis URL pay for it
+            import redis.asyncio as redis
+
+            client = redis.from_url(self.url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            self._script = client.register_script(_TOKEN_BUCKET_LUA)
+        allowed, tokens, retry_after = await self._script(keys=[self.key_prefix + key], args=[rate, burst, cost])
+        return bool(allowed), float(tokens), float(retry_after)
+
+
+def create_store(url: str):
+    """Store for a `rate_limit_storage_url` ("memory://", "redis://...", "rediss://...")."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if importlib.util.find_spec("redis") is None:
+            logger.warning(f"Rate limit store {url} needs the 'redis' package; using per-process memory")
+            return MemoryStore()
+        return RedisStore(url)
+    if url in ("", "memory://"):
+        return MemoryStore()
+    raise ValueError(f"Unsupported rate limit storage URL: {url}")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def jwt_algorithm(token: str) -> Optional[str]:
+    """`alg` named in the (unverified) header of a JWT, else None."""
+    try:
+        alg = orjson.loads(_b64decode(token.split(".")[0])).get("alg")
+        return alg if isinstance(alg, str) else None
+    except (ValueError, binascii.Error, AttributeError):
+        return None
+
+
+def jwt_claims(token: str, secret: str) -> Optional[Dict[str, Any]]:
+    """Claims of an unexpired HS256 JWT signed with `secret`, else None."""
+    try:
+        header, payload, signature = token.split(".")
+        if jwt_algorithm(token) != "HS256":
+            return None
+        expected = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = orjson.loads(_b64decode(payload))
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] < time.time():
+            return None
+        return claims
+    except (ValueError, binascii.Error, AttributeError):
+        return None
+
+
+def jwt_subject(token: str, secret: str) -> Optional[str]:
+    """`sub` of an unexpired HS256 JWT signed with `secret`, else None."""
+    claims = jwt_claims(token, secret)
+    sub = claims.get("sub") if claims else None
+    return str(sub) if sub else None
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing per-caller token buckets on paths under
+    `prefix`. Limited requests get 429 with Retry-After; every limited path
+    carries RateLimit-Limit / RateLimit-Remaining. If the store is
+    unreachable the request is let through (and counted as an error), so a
+    Redis outage does not take the API down with it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Any,
+        per_minute: float = 60,
+        burst: float = 60,
+        read_cost: float = 1.0,
+        write_cost: float = 2.0,
+        not_modified_cost: float = 0.2,
+        jwt_secret: str = "",
+        trust_forwarded_for: bool = False,
+        prefix: str = "/api/v1",
+        exempt_paths: tuple = ("/api/v1/health",),
+    ):
+        self.app = app
+        self.store = store
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.read_cost = read_cost
+        self.write_cost = write_cost
+        self.not_modified_cost = not_modified_cost
+        self.jwt_secret = jwt_secret
+        self.trust_forwarded_for = trust_forwarded_for
+        self.prefix = prefix
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or not scope["path"].startswith(self.prefix) or scope["path"] in self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        key = self.client_key(scope)
+        is_read = scope["method"] in ("GET", "HEAD")
+        cost = self.read_cost if is_read else self.write_cost
+        try:
+            allowed, remaining, retry_after = await self.store.take(key, cost, self.rate, self.burst)
+        except Exception as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            record_rate_limit("error", key)
+            await self.app(scope, receive, send)
+            return
+
+        record_rate_limit("allowed" if allowed else "limited", key)
+        headers = [
+            (b"ratelimit-limit", str(int(self.burst)).encode()),
+            (b"ratelimit-remaining", str(int(remaining)).encode()),
+        ]
+        if not allowed:
+            response = ORJSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        status_code = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        refund = self.read_cost - self.not_modified_cost
+        if is_read and status_code == 304 and refund > 0:
+            try:
+                await self.store.take(key, -refund, self.rate, self.burst)
+            except Exception as e:
+                logger.warning(f"Rate limit refund failed: {e}")
+
+    def client_key(self, scope: Scope) -> str:
+        """"user:<id>" for a verified bearer token, otherwise "ip:<address>"."""
+        authorization = forwarded = None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+            elif name == b"x-forwarded-for":
+                forwarded = value.decode("latin-1")
+        if self.jwt_secret and authorization and authorization.startswith("Bearer "):
+            subject = jwt_subject(authorization[7:].strip(), self.jwt_secret)
+            if subject:
+                return f"user:{subject}"
+        if self.trust_forwarded_for and forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
@@ -0,0 +1,422 @@
+"""
+Upstream resilience - deadlines, admission control and a circuit breaker
+around every Supabase HTTP call.
+
+Each upstream ("supabase" for PostgREST, "supabase_auth" for GoTrue) has
+one process-wide UpstreamGuard, shared by every client talking to it:
+
+- a deadline: connect/read/write/pool timeouts of at most
+  upstream_timeout_seconds per call, so a hung upstream holds a worker
+  thread for a bounded time instead of the client's default two minutes;
+- admission control: at most upstream_max_concurrency calls in flight; a
+  call waits up to upstream_queue_timeout_seconds for a slot and is turned
+  away otherwise, so a slow upstream does not pile up work in the worker.
+  A blocking call made on the event loop thread is turned away at once
+  instead, as waiting there would stall every other request;
+- a circuit breaker: after breaker_failure_threshold consecutive failures
+  (timeouts, connection errors, 5xx answers) calls fail straight away for
+  breaker_open_seconds, then a single probe call decides whether it closes.
+
+Turned-away and failed calls (and 502/503/504 answers) raise
+UpstreamUnavailable, a 503 with Retry-After that route handlers pass
+through like any HTTPException.
+StaleCache keeps the last good rendering of a read so it can be served
+(marked stale) while the upstream is unavailable.
+
+guard_httpx() wraps the transport of an httpx client, the same way
+trace_httpx() does, so no call site changes. Calls made with another
+driver (the asyncpg project store) run inside UpstreamGuard.calling().
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, Optional, Tuple, Type
+
+import httpx
+from fastapi import HTTPException
+
+from app.config import get_settings
+from app.core.metrics import record_breaker_state, record_cache_lookup, record_upstream_rejection
+
+# Answers the breaker counts as failures: the upstream (or the way to it) is in trouble
+_FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+# ...and those that are passed on as UpstreamUnavailable rather than as an error of the call
+_UNAVAILABLE_STATUSES = frozenset({502, 503, 504})
+
+
+def _on_event_loop() -> bool:
+    """Whether the calling thread is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class UpstreamUnavailable(HTTPException):
+    """An upstream call was turned away or failed; retry after `retry_after` seconds."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float):
+        seconds = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=503,
+            detail=f"Upstream {upstream} unavailable ({reason}), retry in {seconds}s",
+            headers={"Retry-After": str(seconds)},
+        )
+        self.upstream = upstream
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. Closed: calls go through. Open:
+    calls are refused until `open_seconds` have passed. Half-open: one
+    probe call goes through; its success closes the breaker, its failure
+    opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """0 when a call may go ahead (claiming the probe when half-open), else seconds to wait."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - self.clock()
+                if remaining > 0:
+                    return remaining
+                self.state = self.HALF_OPEN
+            if self._probing:
+                return 1.0
+            self._probing = True
+            return 0.0
+
+    def record(self, ok: bool) -> str:
+        """Count the outcome of a call that went ahead; returns the new state."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+            if ok:
+                self.state, self.failures = self.CLOSED, 0
+            else:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state, self._opened_at = self.OPEN, self.clock()
+            return self.state
+
+    def wait_hint(self) -> float:
+        """Seconds a refused caller should wait: the rest of the open period, else a moment."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return max(1.0, self._opened_at + self.open_seconds - self.clock())
+            return 1.0
+
+    def release_probe(self) -> None:
+        """The probe never reached the upstream (refused for another reason); let the next call probe."""
+        with self._lock:
+            self._probing = False
+
+
+class UpstreamGuard:
+    """Deadline, concurrency limit and circuit breaker of one upstream."""
+
+    def __init__(self, name: str, timeout: float = 10.0, max_concurrency: int = 32,
+                 queue_timeout: float = 0.5, failure_threshold: int = 5, open_seconds: float = 10.0):
+        self.name = name
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(failure_threshold, open_seconds)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def apply_deadline(self, request: httpx.Request) -> None:
+        """Cap the request's connect/read/write/pool timeouts at the upstream deadline."""
+        timeouts = dict(request.extensions.get("timeout") or {})
+        for phase in ("connect", "read", "write", "pool"):
+            current = timeouts.get(phase)
+            timeouts[phase] = self.timeout if current is None else min(current, self.timeout)
+        request.extensions["timeout"] = timeouts
+
+    def _refuse(self, reason: str, retry_after: float) -> UpstreamUnavailable:
+        record_upstream_rejection(self.name, reason)
+        return UpstreamUnavailable(self.name, reason, retry_after)
+
+    def _admitted(self) -> None:
+        """Check the breaker once a slot is held; gives the slot back if it refuses."""
+        wait = self.breaker.retry_after()
+        if wait:
+            self._slots.release()
+            raise self._refuse("circuit open", wait)
+
+    def admit(self) -> None:
+        """Take a slot and pass the breaker, or raise UpstreamUnavailable."""
+        if _on_event_loop():
+            # Blocking calls belong in worker threads; never wait for a slot here
+            acquired = self._slots.acquire(blocking=False)
+        else:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        if not acquired:
+            raise self._refuse("too many concurrent calls", 1)
+        self._admitted()
+
+    async def admit_async(self) -> None:
+        """admit() without blocking the event loop while waiting for a slot."""
+        deadline = time.monotonic() + self.queue_timeout
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise self._refuse("too many concurrent calls", 1)
+            await asyncio.sleep(0.005)
+        self._admitted()
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def record(self, ok: bool) -> None:
+        record_breaker_state(self.name, self.breaker.record(ok))
+
+    def failed(self, error: Exception) -> UpstreamUnavailable:
+        """Count a timeout or transport error and turn it into a 503."""
+        self.record(False)
+        reason = "timed out" if isinstance(error, (httpx.TimeoutException, TimeoutError)) else "connection failed"
+        return self._refuse(reason, self.breaker.wait_hint())
+
+    def answered(self, status_code: int) -> Optional[UpstreamUnavailable]:
+        """Count an answer; a 503 to raise instead of it when the upstream says it is unavailable."""
+        self.record(status_code not in _FAILURE_STATUSES)
+        if status_code in _UNAVAILABLE_STATUSES:
+            self.release()
+            return self._refuse(f"answered {status_code}", self.breaker.wait_hint())
+        return None
+
+    @asynccontextmanager
+    async def calling(self, failures: Tuple[Type[BaseException], ...] = (TimeoutError, OSError)):
+        """
+        Guard a call made outside httpx: `failures` (timeouts, lost
+        connections) count against the breaker and become a 503; any other
+        error is an answer from a healthy upstream and is raised as it is.
+        """
+        await self.admit_async()
+        try:
+            yield
+        except failures as e:
+            raise self.failed(e) from e
+        except Exception:
+            self.record(True)
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        else:
+            self.record(True)
+        finally:
+            self.release()
+
+    def __repr__(self) -> str:
+        return f"UpstreamGuard({self.name!r}, state={self.breaker.state})"
+
+
+class _GuardedStream(httpx.SyncByteStream):
+    """Response body that gives the upstream slot back once it has been read (or closed)."""
+
+    def __init__(self, inner: httpx.SyncByteStream, guard: UpstreamGuard):
+        self.inner = inner
+        self.guard = guard
+        self._released = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            yield from self.inner
+        except httpx.TransportError as e:
+            raise self.guard.failed(e) from e
+
+    def close(self) -> None:
+        try:
+            self.inner.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self.guard.release()
+
+
+class _AsyncGuardedStream(httpx.AsyncByteStream):
+    """Async variant of _GuardedStream."""
+
+    def __init__(self, inner: httpx.AsyncByteStream, guard: UpstreamGuard):
+        self.inner = inner
+        self.guard = guard
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self.inner:
+                yield chunk
+        except httpx.TransportError as e:
+            raise self.guard.failed(e) from e
+
+    async def aclose(self) -> None:
+        try:
+            await self.inner.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self.guard.release()
+
+
+class _GuardedTransport(httpx.BaseTransport):
+    """Wraps an httpx transport with an upstream's deadline, concurrency limit and breaker."""
+
+    def __init__(self, inner: httpx.BaseTransport, guard: UpstreamGuard):
+        self.inner = inner
+        self.guard = guard
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.guard.admit()
+        self.guard.apply_deadline(request)
+        try:
+            response = self.inner.handle_request(request)
+        except httpx.TransportError as e:
+            self.guard.release()
+            raise self.guard.failed(e) from e
+        except BaseException:
+            self.guard.breaker.release_probe()
+            self.guard.release()
+            raise
+        unavailable = self.guard.answered(response.status_code)
+        if unavailable:
+            response.stream.close()
+            raise unavailable
+        if response.is_closed:
+            # Already read by the transport (e.g. httpx.MockTransport): no body left to wait for
+            self.guard.release()
+            return response
+        response.stream = _GuardedStream(response.stream, self.guard)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _AsyncGuardedTransport(httpx.AsyncBaseTransport):
+    """Async variant of _GuardedTransport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, guard: UpstreamGuard):
+        self.inner = inner
+        self.guard = guard
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.guard.admit_async()
+        self.guard.apply_deadline(request)
+        try:
+            response = await self.inner.handle_async_request(request)
+        except httpx.TransportError as e:
+            self.guard.release()
+            raise self.guard.failed(e) from e
+        except BaseException:
+            self.guard.breaker.release_probe()
+            self.guard.release()
+            raise
+        unavailable = self.guard.answered(response.status_code)
+        if unavailable:
+            await response.stream.aclose()
+            raise unavailable
+        if response.is_closed:
+            self.guard.release()
+            return response
+        response.stream = _AsyncGuardedStream(response.stream, self.guard)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_upstream_guard(upstream: str) -> UpstreamGuard:
+    """Get the process-wide guard of an upstream."""
+    settings = get_settings()
+    return UpstreamGuard(
+        upstream,
+        timeout=settings.upstream_timeout_seconds,
+        max_concurrency=settings.upstream_max_concurrency,
+        queue_timeout=settings.upstream_queue_timeout_seconds,
+        failure_threshold=settings.breaker_failure_threshold,
+        open_seconds=settings.breaker_open_seconds,
+    )
+
+
+def guard_httpx(client: Any, upstream: str) -> Any:
+    """Wrap the transport of an httpx.Client or httpx.AsyncClient with the upstream's guard."""
+    if not get_settings().upstream_guard_enabled:
+        return client
+    guard = get_upstream_guard(upstream)
+    if isinstance(client, httpx.AsyncClient):
+        client._transport = _AsyncGuardedTransport(client._transport, guard)
+    else:
+        client._transport = _GuardedTransport(client._transport, guard)
+    return client
+
+
+def guard_client(client: Any) -> Any:
+    """Guard the PostgREST and Auth HTTP sessions of a supabase-py client."""
+    guard_httpx(client.postgrest.session, "supabase")
+    guard_httpx(client.auth._http_client, "supabase_auth")
+    return client
+
+
+class StaleCache:
+    """
+    The last good rendering of reads, by key, to serve while the upstream
+    is unavailable. Least recently stored entries go beyond `max_bytes`.
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[Hashable, Tuple[bytes, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: Hashable, body: bytes, tag: str) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._items[key] = (body, tag, time.time())
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (dropped, _, _) = self._items.popitem(last=False)
+                self.size -= len(dropped)
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str, float]]:
+        """(body, etag, stored_at) of the last good rendering, or None."""
+        with self._lock:
+            entry = self._items.get(key)
+        record_cache_lookup(self.name, entry is not None)
+        return entry
+
+    def discard(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                old = self._items.pop(key, None)
+                if old is not None:
+                    self.size -= len(old[0])
+
+    def stale_headers(self, stored_at: float) -> Dict[str, str]:
+        """Headers marking a response as served from this cache."""
+        return {"Age": str(max(0, int(time.time() - stored_at))), "Warning": '110 - "Response is Stale"'}
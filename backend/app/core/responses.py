@@ -0,0 +1,72 @@
+"""
+Fast JSON responses.
+
+Provides:
+- ORJSONResponse: the app's default response class; renders with orjson
+  instead of the stdlib encoder.
+- envelope(): wraps an already-encoded JSON body (e.g. straight from
+  PostgREST) in the {"data": ..., "error": null} envelope without parsing it.
+- conditional(): ETag / If-None-Match handling for a rendered response.
+
+Route handlers that return one of these directly also skip FastAPI's
+jsonable_encoder pass, which walks every value of large style documents.
+"""
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+
+def _default(value: Any) -> Any:
+    # Rare types orjson does not know natively (Decimal, pydantic models, sets)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def envelope(data: bytes, status_code: int = 200, **extra: Any) -> Response:
+    """
+    Respond with `data` (encoded JSON) as the envelope's "data" member.
+
+    Extra keyword arguments become additional top-level members.
+    """
+    body = b'{"data":' + data
+    for key, value in extra.items():
+        body += b',' + dumps(key) + b':' + dumps(value)
+    body += b',"error":null}'
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def etag(body: bytes) -> str:
+    """Strong entity tag for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def conditional(request: Request, response: Response, tag: Optional[str] = None) -> Response:
+    """
+    Tag `response` with an ETag of its body (or `tag`, if already computed),
+    or answer 304 Not Modified when the request's If-None-Match already
+    names it. Tags are compared weakly, as compression turns them into
+    W/"..." on the way out.
+    """
+    tag = tag or etag(response.body)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+        if tag in candidates or "*" in candidates:
+            return Response(status_code=304, headers={"ETag": tag})
+    response.headers["ETag"] = tag
+    return response
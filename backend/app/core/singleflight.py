@@ -0,0 +1,47 @@
+"""
+Single-flight request coalescing.
+
+SingleFlight.do(key, fn) runs `fn` once for all concurrent callers with the
+same key: the first caller starts it, later callers wait for the same
+result (or exception) instead of issuing their own upstream request. Only
+calls in flight are shared - nothing is cached once the call completes.
+
+A caller can therefore get the result of a call that started before it
+did: a read issued right after a write may join a read that was already
+in flight and return the value from before the write. Results are at most
+one call old; a read that starts once the call in flight at the time of the
+write has finished sees the write.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import record_coalesced
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key within one event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        record_coalesced(self.name, leader=task is None)
+        if task is None:
+            # A task of its own, so a caller that disconnects does not cancel
+            # the call for everybody else waiting on it
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+    def in_flight(self) -> int:
+        """Number of keys with a call in flight."""
+        return len(self._calls)
@@ -2,24 +2,38 @@
 Supabase client configuration.
 """
 from functools import lru_cache
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 
 from app.config import get_settings
+from app.core.metrics import instrument_client
+from app.core.resilience import guard_client
+from app.core.tracing import instrument_client_tracing
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def create_instrumented_client(url: str, key: str) -> "Client":
+    """Create a Supabase client whose HTTP calls are guarded, metered and traced."""
+    # Imported here: supabase is the slowest import of the app (serverless cold start)
+    from supabase import create_client
+
+    return instrument_client_tracing(instrument_client(guard_client(create_client(url, key))))
 
 
 @lru_cache()
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Get cached Supabase client instance (anon key - subject to RLS)."""
     settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_anon_key)
+    return create_instrumented_client(settings.supabase_url, settings.supabase_anon_key)
 
 
-def get_supabase() -> Client:
+def get_supabase() -> "Client":
     """Dependency injection for Supabase client."""
     return get_supabase_client()
 
 
-def get_supabase_admin() -> Client:
+def get_supabase_admin() -> "Client":
     """Get Supabase client with service role key - bypasses RLS. Use only in trusted server-side code."""
     settings = get_settings()
     key = settings.supabase_service_role_key
@@ -29,4 +43,4 @@ def get_supabase_admin() -> Client:
             "Set it in backend/.env with the service_role key from your Supabase dashboard: "
             "https://supabase.com/dashboard/project/zilbigcueizkfvvpuwjp/settings/api"
         )
-    return create_client(settings.supabase_url, key)
+    return create_instrumented_client(settings.supabase_url, key)
@@ -0,0 +1,218 @@
+"""
+OpenTelemetry tracing.
+
+Spans cover the incoming request (TracingMiddleware), the auth
+dependencies and service methods (@traced) and every outbound Supabase
+HTTP call (instrument_client_tracing). Without setup_tracing() the
+opentelemetry-api no-op tracer is used, so instrumentation costs almost
+nothing when tracing is disabled.
+
+Exporters:
+- "console": print finished spans to stdout
+- "otlp":    OTLP/HTTP (requires opentelemetry-exporter-otlp-proto-http)
+- "memory":  keep spans in memory (see get_memory_exporter) for local checks
+"""
+import functools
+import importlib.util
+import inspect
+import logging
+from typing import Any, Callable, Optional
+
+import httpx
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import route_template, upstream_operation
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "fcbl.backend"
+
+# Newer FastAPI releases open their own server span per request; the
+# TracingMiddleware is only needed on versions that do not.
+FRAMEWORK_SERVER_SPANS = importlib.util.find_spec("fastapi.telemetry") is not None
+
+_memory_exporter = None
+
+
+def get_tracer() -> trace.Tracer:
+    return trace.get_tracer(TRACER_NAME)
+
+
+def setup_tracing(
+    exporter: str = "console",
+    sample_ratio: float = 1.0,
+    otlp_endpoint: str = "",
+    service_name: str = "fcbl-api",
+) -> bool:
+    """
+    Install a TracerProvider with a parent-based ratio sampler and the chosen
+    exporter. Returns False (tracing stays a no-op) if the SDK or exporter
+    package is not installed.
+    """
+    global _memory_exporter
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("opentelemetry-sdk is not installed - tracing disabled")
+        return False
+
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+        resource=Resource.create({"service.name": service_name}),
+    )
+
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http is not installed - tracing disabled")
+            return False
+        kwargs = {"endpoint": otlp_endpoint} if otlp_endpoint else {}
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(**kwargs)))
+    elif exporter == "memory":
+        _memory_exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_memory_exporter))
+    else:
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+
+    trace.set_tracer_provider(provider)
+    return True
+
+
+def get_memory_exporter():
+    """The in-memory exporter installed by setup_tracing(exporter="memory"), if any."""
+    return _memory_exporter
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator wrapping a sync or async function in a span named
+    `name` (default: the function's qualified name).
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().start_as_current_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().start_as_current_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class _TracingTransport(httpx.BaseTransport):
+    """Wraps an httpx transport with a client span per request."""
+
+    def __init__(self, inner: httpx.BaseTransport, upstream: str):
+        self.inner = inner
+        self.upstream = upstream
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with get_tracer().start_as_current_span(
+            f"{self.upstream} {request.method} {upstream_operation(request.url.path)}", kind=SpanKind.CLIENT
+        ) as span:
+            span.set_attribute("http.request.method", request.method)
+            span.set_attribute("url.full", str(request.url.copy_with(query=None)))
+            propagate.inject(request.headers)
+            response = self.inner.handle_request(request)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _AsyncTracingTransport(httpx.AsyncBaseTransport):
+    """Async variant of _TracingTransport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, upstream: str):
+        self.inner = inner
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with get_tracer().start_as_current_span(
+            f"{self.upstream} {request.method} {upstream_operation(request.url.path)}", kind=SpanKind.CLIENT
+        ) as span:
+            span.set_attribute("http.request.method", request.method)
+            span.set_attribute("url.full", str(request.url.copy_with(query=None)))
+            propagate.inject(request.headers)
+            response = await self.inner.handle_async_request(request)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def trace_httpx(client: Any, upstream: str) -> Any:
+    """Wrap the transport of an httpx.Client or httpx.AsyncClient with client spans."""
+    if isinstance(client, httpx.AsyncClient):
+        client._transport = _AsyncTracingTransport(client._transport, upstream)
+    else:
+        client._transport = _TracingTransport(client._transport, upstream)
+    return client
+
+
+def instrument_client_tracing(client: Any) -> Any:
+    """Trace the PostgREST and Auth HTTP sessions of a supabase-py client."""
+    trace_httpx(client.postgrest.session, "supabase")
+    trace_httpx(client.auth._http_client, "supabase_auth")
+    return client
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per request. Continues the
+    caller's trace when a W3C traceparent header is present.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        context = propagate.extract(carrier)
+
+        with get_tracer().start_as_current_span(
+            f"{scope['method']} {scope['path']}", context=context, kind=SpanKind.SERVER
+        ) as span:
+            span.set_attribute("http.request.method", scope["method"])
+            span.set_attribute("url.path", scope["path"])
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name the span after the route template once routing has run
+                route = route_template(scope)
+                if route != "unmatched":
+                    span.set_attribute("http.route", route)
+                    span.update_name(f"{scope['method']} {route}")
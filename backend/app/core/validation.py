@@ -0,0 +1,53 @@
+"""
+Request bodies checked against precompiled pydantic TypeAdapters.
+
+json_body() turns a TypeAdapter into a dependency that reads the body
+(size-limited, see app.core.body_limit), parses it with orjson and rejects
+it before any route code or database call runs when it is malformed, not
+an object, has a key the model does not know, or fails validation. A
+valid body is returned as sent: the model is a gate, not a rewrite, so
+large free-form sections are not copied a second time. Errors are
+FastAPI's usual 422 response, without echoing the input back.
+"""
+from typing import Any, Awaitable, Callable, Collection, Dict
+
+import orjson
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+
+def json_body(
+    adapter: TypeAdapter, keys: Collection[str], exclude: Collection[str] = ()
+) -> Callable[[Request], Awaitable[Dict[str, Any]]]:
+    """
+    Dependency returning the validated JSON object of the body without the
+    keys in `exclude`. `keys` are the top-level keys the model accepts.
+    """
+    known = frozenset(keys)
+    excluded = frozenset(exclude)
+
+    async def dependency(request: Request) -> Dict[str, Any]:
+        body = await request.body()
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": f"Invalid JSON: {e}"}])
+        if not isinstance(data, dict):
+            raise RequestValidationError([{"type": "dict_type", "loc": ("body",), "msg": "Input should be an object"}])
+        unknown = data.keys() - known
+        if unknown:
+            raise RequestValidationError([
+                {"type": "extra_forbidden", "loc": ("body", key), "msg": "Extra inputs are not permitted"}
+                for key in sorted(unknown)
+            ])
+        try:
+            adapter.validate_python(data)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])}
+                 for error in e.errors(include_url=False, include_context=False, include_input=False)]
+            )
+        return {key: value for key, value in data.items() if key not in excluded}
+
+    return dependency
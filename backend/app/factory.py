@@ -0,0 +1,222 @@
+"""
+Application factory shared by the uvicorn server (app.main) and the Vercel
+serverless function (api/index.py).
+
+Everything imported at module level here is on the serverless cold-start
+path, so route modules, the supabase client, the audit service and tracing
+are imported only where they are first needed.
+"""
+import hmac
+import logging
+import sys
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import get_settings
+from app.api.v1.router import LazyRoutes, build_api_router
+from app.core.body_limit import BodyLimitMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware, metrics_response
+from app.core.rate_limit import MemoryStore, RateLimitMiddleware, create_store
+from app.core.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and drain them on shutdown."""
+    from app.services.audit_service import get_audit_service
+
+    audit = get_audit_service()
+    await audit.start()
+    yield
+    await audit.stop()
+
+    # The PDF render pool, if a document was rendered
+    from app.services.document_service import get_document_service
+
+    if get_document_service.cache_info().currsize:
+        get_document_service().close()
+
+    # The QC analytics store, if a report was requested (flushes a file-backed store)
+    from app.services.qc_analytics import get_qc_analytics
+
+    if get_qc_analytics.cache_info().currsize:
+        get_qc_analytics().close()
+
+    # The asyncpg pool of the direct project store, if it was configured and used
+    from app.core.database import get_database
+
+    if get_database.cache_info().currsize and get_database() is not None:
+        await get_database().close()
+
+
+class AuditFlushMiddleware:
+    """
+    Writes the audit events of a request once it has been answered, when
+    no lifespan flush loop is running to do it (the serverless function
+    gets no lifespan, and may be frozen as soon as the request is done).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Only if a route already loaded the audit service
+            audit_module = sys.modules.get("app.services.audit_service")
+            if scope["type"] == "http" and audit_module and audit_module.get_audit_service.cache_info().currsize:
+                await audit_module.get_audit_service().flush_unattended()
+
+
+def create_app(lazy_routes: bool = False, docs_prefix: str = "") -> FastAPI:
+    """
+    Build the API application.
+
+    lazy_routes: import each route module on the first request under its
+        prefix instead of at startup (serverless cold start).
+    docs_prefix: prefix for /docs, /redoc and /openapi.json, e.g. "/api"
+        when only /api/* is routed to the app.
+    """
+    settings = get_settings()
+    if lazy_routes and "documents_render_workers" not in settings.model_fields_set:
+        # Serverless: an instance serves one request at a time and may be
+        # frozen between them, so documents render in a thread, not a pool
+        settings.documents_render_workers = 0
+
+    app = FastAPI(
+        title="FCBL Production API",
+        description="Backend API for the Factory Portal - Garment Tech Pack Management System",
+        version="1.0.0",
+        docs_url=f"{docs_prefix}/docs",
+        redoc_url=f"{docs_prefix}/redoc",
+        openapi_url=f"{docs_prefix}/openapi.json",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+
+    # API routes - the lazy variant is the innermost middleware so modules are
+    # included before routing sees the request
+    if lazy_routes:
+        app.add_middleware(LazyRoutes, fastapi_app=app, prefix=settings.api_v1_prefix)
+    else:
+        app.include_router(build_api_router(), prefix=settings.api_v1_prefix)
+    app.add_middleware(AuditFlushMiddleware)
+
+    # Rate limiting - inside CORS so 429s are readable by the browser, and
+    # ahead of lazy route loading so rejected requests cost no imports
+    if settings.rate_limit_enabled:
+        store = create_store(settings.rate_limit_storage_url)
+        if lazy_routes and isinstance(store, MemoryStore):
+            logger.warning("Rate limits are kept per serverless instance; set RATE_LIMIT_STORAGE_URL "
+                           "to a Redis URL to share them")
+        app.add_middleware(
+            RateLimitMiddleware,
+            store=store,
+            per_minute=settings.rate_limit_per_minute,
+            burst=settings.rate_limit_burst,
+            read_cost=settings.rate_limit_read_cost,
+            write_cost=settings.rate_limit_write_cost,
+            not_modified_cost=settings.rate_limit_not_modified_cost,
+            jwt_secret=settings.supabase_jwt_secret,
+            trust_forwarded_for=settings.rate_limit_trust_forwarded_for,
+            prefix=settings.api_v1_prefix,
+            exempt_paths=(f"{settings.api_v1_prefix}/health",),
+        )
+
+    # Body size limits - ahead of routing and rate limiting, so an oversized
+    # body is refused before anything reads it; inside CORS so 413s are readable
+    app.add_middleware(
+        BodyLimitMiddleware,
+        default_limit=settings.max_body_bytes,
+        route_limits=settings.max_body_bytes_by_route,
+        prefix=settings.api_v1_prefix,
+    )
+
+    # Configure CORS - dynamically include production URL
+    allowed_origins = [
+        settings.frontend_url,  # Production URL from env var
+        "http://localhost:5173",
+        "http://localhost:3000",
+        "http://127.0.0.1:5173",
+    ]
+
+    # Add Vercel preview deployment URLs pattern
+    if settings.frontend_url and ".vercel.app" in settings.frontend_url:
+        # Also allow preview deployments from the same Vercel project
+        base_domain = settings.frontend_url.split(".")[0].replace("https://", "")
+        allowed_origins.append(f"https://{base_domain}-*.vercel.app")
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allowed_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["Authorization", "Content-Type", "apikey", "If-None-Match"],
+        expose_headers=["ETag", "Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "Content-Disposition"],
+    )
+
+    # Compression - inside metrics so response sizes are recorded as sent
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+            zstd_level=settings.compression_zstd_level,
+        )
+
+    # Request metrics - wraps CORS and compression and measures the full request
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware, server_timing=settings.metrics_server_timing)
+
+    # Tracing - outermost so the server span covers metrics and CORS as well
+    if settings.tracing_enabled:
+        from app.core.tracing import FRAMEWORK_SERVER_SPANS, TracingMiddleware, setup_tracing
+
+        if setup_tracing(
+            exporter=settings.tracing_exporter,
+            sample_ratio=settings.tracing_sample_ratio,
+            otlp_endpoint=settings.tracing_otlp_endpoint,
+        ) and not FRAMEWORK_SERVER_SPANS:
+            app.add_middleware(TracingMiddleware)
+
+    async def health_check():
+        """Health check endpoint."""
+        return {
+            "status": "healthy",
+            "version": "1.0.0",
+            "supabase_configured": bool(settings.supabase_url and settings.supabase_anon_key),
+        }
+
+    app.get("/health")(health_check)
+    app.get(f"{settings.api_v1_prefix}/health")(health_check)
+
+    if settings.metrics_enabled and settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}".encode()
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics(request: Request):
+            """Prometheus metrics endpoint, for scrapers holding METRICS_TOKEN."""
+            if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+                raise HTTPException(status_code=401, detail="Metrics token required",
+                                    headers={"WWW-Authenticate": "Bearer"})
+            return metrics_response()
+
+    @app.get("/")
+    async def root():
+        """Root endpoint with API information."""
+        return {
+            "message": "FCBL Production API",
+            "docs": app.docs_url,
+            "health": "/health",
+            "api": settings.api_v1_prefix,
+        }
+
+    return app
@@ -3,7 +3,7 @@ Pydantic models for Project data.
 These mirror the TypeScript types in types.ts.
 """
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from datetime import datetime
 
 
@@ -53,19 +53,28 @@ class UploadedTechPack(BaseModel):
 
 # ============= Project Model =============
 
-class ProjectCreate(BaseModel):
-    """Schema for creating a new project."""
-    title: str
-    po_numbers: List[PONumber] = Field(default_factory=list, alias="poNumbers")
-    status: str = "DRAFT"
-
-    class Config:
-        populate_by_name = True
-
-
 class ProjectUpdate(BaseModel):
-    """Schema for updating a project (all fields optional)."""
+    """
+    Schema for updating a project: every column of Project, all optional.
+    Unknown keys are rejected; id, createdAt and updatedAt are accepted
+    (clients send whole documents back) but never written.
+    """
+    id: Optional[str] = None
+    created_at: Optional[str] = Field(None, alias="createdAt")
+    updated_at: Optional[str] = Field(None, alias="updatedAt")
     title: Optional[str] = None
+    brand: Optional[str] = None
+    team: Optional[str] = None
+    main_status: Optional[str] = Field(None, alias="mainStatus")
+    factory_name: Optional[str] = Field(None, alias="factoryName")
+    product_image: Optional[str] = Field(None, alias="productImage")
+    product_colors: Optional[List[Any]] = Field(None, alias="productColors")
+    article_number: Optional[str] = Field(None, alias="articleNumber")
+    style_number: Optional[str] = Field(None, alias="styleNumber")
+    description: Optional[str] = None
+    po_receive_date: Optional[str] = Field(None, alias="poReceiveDate")
+    shipment_date: Optional[str] = Field(None, alias="shipmentDate")
+    fob: Optional[str] = None
     po_numbers: Optional[List[PONumber]] = Field(None, alias="poNumbers")
     status: Optional[str] = None
     tech_pack_files: Optional[List[Any]] = Field(None, alias="techPackFiles")
@@ -81,16 +90,63 @@ class ProjectUpdate(BaseModel):
     material_remarks: Optional[str] = Field(None, alias="materialRemarks")
     material_attachments: Optional[List[Any]] = Field(None, alias="materialAttachments")
     material_comments: Optional[List[Any]] = Field(None, alias="materialComments")
+    gauge: Optional[str] = None
+    yarn: Optional[str] = None
+    knitting_time: Optional[str] = Field(None, alias="knittingTime")
+    wash: Optional[str] = None
+    embroidery_print: Optional[str] = Field(None, alias="embroideryPrint")
+    special_trims: Optional[str] = Field(None, alias="specialTrims")
+    body_ply: Optional[str] = Field(None, alias="bodyPly")
+    cuff_bottom_ply: Optional[str] = Field(None, alias="cuffBottomPly")
+    neck_ply: Optional[str] = Field(None, alias="neckPly")
+    sample_comment: Optional[str] = Field(None, alias="sampleComment")
+    machine_name: Optional[str] = Field(None, alias="machineName")
+    machine_no: Optional[str] = Field(None, alias="machineNo")
+    machine_gauge: Optional[str] = Field(None, alias="machineGauge")
+    machine_type_no: Optional[str] = Field(None, alias="machineTypeNo")
+    tech_pack_workflow: Optional[Dict[str, Any]] = Field(None, alias="techPackWorkflow")
+    mq_control_workflow: Optional[Dict[str, Any]] = Field(None, alias="mqControlWorkflow")
 
     class Config:
         populate_by_name = True
+        extra = "forbid"
+
+
+class ProjectCreate(ProjectUpdate):
+    """Schema for creating a new project (a title is required)."""
+    title: str
+
+
+# Top-level keys a write may use: API keys and column names
+PROJECT_KEYS = frozenset(
+    key for name, field in ProjectUpdate.model_fields.items() for key in (name, field.alias or name)
+)
+# Set by the server on every write, whatever the client sends
+READ_ONLY_KEYS = frozenset({"id", "created_at", "createdAt", "updated_at", "updatedAt"})
 
 
 class Project(BaseModel):
-    """Full project model."""
+    """
+    Full project model - one field per column of the projects table.
+    Field names are the columns, aliases the camelCase API keys; the
+    row mapper in app.core.mapping is generated from this model.
+    """
     id: str
     title: str
+    brand: Optional[str] = None
+    team: Optional[str] = None
+    main_status: Optional[str] = Field(None, alias="mainStatus")
+    factory_name: Optional[str] = Field(None, alias="factoryName")
+    product_image: Optional[str] = Field(None, alias="productImage")
+    product_colors: List[Any] = Field(default_factory=list, alias="productColors")
+    article_number: Optional[str] = Field(None, alias="articleNumber")
+    style_number: Optional[str] = Field(None, alias="styleNumber")
+    description: Optional[str] = None
+    po_receive_date: Optional[str] = Field(None, alias="poReceiveDate")
+    shipment_date: Optional[str] = Field(None, alias="shipmentDate")
+    fob: Optional[str] = None
     po_numbers: List[PONumber] = Field(default_factory=list, alias="poNumbers")
+    created_at: Optional[str] = Field(None, alias="createdAt")
     updated_at: str = Field(alias="updatedAt")
     status: str
     tech_pack_files: List[Any] = Field(default_factory=list, alias="techPackFiles")
@@ -103,14 +159,38 @@ class Project(BaseModel):
     packing: Optional[Dict[str, Any]] = None
     order_sheet: Optional[Dict[str, Any]] = Field(None, alias="orderSheet")
     consumption: Optional[Dict[str, Any]] = None
-    material_remarks: Optional[str] = Field(None, alias="materialRemarks")
+    material_remarks: Optional[str] = Field("", alias="materialRemarks")
     material_attachments: List[Any] = Field(default_factory=list, alias="materialAttachments")
     material_comments: List[Any] = Field(default_factory=list, alias="materialComments")
+    # Technical specifications (migration 008)
+    gauge: Optional[str] = None
+    yarn: Optional[str] = None
+    knitting_time: Optional[str] = Field(None, alias="knittingTime")
+    wash: Optional[str] = None
+    embroidery_print: Optional[str] = Field(None, alias="embroideryPrint")
+    special_trims: Optional[str] = Field(None, alias="specialTrims")
+    body_ply: Optional[str] = Field(None, alias="bodyPly")
+    cuff_bottom_ply: Optional[str] = Field(None, alias="cuffBottomPly")
+    neck_ply: Optional[str] = Field(None, alias="neckPly")
+    sample_comment: Optional[str] = Field(None, alias="sampleComment")
+    # Machine information (migration 008)
+    machine_name: Optional[str] = Field(None, alias="machineName")
+    machine_no: Optional[str] = Field(None, alias="machineNo")
+    machine_gauge: Optional[str] = Field(None, alias="machineGauge")
+    machine_type_no: Optional[str] = Field(None, alias="machineTypeNo")
+    # Section workflows stored at project level (migration 010)
+    tech_pack_workflow: Optional[Dict[str, Any]] = Field(None, alias="techPackWorkflow")
+    mq_control_workflow: Optional[Dict[str, Any]] = Field(None, alias="mqControlWorkflow")
 
     class Config:
         populate_by_name = True
 
 
+# Compiled once, at import, and shared by every request
+PROJECT_CREATE = TypeAdapter(ProjectCreate)
+PROJECT_UPDATE = TypeAdapter(ProjectUpdate)
+
+
 # ============= Response Models =============
 
 class ProjectListResponse(BaseModel):
@@ -0,0 +1,202 @@
+"""
+Audit service - Append-only activity log for styles and user management.
+
+Events are buffered in memory and written to the activity_log table in
+batched inserts by a background task, so recording an event never adds a
+Supabase round trip to the request that produced it. Where the app runs
+without its lifespan (the serverless function), there is no such task and
+events are written at the end of the request instead (flush_unattended).
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from app.config import get_settings
+from app.core.supabase import get_supabase_admin
+from app.core.tracing import traced
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+
+class AuditService:
+    """Buffers activity events and flushes them to Supabase in batches."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], "Client"] = get_supabase_admin,
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        max_buffer: int = 10000,
+        enabled: bool = True,
+    ):
+        self.table = "activity_log"
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._client_factory = client_factory
+        self._client: Optional["Client"] = None
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._max_buffer = max_buffer
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> "Client":
+        """Lazily create the service-role client used for inserts and queries."""
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting to be flushed."""
+        return len(self._buffer)
+
+    def record(
+        self,
+        action: str,
+        entity_type: str,
+        entity_id: str,
+        actor: Optional[Dict[str, Any]] = None,
+        sections: Optional[Iterable[str]] = None,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Queue an activity event. Never blocks and never raises.
+
+        When the buffer is full (Supabase unreachable for a long time) the
+        oldest events are dropped so memory stays bounded.
+        """
+        if not self.enabled:
+            return
+
+        if len(self._buffer) >= self._max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Audit buffer full, dropped {self.dropped} events so far")
+
+        self._buffer.append({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "actor_id": actor.get("id") if actor else None,
+            "actor_email": actor.get("email") if actor else None,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": str(entity_id),
+            "sections": sorted(sections) if sections else [],
+            "details": details or {},
+        })
+
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush_unattended(self) -> int:
+        """Flush now if events are waiting and no flush loop will write them."""
+        if self._task is not None or not self._buffer:
+            return 0
+        return await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    @traced()
+    async def flush(self) -> int:
+        """
+        Write buffered events in batches of `batch_size`.
+        Returns the number of events written. On failure the batch is put
+        back at the front of the buffer and retried on the next flush.
+        """
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    await asyncio.to_thread(self._insert, batch)
+                except Exception as e:
+                    logger.error(f"Audit flush of {len(batch)} events failed: {e}")
+                    self._buffer.extendleft(reversed(batch))
+                    break
+                written += len(batch)
+        return written
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        self.client.table(self.table).insert(batch).execute()
+
+    @traced()
+    async def query(
+        self,
+        entity_type: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        actor_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Page through the activity log, newest first.
+
+        Pagination is keyset-based on `id` (pass the returned `next_cursor`
+        as `before`), so every page is an index range scan regardless of
+        how deep the client has paged.
+        """
+        query = self.client.table(self.table).select("*")
+        if entity_type:
+            query = query.eq("entity_type", entity_type)
+        if entity_id:
+            query = query.eq("entity_id", entity_id)
+        if actor_id:
+            query = query.eq("actor_id", actor_id)
+        if since:
+            query = query.gte("created_at", since.isoformat())
+        if until:
+            query = query.lt("created_at", until.isoformat())
+        if before:
+            query = query.lt("id", before)
+
+        response = await asyncio.to_thread(query.order("id", desc=True).limit(limit + 1).execute)
+        rows = response.data or []
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+@lru_cache()
+def get_audit_service() -> AuditService:
+    """Get the process-wide audit service."""
+    settings = get_settings()
+    return AuditService(
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval_seconds,
+        max_buffer=settings.audit_max_buffer,
+        enabled=settings.audit_enabled,
+    )
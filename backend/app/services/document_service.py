@@ -0,0 +1,240 @@
+"""
+Document service - PDF invoices, packing lists and inspection reports.
+
+Documents are rendered from the stored section JSON by app.services.pdf_render
+in a pool of worker processes, so a slow render never blocks the event loop
+and several render in parallel. Output is cached in memory keyed by a hash
+of the exact input (template version, style header and document JSON): an
+unchanged invoice is rendered once, however often it is printed, and any
+edit changes the key. Concurrent requests for the same document share one
+render.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import re
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from app.config import get_settings
+from app.core.metrics import record_cache_lookup
+from app.core.singleflight import SingleFlight
+from app.core.supabase import get_supabase
+from app.core.tracing import traced
+from app.services import pdf_render
+
+# Document kind -> projects column it is rendered from
+DOCUMENT_SECTIONS = {"invoice": "invoices", "packing": "packing", "inspection": "inspections"}
+# Style columns shown in every document header
+STYLE_HEADER = ("id", "title", "style_number", "article_number", "brand", "factory_name")
+
+# (file name, kind, payload)
+Document = Tuple[str, str, Dict[str, Any]]
+
+
+def _safe_name(value: Any) -> str:
+    """A file or folder name from free text."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", str(value or "")).strip("-.")[:80] or "untitled"
+
+
+def _unique(name: str, taken: set, extension: str = "") -> str:
+    """name + extension, or with -2, -3, ... before the extension if taken; the result is taken."""
+    candidate, number = name + extension, 1
+    while candidate in taken:
+        number += 1
+        candidate = f"{name}-{number}{extension}"
+    taken.add(candidate)
+    return candidate
+
+
+class RenderCache:
+    """Rendered PDFs by content hash; least recently used entries go beyond `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._items.get(key)
+        record_cache_lookup("documents", data is not None)
+        if data is not None:
+            self._items.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._items[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class _ZipStream(io.RawIOBase):
+    """Write target for ZipFile that hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class DocumentService:
+    """Renders style documents to PDF through a render cache and a process pool."""
+
+    def __init__(self, cache: RenderCache, pool: Optional[Executor] = None, batch_size: int = 20):
+        self.cache = cache
+        self.pool = pool
+        self.batch_size = batch_size
+        self._renders = SingleFlight("documents")
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def content_key(kind: str, payload: Dict[str, Any]) -> str:
+        """Cache key (and ETag) for one document: changes with any input byte or the template."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{kind}:{pdf_render.TEMPLATE_VERSION}:".encode())
+        digest.update(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS))
+        return digest.hexdigest()
+
+    @traced()
+    async def render(self, kind: str, payload: Dict[str, Any]) -> Tuple[bytes, str]:
+        """PDF bytes and content key of one document, from the cache when possible."""
+        key = self.content_key(kind, payload)
+        pdf = self.cache.get(key)
+        if pdf is None:
+            pdf = await self._renders.do(key, lambda: self._render(key, kind, payload))
+        return pdf, key
+
+    async def _render(self, key: str, kind: str, payload: Dict[str, Any]) -> bytes:
+        if self.pool is None:
+            pdf = await asyncio.to_thread(pdf_render.render, kind, payload)
+        else:
+            loop = asyncio.get_running_loop()
+            pdf = await loop.run_in_executor(self.pool, pdf_render.render, kind, payload)
+        self.cache.put(key, pdf)
+        return pdf
+
+    def _load(self, style_ids: Sequence[str], columns: Sequence[str]) -> List[Dict[str, Any]]:
+        select = ",".join(dict.fromkeys((*STYLE_HEADER, *columns)))
+        response = get_supabase().table("projects_full")\
+            .select(select)\
+            .in_("id", list(style_ids))\
+            .execute()
+        return response.data or []
+
+    def documents(self, row: Dict[str, Any], kinds: Sequence[str]) -> List[Document]:
+        """Every document of the given kinds a style has, with its file name."""
+        header = {column: row.get(column) for column in STYLE_HEADER}
+        docs: List[Document] = []
+        for kind in kinds:
+            value = row.get(DOCUMENT_SECTIONS[kind])
+            if kind == "packing":
+                if value:
+                    docs.append(("packing-list.pdf", kind, {"style": header, "document": value}))
+                continue
+            for item in value or []:
+                if kind == "invoice":
+                    name = f"invoice-{_safe_name(item.get('invoiceNo') or item.get('id'))}.pdf"
+                else:
+                    label = item.get("type") or (item.get("data") or {}).get("inspectionType")
+                    name = f"inspection-{_safe_name(label)}-{_safe_name(item.get('id'))}.pdf"
+                docs.append((name, kind, {"style": header, "document": item}))
+        return docs
+
+    @traced()
+    async def style_document(
+        self, style_id: str, kind: str, item_id: Optional[str] = None
+    ) -> Optional[Tuple[str, bytes, str]]:
+        """
+        One document of a style as (file name, PDF, content key): the packing
+        list, or the invoice / inspection with `item_id`. None if not found.
+        """
+        rows = await asyncio.to_thread(self._load, [style_id], [DOCUMENT_SECTIONS[kind]])
+        if not rows:
+            return None
+        for name, doc_kind, payload in self.documents(rows[0], [kind]):
+            if item_id is None or payload["document"].get("id") == item_id:
+                pdf, key = await self.render(doc_kind, payload)
+                return name, pdf, key
+        return None
+
+    async def shipment_zip(self, style_ids: Sequence[str], kinds: Sequence[str]) -> AsyncIterator[bytes]:
+        """
+        Stream one ZIP with the documents of every style, a folder per style.
+        Styles are loaded `batch_size` at a time; a batch's documents render
+        in parallel and each is sent as soon as it and those before it are done.
+        """
+        columns = [DOCUMENT_SECTIONS[kind] for kind in kinds]
+        out = _ZipStream()
+        used = set()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as archive:
+            for start in range(0, len(style_ids), self.batch_size):
+                batch = style_ids[start:start + self.batch_size]
+                rows = await asyncio.to_thread(self._load, batch, columns)
+                # Keep the requested order
+                by_id = {row["id"]: row for row in rows}
+                entries = []
+                for style_id in batch:
+                    row = by_id.get(style_id)
+                    if row is None:
+                        continue
+                    # Styles sharing a number, and invoices sharing one, each keep their file
+                    folder = _unique(_safe_name(row.get("style_number") or row.get("title")), used)
+                    files: set = set()
+                    entries += [(f"{folder}/{_unique(name.removesuffix('.pdf'), files, '.pdf')}", kind, payload)
+                                for name, kind, payload in self.documents(row, kinds)]
+
+                renders = [asyncio.ensure_future(self.render(kind, payload)) for _, kind, payload in entries]
+                try:
+                    for (path, _, _), pending in zip(entries, renders):
+                        pdf, _ = await pending
+                        archive.writestr(path, pdf)
+                        yield out.drain()
+                finally:
+                    for pending in renders:
+                        pending.cancel()
+        yield out.drain()
+
+
+@lru_cache()
+def get_document_service() -> DocumentService:
+    """Get the process-wide document service (and its render pool)."""
+    settings = get_settings()
+    pool = None
+    if settings.documents_render_workers > 0:
+        # Spawned, not forked: the API process has threads (and sockets) a fork would copy
+        pool = ProcessPoolExecutor(
+            max_workers=settings.documents_render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=pdf_render.warm_up,
+        )
+    return DocumentService(
+        RenderCache(settings.documents_cache_max_bytes),
+        pool=pool,
+        batch_size=settings.documents_batch_size,
+    )
@@ -0,0 +1,385 @@
+"""
+Knitting capacity planner - fits the order book of active styles onto the
+knitting machine park.
+
+Every PO of a PRE-PRODUCTION/PRODUCTION style is a job: its pieces (order
+sheet), minutes per piece (`knitting_time`), gauge, and the date knitting
+has to finish by (PO delivery or shipment date, less the days linking,
+washing and packing take). Jobs are planned earliest due date first; each
+is split across the gauge-compatible machines that free up first so they
+all finish together (water-filling on each machine's pieces per day). This
+is a greedy heuristic - no solver - and plans hundreds of styles on
+hundreds of machines in milliseconds.
+
+Re-planning is incremental: the machines' state before each job is kept,
+so when a style changes only the jobs from its first position in the
+order onward are planned again.
+"""
+import asyncio
+import math
+import re
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.core.singleflight import SingleFlight
+from app.core.supabase import get_supabase, get_supabase_admin
+from app.core.tracing import traced
+
+ACTIVE_STATUSES = ("PRE-PRODUCTION", "PRODUCTION")
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_GAUGE = re.compile(r"\d+(?:\.\d+)?")
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*(h(?:ou)?rs?|h|m(?:in(?:ute)?s?)?|s(?:ec(?:ond)?s?)?)?", re.I)
+
+
+def _date(value: Any) -> Optional[date]:
+    if isinstance(value, str) and _DATE.match(value):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def gauges(value: Any) -> FrozenSet[str]:
+    """Gauges named by free text: "12GG" -> {"12"}, "5/7 gg" -> {"5", "7"}."""
+    return frozenset(str(float(g)).removesuffix(".0") for g in _GAUGE.findall(str(value or "")))
+
+
+def knitting_minutes(value: Any) -> Optional[float]:
+    """Minutes per piece from "45 mins", "1.5 hours", "1 hr 20 min", "1:30" or a bare number (minutes)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if value > 0 else None
+    text = str(value or "").strip()
+    clock = re.fullmatch(r"(\d+):(\d{1,2})", text)
+    if clock:
+        minutes = int(clock.group(1)) * 60 + int(clock.group(2))
+        return float(minutes) or None
+    minutes = 0.0
+    for amount, unit in _DURATION.findall(text):
+        unit = unit.lower()
+        if unit.startswith("h"):
+            minutes += float(amount) * 60
+        elif unit.startswith("s"):
+            minutes += float(amount) / 60
+        else:
+            minutes += float(amount)
+    return minutes or None
+
+
+def order_lots(style: Dict[str, Any]) -> List[Tuple[str, float, Optional[date]]]:
+    """
+    (PO number, pieces, delivery date) of a style (camelCase document):
+    order sheet breakdowns per PO, else the quantities of its PO numbers.
+    """
+    sheet = style.get("orderSheet") if isinstance(style.get("orderSheet"), dict) else {}
+    po_numbers = style.get("poNumbers") if isinstance(style.get("poNumbers"), list) else []
+    sheet_pos = sheet.get("poNumbers") if isinstance(sheet.get("poNumbers"), list) else []
+
+    deliveries: Dict[str, date] = {}
+    for po in [*sheet_pos, *po_numbers]:  # the style's own PO numbers win
+        delivery = _date(po.get("deliveryDate"))
+        if delivery:
+            deliveries[str(po.get("number") or "").strip()] = delivery
+
+    pieces: Dict[str, float] = {}
+    for breakdown in sheet.get("breakdowns") if isinstance(sheet.get("breakdowns"), list) else []:
+        po_number = str(breakdown.get("poNumber") or "").strip()
+        for row in breakdown.get("sizeRows") or []:
+            sizes = row.get("sizes") if isinstance(row.get("sizes"), dict) else {}
+            pieces[po_number] = pieces.get(po_number, 0) + (
+                _number(row.get("total")) or sum(_number(v) for v in sizes.values())
+            )
+    if not pieces:
+        for po in po_numbers:
+            po_number = str(po.get("number") or "").strip()
+            pieces[po_number] = pieces.get(po_number, 0) + _number(po.get("quantity"))
+
+    fallback = _date(sheet.get("shipmentDate")) or _date(style.get("shipmentDate"))
+    return [(po, qty, deliveries.get(po) or fallback) for po, qty in pieces.items() if qty > 0]
+
+
+class Machine:
+    """A knitting machine and its capacity."""
+
+    __slots__ = ("id", "name", "machine_no", "gauges", "minutes_per_day")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = str(row["id"])
+        self.name = row.get("name") or self.id
+        self.machine_no = (row.get("machine_no") or "").strip()
+        self.gauges = gauges(row.get("gauge"))
+        hours = _number(row.get("hours_per_day")) or 20.0
+        efficiency = _number(row.get("efficiency")) or 0.85
+        self.minutes_per_day = hours * 60 * efficiency
+
+
+class Job:
+    """One PO of a style to knit."""
+
+    __slots__ = ("style_id", "title", "style_number", "po_number", "pieces", "minutes", "gauge",
+                 "machine_no", "release", "due", "max_machines")
+
+    def __init__(self, style: Dict[str, Any], po_number: str, pieces: float, due: Optional[date],
+                 buffer_days: int):
+        self.style_id = style["id"]
+        self.title = style.get("title")
+        self.style_number = style.get("styleNumber")
+        self.po_number = po_number
+        self.pieces = int(round(pieces))
+        self.minutes = knitting_minutes(style.get("knittingTime"))
+        self.gauge = next(iter(sorted(gauges(style.get("gauge") or style.get("machineGauge")))), None)
+        self.machine_no = (style.get("machineNo") or "").strip()
+        self.due = due - timedelta(days=buffer_days) if due else None
+
+        # The latest PP meeting's production details: knitting start and machines agreed
+        self.release: Optional[date] = None
+        self.max_machines = 0
+        for meeting in reversed(style.get("ppMeetings") or []):
+            details = [d for d in meeting.get("productionDetails") or [] if isinstance(d, dict)]
+            if details:
+                starts = [d for d in (_date(d.get("knittingStartDate")) for d in details) if d]
+                self.release = min(starts) if starts else None
+                self.max_machines = int(sum(_number(d.get("numMachines")) for d in details))
+                break
+
+    def key(self) -> Tuple:
+        """Planning order: earliest due date first, undated last."""
+        return (self.due or date.max, self.release or date.min, self.style_id, self.po_number)
+
+    def signature(self) -> Tuple:
+        return (self.key(), self.pieces, self.minutes, self.gauge, self.machine_no, self.max_machines,
+                self.title, self.style_number)
+
+
+def style_jobs(style: Dict[str, Any], buffer_days: int) -> List[Job]:
+    """The jobs of a style; none unless it is in pre-production or production."""
+    if style.get("mainStatus") not in ACTIVE_STATUSES:
+        return []
+    return [Job(style, po, qty, due, buffer_days) for po, qty, due in order_lots(style)]
+
+
+class KnittingPlanner:
+    """Greedy earliest-due-date planner that re-plans incrementally."""
+
+    def __init__(self, machines: Sequence[Machine], start: date, min_pieces_per_machine: int = 100):
+        self.machines = list(machines)
+        self.start = start
+        self.min_pieces_per_machine = max(1, min_pieces_per_machine)
+        self._by_gauge: Dict[str, List[int]] = {}
+        for index, machine in enumerate(self.machines):
+            for gauge in machine.gauges:
+                self._by_gauge.setdefault(gauge, []).append(index)
+        # (jobs in planning order, their results, the day each machine frees up
+        # before job i and after the last one); replaced as a whole on re-plan
+        self._plan: Tuple[List[Job], List[Dict[str, Any]], List[Tuple[float, ...]]] = (
+            [], [], [tuple(0.0 for _ in self.machines)]
+        )
+        self.replanned = 0
+
+    def _day(self, value: Optional[date]) -> float:
+        return max(0.0, float((value - self.start).days)) if value else 0.0
+
+    def _date(self, day: float) -> str:
+        return (self.start + timedelta(days=int(day))).isoformat()
+
+    def plan(self, jobs: Iterable[Job]) -> None:
+        """Plan `jobs`, keeping the plan of the longest unchanged prefix in planning order."""
+        jobs = sorted(jobs, key=Job.key)
+        old_jobs, results, states = self._plan
+        keep = 0
+        for old, new in zip(old_jobs, jobs):
+            if old.signature() != new.signature():
+                break
+            keep += 1
+        results, states = results[:keep], states[:keep + 1]
+        free = list(states[-1])
+        for job in jobs[keep:]:
+            results.append(self._assign(job, free))
+            states.append(tuple(free))
+        self._plan = (jobs, results, states)
+        self.replanned = len(jobs) - keep
+
+    def _assign(self, job: Job, free: List[float]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "style_id": job.style_id, "title": job.title, "style_number": job.style_number,
+            "po_number": job.po_number, "pieces": job.pieces, "gauge": job.gauge,
+            "due": job.due.isoformat() if job.due else None, "start": None, "finish": None,
+            "late_days": None, "machines": [], "problem": None,
+        }
+        if not job.minutes:
+            result["problem"] = "no knitting time"
+            return result
+        if not job.gauge:
+            result["problem"] = "no gauge"
+            return result
+        candidates = self._by_gauge.get(job.gauge, [])
+        if job.machine_no:
+            pinned = [i for i in candidates if self.machines[i].machine_no == job.machine_no]
+            candidates = pinned or candidates
+        if not candidates:
+            result["problem"] = f"no {job.gauge}GG machine"
+            return result
+
+        release = self._day(job.release)
+        rate = {i: self.machines[i].minutes_per_day / job.minutes for i in candidates}  # pieces per day
+        starts = sorted(candidates, key=lambda i: (max(free[i], release), -rate[i]))
+        limit = max(1, job.pieces // self.min_pieces_per_machine)
+        if job.max_machines:
+            limit = min(limit, job.max_machines)
+
+        # Water-filling: add machines while the next one frees up before the
+        # finish the machines taken so far would reach together
+        used: List[int] = []
+        total_rate = weighted = 0.0
+        finish = 0.0
+        for i in starts[:limit]:
+            begin = max(free[i], release)
+            if used and begin >= finish:
+                break
+            used.append(i)
+            total_rate += rate[i]
+            weighted += rate[i] * begin
+            finish = (job.pieces + weighted) / total_rate
+
+        # Whole pieces per machine, largest remainders first
+        shares = {i: rate[i] * (finish - max(free[i], release)) for i in used}
+        pieces = {i: int(share) for i, share in shares.items()}
+        for i in sorted(used, key=lambda i: pieces[i] - shares[i])[:job.pieces - sum(pieces.values())]:
+            pieces[i] += 1
+
+        first, last = math.inf, 0.0
+        for i in used:
+            if pieces[i] <= 0:
+                continue
+            begin = max(free[i], release)
+            end = begin + pieces[i] / rate[i]
+            free[i] = end
+            first, last = min(first, begin), max(last, end)
+            result["machines"].append({
+                "machine_id": self.machines[i].id, "name": self.machines[i].name, "pieces": pieces[i],
+                "start": self._date(begin), "finish": self._date(end), "days": round(end - begin, 2),
+            })
+        result["start"], result["finish"] = self._date(first), self._date(last)
+        if job.due:
+            result["late_days"] = max(0, (self.start + timedelta(days=int(last)) - job.due).days)
+        return result
+
+    def report(self, style_id: Optional[str] = None) -> Dict[str, Any]:
+        """Jobs (or one style's), lateness and per-machine utilization over the plan horizon."""
+        _, results, states = self._plan
+        busy = {machine.id: 0.0 for machine in self.machines}
+        for result in results:
+            for assignment in result["machines"]:
+                busy[assignment["machine_id"]] += assignment["days"]
+        free = states[-1]
+        horizon = max([*free, 1.0])
+        planned = [r for r in results if r["problem"] is None]
+        late = [r for r in planned if r["late_days"]]
+        return {
+            "start": self.start.isoformat(),
+            "horizon_end": self._date(horizon),
+            "summary": {
+                "jobs": len(results),
+                "planned": len(planned),
+                "unplanned": len(results) - len(planned),
+                "late": len(late),
+                "late_pieces": sum(r["pieces"] for r in late),
+                "max_late_days": max([r["late_days"] for r in late], default=0),
+                "replanned": self.replanned,
+            },
+            "jobs": [r for r in results if style_id is None or r["style_id"] == style_id],
+            "machines": [{
+                "machine_id": machine.id, "name": machine.name, "gauges": sorted(machine.gauges),
+                "busy_days": round(busy[machine.id], 2), "free_from": self._date(free[index]),
+                "utilization": round(min(1.0, busy[machine.id] / horizon), 4),
+            } for index, machine in enumerate(self.machines)],
+        }
+
+
+class KnittingPlanService:
+    """
+    Keeps a plan current with the style change feed and the machine table:
+    changed styles re-plan from their first job on, a changed machine park
+    or a new day re-plans everything.
+    """
+
+    def __init__(self, buffer_days: int = 10, min_pieces_per_machine: int = 100,
+                 sync_seconds: float = 10.0, settle_seconds: float = 2.0, page_size: int = 200):
+        self.buffer_days = buffer_days
+        self.min_pieces_per_machine = min_pieces_per_machine
+        self.sync_seconds = sync_seconds
+        self.settle_seconds = settle_seconds
+        self.page_size = page_size
+        self.cursor = 0
+        self.planner: Optional[KnittingPlanner] = None
+        self._jobs: Dict[str, List[Job]] = {}
+        self._machine_rows: Optional[List[Dict[str, Any]]] = None
+        self._syncs = SingleFlight("knitting_plan")
+        self._synced_at = float("-inf")
+
+    def invalidate(self) -> None:
+        """Catch up (and reload the machines) on the next request."""
+        self._synced_at = float("-inf")
+
+    async def sync(self, force: bool = False) -> KnittingPlanner:
+        """The plan, caught up with changes at most every `sync_seconds` unless forced."""
+        if force or self.planner is None or time.monotonic() - self._synced_at >= self.sync_seconds:
+            await self._syncs.do("sync", self._sync)
+        return self.planner
+
+    @traced()
+    async def _sync(self) -> None:
+        from app.services.project_service import ProjectService
+
+        started = time.monotonic()
+        supabase = get_supabase()
+        # knitting_machines is readable by authenticated users only (018); the planner reads as the service
+        response = await asyncio.to_thread(
+            lambda: get_supabase_admin().table("knitting_machines").select("*").eq("is_active", True).order("id").execute()
+        )
+        machine_rows = response.data or []
+
+        service = ProjectService(supabase)
+        while True:
+            page = await service.changes_since(self.cursor, limit=self.page_size, settle_seconds=self.settle_seconds)
+            for style in page["changes"]:
+                self._jobs[style["id"]] = style_jobs(style, self.buffer_days)
+            for style_id in page["deleted"]:
+                self._jobs.pop(style_id, None)
+            self.cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+
+        today = date.today()
+        if self.planner is None or machine_rows != self._machine_rows or self.planner.start != today:
+            self.planner = KnittingPlanner([Machine(row) for row in machine_rows], today,
+                                           self.min_pieces_per_machine)
+            self._machine_rows = machine_rows
+        jobs = [job for jobs in self._jobs.values() for job in jobs]
+        await asyncio.to_thread(self.planner.plan, jobs)
+        self._synced_at = started
+
+
+@lru_cache()
+def get_knitting_plan_service() -> KnittingPlanService:
+    """Get the process-wide knitting plan."""
+    settings = get_settings()
+    return KnittingPlanService(
+        buffer_days=settings.knitting_finish_buffer_days,
+        min_pieces_per_machine=settings.knitting_min_pieces_per_machine,
+        sync_seconds=settings.knitting_plan_sync_seconds,
+        settle_seconds=settings.style_changes_settle_seconds,
+    )
@@ -0,0 +1,51 @@
+"""
+Material service - yarn and accessory requirements of all active styles.
+
+The requirement rows themselves are kept by triggers on projects (migration
+017): each PRE-PRODUCTION/PRODUCTION style has one row per consumption item
+and PO, recomputed only when its consumption, order sheet, POs or stage
+change. Reports sum those rows in the database instead of reading styles.
+"""
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from supabase import Client
+
+from app.core.tracing import traced
+
+
+class MaterialService:
+    """Service for material requirement (MRP) reports."""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    @traced()
+    async def requirements(
+        self,
+        by_week: bool = True,
+        kind: Optional[str] = None,
+        supplier: Optional[str] = None,
+        week_from: Optional[date] = None,
+        week_to: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Net and required (with wastage) quantity and cost per item, supplier
+        and unit, per delivery week (Monday) or over all weeks. Yarn is in kg.
+        """
+        params = {
+            "p_by_week": by_week,
+            "p_kind": kind,
+            "p_supplier": supplier,
+            "p_from": week_from.isoformat() if week_from else None,
+            "p_to": week_to.isoformat() if week_to else None,
+        }
+        response = await asyncio.to_thread(
+            lambda: self.supabase.rpc("material_requirements_rollup", params).execute()
+        )
+        rows = response.data or []
+        if not by_week:
+            for row in rows:
+                row.pop("delivery_week", None)
+        return rows
@@ -0,0 +1,322 @@
+"""
+Measurements - tolerance checks of QC measurement tables and graded specs.
+
+A QC (or PP meeting) measurement table keeps every value as typed text:
+"40", "40.5", "40 1/2", "-1/4". A table is parsed once into flat columns
+(one entry per point x size x color, blanks as NaN) and kept in a small
+LRU cache, so a sheet that has not changed is never parsed again. A saved
+inspection is keyed by its item row and that row's updated_at; a table
+sent for checking by a digest of its content. The tolerance check then
+runs over the columns in one pass (vectorized when numpy is installed);
+NaN never compares out of tolerance.
+
+Tech pack measurements are specified for one base size (`specs.size`) per
+version; grade_spec() derives the other sizes from per-point grade rules.
+"""
+import asyncio
+import hashlib
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from operator import sub
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence
+
+import orjson
+from supabase import Client
+
+try:
+    import numpy
+except ImportError:  # optional
+    numpy = None
+
+from app.config import get_settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import traced
+from app.services.project_service import ProjectService
+
+# Measurements the way the sheets are typed: "40", "40.5", "40 1/2", "1/2", "-1/4"
+_MEASURE = re.compile(r"^\s*([+-])?\s*(\d+(?:\.\d+)?)?(?:\s*(\d+)\s*/\s*(\d+))?\s*(?:\"|in|cm)?\s*$")
+
+NAN = float("nan")
+
+
+def parse_measure(value: Any) -> Optional[float]:
+    """A measurement or tolerance as a number (fractions allowed), None when blank or unreadable."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _fraction(str(value or ""))
+
+
+@lru_cache(maxsize=4096)
+def _fraction(text: str) -> Optional[float]:
+    match = _MEASURE.match(text)
+    if not match or not (match.group(2) or match.group(3)):
+        return None
+    sign, whole, num, den = match.groups()
+    number = float(whole or 0)
+    if num:
+        if int(den) == 0:
+            return None
+        number += int(num) / int(den)
+    return -number if sign == "-" else number
+
+
+def format_inches(value: float, denominator: int = 8) -> str:
+    """A number as fractional inches to the nearest 1/`denominator`: 40.5 -> "40 1/2"."""
+    steps = round(abs(value) * denominator)
+    whole, part = divmod(steps, denominator)
+    sign = "-" if value < 0 and steps else ""
+    if not part:
+        return f"{sign}{whole}"
+    divisor = math.gcd(part, denominator)
+    fraction = f"{part // divisor}/{denominator // divisor}"
+    return f"{sign}{whole} {fraction}" if whole else f"{sign}{fraction}"
+
+
+class MeasurementSheet:
+    """One measurement table parsed into flat columns, one entry per point, size and color."""
+
+    __slots__ = ("row_ids", "points", "names", "sizes", "colors",
+                 "actual", "standard", "tol_plus", "tol_minus", "_out")
+
+    def __init__(self, table: Mapping[str, Any], master_tolerance: Any = None):
+        self.row_ids: List[str] = []
+        self.points: List[Any] = []
+        self.names: List[Any] = []
+        self.sizes: List[Any] = []
+        self.colors: List[Any] = []
+        actual: List[float] = []
+        standard: List[float] = []
+        tol_plus: List[float] = []
+        tol_minus: List[float] = []
+
+        # Blank tolerances fall back to the sheet's master tolerance, as in the editor
+        master = parse_measure(master_tolerance) or 0.0
+        for row in table.get("rows") or []:
+            plus = parse_measure(row.get("tolerancePlus"))
+            minus = parse_measure(row.get("toleranceMinus"))
+            plus = master if plus is None else abs(plus)
+            minus = master if minus is None else abs(minus)
+            for group in (row.get("groups") or {}).values():
+                value = parse_measure(group.get("actualValue"))
+                for column in group.get("subColumns") or []:
+                    spec = parse_measure(column.get("standardValue"))
+                    self.row_ids.append(row.get("id"))
+                    self.points.append(row.get("point"))
+                    self.names.append(row.get("name"))
+                    self.sizes.append(group.get("size"))
+                    self.colors.append(column.get("color"))
+                    actual.append(NAN if value is None else value)
+                    standard.append(NAN if spec is None else spec)
+                    tol_plus.append(plus)
+                    tol_minus.append(minus)
+
+        self.actual = array("d", actual)
+        self.standard = array("d", standard)
+        self.tol_plus = array("d", tol_plus)
+        self.tol_minus = array("d", tol_minus)
+        self._out: Optional[List[bool]] = None
+
+    def __len__(self) -> int:
+        return len(self.actual)
+
+    def deviations(self) -> Sequence[float]:
+        """Actual minus standard of every entry (NaN where either is blank)."""
+        if numpy is not None:
+            return (numpy.frombuffer(self.actual) - numpy.frombuffer(self.standard)).tolist()
+        return array("d", map(sub, self.actual, self.standard))
+
+    def out_of_tolerance(self) -> List[bool]:
+        """Whether each entry is above standard + tolerance or below standard - tolerance."""
+        if self._out is None:
+            if numpy is not None:
+                # The columns' buffers, without a copy
+                deviation = numpy.frombuffer(self.actual) - numpy.frombuffer(self.standard)
+                out = (deviation > numpy.frombuffer(self.tol_plus)) | (deviation < -numpy.frombuffer(self.tol_minus))
+                self._out = out.tolist()
+            else:
+                self._out = [d > p or d < -m for d, p, m in zip(self.deviations(), self.tol_plus, self.tol_minus)]
+        return self._out
+
+    def report(self) -> Dict[str, Any]:
+        """Every checked entry with its deviation and result, and counts per size and color."""
+        out = self.out_of_tolerance()
+        entries, by_size, by_color = [], {}, {}
+        for i, deviation in enumerate(self.deviations()):
+            if deviation != deviation:  # NaN: not measured
+                continue
+            entries.append({
+                "row_id": self.row_ids[i], "point": self.points[i], "name": self.names[i],
+                "size": self.sizes[i], "color": self.colors[i],
+                "actual": self.actual[i], "standard": self.standard[i],
+                "tol_plus": self.tol_plus[i], "tol_minus": self.tol_minus[i],
+                "deviation": round(deviation, 4), "out": out[i],
+            })
+            for counts, key in ((by_size, self.sizes[i]), (by_color, self.colors[i])):
+                tally = counts.setdefault(key, {"checked": 0, "out": 0})
+                tally["checked"] += 1
+                tally["out"] += out[i]
+        failed = sum(out)
+        return {
+            "summary": {"entries": len(self), "checked": len(entries), "out": failed, "pass": failed == 0,
+                        "by_size": by_size, "by_color": by_color},
+            "entries": entries,
+        }
+
+
+class SheetCache:
+    """Parsed sheets by key; the least recently used go beyond `max_entries`."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Hashable, MeasurementSheet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(table: Mapping[str, Any], master_tolerance: Any) -> bytes:
+        """Content key of a table: changes with any edit to it or its master tolerance."""
+        digest = hashlib.blake2b(orjson.dumps([master_tolerance, table]), digest_size=16)
+        return digest.digest()
+
+    def sheet(self, table: Mapping[str, Any], master_tolerance: Any = None,
+              key: Optional[Hashable] = None) -> MeasurementSheet:
+        """
+        The parsed sheet of `table`. `key` must change whenever the table
+        or its master tolerance does (e.g. the stored item and its
+        updated_at); without one, the table's content is the key.
+        """
+        if key is None:
+            key = self.key(table, master_tolerance)
+        with self._lock:
+            sheet = self._items.get(key)
+            if sheet is not None:
+                self._items.move_to_end(key)
+        record_cache_lookup("measurements", sheet is not None)
+        if sheet is None:
+            sheet = MeasurementSheet(table, master_tolerance)
+            with self._lock:
+                self._items[key] = sheet
+                while len(self._items) > self.max_entries:
+                    self._items.popitem(last=False)
+        return sheet
+
+
+@lru_cache()
+def get_sheet_cache() -> SheetCache:
+    """Get the process-wide cache of parsed measurement sheets."""
+    return SheetCache(get_settings().measurement_cache_entries)
+
+
+def check_table(table: Mapping[str, Any], master_tolerance: Any = None,
+                key: Optional[Hashable] = None) -> Dict[str, Any]:
+    """Tolerance report of a QC measurement table (`qcMeasurementTable` shape); `key` as in SheetCache.sheet."""
+    return get_sheet_cache().sheet(table or {}, master_tolerance, key).report()
+
+
+def grade_spec(
+    page: Mapping[str, Any],
+    sizes: Sequence[str],
+    grades: Optional[Mapping[str, Any]] = None,
+    default_grade: Any = 0,
+    version: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Graded spec table of a tech pack measurement page: each point's value
+    for the base size (`specs.size`) in measurement version `version` (the
+    last one with a value by default) plus its grade per size step, for
+    every size in `sizes`. `grades` maps a point's code (or English label)
+    to its grade; others take `default_grade`. Values are shown in
+    fractional inches when the page's values are typed as fractions.
+    """
+    base_size = str((page.get("specs") or {}).get("size") or "").strip()
+    if base_size not in sizes:
+        raise ValueError(f"Base size {base_size or '(none)'} is not one of the sizes {list(sizes)}")
+    base_index = list(sizes).index(base_size)
+    grades = grades or {}
+    default = parse_measure(default_grade) or 0.0
+
+    measurements = page.get("measurements") or []
+    codes, labels, bases, steps, tolerances = [], [], [], [], []
+    fractions = False
+    for measurement in measurements:
+        values = measurement.get("values") or []
+        if version is None:
+            chosen = next((v for v in reversed(values) if str(v or "").strip()), None)
+        else:
+            chosen = values[version] if version < len(values) else None
+        fractions = fractions or "/" in str(chosen or "")
+        grade = grades.get(measurement.get("code"), grades.get(measurement.get("labelEn")))
+        codes.append(measurement.get("code"))
+        labels.append(measurement.get("labelEn") or measurement.get("labelEs"))
+        bases.append(parse_measure(chosen))
+        steps.append(default if grade is None else (parse_measure(grade) or 0.0))
+        tolerances.append(measurement.get("tolerance"))
+
+    offsets = [i - base_index for i in range(len(sizes))]
+    show = format_inches if fractions else (lambda value: f"{value:g}")
+    rows = []
+    for code, label, base, step, tolerance in zip(codes, labels, bases, steps, tolerances):
+        values = [None if base is None else round(base + step * offset, 4) for offset in offsets]
+        rows.append({
+            "code": code, "label": label, "grade": step, "tolerance": tolerance,
+            "values": dict(zip(sizes, values)),
+            "display": {size: "" if value is None else show(value) for size, value in zip(sizes, values)},
+        })
+    return {"page_id": page.get("id"), "base_size": base_size, "sizes": list(sizes), "rows": rows}
+
+
+class MeasurementService:
+    """Reads the measurement tables and tech pack pages of a style."""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    @traced()
+    async def check_item(self, style_id: str, section: str, item_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Tolerance report of one inspection or PP meeting of a style, or
+        None when the style or item does not exist. The item is read from
+        its row in the section table and its sheet cached by that row's
+        updated_at, so an unchanged sheet is neither hashed nor parsed.
+        """
+        projects = ProjectService(self.supabase)
+        column = projects.section_column(section)
+        response = await asyncio.to_thread(
+            lambda: self.supabase.table(f"project_{column}")
+            .select("data,updated_at")
+            .eq("project_id", style_id)
+            .eq("item_id", item_id)
+            .execute()
+        )
+        if response.data:
+            item = response.data[0]["data"]
+            key = (style_id, column, item_id, response.data[0]["updated_at"])
+        else:
+            # Not in the section table (not backfilled yet): look in the section, keyed by content
+            items = await projects.get_section(style_id, section)
+            item = next((i for i in items or [] if isinstance(i, dict) and str(i.get("id")) == item_id), None)
+            key = None
+        if not isinstance(item, dict):
+            return None
+        # Inspections keep their sheet under "data"; PP meetings at the top level
+        data = item.get("data") if isinstance(item.get("data"), dict) else item
+        report = await asyncio.to_thread(
+            check_table, data.get("qcMeasurementTable") or {}, data.get("globalMasterTolerance"), key
+        )
+        return {"style_id": style_id, "item_id": item_id, **report}
+
+    @traced()
+    async def page(self, style_id: str, page_id: str) -> Optional[Dict[str, Any]]:
+        """A tech pack page of a style, without loading the rest of the document."""
+        response = await asyncio.to_thread(
+            lambda: self.supabase.table("projects").select("id,pages").eq("id", style_id).execute()
+        )
+        if not response.data:
+            return None
+        return next((p for p in response.data[0].get("pages") or [] if str(p.get("id")) == page_id), None)
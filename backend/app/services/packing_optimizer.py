@@ -0,0 +1,440 @@
+"""
+Packing optimizer - cartons per style and how they load into containers.
+
+Carton counts come from the quantities to ship per color and size (the
+packing list summary, else the order sheet) and the packing ratio: cartons
+that share a sequence range on the packing list are an assortment (e.g.
+S:1 M:2 L:2 XL:1), packed in as many whole sets as the carton holds. What
+the assortment leaves over is packed solid per size, and the last odd
+pieces of a color share mixed cartons. A carton holds at most
+`unitsPerBox` pieces and stays under the gross weight limit.
+
+Loading is a block-building heuristic on guillotine cuts: cartons of one
+style are placed as blocks (same orientation, height first, then width,
+then length) into the free space nearest the container's back, and each
+block splits the space it took into the remaining space in front, beside
+and above it. Larger cartons go first, smaller ones fill the gaps, and a
+container is closed when nothing fits or its payload is reached. Cartons
+stay "this side up" unless told otherwise.
+"""
+import asyncio
+import itertools
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from supabase import Client
+
+from app.config import get_settings
+from app.core.tracing import traced
+from app.services.project_service import PROJECT_COLUMNS
+
+PACKING_COLUMNS = "id,title,style_number,shipment_date,packing,order_sheet,consumption"
+
+_WEIGHT_UNITS = {"KG": 1.0, "KGS": 1.0, "G": 0.001, "GR": 0.001, "GRS": 0.001, "LB": 0.45359237, "LBS": 0.45359237}
+
+
+class Container(NamedTuple):
+    """A shipping container's inside dimensions (cm) and payload (kg)."""
+    code: str
+    name: str
+    length: float
+    width: float
+    height: float
+    max_payload_kg: float
+
+    @property
+    def cbm(self) -> float:
+        return self.length * self.width * self.height / 1e6
+
+
+CONTAINERS = {c.code: c for c in (
+    Container("20GP", "20' standard", 589, 235, 239, 28200),
+    Container("40GP", "40' standard", 1203, 235, 239, 26700),
+    Container("40HC", "40' high cube", 1203, 235, 269, 26500),
+)}
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_ratio(text: str) -> Dict[str, int]:
+    """Assortment ratio from "S:1,M:2,L:2,XL:1"."""
+    ratio: Dict[str, int] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        size, sep, count = part.partition(":")
+        if not sep or not size.strip() or not count.strip().isdigit():
+            raise ValueError(f"Invalid ratio {part.strip()!r}, expected SIZE:COUNT")
+        if int(count):
+            ratio[size.strip()] = int(count)
+    return ratio
+
+
+def shipped_quantities(style: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """
+    Pieces per color and size of a style (camelCase document): the packing
+    list summary rows, else the order sheet breakdowns over all POs.
+    """
+    packing = style.get("packing") if isinstance(style.get("packing"), dict) else {}
+    sheet = style.get("orderSheet") if isinstance(style.get("orderSheet"), dict) else {}
+    rows = [(row.get("colorRef"), row.get("sizes")) for row in packing.get("summaryRows") or []]
+    if not any(isinstance(sizes, dict) and sizes for _, sizes in rows):
+        rows = [(row.get("colorCode"), row.get("sizes"))
+                for breakdown in sheet.get("breakdowns") or [] for row in breakdown.get("sizeRows") or []]
+
+    quantities: Dict[str, Dict[str, int]] = {}
+    for color, sizes in rows:
+        if not isinstance(sizes, dict):
+            continue
+        by_size = quantities.setdefault(str(color or "").strip(), {})
+        for size, qty in sizes.items():
+            pieces = int(_number(qty))
+            if pieces > 0:
+                by_size[str(size)] = by_size.get(str(size), 0) + pieces
+    return {color: sizes for color, sizes in quantities.items() if sizes}
+
+
+def packing_ratio(packing: Dict[str, Any]) -> Dict[str, int]:
+    """
+    The assortment of the packing list: the sizes and ratios of the first
+    sequence range listing more than one size. Empty for solid packing.
+    """
+    ranges: Dict[str, Dict[str, int]] = {}
+    for detail in packing.get("boxDetails") or []:
+        size, ratio = str(detail.get("size") or "").strip(), int(_number(detail.get("ratio")))
+        if size and ratio > 0:
+            ranges.setdefault(str(detail.get("seqRange") or detail.get("id")), {})[size] = ratio
+    return next((sizes for sizes in ranges.values() if len(sizes) > 1), {})
+
+
+def piece_weight_kg(style: Dict[str, Any], default: float) -> float:
+    """
+    Net kg per piece: the packing list's net weight over the pieces it
+    lists, else the yarn weight per piece of the consumption sheet.
+    """
+    packing = style.get("packing") if isinstance(style.get("packing"), dict) else {}
+    net = _number(packing.get("netWeight")) * _WEIGHT_UNITS.get(
+        str(packing.get("netWeightUnit") or "KG").strip().upper(), 1.0)
+    listed = sum(int(_number(q)) for row in packing.get("summaryRows") or []
+                 for q in (row.get("sizes") or {}).values())
+    if net > 0 and listed > 0:
+        return net / listed
+    consumption = style.get("consumption") if isinstance(style.get("consumption"), dict) else {}
+    grams = sum(_number(item.get("weightPerPiece")) for item in consumption.get("yarnItems") or [])
+    return grams / 1000 if grams > 0 else default
+
+
+def carton_counts(
+    quantities: Dict[str, Dict[str, int]], units_per_carton: int, ratio: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """
+    Cartons per color: assorted cartons of whole ratio sets, then solid
+    cartons per size, then mixed cartons for the odd pieces left.
+    """
+    set_size = sum(ratio.values())
+    sets_per_carton = units_per_carton // set_size if set_size else 0
+    colors = []
+    for color, sizes in quantities.items():
+        left = dict(sizes)
+        assorted = 0
+        if sets_per_carton:
+            assorted = min(left.get(size, 0) // (count * sets_per_carton) for size, count in ratio.items())
+        if assorted:
+            for size, count in ratio.items():
+                left[size] -= assorted * count * sets_per_carton
+        solid = sum(qty // units_per_carton for qty in left.values())
+        odd = sum(qty % units_per_carton for qty in left.values())
+        mixed = math.ceil(odd / units_per_carton)
+        colors.append({
+            "color": color, "pieces": sum(sizes.values()),
+            "assorted": assorted, "solid": solid, "mixed": mixed,
+            "cartons": assorted + solid + mixed,
+        })
+    return colors
+
+
+class CartonLoad(NamedTuple):
+    """`count` identical cartons of a style to load."""
+    key: str
+    length: float
+    width: float
+    height: float
+    weight_kg: float
+    count: int
+
+    @property
+    def cbm(self) -> float:
+        return self.length * self.width * self.height / 1e6
+
+
+def _orientations(carton: CartonLoad, upright: bool) -> List[Tuple[float, float, float]]:
+    """(along the length, across the width, up) of each way the carton can stand."""
+    if upright:
+        return list(dict.fromkeys([(carton.length, carton.width, carton.height),
+                                   (carton.width, carton.length, carton.height)]))
+    return list(dict.fromkeys(itertools.permutations((carton.length, carton.width, carton.height))))
+
+
+def _block(space: Tuple[float, float, float], shape: Tuple[float, float, float],
+           wanted: int) -> Tuple[int, Tuple[float, float, float]]:
+    """Cartons of `shape` (up to `wanted`) a block in `space` holds, and the block's size."""
+    (dx, dy, dz), (a, b, c) = space, shape
+    nx, ny, nz = int(dx // a), int(dy // b), int(dz // c)
+    count = min(wanted, nx * ny * nz)
+    if not count:
+        return 0, (0.0, 0.0, 0.0)
+    bz = min(nz, count)
+    by = min(ny, math.ceil(count / bz))
+    bx = math.ceil(count / (by * bz))
+    return count, (bx * a, by * b, bz * c)
+
+
+def _split(space: Tuple[float, ...], size: Tuple[float, float, float]) -> List[Tuple[float, ...]]:
+    """The space left in front of, beside and above a block placed in the back corner of `space`."""
+    (x, y, z, dx, dy, dz), (bx, by, bz) = space, size
+    return [s for s in ((x + bx, y, z, dx - bx, dy, dz),
+                        (x, y + by, z, bx, dy - by, dz),
+                        (x, y, z + bz, bx, by, dz - bz)) if min(s[3:]) > 0]
+
+
+def load_containers(
+    cartons: Sequence[CartonLoad], container: Container, upright: bool = True,
+    max_containers: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Fill containers of one type with `cartons`, one after another. Returns
+    the loaded containers and the cartons left over (those that fit no
+    container, or beyond `max_containers`).
+    """
+    remaining = {carton.key: carton.count for carton in cartons}
+    order = sorted((c for c in cartons if c.count > 0), key=lambda c: (-c.cbm, c.key))
+    shapes = {carton.key: _orientations(carton, upright) for carton in order}
+    loads: List[Dict[str, Any]] = []
+
+    while any(remaining.values()) and (max_containers is None or len(loads) < max_containers):
+        # Free spaces as (x, y, z, dx, dy, dz); x runs from the back to the doors
+        spaces = [(0.0, 0.0, 0.0, container.length, container.width, container.height)]
+        payload = container.max_payload_kg
+        loaded: Dict[str, int] = {}
+        for carton in order:
+            while remaining[carton.key] and payload >= carton.weight_kg:
+                wanted = remaining[carton.key]
+                if carton.weight_kg > 0:
+                    wanted = min(wanted, int(payload // carton.weight_kg))
+                block = None
+                for space in sorted(spaces):
+                    for shape in shapes[carton.key]:
+                        count, size = _block(space[3:], shape, wanted)
+                        if not count:
+                            continue
+                        # Most cartons counting what the leftover spaces take in
+                        # their best orientation, then most in this block, then
+                        # the tightest block
+                        ahead = sum(max(_block(rest[3:], other, wanted)[0] for other in shapes[carton.key])
+                                    for rest in _split(space, size))
+                        score = (min(wanted, count + ahead), count, -math.prod(size))
+                        if block is None or score > block[0]:
+                            block = (score, space, count, size)
+                    if block:
+                        break
+                if block is None:
+                    break
+                _, space, count, size = block
+                spaces.remove(space)
+                spaces += _split(space, size)
+                remaining[carton.key] -= count
+                payload -= count * carton.weight_kg
+                loaded[carton.key] = loaded.get(carton.key, 0) + count
+        if not loaded:
+            break
+        cbm = sum(n * c.cbm for c in order for n in [loaded.get(c.key, 0)])
+        weight = sum(n * c.weight_kg for c in order for n in [loaded.get(c.key, 0)])
+        loads.append({
+            "container": container.code, "cartons": loaded, "carton_count": sum(loaded.values()),
+            "cbm": round(cbm, 3), "gross_weight_kg": round(weight, 1),
+            "fill": round(cbm / container.cbm, 4), "weight_fill": round(weight / container.max_payload_kg, 4),
+        })
+    return loads, {key: count for key, count in remaining.items() if count}
+
+
+def recommend_containers(
+    cartons: Sequence[CartonLoad], upright: bool = True
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    A container mix: 40' high cubes filled one at a time until the rest
+    fits in one container, then the smallest container that takes it all.
+    """
+    by_size = sorted(CONTAINERS.values(), key=lambda c: c.cbm)
+    largest = by_size[-1]
+    cartons = [c for c in cartons if c.count > 0]
+    loads: List[Dict[str, Any]] = []
+    while cartons:
+        for container in by_size:
+            rest, left = load_containers(cartons, container, upright, max_containers=1)
+            if rest and not left:
+                return loads + rest, {}
+        rest, left = load_containers(cartons, largest, upright, max_containers=1)
+        if not rest:
+            return loads, {c.key: c.count for c in cartons}
+        loads += rest
+        cartons = [c._replace(count=left[c.key]) for c in cartons if left.get(c.key)]
+    return loads, {}
+
+
+def _container_options(cartons: Sequence[CartonLoad], upright: bool) -> Dict[str, Any]:
+    options = {}
+    for container in CONTAINERS.values():
+        loads, left = load_containers(cartons, container, upright)
+        options[container.code] = {
+            "name": container.name, "containers": len(loads),
+            "fill": round(sum(load["cbm"] for load in loads) / (container.cbm * len(loads)), 4) if loads else 0,
+            "last_fill": loads[-1]["fill"] if loads else 0, "unloaded": left,
+        }
+    return options
+
+
+def plan_style(
+    style: Dict[str, Any],
+    units_per_carton: Optional[int] = None,
+    ratio: Optional[Dict[str, int]] = None,
+    defaults: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Any], Optional[CartonLoad]]:
+    """Carton plan of a style (camelCase document) and its cartons to load, if it can be packed."""
+    defaults = defaults or {}
+    packing = style.get("packing") if isinstance(style.get("packing"), dict) else {}
+    dims = [_number(packing.get(k)) for k in ("boxLengthCm", "boxWidthCm", "boxHeightCm")]
+    tare = defaults.get("carton_tare_kg", 1.0)
+    max_carton_kg = defaults.get("max_carton_kg", 20.0)
+    piece_kg = piece_weight_kg(style, defaults.get("piece_weight_kg", 0.35))
+
+    listed = max([int(_number(d.get("unitsPerBox"))) for d in packing.get("boxDetails") or []], default=0)
+    units = units_per_carton or listed or int(defaults.get("units_per_carton", 24))
+    if piece_kg > 0 and max_carton_kg > tare:
+        units = max(1, min(units, int((max_carton_kg - tare) // piece_kg)))
+    ratio = packing_ratio(packing) if ratio is None else ratio
+
+    colors = carton_counts(shipped_quantities(style), units, ratio)
+    pieces = sum(c["pieces"] for c in colors)
+    cartons = sum(c["cartons"] for c in colors)
+    plan = {
+        "style_id": style.get("id"), "title": style.get("title"), "style_number": style.get("styleNumber"),
+        "shipment_date": style.get("shipmentDate"), "destination": packing.get("destination") or None,
+        "carton_cm": dims, "units_per_carton": units, "ratio": ratio,
+        "piece_weight_kg": round(piece_kg, 4), "colors": colors, "pieces": pieces, "cartons": cartons,
+        "net_weight_kg": round(pieces * piece_kg, 1),
+        "gross_weight_kg": round(pieces * piece_kg + cartons * tare, 1),
+        "cbm": round(cartons * math.prod(dims) / 1e6, 3), "problem": None,
+    }
+    if not all(d > 0 for d in dims):
+        plan["problem"] = "no carton dimensions"
+    elif not cartons:
+        plan["problem"] = "no quantities"
+    if plan["problem"]:
+        return plan, None
+    return plan, CartonLoad(str(style.get("id")), *dims, plan["gross_weight_kg"] / cartons, cartons)
+
+
+def load_plan(
+    styles: Iterable[Dict[str, Any]],
+    container: Optional[str] = None,
+    upright: bool = True,
+    units_per_carton: Optional[int] = None,
+    ratio: Optional[Dict[str, int]] = None,
+    defaults: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Carton plans of `styles` shipped together and how their cartons load:
+    into containers of type `container`, or the recommended mix, with the
+    count and fill of each container type for comparison.
+    """
+    plans, cartons = [], []
+    for style in styles:
+        plan, load = plan_style(style, units_per_carton, ratio, defaults)
+        plans.append(plan)
+        if load:
+            cartons.append(load)
+    if container:
+        loads, unloaded = load_containers(cartons, CONTAINERS[container], upright)
+    else:
+        loads, unloaded = recommend_containers(cartons, upright)
+    packed = [p for p in plans if p["problem"] is None]
+    return {
+        "styles": plans,
+        "totals": {
+            "pieces": sum(p["pieces"] for p in packed),
+            "cartons": sum(p["cartons"] for p in packed),
+            "cbm": round(sum(p["cbm"] for p in packed), 3),
+            "net_weight_kg": round(sum(p["net_weight_kg"] for p in packed), 1),
+            "gross_weight_kg": round(sum(p["gross_weight_kg"] for p in packed), 1),
+        },
+        "containers": loads,
+        "unloaded": unloaded,
+        "options": _container_options(cartons, upright),
+    }
+
+
+class PackingService:
+    """Service for carton and container load plans."""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+        settings = get_settings()
+        self.defaults = {
+            "units_per_carton": settings.packing_units_per_carton,
+            "piece_weight_kg": settings.packing_piece_weight_kg,
+            "carton_tare_kg": settings.packing_carton_tare_kg,
+            "max_carton_kg": settings.packing_max_carton_kg,
+        }
+
+    @traced()
+    async def style_plan(self, style_id: str, **options: Any) -> Optional[Dict[str, Any]]:
+        """Load plan of one style's cartons, or None when there is no such style."""
+        response = await asyncio.to_thread(
+            lambda: self.supabase.table("projects").select(PACKING_COLUMNS).eq("id", style_id).execute()
+        )
+        if not response.data:
+            return None
+        styles = PROJECT_COLUMNS.from_db_many(response.data)
+        return await asyncio.to_thread(load_plan, styles, defaults=self.defaults, **options)
+
+    @traced()
+    async def shipment_plans(
+        self, shipment_date: date, destination: Optional[str] = None, **options: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        One load plan per destination port of the styles shipping on
+        `shipment_date` (only `destination`, when given). The port is the
+        packing list's destination, matched without regard to case.
+        """
+        response = await asyncio.to_thread(
+            lambda: self.supabase.table("projects").select(PACKING_COLUMNS)
+            .gte("shipment_date", shipment_date.isoformat())
+            .lt("shipment_date", (shipment_date + timedelta(days=1)).isoformat())
+            .order("id").execute()
+        )
+        ports: Dict[str, List[Dict[str, Any]]] = {}
+        names: Dict[str, str] = {}
+        for style in PROJECT_COLUMNS.from_db_many(response.data or []):
+            packing = style.get("packing") if isinstance(style.get("packing"), dict) else {}
+            port = str(packing.get("destination") or "").strip()
+            if destination is not None and port.casefold() != destination.strip().casefold():
+                continue
+            ports.setdefault(port.casefold(), []).append(style)
+            names.setdefault(port.casefold(), port)
+
+        def plan_all() -> List[Dict[str, Any]]:
+            return [
+                {"shipment_date": shipment_date.isoformat(), "destination": names[port] or None,
+                 **load_plan(styles, defaults=self.defaults, **options)}
+                for port, styles in sorted(ports.items())
+            ]
+
+        return await asyncio.to_thread(plan_all)
@@ -0,0 +1,324 @@
+"""
+PDF templates for shipment and QC documents.
+
+render(kind, payload) turns the stored JSON of one document into PDF bytes.
+It runs in the document service's worker processes, so it only takes and
+returns plain data, and reportlab is imported there rather than by the API
+process. `payload` is {"style": <style header columns>, "document": <item>}.
+
+Bump TEMPLATE_VERSION whenever the output of a template changes: it is part
+of the render cache key.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+TEMPLATE_VERSION = 1
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _number(value: Any, digits: int = 2) -> str:
+    try:
+        return f"{float(value):,.{digits}f}"
+    except (TypeError, ValueError):
+        return _text(value)
+
+
+def _total(rows: Sequence[Dict[str, Any]], key: str) -> float:
+    total = 0.0
+    for row in rows:
+        try:
+            total += float(row.get(key) or 0)
+        except (TypeError, ValueError):
+            pass
+    return total
+
+
+class _Page:
+    """A document under construction: reportlab flowables plus the shared styles."""
+
+    def __init__(self, title: str, style: Dict[str, Any]):
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph
+
+        self.colors = colors
+        sheet = getSampleStyleSheet()
+        self.body = sheet["BodyText"].clone("cell", fontSize=8, leading=10)
+        self.heading = sheet["Heading2"]
+        self.title = title
+        self.flowables: List[Any] = []
+        self.flowables.append(Paragraph(escape(title), sheet["Title"]))
+        subtitle = " / ".join(
+            _text(v) for v in (style.get("title"), style.get("style_number"), style.get("brand")) if v
+        )
+        if subtitle:
+            self.flowables.append(Paragraph(escape(subtitle), sheet["Heading4"]))
+
+    def cell(self, value: Any) -> Any:
+        from reportlab.platypus import Paragraph
+
+        return Paragraph(escape(_text(value)).replace("\n", "<br/>"), self.body)
+
+    def section(self, title: str) -> None:
+        from reportlab.platypus import Paragraph
+
+        self.flowables.append(Paragraph(escape(title), self.heading))
+
+    def paragraph(self, text: Any) -> None:
+        if text:
+            self.flowables.append(self.cell(text))
+
+    def fields(self, pairs: Sequence[Any], columns: int = 2) -> None:
+        """Label/value pairs laid out `columns` pairs per row; empty values are skipped."""
+        from reportlab.platypus import Table, TableStyle
+
+        pairs = [(label, value) for label, value in pairs if value not in (None, "")]
+        if not pairs:
+            return
+        rows = []
+        for start in range(0, len(pairs), columns):
+            row: List[Any] = []
+            for label, value in pairs[start:start + columns]:
+                row += [self.cell(label), self.cell(value)]
+            rows.append(row + [""] * (2 * columns - len(row)))
+        # Two label/value pairs span the landscape A4 text width
+        table = Table(rows, colWidths=[90, 303] * columns if columns == 2 else None)
+        table.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            *[("TEXTCOLOR", (c, 0), (c, -1), self.colors.grey) for c in range(0, 2 * columns, 2)],
+        ]))
+        self.flowables.append(table)
+
+    def table(self, header: Sequence[str], rows: Sequence[Sequence[Any]],
+              footer: Optional[Sequence[Any]] = None, widths: Optional[Sequence[float]] = None) -> None:
+        from reportlab.platypus import Table, TableStyle
+
+        data = [[self.cell(h) for h in header]] + [[self.cell(v) for v in row] for row in rows]
+        if footer:
+            data.append([self.cell(v) for v in footer])
+        table = Table(data, colWidths=widths, repeatRows=1)
+        commands = [
+            ("GRID", (0, 0), (-1, -1), 0.25, self.colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), self.colors.lightgrey),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]
+        if footer:
+            commands.append(("BACKGROUND", (0, -1), (-1, -1), self.colors.whitesmoke))
+        table.setStyle(TableStyle(commands))
+        self.flowables.append(table)
+
+    def build(self) -> bytes:
+        from io import BytesIO
+
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.platypus import SimpleDocTemplate
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer, pagesize=landscape(A4), title=self.title,
+            leftMargin=28, rightMargin=28, topMargin=28, bottomMargin=28,
+            # Fixed document id and dates, so identical input renders identical bytes
+            invariant=1,
+        )
+        doc.build(self.flowables)
+        return buffer.getvalue()
+
+
+def render_invoice(payload: Dict[str, Any]) -> bytes:
+    """Commercial invoice (InvoiceEditor)."""
+    style, inv = payload["style"], payload["document"]
+    page = _Page("COMMERCIAL INVOICE", style)
+    contract = "L/C" if inv.get("paymentType") == "L/C" else "S/C"
+    page.fields([
+        ("Invoice No", inv.get("invoiceNo")), ("Invoice Date", inv.get("invoiceDate")),
+        ("EXP No", inv.get("expNo")), ("EXP Date", inv.get("expDate")),
+        (f"{contract} No", inv.get("lcNo") if contract == "L/C" else inv.get("scNo")),
+        (f"{contract} Date", inv.get("lcDate") if contract == "L/C" else inv.get("scDate")),
+        ("Export Reg No", inv.get("exportRegNo")), ("Export Reg Date", inv.get("exportRegDate")),
+        ("B/L No", inv.get("blNo")), ("B/L Date", inv.get("blDate")),
+    ])
+    page.section("Parties")
+    page.fields([
+        ("Shipper", "\n".join(filter(None, [inv.get("shipperName"), inv.get("shipperAddress")]))),
+        ("For account and risk of", "\n".join(filter(None, [
+            inv.get("buyerName"), inv.get("buyerAddress"),
+            f"VAT/ID: {inv['buyerVatId']}" if inv.get("buyerVatId") else None,
+        ]))),
+        ("Consignee", "\n".join(filter(None, [inv.get("consigneeName"), inv.get("consigneeAddress")]))),
+        ("Notify party", "\n".join(filter(None, [
+            inv.get("notifyParty1Name"), inv.get("notifyParty1Address"), inv.get("notifyParty1Contact"),
+            inv.get("notifyParty1Phone"), inv.get("notifyParty1Email"),
+        ]))),
+        ("Also notify", "\n".join(filter(None, [inv.get("notifyParty2Name"), inv.get("notifyParty2Address")]))),
+        ("Bank", "\n".join(filter(None, [
+            inv.get("bankName"), inv.get("bankBranch"),
+            f"SWIFT: {inv['bankSwift']}" if inv.get("bankSwift") else None,
+            f"A/C: {inv['bankAccountNo']}" if inv.get("bankAccountNo") else None,
+        ]))),
+    ])
+    page.section("Shipment")
+    page.fields([
+        ("Port of loading", inv.get("portOfLoading")), ("Final destination", inv.get("finalDestination")),
+        ("Mode of shipment", inv.get("modeOfShipment")), ("Payment terms", inv.get("paymentTerms")),
+        ("Country of origin", inv.get("countryOfOrigin")),
+    ])
+
+    items = inv.get("lineItems") or []
+    page.section("Goods")
+    page.table(
+        ("Marks & Nos", "Description", "Composition", "Order No", "Style No", "HS Code",
+         "Quantity", "Cartons", "Unit Price", "Amount"),
+        [
+            (i.get("marksAndNumber"), i.get("description"), i.get("composition"), i.get("orderNo"),
+             i.get("styleNo"), i.get("hsCode"), _number(i.get("quantity"), 0), _number(i.get("cartons"), 0),
+             _number(i.get("unitPrice")), _number(i.get("totalAmount")))
+            for i in items
+        ],
+        footer=("Total", "", "", "", "", "", _number(_total(items, "quantity"), 0),
+                _number(_total(items, "cartons"), 0), "", _number(_total(items, "totalAmount"))),
+    )
+    page.fields([
+        ("Net weight (kg)", _number(inv.get("netWeight"))), ("Gross weight (kg)", _number(inv.get("grossWeight"))),
+        ("Total CBM", _number(inv.get("totalCbm"), 3)),
+    ])
+    if inv.get("rexDeclaration"):
+        page.section("REX declaration")
+        page.paragraph(inv["rexDeclaration"])
+    page.paragraph(inv.get("remarks"))
+    return page.build()
+
+
+def render_packing(payload: Dict[str, Any]) -> bytes:
+    """Packing list (PackingEditor)."""
+    style, pk = payload["style"], payload["document"]
+    page = _Page("PACKING LIST", style)
+    page.fields([
+        ("Supplier", pk.get("supplierName")), ("Supplier code", pk.get("supplierCode")),
+        ("Invoice ref", pk.get("invoiceRef")), ("Delivery note", pk.get("deliveryNoteNo")),
+        ("Order number", pk.get("orderNumber")), ("Shipment type", pk.get("shipmentType")),
+        ("Division", pk.get("division")), ("Section", pk.get("section")),
+        ("Destination", pk.get("destination")), ("Delivery address", pk.get("deliveryAddress")),
+        ("Shipment date", pk.get("shipmentDate")),
+        ("Arrival", " ".join(filter(None, [pk.get("arrivalDate"), pk.get("arrivalTime")]))),
+        ("Alarmed goods", "Yes" if pk.get("alarmedGoods") else None),
+    ])
+
+    boxes = pk.get("boxDetails") or []
+    page.section("Cartons")
+    page.table(
+        ("Seq", "Boxes", "Units/box", "Model", "Quality", "Colour", "Size", "Ratio",
+         "Pcs/bag", "Bags/ctn", "Bags", "Units", "Observation"),
+        [
+            (b.get("seqRange"), _number(b.get("totalBoxes"), 0), _number(b.get("unitsPerBox"), 0),
+             b.get("model"), b.get("quality"),
+             " ".join(filter(None, [_text(b.get("colorRef")), _text(b.get("colorCode"))])),
+             b.get("size"), b.get("ratio"), b.get("totalPcsInOneBag"), b.get("totalBagInCtn"),
+             b.get("totalBag"), _number(b.get("units"), 0), b.get("observation"))
+            for b in boxes
+        ],
+        footer=("Total", _number(_total(boxes, "totalBoxes"), 0), "", "", "", "", "", "", "", "",
+                _number(_total(boxes, "totalBag"), 0), _number(_total(boxes, "units"), 0), ""),
+    )
+
+    summary = pk.get("summaryRows") or []
+    if summary:
+        sizes: List[str] = []
+        for row in summary:
+            sizes += [s for s in (row.get("sizes") or {}) if s not in sizes]
+        page.section("Summary")
+        page.table(
+            ("Model", "Quality", "Colour", *sizes, "Total"),
+            [
+                (r.get("model"), r.get("quality"), r.get("colorRef"),
+                 *[_number((r.get("sizes") or {}).get(s), 0) for s in sizes], _number(r.get("total"), 0))
+                for r in summary
+            ],
+        )
+    references = pk.get("colorReferences") or []
+    if references:
+        page.section("Colour references")
+        page.table(("Code", "Colour"), [(c.get("colorCode"), c.get("colorName")) for c in references])
+
+    page.section("Weights and measures")
+    dims = [pk.get("boxLengthCm"), pk.get("boxWidthCm"), pk.get("boxHeightCm")]
+    page.fields([
+        ("Gross weight", f"{_number(pk.get('grossWeight'))} {_text(pk.get('grossWeightUnit'))}".strip()),
+        ("Net weight", f"{_number(pk.get('netWeight'))} {_text(pk.get('netWeightUnit'))}".strip()),
+        ("Volume", f"{_number(pk.get('volume'), 3)} {_text(pk.get('volumeUnit'))}".strip()),
+        ("Carton", " ".join(filter(None, [
+            _text(pk.get("cartonType")),
+            " x ".join(_number(d, 1) for d in dims) + " cm" if any(dims) else "",
+        ]))),
+    ])
+    page.paragraph(pk.get("remarks"))
+    return page.build()
+
+
+def render_inspection(payload: Dict[str, Any]) -> bytes:
+    """QC inspection report (InspectionReportTemplate)."""
+    style, inspection = payload["style"], payload["document"]
+    data = inspection.get("data") or {}
+    kind = inspection.get("type") or data.get("inspectionType") or ""
+    page = _Page(f"INSPECTION REPORT {kind}".strip().upper(), style)
+    page.fields([
+        ("Supplier", data.get("supplierName")), ("Factory", data.get("factoryName")),
+        ("Inspector", data.get("inspectorName")), ("Date", data.get("inspectionDate")),
+        ("Buyer", data.get("buyerName")), ("Order number", data.get("orderNumber")),
+        ("Style", " ".join(filter(None, [data.get("styleName"), data.get("styleNumber")]))),
+        ("Colour", data.get("colorName")), ("Composition", data.get("composition")),
+        ("Gauge", data.get("gauges")), ("Order quantity", _number(data.get("totalOrderQuantity"), 0)),
+        ("Controlled quantity", _number(data.get("controlledQty"), 0)),
+        ("Measured quantity", _number(data.get("measurementQty"), 0)),
+        ("Country of production", data.get("countryOfProduction")),
+    ])
+
+    groups = data.get("shipmentGroups") or []
+    if groups:
+        page.section("Shipment")
+        rows = []
+        for group in groups:
+            for row in group.get("rows") or []:
+                cells = {k: v for k, v in row.items() if k != "id"}
+                rows.append((group.get("color"), ", ".join(f"{k}: {v}" for k, v in cells.items())))
+        page.table(("Colour", "Quantities"), rows)
+
+    defects = data.get("qcDefects") or []
+    page.section("Defects")
+    page.table(
+        ("Description", "Critical", "Major", "Minor"),
+        [(d.get("description"), d.get("critical"), d.get("major"), d.get("minor")) for d in defects],
+        footer=("Total", _number(_total(defects, "critical"), 0), _number(_total(defects, "major"), 0),
+                _number(_total(defects, "minor"), 0)),
+        widths=(400, 80, 80, 80),
+    )
+    summary = data.get("qcSummary") or {}
+    page.fields([
+        ("Major found", summary.get("majorFound")), ("Major allowed", summary.get("maxAllowed")),
+        ("Critical allowed", summary.get("criticalMaxAllowed")), ("Minor allowed", summary.get("minorMaxAllowed")),
+    ])
+
+    page.section(f"Result: {data.get('overallResult') or inspection.get('status') or 'PENDING'}")
+    page.paragraph(data.get("judgementComments"))
+    page.paragraph(data.get("additionalComments"))
+    page.paragraph(data.get("measurementComments"))
+    return page.build()
+
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], bytes]] = {
+    "invoice": render_invoice,
+    "packing": render_packing,
+    "inspection": render_inspection,
+}
+
+
+def render(kind: str, payload: Dict[str, Any]) -> bytes:
+    """Render one document; the entry point of the render worker processes."""
+    return RENDERERS[kind](payload)
+
+
+def warm_up() -> None:
+    """Process pool initializer: import reportlab before the first job arrives."""
+    import reportlab.platypus  # noqa: F401
@@ -0,0 +1,71 @@
+"""
+Project service on a direct Postgres connection (project_store = "asyncpg").
+
+The hot paths - listing, reading and saving styles - skip PostgREST: the
+list and single-style documents are built by Postgres with json_agg /
+to_json over the same renamed select PostgREST would run, and passed
+through as bytes; a save calls save_style (migration 019) on the pool.
+Everything else is inherited and still goes through supabase-py.
+"""
+from typing import Any, Dict, Optional
+
+from supabase import Client
+
+from app.core.database import Database
+from app.core.tracing import traced
+from app.services.project_service import PROJECT_COLUMNS, ProjectService
+from app.services.revision_service import RevisionService
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# The columns of projects_full under their API keys, as PROJECT_COLUMNS.select has PostgREST do
+_SELECT = ", ".join(
+    _ident(column) if api == column else f"{_ident(column)} AS {_ident(api)}"
+    for api, column, _ in PROJECT_COLUMNS.columns
+)
+LIST_SQL = (
+    f"SELECT COALESCE(json_agg(r), '[]'::json) FROM "
+    f"(SELECT {_SELECT} FROM public.projects_full ORDER BY updated_at DESC) r"
+)
+GET_SQL = f"SELECT to_json(r) FROM (SELECT {_SELECT} FROM public.projects_full WHERE id = $1) r"
+SAVE_STYLE_SQL = "SELECT public.save_style($1, $2)"
+
+
+class PgProjectService(ProjectService):
+    """ProjectService whose list, get and save run on an asyncpg pool."""
+
+    def __init__(self, database: Database, supabase: Client, revisions: Optional[RevisionService] = None):
+        super().__init__(supabase, revisions=revisions)
+        self.database = database
+
+    @traced()
+    async def get_all_json(self) -> bytes:
+        """get_all() as encoded JSON, built by Postgres."""
+        async with self.database.connection() as conn:
+            return await conn.fetchval(LIST_SQL)
+
+    @traced()
+    async def get_by_id_json(self, project_id: str) -> Optional[bytes]:
+        """get_by_id() as encoded JSON, built by Postgres; None when missing."""
+        async with self.database.connection() as conn:
+            return await conn.fetchval(GET_SQL, project_id)
+
+    @traced()
+    async def save(
+        self,
+        project_id: str,
+        values: Dict[str, Any],
+        actor: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        ProjectService.save on the pool. The actor (verified by the route)
+        is added to the request claims, so auth.uid() names it as it would
+        for a PostgREST request made with its token.
+        """
+        claims = {"sub": actor["id"], "email": actor.get("email")} if actor else None
+        async with self.database.connection(write=True, claims=claims) as conn:
+            return await conn.fetchval(SAVE_STYLE_SQL, project_id, values)
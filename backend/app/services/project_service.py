@@ -1,84 +1,148 @@
 """
 Project service - Business logic for project/style operations.
 """
-from typing import List, Optional, Dict, Any
+import asyncio
+from typing import AsyncIterator, List, Optional, Dict, Any
 from datetime import datetime
 
+import orjson
+from postgrest.exceptions import APIError
 from supabase import Client
 
+from app.core.mapping import ColumnMapper
+from app.core.tracing import traced
+from app.models.project import Project
+from app.services.revision_service import RevisionService
+
+# Column tables for every field of the Project model, built once at import
+PROJECT_COLUMNS = ColumnMapper.from_model(Project)
+
+# List sections stored one row per item in project_<section> (migration 016)
+SECTION_COLUMNS = ("comments", "inspections", "invoices", "pp_meetings", "material_control")
+
 
 class ProjectService:
     """Service for project CRUD operations."""
 
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: Client, revisions: Optional[RevisionService] = None):
         self.supabase = supabase
         self.table = "projects"
+        # Full documents are read from the view that assembles the section tables
+        self.view = "projects_full"
+        self.revisions = revisions
 
+    @traced("ProjectService.map_to_db")
     def _map_to_db(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Map camelCase keys to snake_case for database."""
-        mapping = {
-            "poNumbers": "po_numbers",
-            "updatedAt": "updated_at",
-            "techPackFiles": "tech_pack_files",
-            "ppMeetings": "pp_meetings",
-            "materialControl": "material_control",
-            "orderSheet": "order_sheet",
-            "materialRemarks": "material_remarks",
-            "materialAttachments": "material_attachments",
-            "materialComments": "material_comments",
-            "productImage": "product_image",
-            "productColors": "product_colors",
-        }
-        result = {}
-        for key, value in data.items():
-            db_key = mapping.get(key, key)
-            if value is not None:
-                result[db_key] = value
-        return result
+        return PROJECT_COLUMNS.to_db(data)
 
     def _map_from_db(self, row: Dict[str, Any]) -> Dict[str, Any]:
-        """Map snake_case keys from database to camelCase."""
+        """Map snake_case keys from database to camelCase (values are not copied)."""
+        return PROJECT_COLUMNS.from_db(row)
+
+    def changed_sections(self, data: Dict[str, Any]) -> List[str]:
+        """Database columns touched by an update payload (for the audit log)."""
+        return sorted(self._map_to_db(data))
+
+    def section_column(self, section: str) -> str:
+        """Resolve a section name given in camelCase or snake_case to its column."""
+        return PROJECT_COLUMNS.column(section)
+
+    def _select_json(self, params: Dict[str, str], single: bool = False) -> Optional[bytes]:
+        """
+        Fetch rows in the API shape as the raw PostgREST JSON body.
+        With `single`, returns one object, or None when no row matched.
+        """
+        headers = {"Accept": "application/vnd.pgrst.object+json"} if single else {}
+        response = self.supabase.postgrest.session.get(
+            f"/{self.view}", params={"select": PROJECT_COLUMNS.select, **params}, headers=headers
+        )
+        if single and response.status_code == 406:
+            return None
+        if not response.is_success:
+            raise APIError(response.json())
+        return response.content
+
+    @traced()
+    async def get_all_json(self) -> bytes:
+        """get_all() as encoded JSON, passed through from PostgREST."""
+        return await asyncio.to_thread(self._select_json, {"order": "updated_at.desc"})
+
+    @traced()
+    async def get_by_id_json(self, project_id: str) -> Optional[bytes]:
+        """
+        get_by_id() as encoded JSON, passed through from PostgREST. The
+        request runs in a worker thread so concurrent reads can overlap
+        (and be coalesced by the route).
+        """
+        return await asyncio.to_thread(self._select_json, {"id": f"eq.{project_id}"}, single=True)
+
+    async def export_json(self, page_size: int = 50) -> AsyncIterator[bytes]:
+        """
+        Yield every project in the API shape as consecutive chunks of one
+        JSON array, fetching `page_size` rows per PostgREST request. Pages
+        are keyset-paged on id, so each is an index range scan however far
+        into the export it is, and fetched in a worker thread.
+        """
+        yield b"["
+        params = {"order": "id", "limit": str(page_size)}
+        first = True
+        while True:
+            page = await asyncio.to_thread(self._select_json, params)
+            rows = page.strip()[1:-1].strip()
+            if not rows:
+                break
+            yield rows if first else b"," + rows
+            first = False
+            params = {**params, "id": f"gt.{orjson.loads(page)[-1]['id']}"}
+        yield b"]"
+
+    @traced()
+    async def changes_since(self, since: int, limit: int = 500, settle_seconds: float = 2.0) -> Dict[str, Any]:
+        """
+        Styles created or updated and ids deleted after change sequence
+        `since`, oldest first, at most `limit` entries in total. `next_cursor`
+        is the sequence to pass as `since` next time; `has_more` means the
+        page was full and the caller should ask again right away.
+        """
+        params = {"p_since": since, "p_limit": limit, "p_settle": f"{settle_seconds} seconds"}
+        response = await asyncio.to_thread(
+            lambda: self.supabase.rpc("style_changes_since", params).execute()
+        )
+        rows = response.data or []
+        changed = [row["project"] for row in rows if not row["deleted"]]
         return {
-            "id": row.get("id"),
-            "title": row.get("title"),
-            "productImage": row.get("product_image"),
-            "productColors": row.get("product_colors", []),
-            "poNumbers": row.get("po_numbers", []),
-            "updatedAt": row.get("updated_at"),
-            "status": row.get("status"),
-            "techPackFiles": row.get("tech_pack_files", []),
-            "pages": row.get("pages", []),
-            "comments": row.get("comments", []),
-            "inspections": row.get("inspections", []),
-            "ppMeetings": row.get("pp_meetings", []),
-            "materialControl": row.get("material_control", []),
-            "invoices": row.get("invoices", []),
-            "packing": row.get("packing"),
-            "orderSheet": row.get("order_sheet"),
-            "consumption": row.get("consumption"),
-            "materialRemarks": row.get("material_remarks", ""),
-            "materialAttachments": row.get("material_attachments", []),
-            "materialComments": row.get("material_comments", []),
+            "changes": PROJECT_COLUMNS.from_db_many(changed),
+            "deleted": [row["project_id"] for row in rows if row["deleted"]],
+            "next_cursor": rows[-1]["change_seq"] if rows else since,
+            "has_more": len(rows) >= limit,
         }
 
+    @traced()
     async def get_all(self) -> List[Dict[str, Any]]:
         """Get all projects ordered by updated_at descending."""
-        response = self.supabase.table(self.table)\
-            .select("*")\
-            .order("updated_at", desc=True)\
-            .execute()
-        return [self._map_from_db(row) for row in response.data]
+        response = await asyncio.to_thread(
+            self.supabase.table(self.view)
+            .select("*")
+            .order("updated_at", desc=True)
+            .execute
+        )
+        return PROJECT_COLUMNS.from_db_many(response.data)
 
+    @traced()
     async def get_by_id(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get a single project by ID."""
-        response = self.supabase.table(self.table)\
-            .select("*")\
-            .eq("id", project_id)\
-            .execute()
+        response = await asyncio.to_thread(
+            self.supabase.table(self.view)
+            .select("*")
+            .eq("id", project_id)
+            .execute
+        )
         if response.data:
             return self._map_from_db(response.data[0])
         return None
 
+    @traced()
     async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new project."""
         # Generate ID and timestamp
@@ -103,29 +167,113 @@ class ProjectService:
         db_data.setdefault("material_attachments", [])
         db_data.setdefault("material_comments", [])
 
-        response = self.supabase.table(self.table).insert(db_data).execute()
+        response = await asyncio.to_thread(self.supabase.table(self.table).insert(db_data).execute)
         if response.data:
-            return self._map_from_db(response.data[0])
+            # Sections were moved to their tables by the insert trigger, as given
+            row = response.data[0]
+            row.update({column: db_data[column] for column in SECTION_COLUMNS})
+            return self._map_from_db(row)
         raise Exception("Failed to create project")
 
-    async def update(self, project_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Update a project."""
-        db_data = self._map_to_db(data)
-        db_data["updated_at"] = datetime.now().isoformat()
+    @traced()
+    async def update(
+        self,
+        project_id: str,
+        data: Dict[str, Any],
+        actor: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Update a project. The database records a revision per changed
+        section in the same transaction (migration 013), attributed to the
+        caller: the write is made with the caller's JWT (`token`) when
+        there is one.
+        """
+        values = {**self._map_to_db(data), "updated_at": datetime.now().isoformat()}
+        row = await self.save(project_id, values, actor=actor, token=token)
+        if row is None:
+            raise Exception(f"Project {project_id} not found")
+        return self._map_from_db(row)
 
-        response = self.supabase.table(self.table)\
-            .update(db_data)\
-            .eq("id", project_id)\
-            .execute()
+    def _save_style(self, params: Dict[str, Any], token: Optional[str]) -> Any:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.supabase.postgrest.session.post("/rpc/save_style", json=params, headers=headers)
+        if not response.is_success:
+            raise APIError(response.json())
+        return response.json()
 
-        if response.data:
-            return self._map_from_db(response.data[0])
-        raise Exception(f"Project {project_id} not found")
+    @traced()
+    async def save(
+        self,
+        project_id: str,
+        values: Dict[str, Any],
+        actor: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Write `values` to a project (list sections go to their item tables)
+        with save_style (migration 019), as the holder of `token` if given.
+        Returns the stored document, or None if the project is missing.
+        """
+        params = {"p_project_id": project_id, "p_values": values}
+        return await asyncio.to_thread(self._save_style, params, token)
+
+    @traced()
+    async def get_section(self, project_id: str, section: str) -> Optional[List[Any]]:
+        """
+        One list section of a project, read from its own table without
+        loading the rest of the document. None if the project is missing.
+        """
+        column = self.section_column(section)
+        if column not in SECTION_COLUMNS:
+            raise ValueError(f"{section} is not a list section")
+        items, row = await asyncio.gather(
+            asyncio.to_thread(
+                lambda: self.supabase.table(f"project_{column}")
+                .select("data")
+                .eq("project_id", project_id)
+                .order("position")
+                .execute()
+            ),
+            asyncio.to_thread(
+                lambda: self.supabase.table(self.table)
+                .select(f"id,{column}")
+                .eq("id", project_id)
+                .execute()
+            ),
+        )
+        if not row.data:
+            return None
+        if items.data:
+            return [item["data"] for item in items.data]
+        # Not backfilled yet (or empty)
+        return row.data[0][column] or []
+
+    @traced()
+    async def get_as_of(self, project_id: str, as_of: datetime) -> Optional[Dict[str, Any]]:
+        """Get a project as it was at `as_of`, rebuilt from its revision history."""
+        if not self.revisions:
+            raise ValueError("Revision history is disabled")
+        response = await asyncio.to_thread(
+            self.supabase.table(self.view)
+            .select("*")
+            .eq("id", project_id)
+            .execute
+        )
+        if not response.data:
+            return None
+
+        row = response.data[0]
+        row.update(await self.revisions.sections_as_of(project_id, as_of))
+        return self._map_from_db(row)
 
+    @traced()
     async def delete(self, project_id: str) -> bool:
         """Delete a project."""
-        response = self.supabase.table(self.table)\
-            .delete()\
-            .eq("id", project_id)\
-            .execute()
+        response = await asyncio.to_thread(
+            self.supabase.table(self.table)
+            .delete()
+            .eq("id", project_id)
+            .execute
+        )
         return len(response.data) > 0
@@ -0,0 +1,392 @@
+"""
+QC analytics - defect Pareto, pass rates and measurement drift across styles.
+
+Inspections are flattened into three DuckDB tables (inspections, defect rows,
+measurement points) that are queried with SQL, so a report over every style
+is one columnar scan instead of a loop over style documents. The store is
+kept current incrementally: it follows the style change feed
+(`style_changes_since`) from a stored cursor, re-extracting only the styles
+that changed, and writes through the API are applied as soon as they commit.
+
+The store lives in memory unless `QC_ANALYTICS_PATH` names a database file,
+in which case it (and its cursor) survive restarts. Needs `duckdb`.
+"""
+import asyncio
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+
+from app.config import get_settings
+from app.core.singleflight import SingleFlight
+from app.core.supabase import get_supabase
+from app.core.tracing import traced
+from app.services.measurements import parse_measure
+
+logger = logging.getLogger(__name__)
+
+# Bump when the tables or the extraction change; a stored database is rebuilt
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS qc_state (key VARCHAR PRIMARY KEY, value BIGINT);
+CREATE TABLE IF NOT EXISTS qc_inspections (
+    style_id VARCHAR, inspection_id VARCHAR, style_number VARCHAR,
+    inspection_type VARCHAR, status VARCHAR, buyer VARCHAR, factory VARCHAR,
+    supplier VARCHAR, inspection_date DATE, result VARCHAR,
+    order_qty INTEGER, controlled_qty INTEGER,
+    critical INTEGER, major INTEGER, minor INTEGER,
+    critical_allowed INTEGER, major_allowed INTEGER, minor_allowed INTEGER
+);
+CREATE TABLE IF NOT EXISTS qc_defects (
+    style_id VARCHAR, inspection_id VARCHAR, description VARCHAR,
+    critical INTEGER, major INTEGER, minor INTEGER
+);
+CREATE TABLE IF NOT EXISTS qc_measurements (
+    style_id VARCHAR, inspection_id VARCHAR, point VARCHAR, name VARCHAR,
+    size VARCHAR, color VARCHAR, actual DOUBLE, standard DOUBLE,
+    tol_plus DOUBLE, tol_minus DOUBLE
+);
+"""
+
+# Table -> (column, DuckDB type) in insert order
+COLUMNS = {
+    "qc_inspections": (
+        ("style_id", "VARCHAR"), ("inspection_id", "VARCHAR"), ("style_number", "VARCHAR"),
+        ("inspection_type", "VARCHAR"), ("status", "VARCHAR"), ("buyer", "VARCHAR"),
+        ("factory", "VARCHAR"), ("supplier", "VARCHAR"), ("inspection_date", "VARCHAR"),
+        ("result", "VARCHAR"), ("order_qty", "INTEGER"), ("controlled_qty", "INTEGER"),
+        ("critical", "INTEGER"), ("major", "INTEGER"), ("minor", "INTEGER"),
+        ("critical_allowed", "INTEGER"), ("major_allowed", "INTEGER"), ("minor_allowed", "INTEGER"),
+    ),
+    "qc_defects": (
+        ("style_id", "VARCHAR"), ("inspection_id", "VARCHAR"), ("description", "VARCHAR"),
+        ("critical", "INTEGER"), ("major", "INTEGER"), ("minor", "INTEGER"),
+    ),
+    "qc_measurements": (
+        ("style_id", "VARCHAR"), ("inspection_id", "VARCHAR"), ("point", "VARCHAR"),
+        ("name", "VARCHAR"), ("size", "VARCHAR"), ("color", "VARCHAR"), ("actual", "DOUBLE"),
+        ("standard", "DOUBLE"), ("tol_plus", "DOUBLE"), ("tol_minus", "DOUBLE"),
+    ),
+}
+
+# Dimensions reports can be grouped by -> SQL over `i` (qc_inspections) and `m` (qc_measurements)
+INSPECTION_GROUPS = {
+    "factory": "i.factory",
+    "buyer": "i.buyer",
+    "supplier": "i.supplier",
+    "type": "i.inspection_type",
+    "month": "strftime(i.inspection_date, '%Y-%m')",
+}
+MEASUREMENT_GROUPS = {**INSPECTION_GROUPS, "point": "m.name", "size": "m.size"}
+
+
+@lru_cache(maxsize=None)
+def _insert_sql(table: str) -> str:
+    """INSERT of a table's rows from a JSON object of column arrays."""
+    cols = COLUMNS[table]
+    schema = orjson.dumps({name: [sql_type] for name, sql_type in cols}).decode()
+    select = ", ".join(
+        f"TRY_CAST(unnest(j.{name}) AS DATE)" if name == "inspection_date" else f"unnest(j.{name})"
+        for name, _ in cols
+    )
+    return f"INSERT INTO {table} SELECT {select} FROM (SELECT from_json(?, '{schema}') AS j)"
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract(style: Dict[str, Any]) -> Dict[str, List[Tuple]]:
+    """Rows of every QC table for one style (camelCase style document)."""
+    rows: Dict[str, List[Tuple]] = {table: [] for table in COLUMNS}
+    style_id = style["id"]
+    for inspection in style.get("inspections") or []:
+        data = inspection.get("data") or {}
+        inspection_id = str(inspection.get("id"))
+
+        totals = [0, 0, 0]
+        for defect in data.get("qcDefects") or []:
+            counts = [_int(defect.get(k)) or 0 for k in ("critical", "major", "minor")]
+            if not any(counts):
+                continue
+            totals = [a + b for a, b in zip(totals, counts)]
+            rows["qc_defects"].append((
+                style_id, inspection_id, str(defect.get("description") or "").strip(), *counts,
+            ))
+
+        summary = data.get("qcSummary") or {}
+        rows["qc_inspections"].append((
+            style_id, inspection_id, data.get("styleNumber") or style.get("styleNumber"),
+            inspection.get("type") or data.get("inspectionType"), inspection.get("status"),
+            data.get("buyerName") or style.get("brand"),
+            data.get("factoryName") or style.get("factoryName"), data.get("supplierName"),
+            data.get("inspectionDate") or None, data.get("overallResult"),
+            _int(data.get("totalOrderQuantity")), _int(data.get("controlledQty")), *totals,
+            _int(summary.get("criticalMaxAllowed")), _int(summary.get("maxAllowed")),
+            _int(summary.get("minorMaxAllowed")),
+        ))
+
+        # Blank tolerances fall back to the sheet's master tolerance, as in the editor
+        master = parse_measure(data.get("globalMasterTolerance")) or 0.0
+        for row in (data.get("qcMeasurementTable") or {}).get("rows") or []:
+            tol_plus = parse_measure(row.get("tolerancePlus"))
+            tol_minus = parse_measure(row.get("toleranceMinus"))
+            tol_plus = master if tol_plus is None else abs(tol_plus)
+            tol_minus = master if tol_minus is None else abs(tol_minus)
+            for group in (row.get("groups") or {}).values():
+                actual = parse_measure(group.get("actualValue"))
+                if actual is None:
+                    continue
+                for column in group.get("subColumns") or []:
+                    standard = parse_measure(column.get("standardValue"))
+                    if standard is None:
+                        continue
+                    rows["qc_measurements"].append((
+                        style_id, inspection_id, row.get("point"), row.get("name"),
+                        group.get("size"), column.get("color"), actual, standard, tol_plus, tol_minus,
+                    ))
+    return rows
+
+
+class QCAnalytics:
+    """Columnar store of every style's inspections, with the QC reports over it."""
+
+    def __init__(self, path: str = "", sync_seconds: float = 10.0, settle_seconds: float = 2.0,
+                 page_size: int = 200):
+        import duckdb
+
+        self.sync_seconds = sync_seconds
+        self.settle_seconds = settle_seconds
+        self.page_size = page_size
+        self._db = duckdb.connect(path or ":memory:")
+        self._lock = threading.Lock()
+        self._syncs = SingleFlight("qc_analytics")
+        self._synced_at = float("-inf")
+        self._create()
+
+    def _create(self) -> None:
+        self._db.execute(SCHEMA)
+        version = self._state("schema_version")
+        if version != SCHEMA_VERSION:
+            if version is not None:
+                logger.info(f"QC analytics schema {version} -> {SCHEMA_VERSION}, rebuilding")
+            for table in ("qc_state", *COLUMNS):
+                self._db.execute(f"DROP TABLE IF EXISTS {table}")
+            self._db.execute(SCHEMA)
+            self._set_state("schema_version", SCHEMA_VERSION)
+
+    def _state(self, key: str) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM qc_state WHERE key = ?", [key]).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO qc_state VALUES (?, ?)", [key, value])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @property
+    def cursor(self) -> int:
+        """Change sequence the store is current up to."""
+        with self._lock:
+            return self._state("cursor") or 0
+
+    def apply(self, styles: Iterable[Dict[str, Any]], deleted: Sequence[str] = (),
+              cursor: Optional[int] = None) -> None:
+        """Replace the rows of `styles`, drop those of `deleted`, in one transaction."""
+        styles = list(styles)
+        rows: Dict[str, List[Tuple]] = {table: [] for table in COLUMNS}
+        for style in styles:
+            for table, style_rows in extract(style).items():
+                rows[table] += style_rows
+        stale = list(dict.fromkeys([*(style["id"] for style in styles), *deleted]))
+
+        with self._lock:
+            self._db.execute("BEGIN TRANSACTION")
+            try:
+                for table, cols in COLUMNS.items():
+                    if stale:
+                        self._db.execute(f"DELETE FROM {table} WHERE style_id IN (SELECT unnest(?::VARCHAR[]))",
+                                         [stale])
+                    if not rows[table]:
+                        continue
+                    # One INSERT per table: the columns travel as one JSON document that
+                    # DuckDB decodes and unnests side by side (binding Python lists is far slower)
+                    columns = {name: values for (name, _), values in zip(cols, zip(*rows[table]))}
+                    self._db.execute(_insert_sql(table), [orjson.dumps(columns).decode()])
+                if cursor is not None:
+                    self._set_state("cursor", cursor)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    async def sync(self, force: bool = False) -> None:
+        """Catch up with the change feed, at most every `sync_seconds` unless forced."""
+        if force or time.monotonic() - self._synced_at >= self.sync_seconds:
+            await self._syncs.do("sync", self._sync)
+
+    @traced()
+    async def _sync(self) -> None:
+        from app.services.project_service import ProjectService
+
+        service = ProjectService(get_supabase())
+        cursor = await asyncio.to_thread(lambda: self.cursor)
+        started = time.monotonic()
+        while True:
+            page = await service.changes_since(cursor, limit=self.page_size, settle_seconds=self.settle_seconds)
+            await asyncio.to_thread(self.apply, page["changes"], page["deleted"], page["next_cursor"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        self._synced_at = started
+
+    def _query(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db.cursor()
+        try:
+            result = cur.execute(sql, list(params))
+            names = [column[0] for column in result.description]
+            return [dict(zip(names, row)) for row in result.fetchall()]
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """WHERE clause over qc_inspections `i` for the report filters that are set."""
+        clauses, params = [], []
+        for key, column in (("factory", "i.factory"), ("buyer", "i.buyer"),
+                            ("supplier", "i.supplier"), ("type", "i.inspection_type")):
+            if filters.get(key):
+                clauses.append(f"{column} = ?")
+                params.append(filters[key])
+        if filters.get("date_from"):
+            clauses.append("i.inspection_date >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            clauses.append("i.inspection_date <= ?")
+            params.append(filters["date_to"])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _group(group_by: Sequence[str], dimensions: Dict[str, str]) -> Tuple[str, str]:
+        keys = list(dict.fromkeys(group_by))
+        unknown = [key for key in keys if key not in dimensions]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)}")
+        select = "".join(f"{dimensions[key]} AS {key}, " for key in keys)
+        group = " GROUP BY " + ", ".join(dimensions[key] for key in keys) if keys else ""
+        return select, group
+
+    def defect_pareto(self, limit: int = 20, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Defects by description, most frequent first, with each one's share and
+        the cumulative share of all defects found.
+        """
+        where, params = self._where(filters)
+        sql = f"""
+            WITH totals AS (
+                SELECT min(d.description) AS description,
+                       sum(d.critical)::BIGINT AS critical, sum(d.major)::BIGINT AS major,
+                       sum(d.minor)::BIGINT AS minor,
+                       sum(d.critical + d.major + d.minor)::BIGINT AS total,
+                       count(DISTINCT d.style_id) AS styles
+                FROM qc_defects d
+                JOIN qc_inspections i USING (style_id, inspection_id){where}
+                GROUP BY lower(d.description)
+            )
+            SELECT *, total / sum(total) OVER () AS share,
+                   sum(total) OVER (ORDER BY total DESC, description ROWS UNBOUNDED PRECEDING)
+                       / sum(total) OVER () AS cumulative_share
+            FROM totals
+            ORDER BY total DESC, description
+            LIMIT ?
+        """
+        return self._query(sql, [*params, limit])
+
+    def pass_rates(self, group_by: Sequence[str] = ("factory",), **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Inspections by result per group. `pass_rate` is accepted over decided
+        (accepted + rejected); `aql_pass_rate` is the share of inspections with
+        known limits whose critical/major/minor counts are all within them.
+        """
+        select, group = self._group(group_by, INSPECTION_GROUPS)
+        where, params = self._where(filters)
+        within = ("i.critical <= i.critical_allowed AND i.major <= i.major_allowed "
+                  "AND i.minor <= i.minor_allowed")
+        known = "i.critical_allowed IS NOT NULL AND i.major_allowed IS NOT NULL AND i.minor_allowed IS NOT NULL"
+        sql = f"""
+            SELECT {select}count(*) AS inspections,
+                   count(*) FILTER (i.result = 'ACCEPTED') AS accepted,
+                   count(*) FILTER (i.result = 'REJECTED') AS rejected,
+                   count(*) FILTER (i.result IS NULL OR i.result NOT IN ('ACCEPTED', 'REJECTED')) AS pending,
+                   count(*) FILTER (i.result = 'ACCEPTED')
+                       / nullif(count(*) FILTER (i.result IN ('ACCEPTED', 'REJECTED')), 0) AS pass_rate,
+                   count(*) FILTER ({known} AND {within})
+                       / nullif(count(*) FILTER ({known}), 0) AS aql_pass_rate,
+                   sum(i.critical)::BIGINT AS critical, sum(i.major)::BIGINT AS major,
+                   sum(i.minor)::BIGINT AS minor
+            FROM qc_inspections i{where}{group}
+            ORDER BY ALL
+        """
+        return self._query(sql, params)
+
+    def measurement_trends(self, group_by: Sequence[str] = ("month",), **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Measured points per group: how many were out of tolerance (over or
+        under), and the mean deviation from standard, signed (drift) and absolute.
+        """
+        select, group = self._group(group_by, MEASUREMENT_GROUPS)
+        where, params = self._where(filters)
+        sql = f"""
+            SELECT {select}count(*) AS measured,
+                   count(*) FILTER (m.actual - m.standard > m.tol_plus
+                                    OR m.actual - m.standard < -m.tol_minus) AS out_of_tolerance,
+                   count(*) FILTER (m.actual - m.standard > m.tol_plus) AS over,
+                   count(*) FILTER (m.actual - m.standard < -m.tol_minus) AS under,
+                   count(*) FILTER (m.actual - m.standard > m.tol_plus
+                                    OR m.actual - m.standard < -m.tol_minus) / count(*) AS out_of_tolerance_rate,
+                   avg(m.actual - m.standard) AS mean_deviation,
+                   avg(abs(m.actual - m.standard)) AS mean_abs_deviation
+            FROM qc_measurements m
+            JOIN qc_inspections i USING (style_id, inspection_id){where}{group}
+            ORDER BY ALL
+        """
+        return self._query(sql, params)
+
+
+@lru_cache()
+def get_qc_analytics() -> QCAnalytics:
+    """Get the process-wide QC analytics store."""
+    settings = get_settings()
+    return QCAnalytics(
+        settings.qc_analytics_path,
+        sync_seconds=settings.qc_analytics_sync_seconds,
+        settle_seconds=settings.style_changes_settle_seconds,
+    )
+
+
+async def style_saved(style: Dict[str, Any]) -> None:
+    """Apply a style written through the API to the store, if this process has one open."""
+    if get_qc_analytics.cache_info().currsize:
+        try:
+            await asyncio.to_thread(get_qc_analytics().apply, [style])
+        except Exception as e:
+            logger.warning(f"QC analytics not updated for style {style.get('id')}: {e}")
+
+
+async def style_deleted(style_id: str) -> None:
+    """Drop a deleted style from the store, if this process has one open."""
+    if get_qc_analytics.cache_info().currsize:
+        try:
+            await asyncio.to_thread(get_qc_analytics().apply, [], [style_id])
+        except Exception as e:
+            logger.warning(f"QC analytics not updated for deleted style {style_id}: {e}")
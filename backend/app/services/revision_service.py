@@ -0,0 +1,136 @@
+"""
+Revision service - Per-section version history for styles.
+
+Every write to a projects column stores a compact JSON diff against the
+previous value in style_revisions. The database records them itself, in
+the transaction of the write (migration 013), whoever the writer is; this
+service reads them back. A full snapshot is stored instead when the diff
+would be larger than the value itself, when the history does not end with
+the value being replaced, or every style_revision_snapshot_interval()
+diffs, so reconstructing a section at any timestamp replays a bounded
+number of diffs.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from supabase import Client
+
+from app.core.tracing import traced
+
+# Diff operations (lists so they round-trip through JSONB unchanged):
+#   ["r", path, value]  set the value at path (empty path = whole document)
+#   ["d", path]         delete the dict key at path
+#   ["t", path, n]      truncate the list at path to n items
+#   ["a", path, items]  append items to the list at path
+Op = List[Any]
+
+
+def json_diff(old: Any, new: Any, path: Optional[List[Any]] = None) -> List[Op]:
+    """Compute the operations that turn `old` into `new` (as public.jsonb_diff does)."""
+    path = path or []
+    if old == new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Op] = []
+        for key in old.keys() - new.keys():
+            ops.append(["d", path + [key]])
+        for key, value in new.items():
+            if key in old:
+                ops.extend(json_diff(old[key], value, path + [key]))
+            else:
+                ops.append(["r", path + [key], value])
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(json_diff(old[i], new[i], path + [i]))
+        if len(old) > len(new):
+            ops.append(["t", path, len(new)])
+        elif len(new) > len(old):
+            ops.append(["a", path, new[common:]])
+        return ops
+
+    return [["r", path, new]]
+
+
+def json_patch(doc: Any, ops: List[Op]) -> Any:
+    """Apply operations produced by `json_diff`. Mutates `doc` in place."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if kind == "r" and not path:
+            doc = op[2]
+            continue
+
+        container_path = path if kind in ("t", "a") else path[:-1]
+        target = doc
+        for key in container_path:
+            target = target[key]
+
+        if kind == "r":
+            target[path[-1]] = op[2]
+        elif kind == "d":
+            target.pop(path[-1], None)
+        elif kind == "t":
+            del target[op[2]:]
+        elif kind == "a":
+            target.extend(op[2])
+    return doc
+
+
+class RevisionService:
+    """Service for reading and replaying per-section style revisions."""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+        self.table = "style_revisions"
+
+    @traced()
+    async def history(
+        self,
+        project_id: str,
+        section: Optional[str] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """Revision metadata for a project, newest first (keyset-paged on id)."""
+        query = self.supabase.table(self.table)\
+            .select("id,section,created_at,kind,depth,actor_id,actor_email")\
+            .eq("project_id", project_id)
+        if section:
+            query = query.eq("section", section)
+        if before:
+            query = query.lt("id", before)
+
+        response = await asyncio.to_thread(query.order("id", desc=True).limit(limit + 1).execute)
+        rows = response.data or []
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    @traced()
+    async def sections_as_of(
+        self,
+        project_id: str,
+        as_of: datetime,
+        sections: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Rebuild section values at `as_of`. Sections without any history are
+        omitted (their current value has never changed since tracking began).
+        """
+        params = {"p_project_id": project_id, "p_as_of": as_of.isoformat()}
+        if sections:
+            params["p_sections"] = sections
+        response = await asyncio.to_thread(self.supabase.rpc("style_revisions_as_of", params).execute)
+
+        values: Dict[str, Any] = {}
+        for rev in response.data or []:
+            section = rev["section"]
+            if rev["kind"] == "snapshot":
+                values[section] = rev["payload"]
+            else:
+                values[section] = json_patch(values.get(section), rev["payload"])
+        return values
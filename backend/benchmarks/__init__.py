@@ -0,0 +1 @@
+# Benchmark harness (not shipped with the app)
@@ -0,0 +1,172 @@
+"""
+Cold-start benchmark for the app entry points.
+
+Each run starts a fresh interpreter with `python -X importtime`, imports the
+entry point and serves one GET /api/v1/health through ASGI. Reported per
+entry point (medians over --runs):
+
+    import_ms         cumulative import time of the entry module (-X importtime)
+    first_request_ms  time to answer the first request after import
+    process_ms        wall time of the whole interpreter run
+
+Entry points: "serverless" (api/index.py), "server" (app.main) and, with
+--baseline-ref, "baseline": api/index.py as it was at that git ref.
+
+Usage (from backend/):
+    python -m benchmarks.cold_start --runs 15 --baseline-ref <commit>
+    python -m benchmarks.cold_start --top 15   # slowest modules of the serverless entry
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import compare, print_table, save_results  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = BACKEND_DIR.parent
+
+# Imports the entry module, then sends one request straight through ASGI
+_RUNNER = """
+import asyncio, sys, time
+sys.path[:0] = {paths!r}
+import {module} as entry
+app = entry.app
+
+async def first_request():
+    scope = {{"type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/api/v1/health", "raw_path": b"/api/v1/health",
+             "query_string": b"", "root_path": "", "headers": [], "client": ("127.0.0.1", 1),
+             "server": ("127.0.0.1", 80)}}
+    status = []
+
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - start, status[0]
+
+elapsed, status = asyncio.run(first_request())
+print(f"FIRST_REQUEST {{elapsed * 1000:.3f}} {{status}}")
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for every -X importtime line."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def run_once(module: str, paths: List[str]) -> Dict[str, Any]:
+    code = _RUNNER.format(module=module, paths=paths)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=tempfile.gettempdir())
+    process_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{module} failed to start:\n{proc.stderr[-2000:]}")
+
+    rows = parse_importtime(proc.stderr)
+    import_us = next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0)
+    first_request = re.search(r"FIRST_REQUEST (\S+) (\d+)", proc.stdout)
+    return {
+        "import_ms": import_us / 1000,
+        "first_request_ms": float(first_request.group(1)),
+        "status": int(first_request.group(2)),
+        "process_ms": process_ms,
+        "modules": rows,
+    }
+
+
+def bench_entry(module: str, paths: List[str], runs: int) -> Tuple[Dict[str, Any], List[Tuple[str, int, int, int]]]:
+    samples = [run_once(module, paths) for _ in range(runs)]
+    result: Dict[str, Any] = {"runs": runs, "status": samples[0]["status"]}
+    for key in ("import_ms", "first_request_ms", "process_ms"):
+        values = [s[key] for s in samples]
+        result[key] = round(statistics.median(values), 2)
+        result[key.replace("_ms", "_min_ms")] = round(min(values), 2)
+    return result, samples[-1]["modules"]
+
+
+def baseline_entry(ref: str, workdir: Path) -> Path:
+    """Write api/index.py from `ref` into workdir as baseline_index.py."""
+    source = subprocess.check_output(["git", "show", f"{ref}:api/index.py"], cwd=REPO_DIR, text=True)
+    path = workdir / "baseline_index.py"
+    path.write_text(source)
+    return path
+
+
+def print_top(modules: List[Tuple[str, int, int, int]], top: int) -> None:
+    print(f"\nSlowest modules by self time (serverless entry):\n{'module':<52}{'self_ms':>10}{'cumul_ms':>10}")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:top]:
+        print(f"{name:<52}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per entry point")
+    parser.add_argument("--baseline-ref", help="git ref whose api/index.py is measured as 'baseline'")
+    parser.add_argument("--top", type=int, default=0, help="print the N slowest modules of the serverless entry")
+    parser.add_argument("--output", help="result file (default benchmarks/results/cold-start-<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    entries = {
+        "serverless": ("index", [str(REPO_DIR / "api")]),
+        "server": ("app.main", [str(BACKEND_DIR)]),
+    }
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline_ref:
+            baseline_entry(args.baseline_ref, Path(tmp))
+            entries = {"baseline": ("baseline_index", [tmp]), **entries}
+        serverless_modules = []
+        for name, (module, paths) in entries.items():
+            results[name], modules = bench_entry(module, paths, args.runs)
+            if name == "serverless":
+                serverless_modules = modules
+            print(f"  {name:<12} done", flush=True)
+
+    if "baseline" in results:
+        base = results["baseline"]["import_ms"]
+        for name in ("serverless", "server"):
+            results[name]["import_vs_baseline"] = round(results[name]["import_ms"] / base, 2)
+
+    print_table(results, ("import_ms", "import_min_ms", "first_request_ms", "process_ms", "status"))
+    if args.top:
+        print_top(serverless_modules, args.top)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    path = save_results("cold-start", params, results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, metrics=("import_ms", "first_request_ms"))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
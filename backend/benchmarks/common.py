@@ -0,0 +1,107 @@
+"""
+Shared helpers for benchmark scripts: latency summaries, result files and
+regression comparison against a stored baseline.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Metrics where a higher value is better; everything else is lower-is-better
+HIGHER_IS_BETTER = {"rps", "rows_per_s", "mb_per_s", "speedup"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else 0.0,
+        "rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(name: str, params: Dict[str, Any], results: Dict[str, Dict[str, Any]],
+                 output: Optional[str] = None) -> Path:
+    """Write results as JSON (default: benchmarks/results/<name>-<commit>.json)."""
+    env = environment()
+    path = Path(output) if output else RESULTS_DIR / f"{name}-{env['commit'] or 'local'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"benchmark": name, "environment": env, "params": params,
+                                "results": results}, indent=2))
+    return path
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline_path: str, tolerance: float,
+            metrics: tuple = ("p95_ms", "rps")) -> List[str]:
+    """
+    Compare results with a baseline file. Prints a table and returns a list
+    of regressions larger than `tolerance` (fraction, e.g. 0.15 = 15%).
+    """
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    regressions = []
+    print(f"\n{'scenario':<28}{'metric':<10}{'baseline':>12}{'current':>12}{'change':>10}")
+    for scenario, current in results.items():
+        base = baseline.get(scenario)
+        if not base:
+            continue
+        for metric in metrics:
+            if metric not in current or metric not in base or not base[metric]:
+                continue
+            change = (current[metric] - base[metric]) / base[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            print(f"{scenario:<28}{metric:<10}{base[metric]:>12.2f}{current[metric]:>12.2f}{change:>+10.1%}{flag}")
+            if flag:
+                regressions.append(f"{scenario} {metric} {change:+.1%}")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: tuple) -> None:
+    """One row per scenario; each column as wide as its header or widest value, plus a space."""
+    cells = {scenario: [f"{row[c]:.2f}" if isinstance(row.get(c), float) else str(row.get(c, ""))
+                        for c in columns]
+             for scenario, row in results.items()}
+    first = max([len("scenario"), *map(len, cells)]) + 1
+    widths = [max([len(c), *(len(values[i]) for values in cells.values())]) + 1 for i, c in enumerate(columns)]
+    print(f"\n{'scenario':<{first}}" + "".join(f"{c:>{w}}" for c, w in zip(columns, widths)))
+    for scenario, values in cells.items():
+        print(f"{scenario:<{first}}" + "".join(f"{v:>{w}}" for v, w in zip(values, widths)))
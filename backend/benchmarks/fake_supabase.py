@@ -0,0 +1,811 @@
+"""
+In-process stand-in for the parts of Supabase the backend talks to.
+
+Implements enough of PostgREST (select/insert/upsert/update/delete with
+eq/neq/gt/gte/lt/lte/in/is filters, aliased columns, order, limit, offset,
+single-object responses and RPC calls) and of GoTrue (token lookup, admin create/delete
+user) to run the FastAPI app end to end without network access.
+
+Tables are plain lists of dicts guarded by one lock. A fixed per-request
+latency can be injected to approximate the round trip to a hosted project,
+and faults (extra latency, error statuses, dropped connections) on some or
+all requests to exercise the backend's upstream guard.
+
+Usage:
+    fake = FakeSupabase(latency_ms=5)
+    fake.start()                  # serves on http://127.0.0.1:<fake.port>
+    fake.seed("projects", rows)
+    fake.inject(status=503, rate=0.5)    # half of the requests fail
+    fake.inject(latency_ms=2000)         # every request hangs for 2s
+    fake.clear_faults()
+    ...
+    fake.stop()
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from app.services.revision_service import json_diff
+
+# Tables whose primary key is a BIGSERIAL assigned by the database
+SERIAL_TABLES = {"activity_log", "style_revisions"}
+# Tables whose writes are stamped from the change sequence (migration 014 triggers)
+CHANGE_FEED_TABLES = {"projects"}
+# List sections of projects kept one row per item in project_<section> (migration 016)
+SECTION_COLUMNS = ("comments", "inspections", "invoices", "pp_meetings", "material_control")
+# Columns of projects without revisions; the sections are recorded as their items are synced (013, 016)
+UNTRACKED_COLUMNS = {"id", "updated_at", "created_at", "change_seq", "changed_at", *SECTION_COLUMNS}
+# style_revision_snapshot_interval() (013)
+SNAPSHOT_INTERVAL = 20
+
+RpcHandler = Callable[["FakeSupabase", Dict[str, Any]], Any]
+
+
+class RpcError(Exception):
+    """Raised by a fake function; answered as PostgREST answers a RAISE with SQLSTATE `code`."""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class Fault(NamedTuple):
+    """What an injected fault does to a request: delay it, then answer `status` or drop the connection."""
+    latency: float
+    status: Optional[int]
+    drop: bool
+    rate: float
+    path: str
+
+
+def _coerce(value: str) -> Any:
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "is":
+        return actual is expected if expected is None or isinstance(expected, bool) else actual == expected
+    if op == "in":
+        return actual in expected
+    if actual is None:
+        return False
+    if isinstance(actual, (int, float)) and isinstance(expected, str):
+        expected = _coerce(expected)
+    elif isinstance(actual, str) and not isinstance(expected, str):
+        expected = str(expected)
+    if op == "eq":
+        return actual == expected
+    if op == "neq":
+        return actual != expected
+    if op == "gt":
+        return actual > expected
+    if op == "gte":
+        return actual >= expected
+    if op == "lt":
+        return actual < expected
+    if op == "lte":
+        return actual <= expected
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class Query:
+    """A parsed PostgREST query string."""
+
+    RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self, query_string: str):
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.select = "*"
+        self.order: List[Tuple[str, bool]] = []
+        self.limit: Optional[int] = None
+        self.offset = 0
+        self.on_conflict: Optional[str] = None
+
+        for key, value in parse_qsl(query_string, keep_blank_values=True):
+            if key == "select":
+                self.select = value
+            elif key == "order":
+                for part in value.split(","):
+                    pieces = part.split(".")
+                    self.order.append((pieces[0], "desc" in pieces[1:]))
+            elif key == "limit":
+                self.limit = int(value)
+            elif key == "offset":
+                self.offset = int(value)
+            elif key == "on_conflict":
+                self.on_conflict = value
+            elif key not in self.RESERVED:
+                op, _, operand = value.partition(".")
+                if op == "in":
+                    expected = [_coerce(v.strip('"')) for v in operand.strip("()").split(",") if v]
+                    expected += [str(v) for v in expected]
+                elif op == "is":
+                    expected = _coerce(operand)
+                else:
+                    expected = operand
+                self.filters.append((key, op, expected))
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return all(_compare(op, row.get(col), expected) for col, op, expected in self.filters)
+
+    def project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self.select in ("*", ""):
+            return dict(row)
+        projected = {}
+        for col in self.select.split(","):
+            alias, _, name = col.rpartition(":")
+            projected[alias or name] = row.get(name)
+        return projected
+
+    def apply(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = [row for row in rows if self.matches(row)]
+        for col, desc in reversed(self.order):
+            result.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        end = self.offset + self.limit if self.limit is not None else None
+        return [self.project(row) for row in result[self.offset:end]]
+
+
+class FakeSupabase:
+    """Thread-safe in-memory tables served over a local PostgREST/GoTrue-like HTTP API."""
+
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.rpc: Dict[str, RpcHandler] = dict(DEFAULT_RPCS)
+        self.request_count = 0
+        self.fault: Optional[Fault] = None
+        self.lock = threading.RLock()
+        self._serial: Dict[str, int] = {}
+        self._change_seq = 0
+        # The caller of the request being served, as auth.uid()/auth.jwt() see it
+        self._request = threading.local()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._server.server_address[0]}:{self.port}"
+
+    def start(self) -> "FakeSupabase":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ── fault injection ──────────────────────────────────────────────────────
+    def inject(self, latency_ms: float = 0.0, status: Optional[int] = None, drop: bool = False,
+               rate: float = 1.0, path: str = "/") -> None:
+        """Apply a fault to `rate` of the requests whose path starts with `path` until cleared."""
+        self.fault = Fault(latency_ms / 1000.0, status, drop, rate, path)
+
+    def clear_faults(self) -> None:
+        self.fault = None
+
+    # ── data access ──────────────────────────────────────────────────────────
+    def table(self, name: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return self.tables.setdefault(name, [])
+
+    def seed(self, name: str, rows: List[Dict[str, Any]]) -> None:
+        with self.lock:
+            for row in rows:
+                self._insert_row(name, dict(row))
+
+    def add_user(self, token: str, user_id: str, email: str, role: str = "admin") -> None:
+        """Register a bearer token accepted by /auth/v1/user and its profile row."""
+        with self.lock:
+            self.users[token] = {
+                "id": user_id, "aud": "authenticated", "role": "authenticated",
+                "email": email, "user_metadata": {"role": role},
+                "app_metadata": {}, "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.seed("profiles", [{"id": user_id, "email": email, "role": role, "is_active": True}])
+
+    def _insert_row(self, name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        if name in SERIAL_TABLES and row.get("id") is None:
+            self._serial[name] = self._serial.get(name, 0) + 1
+            row["id"] = self._serial[name]
+        if name in SERIAL_TABLES:
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        if name == "projects":
+            self._divert_sections(row, None)
+        if name in CHANGE_FEED_TABLES:
+            self._stamp_change(row)
+            self.tables["style_tombstones"] = [
+                t for t in self.tables.get("style_tombstones", []) if t["project_id"] != row["id"]
+            ]
+        self.tables.setdefault(name, []).append(row)
+        if name == "projects":
+            self._refresh_requirements(row)
+        return row
+
+    def _stamp_change(self, row: Dict[str, Any]) -> None:
+        self._change_seq += 1
+        row["change_seq"] = self._change_seq
+        row["changed_at"] = datetime.now(timezone.utc).isoformat()
+
+    def _divert_sections(self, row: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        """The projects trigger: section columns are written to their item tables."""
+        for section in SECTION_COLUMNS:
+            if row.get(section) is not None:
+                self._sync_section(row["id"], section, row[section], previous, row.get("updated_at"))
+                row[section] = None
+
+    def _section_items(self, project_id: str, section: str) -> List[Any]:
+        items = [r for r in self.tables.get(f"project_{section}", []) if r["project_id"] == project_id]
+        return [r["data"] for r in sorted(items, key=lambda r: r["position"])]
+
+    def _sync_section(self, project_id: str, section: str, items: Any, row: Optional[Dict[str, Any]],
+                      updated_at: Optional[str] = None) -> None:
+        """sync_project_section, and what is recorded at commit; `row` is the projects row before the write."""
+        name = f"project_{section}"
+        previous = self._section_items(project_id, section)
+        rows = [r for r in self.tables.get(name, []) if r["project_id"] != project_id]
+        stored = {r["item_id"]: r for r in self.tables.get(name, []) if r["project_id"] == project_id}
+        now = datetime.now(timezone.utc).isoformat()
+        seen = set()
+        for position, item in enumerate(items if isinstance(items, list) else []):
+            item_id = item.get("id") if isinstance(item, dict) else None
+            # A repeated id is keyed by position, like an item without one
+            if item_id is None or str(item_id) in seen:
+                item_id = f"#{position + 1}"
+            else:
+                seen.add(str(item_id))
+            old_row = stored.get(str(item_id))
+            # An unchanged item keeps its row (and updated_at)
+            updated = old_row["updated_at"] if old_row and (old_row["position"], old_row["data"]) == (position, item) else now
+            rows.append({"project_id": project_id, "item_id": str(item_id), "position": position, "data": item,
+                         "updated_at": updated})
+        self.tables[name] = rows
+        self._record_section(project_id, section, previous, row, updated_at)
+
+    def _record_section(self, project_id: str, section: str, previous: List[Any], row: Optional[Dict[str, Any]],
+                        updated_at: Optional[str]) -> None:
+        """record_section_edit (016): the section's revision and stamp, if its items changed."""
+        column = row.get(section) if row else None
+        previous = previous or (column if column is not None else [])
+        current = self._section_items(project_id, section)
+        if current == previous:
+            return
+        self._append_revision(project_id, section, previous, current, row.get("updated_at") if row else None)
+        self._change_seq += 1
+        changes = [c for c in self.tables.get("style_section_changes", [])
+                   if (c["project_id"], c["section"]) != (project_id, section)]
+        now = datetime.now(timezone.utc).isoformat()
+        changes.append({"project_id": project_id, "section": section, "change_seq": self._change_seq,
+                        "changed_at": now, "updated_at": updated_at or now})
+        self.tables["style_section_changes"] = changes
+
+    def _write_project(self, row: Dict[str, Any], values: Dict[str, Any]) -> None:
+        """An UPDATE of a projects row and the triggers it fires (013, 014, 016, 017)."""
+        previous = dict(row)
+        row.update(values)
+        self._divert_sections(row, previous)
+        self._stamp_change(row)
+        self._refresh_requirements(row)
+        for column, value in row.items():
+            if column not in UNTRACKED_COLUMNS and previous.get(column) != value:
+                self._append_revision(row["id"], column, previous.get(column), value, previous.get("updated_at"))
+
+    def _actor(self) -> Dict[str, Any]:
+        return getattr(self._request, "actor", None) or {}
+
+    def _append_revision(self, project_id: str, section: str, old: Any, new: Any,
+                         baseline_at: Optional[str]) -> None:
+        """append_style_revision (013)."""
+        if old == new:
+            return
+        history = [r for r in self.tables.get("style_revisions", [])
+                   if r["project_id"] == project_id and r["section"] == section]
+        head = max(history, key=lambda r: r["id"]) if history else None
+        depth = None
+        if head is None and baseline_at:
+            self._insert_row("style_revisions", {
+                "project_id": project_id, "section": section, "created_at": baseline_at, "kind": "snapshot",
+                "depth": 0, "payload": old, "actor_id": None, "actor_email": None, "checksum": _checksum(old),
+            })
+            depth = 0
+        elif head is not None and head["checksum"] == _checksum(old):
+            depth = head["depth"]
+        ops = json_diff(old, new)
+        if depth is None or depth + 1 >= SNAPSHOT_INTERVAL or len(json.dumps(ops)) >= len(json.dumps(new)):
+            kind, payload, depth = "snapshot", new, 0
+        else:
+            kind, payload, depth = "diff", ops, depth + 1
+        actor = self._actor()
+        self._insert_row("style_revisions", {
+            "project_id": project_id, "section": section, "kind": kind, "depth": depth, "payload": payload,
+            "actor_id": actor.get("id"), "actor_email": actor.get("email"), "checksum": _checksum(new),
+        })
+
+    def _sections(self, project_id: str) -> Dict[str, List[Any]]:
+        sections = {}
+        for section in SECTION_COLUMNS:
+            items = [r for r in self.tables.get(f"project_{section}", []) if r["project_id"] == project_id]
+            sections[section] = [r["data"] for r in sorted(items, key=lambda r: r["position"])]
+        return sections
+
+    def _assembled(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """A projects row as the projects_full view returns it."""
+        full = dict(row)
+        for section, items in self._sections(row["id"]).items():
+            full[section] = items or row.get(section) or []
+        # The latest of the row's and its sections' stamps
+        for change in self.tables.get("style_section_changes", []):
+            if change["project_id"] == row["id"]:
+                for column in ("updated_at", "change_seq", "changed_at"):
+                    full[column] = _latest(full.get(column), change[column])
+        return full
+
+    def _refresh_requirements(self, row: Dict[str, Any]) -> None:
+        """The material requirements trigger (migration 017)."""
+        rows = [r for r in self.tables.get("material_requirements", []) if r["project_id"] != row["id"]]
+        self.tables["material_requirements"] = rows + _material_requirements(row)
+
+    # ── PostgREST operations ─────────────────────────────────────────────────
+    def select(self, name: str, query: Query) -> List[Dict[str, Any]]:
+        with self.lock:
+            if name == "projects_full":
+                return query.apply([self._assembled(row) for row in self.tables.get("projects", [])])
+            return query.apply(self.tables.get(name, []))
+
+    def _item_write(self, name: str) -> Optional[Dict[Tuple[str, str], List[Any]]]:
+        """Before a direct write to an item table: its sections as they are (016 stages them)."""
+        section = name[len("project_"):]
+        if section not in SECTION_COLUMNS:
+            return None
+        return {(row["id"], section): self._section_items(row["id"], section)
+                for row in self.tables.get("projects", [])}
+
+    def _item_written(self, staged: Optional[Dict[Tuple[str, str], List[Any]]]) -> None:
+        for (project_id, section), previous in (staged or {}).items():
+            row = next(r for r in self.tables["projects"] if r["id"] == project_id)
+            self._record_section(project_id, section, previous, row, None)
+
+    def insert(self, name: str, query: Query, payload: Any, upsert: bool) -> List[Dict[str, Any]]:
+        rows = payload if isinstance(payload, list) else [payload]
+        key = query.on_conflict or "id"
+        result = []
+        with self.lock:
+            staged = self._item_write(name)
+            table = self.tables.setdefault(name, [])
+            for row in rows:
+                existing = None
+                if upsert and row.get(key) is not None:
+                    existing = next((r for r in table if r.get(key) == row[key]), None)
+                if existing is not None:
+                    if name == "projects":
+                        self._write_project(existing, row)
+                    else:
+                        existing.update(row)
+                    result.append(dict(existing))
+                else:
+                    result.append(dict(self._insert_row(name, dict(row))))
+            self._item_written(staged)
+        return result
+
+    def update(self, name: str, query: Query, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self.lock:
+            staged = self._item_write(name)
+            matched = [row for row in self.tables.get(name, []) if query.matches(row)]
+            for row in matched:
+                if name == "projects":
+                    self._write_project(row, payload)
+                else:
+                    row.update(payload)
+            self._item_written(staged)
+            return [dict(row) for row in matched]
+
+    def delete(self, name: str, query: Query) -> List[Dict[str, Any]]:
+        with self.lock:
+            staged = self._item_write(name)
+            table = self.tables.get(name, [])
+            removed = [row for row in table if query.matches(row)]
+            self.tables[name] = [row for row in table if not query.matches(row)]
+            self._item_written(staged)
+            if name == "projects":
+                gone = {row["id"] for row in removed}
+                for table_name in [f"project_{section}" for section in SECTION_COLUMNS] + ["style_section_changes"]:
+                    items = self.tables.get(table_name, [])
+                    self.tables[table_name] = [r for r in items if r["project_id"] not in gone]
+                requirements = self.tables.get("material_requirements", [])
+                self.tables["material_requirements"] = [r for r in requirements if r["project_id"] not in gone]
+            if name in CHANGE_FEED_TABLES:
+                tombstones = self.tables.setdefault("style_tombstones", [])
+                for row in removed:
+                    self._change_seq += 1
+                    tombstones[:] = [t for t in tombstones if t["project_id"] != row["id"]]
+                    tombstones.append({"project_id": row["id"], "change_seq": self._change_seq,
+                                       "deleted_at": datetime.now(timezone.utc).isoformat()})
+            return removed
+
+    # ── HTTP plumbing ────────────────────────────────────────────────────────
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without TCP_NODELAY
+            # Nagle + delayed ACK adds ~40ms to every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> Any:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                return json.loads(raw) if raw else None
+
+            def _send(self, status: int, payload: Any = None, empty: bool = True) -> None:
+                body = b"" if payload is None and empty else json.dumps(payload, default=str).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _dispatch(self) -> None:
+                with fake.lock:
+                    fake.request_count += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                fault = fake.fault
+                if fault and self.path.startswith(fault.path) and random.random() < fault.rate:
+                    if fault.latency:
+                        time.sleep(fault.latency)
+                    if fault.drop:
+                        self.close_connection = True
+                        return
+                    if fault.status:
+                        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                        self._send(fault.status, {"message": "injected fault", "code": "FAKE"})
+                        return
+
+                url = urlsplit(self.path)
+                parts = url.path.strip("/").split("/")
+                try:
+                    if parts[:2] == ["rest", "v1"]:
+                        self._rest(parts[2:], Query(url.query))
+                    elif parts[:2] == ["auth", "v1"]:
+                        self._auth(parts[2:])
+                    else:
+                        self._send(404, {"message": "not found"})
+                except Exception as e:
+                    self._send(400, {"message": str(e), "code": "FAKE"})
+
+            def _rest(self, parts: List[str], query: Query) -> None:
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+                fake._request.actor = fake.users.get(token) or _jwt_actor(token)
+                prefer = self.headers.get("Prefer", "")
+                single = "vnd.pgrst.object" in self.headers.get("Accept", "")
+
+                if parts[0] == "rpc":
+                    handler = fake.rpc.get(parts[1])
+                    if handler is None:
+                        self._send(404, {"message": f"function {parts[1]} not found"})
+                        return
+                    try:
+                        result = handler(fake, self._body() or {})
+                    except RpcError as e:
+                        self._send(e.status, {"message": str(e), "code": e.code, "details": None, "hint": None})
+                        return
+                    # A function returning NULL still has a JSON body
+                    self._send(200, result, empty=False)
+                    return
+
+                name = parts[0]
+                if self.command in ("GET", "HEAD"):
+                    rows = fake.select(name, query)
+                elif self.command == "POST":
+                    rows = fake.insert(name, query, self._body(), "merge-duplicates" in prefer)
+                elif self.command == "PATCH":
+                    rows = fake.update(name, query, self._body() or {})
+                elif self.command == "DELETE":
+                    self._body()  # drain it, or it is read as the next keep-alive request
+                    rows = fake.delete(name, query)
+                else:
+                    self._send(405, {"message": "method not allowed"})
+                    return
+
+                if "return=minimal" in prefer:
+                    self._send(201 if self.command == "POST" else 204)
+                elif single:
+                    if len(rows) != 1:
+                        self._send(406, {"message": "JSON object requested, multiple (or no) rows returned",
+                                         "code": "PGRST116", "details": f"{len(rows)} rows", "hint": None})
+                    else:
+                        self._send(200, rows[0])
+                else:
+                    self._send(201 if self.command == "POST" else 200, rows)
+
+            def _auth(self, parts: List[str]) -> None:
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+                if parts == ["user"] and self.command == "GET":
+                    user = fake.users.get(token)
+                    if user is None:
+                        self._send(401, {"code": 401, "msg": "invalid JWT"})
+                    else:
+                        self._send(200, user)
+                elif parts[:2] == ["admin", "users"] and self.command == "POST":
+                    body = self._body() or {}
+                    with fake.lock:
+                        taken = any(u.get("email") == body.get("email") for u in fake.users.values())
+                    if taken:
+                        self._send(422, {"code": 422, "error_code": "email_exists",
+                                         "msg": "A user with this email address has already been registered"})
+                        return
+                    user_id = str(uuid.uuid4())
+                    user = {
+                        "id": user_id, "aud": "authenticated", "role": "authenticated",
+                        "email": body.get("email"), "user_metadata": body.get("user_metadata", {}),
+                        "app_metadata": {}, "created_at": datetime.now(timezone.utc).isoformat(),
+                    }
+                    with fake.lock:
+                        fake.users[f"user-{user_id}"] = user
+                    self._send(200, user)
+                elif parts[:2] == ["admin", "users"] and self.command == "DELETE" and len(parts) == 3:
+                    self._body()
+                    with fake.lock:
+                        fake.users = {t: u for t, u in fake.users.items() if u["id"] != parts[2]}
+                    self._send(200, {})
+                else:
+                    self._send(404, {"msg": "not found"})
+
+            do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        return Handler
+
+
+# ── Material requirements, as refresh_material_requirements (017) computes them ──
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and re.fullmatch(r"-?[0-9]+(\.[0-9]+)?", value.strip()):
+        return float(value)
+    return None
+
+
+def _date(value: Any) -> Optional[date]:
+    """A leading YYYY-MM-DD as a date; None when there is none or it is no real day (text_to_date)."""
+    if not isinstance(value, str) or not _DATE.match(value):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _week(day: Optional[date]) -> Optional[str]:
+    return (day - timedelta(days=day.weekday())).isoformat() if day else None
+
+
+def _instant(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _latest(a: Any, b: Any) -> Any:
+    """GREATEST() of two timestamps (ISO strings) or sequence values; a NULL is ignored."""
+    if a is None or b is None:
+        return b if a is None else a
+    if isinstance(a, str):
+        return a if _instant(a) >= _instant(b) else b
+    return max(a, b)
+
+
+def _checksum(value: Any) -> str:
+    return hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def _jwt_actor(token: str) -> Optional[Dict[str, Any]]:
+    """The sub and email of a JWT, as auth.uid() and auth.jwt() read them (PostgREST has verified it)."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except ValueError:
+        return None
+    return {"id": claims.get("sub"), "email": claims.get("email")} if isinstance(claims, dict) else None
+
+
+def _material_requirements(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if row.get("main_status") not in ("PRE-PRODUCTION", "PRODUCTION"):
+        return []
+    sheet = row.get("order_sheet") if isinstance(row.get("order_sheet"), dict) else {}
+    consumption = row.get("consumption") if isinstance(row.get("consumption"), dict) else {}
+    po_numbers = row.get("po_numbers") if isinstance(row.get("po_numbers"), list) else []
+    sheet_pos = sheet.get("poNumbers") if isinstance(sheet.get("poNumbers"), list) else []
+
+    dates: Dict[str, date] = {}
+    for po in [*sheet_pos, *po_numbers]:  # the style's own PO numbers win
+        delivery = _date(po.get("deliveryDate"))
+        if delivery:
+            dates[str(po.get("number") or "").strip()] = delivery
+
+    orders: Dict[str, float] = {}
+    for breakdown in sheet.get("breakdowns") if isinstance(sheet.get("breakdowns"), list) else []:
+        po_number = str(breakdown.get("poNumber") or "").strip()
+        for size_row in breakdown.get("sizeRows") or []:
+            sizes = size_row.get("sizes") if isinstance(size_row.get("sizes"), dict) else {}
+            pieces = _number(size_row.get("total")) or sum(_number(v) or 0 for v in sizes.values())
+            orders[po_number] = orders.get(po_number, 0) + pieces
+    if not orders:
+        for po in po_numbers:
+            po_number = str(po.get("number") or "").strip()
+            orders[po_number] = orders.get(po_number, 0) + (_number(po.get("quantity")) or 0)
+
+    fallback = _date(sheet.get("shipmentDate")) or _date(row.get("shipment_date"))
+    deliveries = [(po_number, pieces, _week(dates.get(po_number) or fallback))
+                  for po_number, pieces in orders.items() if pieces > 0]
+
+    items = [("yarn", y.get("yarnType"), y.get("supplier"), "kg", (_number(y.get("weightPerPiece")) or 0) / 1000,
+              _number(y.get("wastagePercent")) or 0, _number(y.get("ratePerKg")) or 0)
+             for y in consumption.get("yarnItems") or []]
+    items += [("accessory", a.get("accessoryName"), a.get("supplier"), (a.get("unit") or "").strip() or "Pcs",
+               _number(a.get("quantityPerGarment")) or 0, _number(a.get("wastagePercent")) or 0,
+               _number(a.get("ratePerUnit")) or 0)
+              for a in consumption.get("accessoryItems") or []]
+
+    rows = []
+    for kind, item, supplier, unit, per_piece, wastage, rate in items:
+        if not (item or "").strip() or per_piece <= 0:
+            continue
+        for po_number, pieces, week in deliveries:
+            required = pieces * per_piece * (1 + wastage / 100)
+            rows.append({
+                "project_id": row["id"], "kind": kind, "item": item.strip(), "supplier": (supplier or "").strip(),
+                "unit": unit, "po_number": po_number, "delivery_week": week, "pieces": pieces,
+                "net_quantity": pieces * per_piece, "required_quantity": required, "cost": required * rate,
+            })
+    return rows
+
+
+# ── RPC functions mirroring those defined in supabase/migrations ─────────────
+
+def _style_revisions_as_of(fake: FakeSupabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    as_of = params["p_as_of"]
+    wanted = params.get("p_sections")
+    by_section: Dict[str, List[Dict[str, Any]]] = {}
+    with fake.lock:
+        for rev in fake.tables.get("style_revisions", []):
+            if rev["project_id"] == params["p_project_id"] and (not wanted or rev["section"] in wanted):
+                by_section.setdefault(rev["section"], []).append(dict(rev))
+
+    result = []
+    for section, revs in sorted(by_section.items()):
+        revs.sort(key=lambda r: r["id"])
+        snapshots = [r for r in revs if r["kind"] == "snapshot"]
+        eligible = [r for r in snapshots if r["created_at"] <= as_of]
+        base = (eligible[-1] if eligible else snapshots[0]) if snapshots else None
+        if base is None:
+            continue
+        result.append(base)
+        result.extend(r for r in revs if r["id"] > base["id"] and r["created_at"] <= as_of)
+    return result
+
+
+def _style_changes_since(fake: FakeSupabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    since, limit = int(params["p_since"]), int(params.get("p_limit", 500))
+    settle = float(str(params.get("p_settle", "2 seconds")).split()[0])
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=settle)).isoformat()
+    with fake.lock:
+        styles = [fake._assembled(row) for row in fake.tables.get("projects", [])]
+        changes = [
+            {"change_seq": full["change_seq"], "project_id": full["id"], "deleted": False,
+             "project": {k: v for k, v in full.items() if k not in ("change_seq", "changed_at")}}
+            for full in styles
+            if full["change_seq"] > since and full["changed_at"] < cutoff
+        ]
+        changes += [
+            {"change_seq": t["change_seq"], "project_id": t["project_id"], "deleted": True, "project": None}
+            for t in fake.tables.get("style_tombstones", [])
+            if t["change_seq"] > since and t["deleted_at"] < cutoff
+        ]
+    changes.sort(key=lambda c: c["change_seq"])
+    return changes[:limit]
+
+
+def _material_requirements_rollup(fake: FakeSupabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    by_week = params.get("p_by_week", True)
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    with fake.lock:
+        for r in fake.tables.get("material_requirements", []):
+            if any(params.get(f"p_{column}") not in (None, r[column]) for column in ("kind", "supplier")):
+                continue
+            week = r["delivery_week"]
+            if (params.get("p_from") and (week is None or week < params["p_from"])) \
+                    or (params.get("p_to") and (week is None or week > params["p_to"])):
+                continue
+            key = (r["kind"], r["item"], r["supplier"], r["unit"], week if by_week else None)
+            total = groups.setdefault(key, {
+                "kind": key[0], "item": key[1], "supplier": key[2], "unit": key[3], "delivery_week": key[4],
+                "styles": set(), "pieces": 0, "net_quantity": 0, "required_quantity": 0, "cost": 0,
+            })
+            total["styles"].add(r["project_id"])
+            for column in ("pieces", "net_quantity", "required_quantity", "cost"):
+                total[column] += r[column]
+    rows = []
+    for key in sorted(groups, key=lambda k: tuple((v is None, v or "") for v in k)):
+        total = groups[key]
+        rows.append({**total, "styles": len(total["styles"]), "net_quantity": round(total["net_quantity"], 3),
+                     "required_quantity": round(total["required_quantity"], 3), "cost": round(total["cost"], 2)})
+    return rows
+
+
+def _save_project_sections(fake: FakeSupabase, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    project_id, sections = params["p_project_id"], params.get("p_sections") or {}
+    unknown = set(sections) - set(SECTION_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown project section: {sorted(unknown)[0]}")
+    with fake.lock:
+        row = next((row for row in fake.tables.get("projects", []) if row["id"] == project_id), None)
+        if row is None:
+            return None
+        # Item rows only: the projects row is not written
+        for section, items in sections.items():
+            fake._sync_section(project_id, section, items, row)
+        return fake._sections(project_id)
+
+
+def _save_style(fake: FakeSupabase, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    project_id, values = params["p_project_id"], params.get("p_values") or {}
+    fields = {k: v for k, v in values.items() if k not in SECTION_COLUMNS}
+    with fake.lock:
+        row = next((row for row in fake.tables.get("projects", []) if row["id"] == project_id), None)
+        if row is None:
+            return None
+        # A save of sections alone (and its updated_at) leaves the projects row alone
+        if set(fields) - {"updated_at"} or (fields and fields == values):
+            fake._write_project(row, fields)
+        for section in SECTION_COLUMNS:
+            if section in values:
+                fake._sync_section(project_id, section, values[section], row, values.get("updated_at"))
+        return fake._assembled(row)
+
+
+DEFAULT_RPCS: Dict[str, RpcHandler] = {
+    "style_revisions_as_of": _style_revisions_as_of,
+    "style_changes_since": _style_changes_since,
+    "save_project_sections": _save_project_sections,
+    "save_style": _save_style,
+    "material_requirements_rollup": _material_requirements_rollup,
+}
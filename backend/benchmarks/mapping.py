@@ -0,0 +1,135 @@
+"""
+Row mapping benchmark.
+
+Maps large listings (default 10,000 rows) between database and API keys:
+
+    legacy/from_db      the previous hand-written 20-key map_from_db, per row
+    mapper/from_db      ColumnMapper.from_db (all Project columns), per row
+    mapper/from_db_many ColumnMapper.from_db_many bulk fast path (in place)
+    legacy/to_db        the previous map_to_db (mapping dict rebuilt per call)
+    mapper/to_db        ColumnMapper.to_db
+
+Rows carry every projects column with small values, so the numbers show
+key-mapping cost only (values are never copied).
+
+Usage (from backend/):
+    python -m benchmarks.mapping --rows 10000
+    python -m benchmarks.mapping --compare benchmarks/results/mapping-abc123.json
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.project_service import PROJECT_COLUMNS  # noqa: E402
+from benchmarks.common import compare, print_table, save_results  # noqa: E402
+from benchmarks.seed import make_style  # noqa: E402
+
+
+def legacy_map_to_db(data: Dict[str, Any]) -> Dict[str, Any]:
+    mapping = {
+        "poNumbers": "po_numbers", "updatedAt": "updated_at", "techPackFiles": "tech_pack_files",
+        "ppMeetings": "pp_meetings", "materialControl": "material_control", "orderSheet": "order_sheet",
+        "materialRemarks": "material_remarks", "materialAttachments": "material_attachments",
+        "materialComments": "material_comments", "productImage": "product_image",
+        "productColors": "product_colors",
+    }
+    result = {}
+    for key, value in data.items():
+        db_key = mapping.get(key, key)
+        if value is not None:
+            result[db_key] = value
+    return result
+
+
+def legacy_map_from_db(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row.get("id"), "title": row.get("title"), "productImage": row.get("product_image"),
+        "productColors": row.get("product_colors", []), "poNumbers": row.get("po_numbers", []),
+        "updatedAt": row.get("updated_at"), "status": row.get("status"),
+        "techPackFiles": row.get("tech_pack_files", []), "pages": row.get("pages", []),
+        "comments": row.get("comments", []), "inspections": row.get("inspections", []),
+        "ppMeetings": row.get("pp_meetings", []), "materialControl": row.get("material_control", []),
+        "invoices": row.get("invoices", []), "packing": row.get("packing"),
+        "orderSheet": row.get("order_sheet"), "consumption": row.get("consumption"),
+        "materialRemarks": row.get("material_remarks", ""),
+        "materialAttachments": row.get("material_attachments", []),
+        "materialComments": row.get("material_comments", []),
+    }
+
+
+def make_rows(count: int, seed: int) -> List[Dict[str, Any]]:
+    """`count` rows with every column; nested values are shared with one template style."""
+    template = make_style(random.Random(seed), 0, "small")
+    base = {column: template.get(column) for column in PROJECT_COLUMNS.db_columns}
+    return [dict(base, id=f"proj-{i:06d}", title=f"Style {i}") for i in range(count)]
+
+
+def _seconds(fn: Callable[[Any], Any], setup: Callable[[], Any], repeat: int) -> float:
+    """Best time of `fn(setup())` over `repeat` runs; setup is not timed."""
+    best = float("inf")
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7, help="timed repetitions (best is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default benchmarks/results/mapping-<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    payloads = [PROJECT_COLUMNS.from_db(row) for row in rows]
+    # from_db_many consumes its input, so every run gets fresh row dicts (as after parsing)
+    fresh_rows = lambda: [dict(row) for row in rows]  # noqa: E731
+    cases = {
+        "legacy/from_db": (lambda data: [legacy_map_from_db(row) for row in data], lambda: rows),
+        "mapper/from_db": (lambda data: [PROJECT_COLUMNS.from_db(row) for row in data], lambda: rows),
+        "mapper/from_db_many": (PROJECT_COLUMNS.from_db_many, fresh_rows),
+        "legacy/to_db": (lambda data: [legacy_map_to_db(payload) for payload in data], lambda: payloads),
+        "mapper/to_db": (lambda data: [PROJECT_COLUMNS.to_db(payload) for payload in data], lambda: payloads),
+    }
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, (fn, setup) in cases.items():
+        seconds = _seconds(fn, setup, args.repeat)
+        results[name] = {
+            "rows": args.rows,
+            "keys_out": len(fn(setup())[0]),
+            "total_ms": round(seconds * 1000, 3),
+            "us_per_row": round(seconds * 1e6 / args.rows, 3),
+            "rows_per_s": round(args.rows / seconds),
+        }
+    for direction in ("from_db", "to_db"):
+        legacy = results[f"legacy/{direction}"]["us_per_row"]
+        for name, row in results.items():
+            if direction in name:
+                row["speedup"] = round(legacy / row["us_per_row"], 2)
+
+    print_table(results, ("rows", "keys_out", "total_ms", "us_per_row", "rows_per_s", "speedup"))
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    path = save_results("mapping", params, results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, metrics=("us_per_row",))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+End-to-end API benchmark.
+
+Starts the FastAPI app under uvicorn against an in-process fake Supabase
+(see fake_supabase.py), seeds realistic styles and measures latency
+percentiles and throughput of list/get/create/update under concurrency.
+
+Usage (from backend/):
+    python -m benchmarks.run_api --styles 200 --profile medium --concurrency 16
+    python -m benchmarks.run_api --compare benchmarks/results/api-abc123.json
+
+Results are written to benchmarks/results/api-<commit>.json. With
+--compare, the run exits non-zero if p95 latency or throughput of any
+scenario regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import copy
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks.common import compare, print_table, save_results, summarize  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.seed import make_styles  # noqa: E402
+
+BENCH_TOKEN = "bench-admin-token"
+SCENARIOS = ("list", "get", "create", "update")
+
+# camelCase keys the frontend sends for the snake_case columns in seed rows
+_CAMEL = {"po_numbers": "poNumbers", "tech_pack_files": "techPackFiles", "pp_meetings": "ppMeetings",
+          "material_control": "materialControl", "order_sheet": "orderSheet",
+          "material_remarks": "materialRemarks", "material_attachments": "materialAttachments",
+          "material_comments": "materialComments", "product_image": "productImage",
+          "product_colors": "productColors"}
+
+
+def to_client_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {_CAMEL.get(k, k): v for k, v in row.items()
+            if k not in ("id", "created_at", "updated_at", "main_status", "brand", "team",
+                         "factory_name", "gauge", "shipment_date")}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port: int):
+    """Run the app under uvicorn in a background thread; returns the server."""
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 15
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Tuple[str, str, Any]],
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Issue `total` requests from `concurrency` workers and summarize them."""
+    latencies: List[float] = []
+    errors = 0
+    response_bytes = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors, response_bytes
+        for i in counter:
+            method, url, body = make_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                elapsed = time.perf_counter() - start
+                if response.status_code >= 400:
+                    errors += 1
+                else:
+                    latencies.append(elapsed)
+                    response_bytes += len(response.content)
+            except httpx.HTTPError:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, time.perf_counter() - wall_start, errors)
+    summary["avg_response_kb"] = round(response_bytes / max(1, len(latencies)) / 1024, 1)
+    return summary
+
+
+async def run_all(base_url: str, style_ids: List[str], templates: List[Dict[str, Any]],
+                  args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    headers = {"Authorization": f"Bearer {BENCH_TOKEN}"}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    def list_request(i):
+        return "GET", "/api/v1/styles", None
+
+    def get_request(i):
+        return "GET", f"/api/v1/styles/{rng.choice(style_ids)}", None
+
+    def create_request(i):
+        payload = to_client_payload(templates[i % len(templates)])
+        payload["title"] = f"Bench create {i}"
+        return "POST", "/api/v1/styles", payload
+
+    def update_request(i):
+        template = templates[i % len(templates)]
+        order_sheet = copy.deepcopy(template["order_sheet"])
+        order_sheet["remarks"] = order_sheet["remarks"] + [f"update {i}"]
+        return "PATCH", f"/api/v1/styles/{rng.choice(style_ids)}", {"orderSheet": order_sheet}
+
+    scenarios = {
+        "list": (list_request, args.list_requests),
+        "get": (get_request, args.requests),
+        "create": (create_request, args.requests),
+        "update": (update_request, args.requests),
+    }
+
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as client:
+        for name in args.scenarios:
+            make_request, total = scenarios[name]
+            if args.warmup:
+                await run_scenario(client, make_request, args.warmup, min(args.warmup, args.concurrency))
+            results[name] = await run_scenario(client, make_request, total, args.concurrency)
+            print(f"  {name:<8} done", flush=True)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--styles", type=int, default=200, help="number of seeded styles")
+    parser.add_argument("--profile", choices=("small", "medium", "large"), default="medium")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="requests per get/create/update scenario")
+    parser.add_argument("--list-requests", type=int, default=40, help="requests for the list scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--upstream-latency-ms", type=float, default=2.0,
+                        help="latency injected into every fake Supabase request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default benchmarks/results/api-<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency_ms=args.upstream_latency_ms).start()
+    styles = make_styles(args.styles, args.profile, args.seed)
+    fake.seed("projects", styles)
+    fake.add_user(BENCH_TOKEN, "00000000-0000-0000-0000-00000000be0c", "bench@example.com", role="admin")
+
+    os.environ.update({
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_ANON_KEY": "bench-anon-key",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role-key",
+        # Every benchmark client shares one IP; measure the API, not the limiter
+        "RATE_LIMIT_ENABLED": "false",
+    })
+    port = _free_port()
+    print(f"Seeded {len(styles)} '{args.profile}' styles; fake Supabase at {fake.url}; app on :{port}")
+    server = start_app(port)
+
+    try:
+        results = asyncio.run(run_all(f"http://127.0.0.1:{port}", [s["id"] for s in styles], styles[:20], args))
+    finally:
+        server.should_exit = True
+        fake.stop()
+
+    print_table(results, ("p50_ms", "p95_ms", "p99_ms", "rps", "errors", "avg_response_kb"))
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    path = save_results("api", params, results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
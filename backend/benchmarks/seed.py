@@ -0,0 +1,246 @@
+"""
+Realistic style (projects row) generator for benchmarks.
+
+Documents follow the shapes in types.ts: tech-pack pages with measurement
+tables, QC inspections with defect lists and measurement tables, commercial
+invoices, packing lists, order sheets and consumption. Sizes are controlled
+by a profile so runs are comparable; generation is seeded and deterministic.
+"""
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+# Counts per style for each profile
+PROFILES: Dict[str, Dict[str, int]] = {
+    "small":  {"pages": 2,  "measurements": 15, "inspections": 1, "qc_rows": 15, "invoices": 1, "line_items": 4,  "box_rows": 10,  "comments": 5},
+    "medium": {"pages": 8,  "measurements": 25, "inspections": 3, "qc_rows": 25, "invoices": 2, "line_items": 10, "box_rows": 40,  "comments": 20},
+    "large":  {"pages": 30, "measurements": 40, "inspections": 8, "qc_rows": 40, "invoices": 4, "line_items": 25, "box_rows": 120, "comments": 60},
+}
+
+SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+COLORS = ["Black", "Navy", "Ecru", "Grey Melange", "Bordeaux", "Olive"]
+YARNS = ["Cotton", "Viscose", "Nylon", "Merino Wool", "Acrylic", "Cashmere"]
+GAUGES = ["3GG", "5GG", "7GG", "12GG", "14GG"]
+STATUSES = ["DEVELOPMENT", "PRE-PRODUCTION", "PRODUCTION", "FINALIZED"]
+POINTS = ["Chest width", "Body length", "Sleeve length", "Shoulder width", "Hem width",
+          "Neck width", "Cuff width", "Armhole", "Front neck drop", "Back neck drop"]
+
+
+def _words(rng: random.Random, n: int) -> str:
+    vocab = ["knit", "rib", "yarn", "panel", "seam", "collar", "trim", "hem", "label", "wash",
+             "shade", "tension", "linking", "sample", "approval", "fit", "cuff", "body", "neck"]
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+
+def _attachments(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    return [{
+        "id": f"att-{rng.getrandbits(32):08x}",
+        "fileName": f"{_words(rng, 2).replace(' ', '_')}.pdf",
+        "fileUrl": f"https://storage.example.com/files/{rng.getrandbits(64):016x}.pdf",
+        "uploadDate": "2026-03-01T10:00:00Z",
+    } for _ in range(n)]
+
+
+def _comments(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    return [{
+        "id": f"c-{i}", "author": "Merchandiser", "role": "merchandiser",
+        "text": _words(rng, 12), "timestamp": f"2026-03-{1 + i % 28:02d}T09:00:00Z",
+    } for i in range(n)]
+
+
+def _workflow(rng: random.Random) -> Dict[str, Any]:
+    return {"status": rng.choice(["DRAFT", "SUBMITTED", "APPROVED"]), "history": [
+        {"id": f"wf-{i}", "action": "SUBMIT", "userId": "u-1", "userName": "QC Lead",
+         "userRole": "qc", "timestamp": "2026-03-02T12:00:00Z"} for i in range(rng.randint(0, 3))
+    ]}
+
+
+def _page(rng: random.Random, i: int, n_measurements: int) -> Dict[str, Any]:
+    return {
+        "id": f"page-{i}", "pageType": "measurement", "tabName": f"Spec {i + 1}",
+        "sectionTitle": "MEASUREMENT CHART", "leftPanelContent": _words(rng, 40),
+        "measurementVersions": ["Proto", "SMS"],
+        "header": {"season": "AW", "year": "2026", "styleName": _words(rng, 2), "date": "2026-02-01",
+                   "designerName": "Designer", "designerEmail": "designer@example.com",
+                   "department": "Knitwear", "garmentDetails": _words(rng, 8)},
+        "specs": {"supplier": "FCBL", "referenceNumber": f"REF-{i}", "departmentType": "Women",
+                  "garmentType": "Sweater", "sampleDate": "2026-02-10", "seasonCode": "AW26", "size": "M"},
+        "measurements": [{
+            "id": f"m-{i}-{j}", "code": chr(65 + j % 26) + str(j // 26),
+            "labelEs": POINTS[j % len(POINTS)], "labelEn": POINTS[j % len(POINTS)],
+            "values": [f"{40 + j + k * 2} {rng.choice(['', '1/2', '1/4'])}".strip() for k in range(len(SIZES))],
+            "tolerance": rng.choice(["1", "1/2", "0.5", "1 1/2"]),
+        } for j in range(n_measurements)],
+        "images": [{"url": f"https://storage.example.com/img/{rng.getrandbits(48):012x}.jpg", "label": "Front"}],
+    }
+
+
+def _qc_table(rng: random.Random, n_rows: int) -> Dict[str, Any]:
+    groups = [{"id": f"g-{s}", "size": s, "colorCols": [{"id": f"cc-{s}-{c}", "color": c} for c in COLORS[:2]]}
+              for s in SIZES[:4]]
+    rows = []
+    for r in range(n_rows):
+        base = 40 + r
+        rows.append({
+            "id": f"qr-{r}", "point": chr(65 + r % 26), "name": POINTS[r % len(POINTS)],
+            "tolerancePlus": rng.choice(["1", "1/2", "0.5"]), "toleranceMinus": rng.choice(["1", "1/2", "0.5"]),
+            "groups": {g["id"]: {
+                "id": g["id"], "size": g["size"], "actualValue": str(base + gi),
+                "subColumns": [{"id": cc["id"], "color": cc["color"],
+                                "standardValue": f"{base + gi + rng.choice([-1, -0.5, 0, 0.5, 1])}"}
+                               for cc in g["colorCols"]],
+            } for gi, g in enumerate(groups)},
+            "remarks": "",
+        })
+    return {"groups": groups, "rows": rows}
+
+
+def _inspection(rng: random.Random, project_id: str, i: int, profile: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "id": f"insp-{project_id}-{i}", "projectId": project_id,
+        "type": rng.choice(["Inline", "Final", "Pre-final"]), "status": "SUBMITTED",
+        "data": {
+            "supplierName": "FCBL", "supplierAddress": _words(rng, 6), "inspectionType": "Final",
+            "inspectorName": "Inspector", "inspectionDate": "2026-04-10", "buyerName": rng.choice(["Mango", "Zara", "H&M"]),
+            "styleName": _words(rng, 2), "styleNumber": f"ST-{i}", "orderNumber": f"PO-{i}",
+            "totalOrderQuantity": rng.randint(500, 20000), "refNumber": f"R-{i}", "colorName": rng.choice(COLORS),
+            "composition": "100% Cotton", "gauges": rng.choice(GAUGES), "weight": "450g", "time": "10:00",
+            "factoryName": "FCBL Unit 1", "factoryContact": "+880", "countryOfProduction": "Bangladesh",
+            "shipmentGroups": [{"id": f"sg-{c}", "color": c, "rows": [
+                {"id": f"sr-{c}-{s}", "size": s, "orderQty": 200, "shipQty": 198, "cartonCount": 10} for s in SIZES
+            ]} for c in COLORS[:3]],
+            "measurementQty": 32, "controlledQty": 125,
+            "attachments": [{"id": f"ai-{k}", "label": _words(rng, 2), "available": True,
+                             "attachments": _attachments(rng, 1)} for k in range(4)],
+            "qcDefects": [{"id": f"d-{k}", "description": _words(rng, 3), "critical": rng.randint(0, 1),
+                           "major": rng.randint(0, 4), "minor": rng.randint(0, 8)} for k in range(12)],
+            "qcSummary": {"majorFound": 3, "maxAllowed": 10, "criticalMaxAllowed": 0, "minorMaxAllowed": 14},
+            "overallResult": rng.choice(["ACCEPTED", "REJECTED", "PENDING"]),
+            "judgementComments": _words(rng, 20), "additionalComments": _words(rng, 20),
+            "qcMeasurementTable": _qc_table(rng, profile["qc_rows"]),
+            "globalMasterTolerance": "1", "maxToleranceColorVariation": 1, "measurementComments": _words(rng, 10),
+            "images": [{"url": f"https://storage.example.com/qc/{rng.getrandbits(48):012x}.jpg", "label": "Defect"}
+                       for _ in range(3)],
+            "visibleSections": ["info", "defects", "measurements"],
+            "sectionComments": {"defects": [{"id": "sc-1", "text": _words(rng, 10), "attachments": []}]},
+        },
+        "workflow": _workflow(rng),
+    }
+
+
+def _invoice(rng: random.Random, i: int, n_items: int) -> Dict[str, Any]:
+    items = []
+    for k in range(n_items):
+        qty = rng.randint(100, 3000)
+        price = round(rng.uniform(6, 25), 2)
+        items.append({"id": f"li-{k}", "marksAndNumber": f"CTN {k}", "description": _words(rng, 6),
+                      "composition": "100% Cotton", "orderNo": f"PO-{k}", "styleNo": f"ST-{k}",
+                      "hsCode": "6110.20", "quantity": qty, "cartons": qty // 24, "unitPrice": price,
+                      "totalAmount": round(qty * price, 2)})
+    fields = {key: _words(rng, 3) for key in (
+        "shipperName", "shipperAddress", "buyerName", "buyerAddress", "buyerVatId", "consigneeName",
+        "consigneeAddress", "notifyParty1Name", "notifyParty1Address", "notifyParty1Phone",
+        "notifyParty1Contact", "notifyParty1Email", "notifyParty2Name", "notifyParty2Address",
+        "bankName", "bankBranch", "bankSwift", "bankAccountNo", "exportRegNo", "portOfLoading",
+        "finalDestination", "paymentTerms", "modeOfShipment", "blNo", "countryOfOrigin", "rexDeclaration")}
+    return {"id": f"inv-{i}", "invoiceNo": f"FCBL/{i:04d}", "invoiceDate": "2026-05-01", "expNo": f"EXP-{i}",
+            "expDate": "2026-05-01", "scNo": f"SC-{i}", "scDate": "2026-04-01", "paymentType": "S/C",
+            "exportRegDate": "2026-01-01", "blDate": "2026-05-03", **fields, "lineItems": items,
+            "netWeight": 900.5, "grossWeight": 1010.0, "totalCbm": 12.4, "attachments": _attachments(rng, 2),
+            "status": "DRAFT", "comments": _comments(rng, 3), "workflow": _workflow(rng)}
+
+
+def _packing(rng: random.Random, n_rows: int) -> Dict[str, Any]:
+    return {
+        "division": "Women", "section": "Knit", "invoiceRef": "FCBL/0001", "deliveryNoteNo": "DN-1",
+        "orderNumber": "PO-1", "shipmentType": "SEA", "alarmedGoods": False, "supplierCode": "S-1",
+        "supplierName": "FCBL", "vatCode": "VAT", "address": _words(rng, 6), "phone": "+880", "fax": "",
+        "email": "ship@example.com", "destination": "Barcelona", "deliveryAddress": _words(rng, 6),
+        "shipmentDate": "2026-06-01", "arrivalDate": "2026-07-01", "arrivalTime": "10:00",
+        "boxDetails": [{"id": f"bd-{k}", "seqRange": f"{k * 10 + 1}-{k * 10 + 10}", "totalBoxes": 10,
+                        "unitsPerBox": 24, "model": "M1", "quality": "Q1", "colorRef": rng.choice(COLORS),
+                        "colorCode": f"{k % 90:02d}", "size": SIZES[k % len(SIZES)], "ratio": 1,
+                        "totalPcsInOneBag": 1, "totalBagInCtn": 24, "totalBag": 240, "units": 240,
+                        "observation": ""} for k in range(n_rows)],
+        "summaryRows": [{"id": f"sum-{c}", "model": "M1", "quality": "Q1", "colorRef": c,
+                         "sizes": {s: rng.randint(50, 500) for s in SIZES}, "total": 1500} for c in COLORS[:3]],
+        "colorReferences": [{"colorCode": f"{k:02d}", "colorName": c} for k, c in enumerate(COLORS)],
+        "grossWeight": 1010.0, "grossWeightUnit": "KG", "netWeight": 900.5, "netWeightUnit": "KG",
+        "volume": 12.4, "volumeUnit": "CBM", "cartonType": "5-ply", "boxLengthCm": 60, "boxWidthCm": 40,
+        "boxHeightCm": 30, "remarks": "", "attachments": _attachments(rng, 2), "workflow": _workflow(rng),
+    }
+
+
+def _order_sheet(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": "os-1", "companyName": "Buyer Co", "poNumber": "PO-1", "factoryName": "FCBL",
+        "shipmentDate": "2026-06-01", "incoterms": "FOB", "currency": "USD", "shipmentMethod": "SEA",
+        "styleName": _words(rng, 2), "styleCode": "SC-1", "gauge": rng.choice(GAUGES), "unitPrice": 12.5,
+        "breakdowns": [{"id": f"bk-{p}", "poNumber": f"PO-{p}", "sizeColumns": SIZES,
+                        "sizeRows": [{"id": f"row-{p}-{c}", "colorCode": c,
+                                      "sizes": {s: rng.randint(20, 400) for s in SIZES}, "total": 0}
+                                     for c in COLORS[:4]]} for p in range(2)],
+        "accessories": {"mainLabel": "Woven", "careLabel": "Printed", "hangTag": "Paper",
+                        "polybag": "LDPE", "carton": "5-ply"},
+        "remarks": [_words(rng, 10) for _ in range(3)], "workflow": _workflow(rng),
+    }
+
+
+def _consumption(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": "cons-1",
+        "yarnItems": [{"id": f"y-{k}", "yarnType": YARNS[k % len(YARNS)], "compositionPercent": 50,
+                       "weightPerPiece": rng.randint(150, 450), "wastagePercent": rng.choice([3, 5, 8]),
+                       "ratePerKg": round(rng.uniform(4, 30), 2), "remarks": ""} for k in range(2)],
+        "accessoryItems": [{"id": f"a-{k}", "accessoryName": name, "description": _words(rng, 4),
+                            "specification": "std", "quantityPerGarment": 1, "unit": "Pcs",
+                            "wastagePercent": 3, "ratePerUnit": 0.05, "supplier": "Trims Ltd", "remarks": ""}
+                           for k, name in enumerate(["Main label", "Care label", "Hang tag", "Polybag"])],
+        "gauge": rng.choice(GAUGES), "knittingTime": "45 mins", "machineName": "Shima Seiki",
+        "workflow": _workflow(rng),
+    }
+
+
+def make_style(rng: random.Random, index: int, profile: str = "medium") -> Dict[str, Any]:
+    """Build one projects row (snake_case columns) of the given size profile."""
+    counts = PROFILES[profile]
+    project_id = f"proj-bench-{index:06d}"
+    updated = date(2026, 1, 1) + timedelta(days=index % 300, seconds=index)
+    return {
+        "id": project_id,
+        "title": f"Style {index} {_words(rng, 2)}",
+        "status": rng.choice(["DRAFT", "SUBMITTED", "APPROVED"]),
+        "main_status": rng.choice(STATUSES),
+        "brand": rng.choice(["Mango", "Zara", "H&M", "COS"]),
+        "team": rng.choice(["Team A", "Team B"]),
+        "factory_name": "FCBL Unit 1",
+        "gauge": rng.choice(GAUGES),
+        "knitting_time": f"{30 + index % 4 * 15} mins",
+        "shipment_date": (updated + timedelta(days=90)).isoformat(),
+        "product_image": f"https://storage.example.com/products/{index}.jpg",
+        "product_colors": [{"id": f"pc-{k}", "hex": "#%06x" % rng.getrandbits(24), "name": c}
+                           for k, c in enumerate(COLORS[:3])],
+        "po_numbers": [{"id": f"po-{k}", "number": f"PO-{index}-{k}", "quantity": rng.randint(500, 5000),
+                        "deliveryDate": "2026-06-01"} for k in range(2)],
+        "created_at": f"{updated.isoformat()}T08:00:00+00:00",
+        "updated_at": f"{updated.isoformat()}T{index % 24:02d}:00:00",
+        "tech_pack_files": _attachments(rng, 2),
+        "pages": [_page(rng, i, counts["measurements"]) for i in range(counts["pages"])],
+        "comments": _comments(rng, counts["comments"]),
+        "inspections": [_inspection(rng, project_id, i, counts) for i in range(counts["inspections"])],
+        "pp_meetings": [],
+        "material_control": [],
+        "invoices": [_invoice(rng, i, counts["line_items"]) for i in range(counts["invoices"])],
+        "packing": _packing(rng, counts["box_rows"]),
+        "order_sheet": _order_sheet(rng),
+        "consumption": _consumption(rng),
+        "material_remarks": "",
+        "material_attachments": [],
+        "material_comments": [],
+    }
+
+
+def make_styles(count: int, profile: str = "medium", seed: int = 42) -> List[Dict[str, Any]]:
+    """Deterministically generate `count` styles."""
+    rng = random.Random(seed)
+    return [make_style(rng, i, profile) for i in range(count)]
@@ -0,0 +1,131 @@
+"""
+Serialization benchmark.
+
+Measures the CPU the API spends turning PostgREST rows into a response
+body, per MB of style payload, for three paths:
+
+    stdlib       parse + map_from_db + jsonable_encoder + stdlib json
+                 (FastAPI's default handling of a returned dict)
+    orjson       parse + map_from_db + orjson (ORJSONResponse, used by
+                 mutations and point-in-time reads)
+    passthrough  PostgREST body spliced into the envelope unparsed
+                 (list and get)
+
+Usage (from backend/):
+    python -m benchmarks.serialization --profile large --styles 50
+    python -m benchmarks.serialization --compare benchmarks/results/serialization-abc123.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.core.responses import ORJSONResponse, envelope  # noqa: E402
+from app.services.project_service import PROJECT_COLUMNS  # noqa: E402
+from benchmarks.common import compare, print_table, save_results  # noqa: E402
+from benchmarks.seed import PROFILES, make_styles  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def _stdlib_render(content: Any) -> bytes:
+    # Same settings as starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _cpu_seconds(fn: Callable[[], Any], min_time: float) -> float:
+    """CPU seconds per call, repeating until at least `min_time` of CPU was used."""
+    fn()
+    calls, start = 0, time.process_time()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def bench_profile(profile: str, count: int, seed: int, min_time: float) -> Dict[str, Dict[str, Any]]:
+    styles = make_styles(count, profile, seed)
+    # Bodies as PostgREST returns them for select=* and for the aliased PROJECT_COLUMNS.select
+    db_rows = [json.dumps({column: row.get(column) for column in PROJECT_COLUMNS.db_columns},
+                          separators=(",", ":")).encode() for row in styles]
+    api_rows = [json.dumps(PROJECT_COLUMNS.from_db(row), separators=(",", ":")).encode() for row in styles]
+    db_list = b"[" + b",".join(db_rows) + b"]"
+    api_list = b"[" + b",".join(api_rows) + b"]"
+
+    def parse_and_map(body: bytes) -> Any:
+        data = json.loads(body)
+        if isinstance(data, list):
+            return PROJECT_COLUMNS.from_db_many(data)
+        return PROJECT_COLUMNS.from_db(data)
+
+    cases: Dict[str, Dict[str, Callable[[], bytes]]] = {
+        "get": {
+            "stdlib": lambda: _stdlib_render(jsonable_encoder({"data": parse_and_map(db_rows[0]), "error": None})),
+            "orjson": lambda: ORJSONResponse({"data": parse_and_map(db_rows[0]), "error": None}).body,
+            "passthrough": lambda: envelope(api_rows[0]).body,
+        },
+        "list": {
+            "stdlib": lambda: _stdlib_render(jsonable_encoder({"data": parse_and_map(db_list), "error": None})),
+            "orjson": lambda: ORJSONResponse({"data": parse_and_map(db_list), "error": None}).body,
+            "passthrough": lambda: envelope(api_list).body,
+        },
+    }
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario, paths in cases.items():
+        payload_mb = len(paths["stdlib"]()) / MB
+        baseline = None
+        for path, fn in paths.items():
+            seconds = _cpu_seconds(fn, min_time)
+            ms_per_mb = seconds * 1000 / payload_mb
+            baseline = baseline or ms_per_mb
+            results[f"{profile}/{scenario}/{path}"] = {
+                "payload_kb": round(payload_mb * 1024, 1),
+                "cpu_ms": round(seconds * 1000, 3),
+                "cpu_ms_per_mb": round(ms_per_mb, 3),
+                "mb_per_s": round(payload_mb / seconds, 1),
+                "saved_ms_per_mb": round(baseline - ms_per_mb, 3),
+                "speedup": round(baseline / ms_per_mb, 2),
+            }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", nargs="+", choices=tuple(PROFILES), default=list(PROFILES))
+    parser.add_argument("--styles", type=int, default=20, help="styles in the list payload")
+    parser.add_argument("--min-time", type=float, default=0.5, help="CPU seconds to measure each path for")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default benchmarks/results/serialization-<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for profile in args.profile:
+        results.update(bench_profile(profile, args.styles, args.seed, args.min_time))
+
+    print_table(results, ("payload_kb", "cpu_ms", "cpu_ms_per_mb", "mb_per_s", "saved_ms_per_mb", "speedup"))
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    path = save_results("serialization", params, results, args.output)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        regressions: List[str] = compare(results, args.compare, args.tolerance, metrics=("cpu_ms_per_mb",))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
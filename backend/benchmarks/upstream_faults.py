@@ -0,0 +1,137 @@
+"""
+Upstream fault benchmark.
+
+Runs the app under uvicorn against the fake Supabase (see fake_supabase.py)
+and reads styles while the fake goes through phases of trouble: healthy,
+slow (every call past the upstream deadline), failing (503 answers), down
+(dropped connections) and healthy again. For each phase it reports how
+many reads were answered fresh, stale (last good copy, while the breaker
+is open) or refused with 503 + Retry-After, and how long answers took -
+with the upstream guard, a sick upstream should make reads fail (or go
+stale) fast rather than pile up.
+
+Usage (from backend/):
+    python -m benchmarks.upstream_faults --styles 50 --concurrency 16
+    python -m benchmarks.upstream_faults --timeout 0.5 --slow-ms 3000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks.common import print_table, save_results, summarize  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.run_api import _free_port, start_app  # noqa: E402
+from benchmarks.seed import make_styles  # noqa: E402
+
+
+async def run_phase(client: httpx.AsyncClient, style_ids: List[str], total: int, concurrency: int,
+                    rng: random.Random) -> Dict[str, Any]:
+    """Read `total` random styles from `concurrency` workers; count answers by kind."""
+    latencies: List[float] = []
+    counts = {"fresh": 0, "stale": 0, "unavailable": 0, "other": 0, "retry_after": 0}
+    counter = iter(range(total))
+
+    async def worker():
+        for _ in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"/api/v1/styles/{rng.choice(style_ids)}")
+            except httpx.HTTPError:
+                counts["other"] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status_code == 200:
+                counts["stale" if response.headers.get("warning") else "fresh"] += 1
+            elif response.status_code == 503:
+                counts["unavailable"] += 1
+                counts["retry_after"] += "retry-after" in response.headers
+            else:
+                counts["other"] += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, time.perf_counter() - wall_start, counts["unavailable"] + counts["other"])
+    summary.update(counts)
+    return summary
+
+
+async def run_all(fake: FakeSupabase, base_url: str, style_ids: List[str],
+                  args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    phases = {
+        "healthy": lambda: fake.clear_faults(),
+        "slow": lambda: fake.inject(latency_ms=args.slow_ms),
+        "failing": lambda: fake.inject(status=503),
+        "down": lambda: fake.inject(drop=True),
+        "recovered": lambda: fake.clear_faults(),
+    }
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        # Warm the stale copies: every style read once while healthy
+        for style_id in style_ids:
+            await client.get(f"/api/v1/styles/{style_id}")
+        for name, begin in phases.items():
+            begin()
+            if name == "recovered":
+                await asyncio.sleep(args.breaker_open + 0.1)
+            results[name] = await run_phase(client, style_ids, args.requests, args.concurrency, rng)
+            print(f"  {name:<10} done", flush=True)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--styles", type=int, default=50, help="number of seeded styles")
+    parser.add_argument("--profile", choices=("small", "medium", "large"), default="small")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="reads per phase")
+    parser.add_argument("--timeout", type=float, default=1.0, help="upstream deadline (seconds)")
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="upstream latency in the slow phase")
+    parser.add_argument("--breaker-open", type=float, default=2.0, help="seconds the breaker stays open")
+    parser.add_argument("--no-stale", action="store_true", help="refuse reads instead of serving stale copies")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default benchmarks/results/upstream-faults-<commit>.json)")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency_ms=1.0).start()
+    styles = make_styles(args.styles, args.profile, args.seed)
+    fake.seed("projects", styles)
+
+    os.environ.update({
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_ANON_KEY": "bench-anon-key",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role-key",
+        "RATE_LIMIT_ENABLED": "false",
+        "UPSTREAM_TIMEOUT_SECONDS": str(args.timeout),
+        "BREAKER_OPEN_SECONDS": str(args.breaker_open),
+        "SERVE_STALE_STYLES": str(not args.no_stale).lower(),
+    })
+    port = _free_port()
+    print(f"Seeded {len(styles)} '{args.profile}' styles; fake Supabase at {fake.url}; app on :{port}")
+    server = start_app(port)
+
+    try:
+        results = asyncio.run(run_all(fake, f"http://127.0.0.1:{port}", [s["id"] for s in styles], args))
+    finally:
+        server.should_exit = True
+        fake.stop()
+
+    print_table(results, ("fresh", "stale", "unavailable", "retry_after", "p50_ms", "p95_ms", "rps"))
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    path = save_results("upstream-faults", params, results, args.output)
+    print(f"\nResults written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Shared fixtures.
+
+Database tests run against a throwaway Postgres: the server named by
+TEST_DATABASE_URL (the tests create and drop their own databases on it), or
+else a private server started with the `pgserver` package. Without either
+they are skipped. Each test database first gets supabase_bootstrap.sql, the
+part of the schema Supabase itself provides.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, Iterator, List
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BOOTSTRAP_SQL = Path(__file__).with_name("supabase_bootstrap.sql")
+
+
+def database_url(server_url: str, name: str) -> str:
+    """`server_url` pointed at database `name`."""
+    return urlunsplit(urlsplit(server_url)._replace(path=f"/{name}"))
+
+
+def run_migrations(url: str, *args: str) -> subprocess.CompletedProcess:
+    """Run run_migration.py against `url` the way a deploy does; output is captured."""
+    return subprocess.run(
+        [sys.executable, "run_migration.py", "--database-url", url, *args],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=300,
+    )
+
+
+def act_as(cur, role: str) -> None:
+    """Switch the transaction to an API role, as PostgREST does for a request."""
+    cur.execute("SELECT set_config('role', %s, true), set_config('request.jwt.claims', %s, true)",
+                (role, json.dumps({"role": role})))
+
+
+def at_commit(cur) -> None:
+    """Run what is deferred to commit (016's section revisions) without ending the transaction."""
+    cur.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cur.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+def add_style(cur, project_id: str, title: str = "Style") -> None:
+    cur.execute("INSERT INTO public.projects (id, title) VALUES (%s, %s)", (project_id, title))
+
+
+@pytest.fixture(scope="session")
+def postgres_server() -> Iterator[str]:
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip("needs TEST_DATABASE_URL or the pgserver package")
+    with tempfile.TemporaryDirectory(prefix="fcbl-pg-") as pgdata:
+        server = pgserver.get_server(pgdata, cleanup_mode="stop")
+        yield server.get_uri()
+        server.cleanup()
+
+
+@pytest.fixture(scope="session")
+def create_database(postgres_server: str) -> Iterator[Callable[[], str]]:
+    """Factory for empty, bootstrapped databases; all are dropped at the end of the session."""
+    psycopg2 = pytest.importorskip("psycopg2")
+    created: List[str] = []
+    admin = psycopg2.connect(postgres_server)
+    admin.autocommit = True
+
+    def create() -> str:
+        name = f"fcbl_test_{uuid.uuid4().hex[:12]}"
+        admin.cursor().execute(f'CREATE DATABASE "{name}"')
+        created.append(name)
+        url = database_url(postgres_server, name)
+        conn = psycopg2.connect(url)
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(BOOTSTRAP_SQL.read_text())
+        finally:
+            conn.close()
+        return url
+
+    yield create
+    for name in created:
+        admin.cursor().execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    admin.close()
+
+
+@pytest.fixture(scope="session")
+def migrated_database(create_database: Callable[[], str]) -> str:
+    """One database with every migration applied, shared by the schema tests."""
+    url = create_database()
+    result = run_migrations(url, "migrate")
+    assert result.returncode == 0, result.stdout + result.stderr
+    return url
+
+
+@pytest.fixture
+def db(migrated_database: str) -> Iterator:
+    """A psycopg2 connection to the migrated database, rolled back after the test."""
+    import psycopg2
+
+    conn = psycopg2.connect(migrated_database)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
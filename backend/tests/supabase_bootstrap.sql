@@ -0,0 +1,123 @@
+-- ============================================================
+-- What a Supabase project provides before supabase/migrations
+-- run, for a plain Postgres test database: the API roles and
+-- their default grants, auth.* (users, uid(), role(), jwt()
+-- reading request.jwt.claims as PostgREST sets it), storage
+-- buckets/objects, the realtime publication, and the projects
+-- table as it was created in the dashboard (the migrations only
+-- ever ALTER it).
+--
+-- Roles are cluster-wide, so they are created only if missing.
+-- ============================================================
+
+DO $$
+DECLARE
+  v_role TEXT;
+BEGIN
+  FOREACH v_role IN ARRAY ARRAY['anon', 'authenticated', 'service_role']
+  LOOP
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = v_role) THEN
+      EXECUTE format('CREATE ROLE %I NOLOGIN NOINHERIT', v_role);
+    END IF;
+  END LOOP;
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticator') THEN
+    CREATE ROLE authenticator LOGIN NOINHERIT;
+  END IF;
+END;
+$$;
+
+ALTER ROLE service_role BYPASSRLS;
+GRANT anon, authenticated, service_role TO authenticator;
+GRANT anon, authenticated, service_role TO CURRENT_USER;
+
+GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON SEQUENCES TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON FUNCTIONS TO anon, authenticated, service_role;
+
+-- ── auth ──
+CREATE SCHEMA IF NOT EXISTS auth;
+GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+  id                  UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  email               TEXT,
+  raw_user_meta_data  JSONB DEFAULT '{}'::jsonb,
+  raw_app_meta_data   JSONB DEFAULT '{}'::jsonb,
+  created_at          TIMESTAMPTZ DEFAULT NOW(),
+  updated_at          TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION auth.jwt() RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(NULLIF(current_setting('request.jwt.claims', true), ''), '{}')::jsonb;
+$$;
+
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID
+LANGUAGE sql STABLE AS $$
+  SELECT NULLIF(auth.jwt() ->> 'sub', '')::uuid;
+$$;
+
+CREATE OR REPLACE FUNCTION auth.role() RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+  SELECT NULLIF(auth.jwt() ->> 'role', '');
+$$;
+
+-- ── storage ──
+CREATE SCHEMA IF NOT EXISTS storage;
+GRANT USAGE ON SCHEMA storage TO anon, authenticated, service_role;
+
+CREATE TABLE IF NOT EXISTS storage.buckets (
+  id                  TEXT PRIMARY KEY,
+  name                TEXT NOT NULL,
+  owner               UUID,
+  public              BOOLEAN DEFAULT FALSE,
+  file_size_limit     BIGINT,
+  allowed_mime_types  TEXT[],
+  created_at          TIMESTAMPTZ DEFAULT NOW(),
+  updated_at          TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS storage.objects (
+  id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  bucket_id   TEXT REFERENCES storage.buckets(id),
+  name        TEXT,
+  owner       UUID,
+  metadata    JSONB,
+  created_at  TIMESTAMPTZ DEFAULT NOW(),
+  updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+ALTER TABLE storage.objects ENABLE ROW LEVEL SECURITY;
+
+-- ── realtime ──
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+    CREATE PUBLICATION supabase_realtime;
+  END IF;
+END;
+$$;
+
+-- ── projects, as created in the dashboard ──
+-- The app reads and writes styles with the anon key.
+CREATE TABLE IF NOT EXISTS public.projects (
+  id                TEXT PRIMARY KEY,
+  title             TEXT NOT NULL,
+  status            TEXT DEFAULT 'DRAFT',
+  po_numbers        JSONB DEFAULT '[]'::jsonb,
+  tech_pack_files   JSONB DEFAULT '[]'::jsonb,
+  pages             JSONB DEFAULT '[]'::jsonb,
+  comments          JSONB DEFAULT '[]'::jsonb,
+  inspections       JSONB DEFAULT '[]'::jsonb,
+  pp_meetings       JSONB DEFAULT '[]'::jsonb,
+  material_control  JSONB DEFAULT '[]'::jsonb,
+  invoices          JSONB DEFAULT '[]'::jsonb,
+  packing           JSONB,
+  order_sheet       JSONB,
+  consumption       JSONB,
+  updated_at        TIMESTAMPTZ DEFAULT NOW()
+);
+ALTER TABLE public.projects ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Public access to projects" ON public.projects;
+CREATE POLICY "Public access to projects" ON public.projects
+  FOR ALL TO anon, authenticated USING (true) WITH CHECK (true);
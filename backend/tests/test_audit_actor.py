@@ -0,0 +1,107 @@
+"""The actor of a style write, and audit events where no lifespan runs."""
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.config import get_settings
+from app.core import auth_middleware
+from app.core.auth_middleware import token_actor
+from app.services.audit_service import AuditService
+
+SECRET = "test-jwt-secret"
+
+
+def encode(part: bytes) -> str:
+    return base64.urlsafe_b64encode(part).rstrip(b"=").decode()
+
+
+def sign(claims: dict, secret: str = SECRET) -> str:
+    head = encode(orjson.dumps({"alg": "HS256", "typ": "JWT"})) + "." + encode(orjson.dumps(claims))
+    return head + "." + encode(hmac.new(secret.encode(), head.encode(), hashlib.sha256).digest())
+
+
+def request_with(token=None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "PUT", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def jwt_secret(monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", SECRET)
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_actor_is_read_from_a_verified_token(jwt_secret):
+    token = sign({"sub": "user-1", "email": "a@b.c", "exp": time.time() + 60,
+                  "user_metadata": {"role": "merchandiser"}})
+    actor = asyncio.run(token_actor(request_with(token)))
+    assert actor == {"id": "user-1", "email": "a@b.c", "role": "merchandiser"}
+    assert asyncio.run(token_actor(request_with())) is None
+
+
+@pytest.mark.parametrize("token", [
+    sign({"sub": "user-1", "exp": time.time() - 1}),
+    sign({"sub": "user-1", "exp": time.time() + 60}, secret="another-secret"),
+    sign({"role": "anon", "exp": time.time() + 60}),
+    "not-a-jwt",
+])
+def test_invalid_tokens_are_refused(jwt_secret, token):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(token_actor(request_with(token)))
+    assert error.value.status_code == 401
+
+
+def test_tokens_of_other_signing_keys_are_checked_with_auth(jwt_secret, monkeypatch):
+    checked = []
+
+    async def optional_auth(request):
+        checked.append(request.headers["authorization"])
+        return {"id": "user-2", "email": None, "role": "viewer"}
+
+    monkeypatch.setattr(auth_middleware, "optional_auth", optional_auth)
+    token = ".".join((encode(orjson.dumps({"alg": "ES256", "kid": "key-1"})),
+                      encode(orjson.dumps({"sub": "user-2", "exp": time.time() + 60})), encode(b"signature")))
+    assert asyncio.run(token_actor(request_with(token)))["id"] == "user-2"
+    assert checked == [f"Bearer {token}"]
+
+
+class Inserts:
+    """Stands in for the Supabase client: records what the audit service inserts."""
+
+    def __init__(self):
+        self.rows = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.rows.extend(rows)
+        return self
+
+    def execute(self):
+        return None
+
+
+def test_events_are_written_right_away_without_a_flush_loop():
+    client = Inserts()
+    audit = AuditService(client_factory=lambda: client)
+
+    async def run():
+        audit.record("update", "style", "proj-1")
+        assert await audit.flush_unattended() == 1
+        await audit.start()
+        audit.record("update", "style", "proj-2")
+        assert await audit.flush_unattended() == 0  # the loop will write it
+        await audit.stop()
+
+    asyncio.run(run())
+    assert [row["entity_id"] for row in client.rows] == ["proj-1", "proj-2"]
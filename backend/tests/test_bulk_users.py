@@ -0,0 +1,55 @@
+"""Bulk user provisioning, against the fake Supabase."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.factory import create_app
+from app.services.audit_service import AuditService, get_audit_service
+from benchmarks.fake_supabase import FakeSupabase
+
+ADMIN_TOKEN = "admin-token"
+USERS = [{"email": f"op{i}@example.com", "password": "Secret-123!", "name": f"Operator {i}", "role": "viewer"}
+         for i in range(3)]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeSupabase().start()
+    fake.add_user(ADMIN_TOKEN, "00000000-0000-4000-8000-000000000001", "admin@example.com")
+    monkeypatch.setenv("SUPABASE_URL", fake.url)
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "test-service-key")
+    get_settings.cache_clear()
+    yield fake
+    get_settings.cache_clear()
+    fake.stop()
+
+
+@pytest.fixture
+def client(fake):
+    app = create_app()
+    app.dependency_overrides[get_audit_service] = lambda: AuditService(enabled=False)
+    return TestClient(app, headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+
+
+def auth_emails(fake: FakeSupabase) -> set:
+    return {user["email"] for user in fake.users.values()} - {"admin@example.com"}
+
+
+def test_users_are_created_with_their_profiles(fake, client):
+    response = client.post("/api/v1/users/bulk", json=USERS)
+    assert response.status_code == 200
+    assert response.json()["counts"] == {"created": 3}
+    assert auth_emails(fake) == {user["email"] for user in USERS}
+    assert len(fake.table("profiles")) == 4
+
+
+def test_auth_users_are_removed_when_their_profiles_are_not_saved(fake, client):
+    fake.inject(status=500, path="/rest/v1/profiles")
+    body = client.post("/api/v1/users/bulk", json=USERS).json()
+    assert body["counts"] == {"failed": 3}
+    assert all(r["user_id"] is None and "auth user removed" in r["error"] for r in body["results"])
+    assert auth_emails(fake) == set()
+
+    # The same list goes through once the database is back
+    fake.clear_faults()
+    assert client.post("/api/v1/users/bulk", json=USERS).json()["counts"] == {"created": 3}
@@ -0,0 +1,127 @@
+"""Negotiated response compression and the style payload budget."""
+import asyncio
+import gzip
+import logging
+import zlib
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from app.api.v1.routes.styles import check_payload_budget
+from app.config import get_settings
+from app.core.compression import CompressionMiddleware, negotiate
+
+BODY = orjson.dumps({"data": [{"id": f"proj-{i}", "title": "Crew neck"} for i in range(100)]})
+CHUNKS = [orjson.dumps([{"id": f"proj-{page}-{i}"} for i in range(50)]) for page in range(3)]
+
+
+def test_the_highest_q_value_wins_and_ties_go_to_the_server_order():
+    offered = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br, zstd", offered) == "zstd"
+    assert negotiate("gzip;q=1.0, br;q=0.8, zstd;q=0.5", offered) == "gzip"
+    assert negotiate("br;q=0.9, *;q=0.1", offered) == "br"
+    assert negotiate("*;q=0.3, gzip;q=0", offered) == "zstd"
+    assert negotiate("gzip;q=0, identity", offered) is None
+    assert negotiate("br", ["gzip"]) is None  # brotli not installed
+    assert negotiate("", offered) is None
+
+
+def app(minimum_size: int = 1024) -> Starlette:
+    async def json(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    async def small(request):
+        return Response(b'{"data":[]}', media_type="application/json")
+
+    async def pdf(request):
+        return Response(BODY, media_type="application/pdf")
+
+    async def stream(request):
+        async def chunks():
+            for chunk in CHUNKS:
+                yield chunk
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    routes = [Route("/json", json), Route("/small", small), Route("/pdf", pdf), Route("/stream", stream)]
+    application = Starlette(routes=routes)
+    application.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return application
+
+
+def test_json_is_gzipped_with_a_weak_etag():
+    client = TestClient(app())
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+    plain = client.get("/json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == '"v1"'
+
+
+def test_small_and_binary_responses_are_sent_as_they_are():
+    client = TestClient(app(minimum_size=64))
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in client.get("/pdf", headers={"Accept-Encoding": "gzip"}).headers
+    # The cutoff is the uncompressed size
+    assert TestClient(app(minimum_size=len(BODY))).get("/json").headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in TestClient(app(minimum_size=len(BODY) + 1)).get("/json").headers
+
+
+def test_streams_are_flushed_after_every_chunk():
+    sent = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+             "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1", "scheme": "http",
+             "server": ("test", 80), "client": ("test", 1), "root_path": ""}
+    asyncio.run(app(minimum_size=10 ** 9)(scope, receive, send))
+
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk decompresses in full on arrival, before the stream ends
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    received = [decoder.decompress(message["body"]) for message in bodies]
+    assert received[:len(CHUNKS)] == CHUNKS
+    assert b"".join(received) == b"".join(CHUNKS)
+    assert gzip.decompress(b"".join(message["body"] for message in bodies)) == b"".join(CHUNKS)
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setenv("STYLE_PAYLOAD_BUDGET_BYTES", "200")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_styles_over_budget_name_their_largest_sections(budget, caplog):
+    caplog.set_level(logging.WARNING)
+    check_payload_budget("proj-small", orjson.dumps({"title": "Crew neck"}))
+    assert caplog.records == []
+
+    style = {"title": "Crew neck", "pages": ["x" * 300], "comments": ["y" * 100], "status": "DRAFT"}
+    check_payload_budget("proj-big", orjson.dumps(style))
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "proj-big" in message and "over the 200 byte budget" in message
+    assert message.endswith("largest sections: pages=304, comments=104, title=11")
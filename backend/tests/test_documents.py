@@ -0,0 +1,61 @@
+"""Shipment ZIPs and where documents render."""
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.config import get_settings
+from app.factory import create_app
+from app.services.document_service import DocumentService, RenderCache
+
+
+@pytest.fixture
+def settings_reset():
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def zip_names(service: DocumentService, style_ids, kinds) -> list:
+    async def collect():
+        return b"".join([chunk async for chunk in service.shipment_zip(style_ids, kinds)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(collect()))).namelist()
+
+
+def test_duplicate_names_in_a_shipment_zip_get_a_number(monkeypatch):
+    rows = [
+        {"id": "proj-1", "style_number": "ST-1",
+         "invoices": [{"id": "i1", "invoiceNo": "INV-7"}, {"id": "i2", "invoiceNo": "INV-7"}]},
+        {"id": "proj-2", "style_number": "ST-1", "invoices": [{"id": "i3", "invoiceNo": "INV-7"}]},
+        {"id": "proj-3", "style_number": "ST-1-2", "invoices": [{"id": "i4", "invoiceNo": "INV-8"}]},
+    ]
+    service = DocumentService(RenderCache(1 << 20), batch_size=2)
+
+    async def render(kind, payload):
+        return payload["document"]["id"].encode(), "key"
+
+    monkeypatch.setattr(service, "_load", lambda ids, columns: [row for row in rows if row["id"] in ids])
+    monkeypatch.setattr(service, "render", render)
+
+    assert zip_names(service, ["proj-1", "proj-2", "proj-3"], ["invoice"]) == [
+        "ST-1/invoice-INV-7.pdf",
+        "ST-1/invoice-INV-7-2.pdf",
+        "ST-1-2/invoice-INV-7.pdf",
+        "ST-1-2-2/invoice-INV-8.pdf",
+    ]
+
+
+def test_documents_render_in_a_thread_when_serverless(settings_reset, monkeypatch):
+    create_app(lazy_routes=True)
+    assert get_settings().documents_render_workers == 0
+
+    get_settings.cache_clear()
+    create_app()
+    assert get_settings().documents_render_workers == 2
+
+    get_settings.cache_clear()
+    monkeypatch.setenv("DOCUMENTS_RENDER_WORKERS", "1")
+    create_app(lazy_routes=True)
+    assert get_settings().documents_render_workers == 1
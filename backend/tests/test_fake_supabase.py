@@ -0,0 +1,93 @@
+"""
+The fake Supabase (benchmarks/fake_supabase.py) reimplements migrations
+013, 016, 017 and 019 in Python; these tests run the same style through the fake
+and through the real SQL and compare what comes back.
+"""
+import json
+
+import pytest
+from supabase import create_client
+
+from benchmarks.fake_supabase import FakeSupabase
+from tests.conftest import add_style, at_commit
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+STYLE = {
+    "main_status": "PRODUCTION",
+    "shipment_date": "2025-04-18",
+    "po_numbers": [
+        {"number": "PO-1", "quantity": 120, "deliveryDate": "2025-03-05"},
+        {"number": "PO-2", "quantity": "80", "deliveryDate": "2025-02-30"},  # no such day: falls back
+        {"number": "PO-3", "quantity": "n/a"},
+    ],
+    "order_sheet": {"shipmentDate": "2025-04-01T00:00:00Z", "poNumbers": [{"number": "PO-1", "deliveryDate": "2025-01-01"}]},
+    "consumption": {
+        "yarnItems": [{"yarnType": " Merino ", "supplier": "Yarns Ltd", "weightPerPiece": "450",
+                       "wastagePercent": 5, "ratePerKg": "12.5"},
+                      {"yarnType": "", "weightPerPiece": "100"}],
+        "accessoryItems": [{"accessoryName": "Button", "quantityPerGarment": 6, "unit": "",
+                            "wastagePercent": "2", "ratePerUnit": 0.04}],
+    },
+    "comments": [{"id": "c1", "text": "a"}, {"id": "c1", "text": "repeated"}, {"text": "no id"}],
+    "inspections": [{"id": "i1", "data": {"result": "PASS"}}],
+}
+SECTIONS = ("comments", "inspections", "invoices", "pp_meetings", "material_control")
+
+
+def requirement_rows(rows):
+    return sorted((r["kind"], r["item"], r["supplier"], r["unit"], r["po_number"], r["delivery_week"],
+                   round(float(r["pieces"]), 6), round(float(r["required_quantity"]), 6), round(float(r["cost"]), 6))
+                  for r in rows)
+
+
+@pytest.fixture
+def fake():
+    fake = FakeSupabase().start()
+    yield fake
+    fake.stop()
+
+
+def test_saving_a_style_matches_the_sql(db, fake):
+    cur = db.cursor()
+    add_style(cur, "proj-x")
+    cur.execute("SELECT public.save_style('proj-x', %s::jsonb)", (json.dumps(STYLE),))
+    real_document = cur.fetchone()[0]
+    cur.execute("SELECT to_jsonb(r) FROM public.material_requirements r WHERE project_id = 'proj-x'")
+    real_rows = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT public.material_requirements_rollup(true)")
+    real_rollup = cur.fetchone()[0]
+
+    fake.seed("projects", [{"id": "proj-x", "title": "Style"}])
+    client = create_client(fake.url, "test-anon-key")
+    fake_document = client.rpc("save_style", {"p_project_id": "proj-x", "p_values": STYLE}).execute().data
+    fake_rows = client.table("material_requirements").select("*").eq("project_id", "proj-x").execute().data
+    fake_rollup = client.rpc("material_requirements_rollup", {"p_by_week": True}).execute().data
+
+    assert {s: fake_document[s] for s in SECTIONS} == {s: real_document[s] for s in SECTIONS}
+    assert requirement_rows(fake_rows) == requirement_rows(real_rows)
+    assert len(real_rows) == 4
+    assert [{**r, "pieces": float(r["pieces"])} for r in fake_rollup] == \
+        [{**r, "pieces": float(r["pieces"])} for r in real_rollup]
+
+
+def test_revisions_of_a_save_match_the_sql(db, fake):
+    cur = db.cursor()
+    add_style(cur, "proj-x")
+    cur.execute("SELECT to_jsonb(p) FROM public.projects p WHERE id = 'proj-x'")
+    fake.seed("projects", [cur.fetchone()[0]])
+    client = create_client(fake.url, "test-anon-key")
+    edited = {**STYLE, "main_status": "SHIPPED", "comments": STYLE["comments"][:1]}
+    for values in (STYLE, edited):
+        cur.execute("SELECT public.save_style('proj-x', %s::jsonb)", (json.dumps(values),))
+        at_commit(cur)
+        client.rpc("save_style", {"p_project_id": "proj-x", "p_values": values}).execute()
+
+    cur.execute("SELECT section, kind, depth, payload FROM public.style_revisions "
+                "WHERE project_id = 'proj-x' ORDER BY section, id")
+    real = [tuple(row) for row in cur.fetchall()]
+    revisions = client.table("style_revisions").select("*").eq("project_id", "proj-x").execute().data
+    fake_revisions = [(r["section"], r["kind"], r["depth"], r["payload"])
+                      for r in sorted(revisions, key=lambda r: (r["section"], r["id"]))]
+    assert fake_revisions == real
+    assert ("comments", "diff", 1, [["t", [], 1]]) in real
@@ -0,0 +1,105 @@
+"""The knitting capacity plan, against hand-computed schedules."""
+from datetime import date
+
+from app.services.knitting_planner import KnittingPlanner, Machine, style_jobs
+
+START = date(2026, 1, 1)
+
+
+def machine(machine_id: str, gauge: str = "12GG", machine_no: str = "") -> Machine:
+    # 600 minutes a day: 10 pieces a day at an hour per piece
+    return Machine({"id": machine_id, "gauge": gauge, "machine_no": machine_no,
+                    "hours_per_day": 10, "efficiency": 1})
+
+
+def style(style_id: str, pieces: int, due: str = "2026-06-30", gauge: str = "12GG", **fields) -> dict:
+    return {"id": style_id, "mainStatus": "PRODUCTION", "gauge": gauge, "knittingTime": "60 mins",
+            "poNumbers": [{"number": "PO-1", "quantity": pieces, "deliveryDate": due}], **fields}
+
+
+def planned(planner: KnittingPlanner, *styles: dict, buffer_days: int = 0) -> list:
+    planner.plan([job for s in styles for job in style_jobs(s, buffer_days)])
+    return planner.report()["jobs"]
+
+
+def shares(result: dict) -> dict:
+    return {m["machine_id"]: m["pieces"] for m in result["machines"]}
+
+
+def test_jobs_go_to_machines_of_their_gauge_or_the_pinned_one():
+    machines = [machine("m1"), machine("m2", "7GG"), machine("m3", machine_no="K-3")]
+
+    jobs = planned(KnittingPlanner(machines, START), style("s12", 200), style("s7", 100, gauge="7 gg"),
+                   style("s5", 100, gauge="5GG"))
+    by_style = {job["style_id"]: job for job in jobs}
+    assert shares(by_style["s12"]) == {"m1": 100, "m3": 100}
+    assert by_style["s12"]["finish"] == "2026-01-11"
+    assert shares(by_style["s7"]) == {"m2": 100}
+    assert by_style["s5"]["problem"] == "no 5GG machine"
+
+    pinned = planned(KnittingPlanner(machines, START), style("s", 200, machineNo="K-3"))[0]
+    assert shares(pinned) == {"m3": 200}
+    # A machine number the park does not have falls back to every machine of the gauge
+    unknown = planned(KnittingPlanner(machines, START), style("s", 200, machineNo="K-9"))[0]
+    assert shares(unknown) == {"m1": 100, "m3": 100}
+
+
+def test_machines_per_job_follow_min_pieces_and_the_pp_meeting():
+    park = [machine(f"m{i}") for i in range(1, 5)]
+
+    assert shares(planned(KnittingPlanner(park, START, min_pieces_per_machine=100), style("s", 250))[0]) == \
+        {"m1": 125, "m2": 125}
+    # Five machines allowed, four exist: 62.5 each, the odd pieces to the first
+    assert shares(planned(KnittingPlanner(park, START, min_pieces_per_machine=50), style("s", 250))[0]) == \
+        {"m1": 63, "m2": 63, "m3": 62, "m4": 62}
+    agreed = style("s", 250, ppMeetings=[{"productionDetails": [{"numMachines": 2}, {"numMachines": 1}]}])
+    assert shares(planned(KnittingPlanner(park, START, min_pieces_per_machine=50), agreed)[0]) == \
+        {"m1": 84, "m2": 83, "m3": 83}
+
+
+def test_every_piece_of_a_job_is_planned_once():
+    park = [machine("m1"), machine("m2"), machine("m3", "12/14GG")]
+    styles = [style(f"s{i}", pieces, due=f"2026-0{1 + i % 6}-15")
+              for i, pieces in enumerate([137, 1001, 250, 99, 3333, 401, 7])]
+
+    jobs = planned(KnittingPlanner(park, START, min_pieces_per_machine=60), *styles)
+    assert len(jobs) == len(styles)
+    for job in jobs:
+        assert sum(m["pieces"] for m in job["machines"]) == job["pieces"]
+        assert all(m["pieces"] > 0 for m in job["machines"])
+    # Machines are never booked twice: each assignment starts when the one before it finished
+    for machine_id in ("m1", "m2", "m3"):
+        slots = [m for job in jobs for m in job["machines"] if m["machine_id"] == machine_id]
+        assert all(a["finish"] <= b["start"] for a, b in zip(slots, slots[1:]))
+
+
+def test_late_days_count_from_the_due_date_less_the_buffer():
+    planner = KnittingPlanner([machine("m1")], START, min_pieces_per_machine=1000)
+    # 300 pieces at 10 a day: days 0-30, knitting due 5 days before the 26th
+    late, early = planned(planner, style("late", 300, due="2026-01-26"), style("early", 100, due="2026-12-31"),
+                          buffer_days=5)
+    assert (late["due"], late["finish"], late["late_days"]) == ("2026-01-21", "2026-01-31", 10)
+    assert (early["start"], early["finish"], early["late_days"]) == ("2026-01-31", "2026-02-10", 0)
+    summary = planner.report()["summary"]
+    assert (summary["late"], summary["late_pieces"], summary["max_late_days"]) == (1, 300, 10)
+
+
+def test_a_replan_keeps_the_jobs_before_the_first_change():
+    planner = KnittingPlanner([machine("m1"), machine("m2")], START)
+    styles = [style("a", 200, due="2026-02-01"), style("b", 300, due="2026-03-01"),
+              style("c", 400, due="2026-04-01")]
+    first = planned(planner, *styles)
+    assert planner.replanned == 3
+
+    styles[2] = style("c", 500, due="2026-04-01")
+    second = planned(planner, *styles)
+    assert planner.replanned == 1
+    assert second[0] is first[0] and second[1] is first[1]
+    assert sum(m["pieces"] for m in second[2]["machines"]) == 500
+
+    planned(planner, *styles)
+    assert planner.replanned == 0
+    # A change to the first job in planning order re-plans everything after it
+    styles[0] = style("a", 200, due="2026-02-01", machineNo="K-1")
+    planned(planner, *styles)
+    assert planner.replanned == 3
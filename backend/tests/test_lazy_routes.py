@@ -0,0 +1,60 @@
+"""The serverless entry point: one app with route modules loaded on first use."""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.router import ROUTE_MODULES
+from app.factory import create_app
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+
+# Imports the Vercel entry module and answers a health check in a fresh interpreter
+_COLD_START = """
+import json, sys
+sys.path.insert(0, {api!r})
+from fastapi.testclient import TestClient
+import index
+loaded = lambda: sorted(m for m in ("supabase", *{modules!r}) if m in sys.modules)
+before = loaded()
+status = TestClient(index.app).get("/api/v1/health").status_code
+print(json.dumps({{"before": before, "status": status, "after": loaded()}}))
+"""
+
+
+def api_paths(app) -> set:
+    """API paths the app serves right now (LazyRoutes drops the cached schema as it loads)."""
+    return {path for path in app.openapi()["paths"] if path.startswith("/api/v1/")}
+
+
+def test_the_serverless_entry_imports_no_route_module_for_a_health_check():
+    code = _COLD_START.format(api=str(REPO_DIR / "api"), modules=tuple(ROUTE_MODULES.values()))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_DIR / "backend",
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == {"before": [], "status": 200, "after": []}
+
+
+def test_a_route_module_is_included_by_the_first_request_under_its_prefix():
+    app = create_app(lazy_routes=True)
+    client = TestClient(app)
+    assert api_paths(app) == {"/api/v1/health"}
+
+    # Only a whole path segment matches: /stylesheet is not under /styles
+    assert client.get("/api/v1/stylesheet").status_code == 404
+    assert api_paths(app) == {"/api/v1/health"}
+
+    assert client.get("/api/v1/packing/no-such-route").status_code == 404
+    loaded = api_paths(app)
+    assert loaded and all(path.startswith(("/api/v1/packing", "/api/v1/health")) for path in loaded)
+
+
+def test_the_docs_list_the_same_routes_as_the_server():
+    lazy = create_app(lazy_routes=True, docs_prefix="/api")
+    schema = TestClient(lazy).get("/api/openapi.json").json()
+
+    server = create_app()
+    assert api_paths(lazy) == api_paths(server)
+    assert set(schema["paths"]) == set(server.openapi()["paths"])
@@ -0,0 +1,62 @@
+"""The camelCase <-> snake_case project mapper."""
+import pytest
+
+from app.core.mapping import ColumnMapper
+from app.models.project import Project
+from app.services.project_service import PROJECT_COLUMNS
+
+# Bookkeeping of the change feed (014), not part of the document
+FEED_COLUMNS = {"change_seq", "changed_at"}
+
+
+def test_every_column_of_the_style_view_is_mapped(db):
+    cur = db.cursor()
+    cur.execute("SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = 'public' AND table_name = 'projects_full'")
+    assert {row[0] for row in cur.fetchall()} - FEED_COLUMNS == set(PROJECT_COLUMNS.db_columns)
+
+
+def test_api_keys_map_to_columns_and_back():
+    document = {"id": "proj-1", "styleNumber": "ST-1", "poNumbers": [{"number": "PO-1"}], "gauge": "12GG",
+                "mqControlWorkflow": {"step": 2}, "brand": None}
+    row = PROJECT_COLUMNS.to_db(document)
+    # None means "not sent"; keys spelled the same pass through
+    assert row == {"id": "proj-1", "style_number": "ST-1", "po_numbers": [{"number": "PO-1"}], "gauge": "12GG",
+                   "mq_control_workflow": {"step": 2}}
+    mapped = PROJECT_COLUMNS.from_db(row)
+    assert set(mapped) == set(PROJECT_COLUMNS.api_keys)
+    assert {key: mapped[key] for key in document if key != "brand"} == {k: v for k, v in document.items() if v}
+    # Missing columns get the model's default
+    assert (mapped["brand"], mapped["status"], mapped["pages"], mapped["materialRemarks"]) == (None, None, [], "")
+    assert PROJECT_COLUMNS.column("styleNumber") == PROJECT_COLUMNS.column("style_number") == "style_number"
+
+
+def test_postgrest_renames_the_columns_in_the_select():
+    select = PROJECT_COLUMNS.select.split(",")
+    assert "styleNumber:style_number" in select and "id" in select
+    assert len(select) == len(PROJECT_COLUMNS.columns)
+
+
+def test_full_rows_are_renamed_in_place_and_partial_rows_rebuilt():
+    full = [dict.fromkeys(PROJECT_COLUMNS.db_columns, "x") for _ in range(2)]
+    renamed = PROJECT_COLUMNS.from_db_many(full)
+    assert renamed is full
+    assert set(renamed[1]) == set(PROJECT_COLUMNS.api_keys)
+
+    partial = [{"id": "proj-1", "style_number": "ST-1"}]
+    rebuilt = PROJECT_COLUMNS.from_db_many(partial)
+    assert rebuilt is not partial and partial == [{"id": "proj-1", "style_number": "ST-1"}]
+    assert rebuilt[0]["styleNumber"] == "ST-1" and rebuilt[0]["comments"] == []
+
+
+def test_defaults_are_fresh_per_row():
+    mapper = ColumnMapper.from_model(Project)
+    first, second = mapper.from_db({"id": "a"}), mapper.from_db({"id": "b"})
+    first["pages"].append("page")
+    assert second["pages"] == []
+
+
+@pytest.mark.parametrize("key", ["poNumbers", "createdAt", "ppMeetings", "cuffBottomPly", "techPackWorkflow"])
+def test_aliases_come_from_the_model(key):
+    field = next(name for name, f in Project.model_fields.items() if f.alias == key)
+    assert PROJECT_COLUMNS.column(key) == field
@@ -0,0 +1,63 @@
+"""Material requirements (migration 017): recomputed on save, never in its way."""
+import json
+
+import pytest
+
+from tests.conftest import add_style
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+CONSUMPTION = {"yarnItems": [{"yarnType": "Merino", "weightPerPiece": "500", "wastagePercent": "10"}]}
+
+
+def make_active(cur, project_id: str, **values) -> None:
+    add_style(cur, project_id)
+    values = {"main_status": "PRODUCTION", "consumption": CONSUMPTION, **values}
+    columns = ", ".join(values)
+    cur.execute(
+        f"UPDATE public.projects SET ({columns}) = ROW({', '.join(['%s'] * len(values))}) WHERE id = %s",
+        [json.dumps(v) if isinstance(v, (dict, list)) else v for v in values.values()] + [project_id],
+    )
+
+
+def requirements_of(cur, project_id: str):
+    cur.execute("SELECT po_number, delivery_week::TEXT, pieces, required_quantity FROM public.material_requirements "
+                "WHERE project_id = %s ORDER BY po_number", (project_id,))
+    return cur.fetchall()
+
+
+def test_rows_follow_the_pos_of_an_active_style(db):
+    cur = db.cursor()
+    make_active(cur, "proj-m1", shipment_date="2025-03-14",
+                po_numbers=[{"number": "PO-1", "quantity": 100, "deliveryDate": "2025-03-05"},
+                            {"number": "PO-2", "quantity": "50"}])
+    assert requirements_of(cur, "proj-m1") == [
+        ("PO-1", "2025-03-03", 100, 55),
+        ("PO-2", "2025-03-10", 50, 27.5),
+    ]
+
+
+def test_an_impossible_date_does_not_block_the_save(db):
+    cur = db.cursor()
+    make_active(cur, "proj-m2", shipment_date="2025-02-30",
+                po_numbers=[{"number": "PO-1", "quantity": 100, "deliveryDate": "2025-02-30"},
+                            {"number": "PO-2", "quantity": 50, "deliveryDate": "2025-03-12T09:00"}])
+    cur.execute("SELECT shipment_date FROM public.projects WHERE id = 'proj-m2'")
+    assert cur.fetchone()[0] == "2025-02-30"
+    assert requirements_of(cur, "proj-m2") == [
+        ("PO-1", None, 100, 55),
+        ("PO-2", "2025-03-10", 50, 27.5),
+    ]
+
+
+def test_a_failed_recompute_saves_the_style_and_drops_its_rows(db):
+    cur = db.cursor()
+    make_active(cur, "proj-m3", po_numbers=[{"number": "PO-1", "quantity": 100}])
+    assert len(requirements_of(cur, "proj-m3")) == 1
+    cur.execute("ALTER TABLE public.material_requirements ADD CONSTRAINT no_rows CHECK (false) NOT VALID")
+
+    cur.execute("UPDATE public.projects SET po_numbers = %s WHERE id = 'proj-m3'",
+                (json.dumps([{"number": "PO-1", "quantity": 200}]),))
+    cur.execute("SELECT po_numbers FROM public.projects WHERE id = 'proj-m3'")
+    assert cur.fetchone()[0] == [{"number": "PO-1", "quantity": 200}]
+    assert requirements_of(cur, "proj-m3") == []
@@ -0,0 +1,63 @@
+"""Measurement tolerance checks and their sheet cache."""
+import asyncio
+
+import pytest
+from supabase import create_client
+
+from app.services import measurements
+from app.services.measurements import MeasurementService, MeasurementSheet, SheetCache
+from app.services.project_service import ProjectService
+from benchmarks.fake_supabase import FakeSupabase
+
+TABLE = {"rows": [
+    {"id": "r1", "point": "A", "name": "Chest", "tolerancePlus": "1/2", "toleranceMinus": "",
+     "groups": {"g1": {"size": "M", "actualValue": "40 3/4",
+                       "subColumns": [{"color": "Navy", "standardValue": "40"},
+                                      {"color": "Red", "standardValue": "40 1/2"}]}}},
+    {"id": "r2", "point": "B", "name": "Length", "tolerancePlus": "", "toleranceMinus": "1/4",
+     "groups": {"g1": {"size": "M", "actualValue": "",
+                       "subColumns": [{"color": "Navy", "standardValue": "60"}]}}},
+]}
+
+
+@pytest.mark.parametrize("with_numpy", [False, True])
+def test_out_of_tolerance_with_and_without_numpy(monkeypatch, with_numpy):
+    if with_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(measurements, "numpy", None)
+
+    sheet = MeasurementSheet(TABLE, master_tolerance="1")
+    assert sheet.out_of_tolerance() == [True, False, False]  # a blank actual is never out
+    report = sheet.report()
+    assert report["summary"]["checked"] == 2
+    assert [entry["deviation"] for entry in report["entries"]] == [0.75, 0.25]
+
+
+def test_saved_sheets_are_cached_by_item_and_updated_at(monkeypatch):
+    fake = FakeSupabase().start()
+    try:
+        client = create_client(fake.url, "test-anon-key")
+        fake.seed("projects", [{"id": "proj-1", "title": "Style"}])
+        inspection = {"id": "insp-1", "data": {"qcMeasurementTable": TABLE, "globalMasterTolerance": "1"}}
+        projects = ProjectService(client)
+        asyncio.run(projects.save("proj-1", {"inspections": [inspection]}, []))
+
+        cache = SheetCache()
+        monkeypatch.setattr(measurements, "get_sheet_cache", lambda: cache)
+        monkeypatch.setattr(SheetCache, "key", lambda *args: pytest.fail("saved sheets are not hashed"))
+        service = MeasurementService(client)
+
+        first = asyncio.run(service.check_item("proj-1", "inspections", "insp-1"))
+        assert first["summary"]["out"] == 1
+        assert asyncio.run(service.check_item("proj-1", "inspections", "insp-1")) == first
+        assert len(cache._items) == 1
+
+        table = {"rows": [{**TABLE["rows"][0], "tolerancePlus": "1/8"}, TABLE["rows"][1]]}
+        inspection["data"]["qcMeasurementTable"] = table
+        asyncio.run(projects.save("proj-1", {"inspections": [inspection]}, []))
+        assert asyncio.run(service.check_item("proj-1", "inspections", "insp-1"))["summary"]["out"] == 2
+        assert len(cache._items) == 2
+        assert asyncio.run(service.check_item("proj-1", "inspections", "missing")) is None
+    finally:
+        fake.stop()
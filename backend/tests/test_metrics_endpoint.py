@@ -0,0 +1,32 @@
+"""/metrics is served only to scrapers holding the metrics token."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.factory import create_app
+
+
+@pytest.fixture
+def app_with(monkeypatch):
+    def build(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        get_settings.cache_clear()
+        return TestClient(create_app())
+
+    yield build
+    get_settings.cache_clear()
+
+
+def test_metrics_need_the_token(app_with):
+    client = app_with(METRICS_TOKEN="scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "fcbl_" in response.text
+
+
+def test_metrics_are_not_mounted_without_a_token(app_with):
+    assert app_with().get("/metrics").status_code == 404
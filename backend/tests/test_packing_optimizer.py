@@ -0,0 +1,86 @@
+"""Carton counts and container loads, against hand-computed plans."""
+import pytest
+
+from app.services.packing_optimizer import (
+    CONTAINERS, CartonLoad, carton_counts, load_containers, packing_ratio, plan_style, recommend_containers,
+)
+
+NAVY = {"S": 30, "M": 50, "L": 50, "XL": 25}
+RATIO = {"S": 1, "M": 2, "L": 2, "XL": 1}
+
+
+def test_cartons_are_assorted_then_solid_then_mixed():
+    colors = carton_counts({"NAVY": NAVY, "RED": {"M": 30}}, units_per_carton=12, ratio=RATIO)
+    # NAVY: 2 sets of 6 a carton, 12 cartons take S24 M48 L48 XL24; S6 M2 L2 XL1 share one mixed carton
+    # RED: not the ratio's sizes, so 2 solid cartons of 12 and 6 pieces in a mixed one
+    assert colors == [
+        {"color": "NAVY", "pieces": 155, "assorted": 12, "solid": 0, "mixed": 1, "cartons": 13},
+        {"color": "RED", "pieces": 30, "assorted": 0, "solid": 2, "mixed": 1, "cartons": 3},
+    ]
+    # Solid packing: S 30 = 2 cartons + 6, M 50 = 4 + 2, L 4 + 2, XL 25 = 2 + 1; 11 odd pieces, one mixed carton
+    assert carton_counts({"NAVY": NAVY}, 12, {})[0] == \
+        {"color": "NAVY", "pieces": 155, "assorted": 0, "solid": 12, "mixed": 1, "cartons": 13}
+
+
+def test_a_style_is_planned_from_its_packing_list():
+    style = {
+        "id": "s1", "title": "Crew neck",
+        "packing": {
+            "boxLengthCm": 60, "boxWidthCm": 40, "boxHeightCm": 30, "netWeight": 155, "netWeightUnit": "KG",
+            "summaryRows": [{"colorRef": "NAVY", "sizes": NAVY}],
+            "boxDetails": [
+                {"seqRange": "1-8", "size": "S", "ratio": 1, "unitsPerBox": 24},
+                {"seqRange": "1-8", "size": "M", "ratio": 2},
+                {"seqRange": "1-8", "size": "L", "ratio": 2},
+                {"seqRange": "1-8", "size": "XL", "ratio": 1},
+                {"seqRange": "9", "size": "S", "ratio": 6},
+            ],
+        },
+    }
+    assert packing_ratio(style["packing"]) == RATIO
+
+    plan, load = plan_style(style, defaults={"carton_tare_kg": 1.0, "max_carton_kg": 20.0})
+    # 1 kg a piece: a carton holds 19 (not 24) under 20 kg with its tare, i.e. 3 sets;
+    # 8 assorted cartons, then S6 M2 L2 XL1 in one mixed carton
+    assert (plan["units_per_carton"], plan["piece_weight_kg"], plan["cartons"]) == (19, 1.0, 9)
+    assert plan["colors"][0]["assorted"] == 8
+    assert (plan["gross_weight_kg"], plan["cbm"]) == (164.0, 0.648)
+    assert load == CartonLoad("s1", 60, 40, 30, pytest.approx(164 / 9), 9)
+
+
+def test_containers_take_whole_cartons_up_to_their_payload():
+    cube = CartonLoad("cube", 100, 100, 100, 10, 25)
+    # 20' standard, 589 x 235 x 239: 5 x 2 x 2 one-metre cartons
+    loads, left = load_containers([cube], CONTAINERS["20GP"])
+    assert [load["cartons"] for load in loads] == [{"cube": 20}, {"cube": 5}]
+    assert left == {}
+    assert load_containers([cube], CONTAINERS["20GP"], max_containers=1)[1] == {"cube": 5}
+    # 2 t each: 14 make the 28.2 t payload
+    heavy = cube._replace(weight_kg=2000)
+    assert [load["carton_count"] for load in load_containers([heavy], CONTAINERS["20GP"])[0]] == [14, 11]
+
+
+def test_smaller_cartons_fill_the_space_larger_ones_leave():
+    big = CartonLoad("big", 100, 100, 100, 10, 20)
+    small = CartonLoad("small", 50, 50, 50, 2, 30)
+    loads, left = load_containers([small, big], CONTAINERS["20GP"])
+    # The 20 cubes take 500 x 200 x 200; the 89 cm in front of them hold 1 x 4 x 4 small cartons
+    assert [load["cartons"] for load in loads] == [{"big": 20, "small": 16}, {"small": 14}]
+    assert left == {}
+
+
+def test_cartons_are_laid_down_only_when_allowed():
+    tall = CartonLoad("tall", 50, 50, 240, 5, 10)
+    assert load_containers([tall], CONTAINERS["20GP"]) == ([], {"tall": 10})
+    loads, left = load_containers([tall], CONTAINERS["20GP"], upright=False)
+    assert (loads[0]["cartons"], left) == ({"tall": 10}, {})
+
+
+def test_recommended_mix_fills_high_cubes_and_ends_with_the_smallest_that_fits():
+    cube = CartonLoad("cube", 100, 100, 100, 10, 25)
+    assert [load["container"] for load in recommend_containers([cube])[0]] == ["40GP"]
+    # 48 a 40' container (12 x 2 x 2): two high cubes, then 4 cubes in a 20'
+    loads, left = recommend_containers([cube._replace(count=100)])
+    assert [(load["container"], load["carton_count"]) for load in loads] == \
+        [("40HC", 48), ("40HC", 48), ("20GP", 4)]
+    assert left == {}
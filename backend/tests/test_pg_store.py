@@ -0,0 +1,137 @@
+"""Database (asyncpg pool) and PgProjectService against a throwaway Postgres."""
+import asyncio
+import json
+from urllib.parse import urlsplit, urlunsplit
+
+import orjson
+import pytest
+
+from app.core.database import Database
+from app.core.resilience import UpstreamGuard, UpstreamUnavailable
+from app.services.pg_project_service import PgProjectService
+from tests.conftest import run_migrations
+
+psycopg2 = pytest.importorskip("psycopg2")
+pytest.importorskip("asyncpg")
+
+
+def as_user(url: str, user: str) -> str:
+    """`url` logging in as `user` (no password: the test server trusts local connections)."""
+    parts = urlsplit(url)
+    host = parts.netloc.rsplit("@", 1)[-1]
+    return urlunsplit(parts._replace(netloc=f"{user}@{host}"))
+
+
+@pytest.fixture(scope="module")
+def store_url(create_database):
+    """A migrated database with two committed styles; the pool sees only committed data."""
+    url = create_database()
+    result = run_migrations(url, "migrate")
+    assert result.returncode == 0, result.stdout + result.stderr
+    with psycopg2.connect(url) as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO public.projects (id, title, comments, updated_at) VALUES "
+                    "('proj-open', 'Open', %s, '2026-01-02'), ('proj-hidden', 'Hidden', '[]', '2026-01-01')",
+                    (json.dumps([{"id": "c1", "text": "hi"}]),))
+        # Like Supabase's authenticator: a login role that can only become the API roles
+        cur.execute("DO $$ BEGIN IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'fcbl_outsider') "
+                    "THEN CREATE ROLE fcbl_outsider LOGIN; END IF; END $$")
+    return url
+
+
+def run(database: Database, work):
+    async def go():
+        try:
+            return await work(PgProjectService(database, supabase=None))
+        finally:
+            await database.close()
+
+    return asyncio.run(go())
+
+
+def test_reads_pass_documents_through_as_json(store_url):
+    async def work(service):
+        listed = await service.get_all_json()
+        one = await service.get_by_id_json("proj-open")
+        missing = await service.get_by_id_json("proj-missing")
+        return listed, one, missing
+
+    listed, one, missing = run(Database(as_user(store_url, "authenticator"), min_size=1, max_size=2), work)
+    assert isinstance(listed, bytes) and isinstance(one, bytes)
+    assert [style["id"] for style in orjson.loads(listed)] == ["proj-open", "proj-hidden"]
+    assert orjson.loads(one)["comments"] == [{"id": "c1", "text": "hi"}]
+    assert missing is None
+
+
+def test_calls_run_as_the_api_role_under_its_policies(store_url):
+    with psycopg2.connect(store_url) as conn, conn.cursor() as cur:
+        cur.execute('DROP POLICY "Public access to projects" ON public.projects')
+        cur.execute("CREATE POLICY open_only ON public.projects FOR ALL TO anon USING (title = 'Open')")
+    try:
+        async def work(service):
+            async with service.database.connection() as conn:
+                who = await conn.fetchrow("SELECT current_user, auth.role()")
+            listed = orjson.loads(await service.get_all_json())
+            hidden = await service.get_by_id_json("proj-hidden")
+            saved_hidden = await service.save("proj-hidden", {"status": "X"})
+            return who, listed, hidden, saved_hidden
+
+        database = Database(as_user(store_url, "authenticator"), min_size=1, max_size=2, role="anon")
+        who, listed, hidden, saved_hidden = run(database, work)
+        assert tuple(who) == ("anon", "anon")
+        assert [style["id"] for style in listed] == ["proj-open"]
+        assert hidden is None and saved_hidden is None
+    finally:
+        with psycopg2.connect(store_url) as conn, conn.cursor() as cur:
+            cur.execute("DROP POLICY open_only ON public.projects")
+            cur.execute('CREATE POLICY "Public access to projects" ON public.projects '
+                        "FOR ALL TO anon, authenticated USING (true) WITH CHECK (true)")
+
+
+def test_saves_record_revisions_under_the_callers_name(store_url):
+    actor = {"id": "6f1c2e1a-0000-4000-8000-000000000001", "email": "qa@example.com"}
+
+    async def work(service):
+        return await service.save("proj-open", {"status": "SAMPLING", "comments": [{"id": "c2"}]}, actor=actor)
+
+    saved = run(Database(as_user(store_url, "authenticator"), min_size=1, max_size=2), work)
+    assert saved["status"] == "SAMPLING" and saved["comments"] == [{"id": "c2"}]
+    with psycopg2.connect(store_url) as conn, conn.cursor() as cur:
+        cur.execute("SELECT section, payload, actor_email FROM public.style_revisions "
+                    "WHERE project_id = 'proj-open' AND actor_id IS NOT NULL ORDER BY section")
+        assert cur.fetchall() == [("comments", [{"id": "c2"}], "qa@example.com"),
+                                  ("status", "SAMPLING", "qa@example.com")]
+
+
+def test_the_login_role_must_be_a_member_of_the_api_role(store_url):
+    import asyncpg
+
+    async def work(service):
+        with pytest.raises(asyncpg.exceptions.InsufficientPrivilegeError):
+            await service.get_all_json()
+
+    run(Database(as_user(store_url, "fcbl_outsider"), min_size=1, max_size=1, role="anon"), work)
+
+
+def test_an_empty_role_keeps_the_login_role(store_url):
+    async def work(service):
+        async with service.database.connection() as conn:
+            user = await conn.fetchval("SELECT current_user")
+        return user, orjson.loads(await service.get_all_json())
+
+    user, listed = run(Database(store_url, min_size=1, max_size=1, role=""), work)
+    assert user == urlsplit(store_url).username
+    assert len(listed) == 2
+
+
+def test_an_unreachable_server_is_an_upstream_failure():
+    guard = UpstreamGuard("postgres-test", max_concurrency=1, failure_threshold=1)
+    database = Database("postgresql://authenticator@127.0.0.1:9/postgres", min_size=1, max_size=1,
+                        guard=guard, timeout=2)
+
+    async def work(service):
+        with pytest.raises(UpstreamUnavailable) as error:
+            await service.get_all_json()
+        return error.value
+
+    assert run(database, work).reason == "connection failed"
+    assert guard.breaker.state == guard.breaker.OPEN
@@ -0,0 +1,31 @@
+"""ProjectService.export_json, against the fake Supabase."""
+import asyncio
+
+import orjson
+import pytest
+from supabase import create_client
+
+from app.services.project_service import ProjectService
+from benchmarks.fake_supabase import FakeSupabase
+
+
+@pytest.fixture
+def fake():
+    fake = FakeSupabase().start()
+    yield fake
+    fake.stop()
+
+
+async def export(service: ProjectService, page_size: int) -> bytes:
+    return b"".join([chunk async for chunk in service.export_json(page_size)])
+
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5])
+def test_exports_every_style_once_in_id_order(fake, count):
+    fake.seed("projects", [{"id": f"proj-{i}", "title": f"Style {i}", "comments": [{"id": "c"}]}
+                           for i in reversed(range(count))])
+    service = ProjectService(create_client(fake.url, "test-anon-key"))
+
+    exported = orjson.loads(asyncio.run(export(service, page_size=2)))
+    assert [style["id"] for style in exported] == [f"proj-{i}" for i in range(count)]
+    assert all(style["comments"] == [{"id": "c"}] for style in exported)
@@ -0,0 +1,82 @@
+"""Token buckets and the rate limit middleware."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.core import rate_limit
+from app.core.rate_limit import MemoryStore, RateLimitMiddleware
+from tests.test_audit_actor import SECRET, sign
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_buckets_refill_at_the_rate(clock):
+    store = MemoryStore()
+    take = lambda cost=1.0: asyncio.run(store.take("user:1", cost, rate=1.0, burst=3))  # noqa: E731
+
+    assert [take()[0] for _ in range(4)] == [True, True, True, False]
+    assert take(2.0) == (False, 0.0, 2.0)
+    clock[0] += 1.5
+    assert take() == (True, 0.5, 0.0)
+    clock[0] += 60
+    assert take()[1] == 2.0  # never above the burst
+
+
+def limited_app(store, **options) -> TestClient:
+    async def style(request):
+        return Response(status_code=304 if request.headers.get("if-none-match") else 200)
+
+    app = Starlette(routes=[Route("/api/v1/styles", style, methods=["GET", "POST"])])
+    app.add_middleware(RateLimitMiddleware, store=store, per_minute=60, burst=3, jwt_secret=SECRET, **options)
+    return TestClient(app)
+
+
+def test_callers_over_the_limit_get_429_with_retry_after(clock):
+    client = limited_app(MemoryStore())
+    assert client.post("/api/v1/styles").headers["ratelimit-remaining"] == "1"
+    response = client.post("/api/v1/styles")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": "Rate limit exceeded"}
+    assert client.get("/api/v1/styles").status_code == 200
+
+
+def test_not_modified_reads_are_refunded(clock):
+    store = MemoryStore()
+    client = limited_app(store)
+    # Ten reads from a bucket of three: each 304 costs 0.2
+    for _ in range(10):
+        assert client.get("/api/v1/styles", headers={"If-None-Match": '"v1"'}).status_code == 304
+    assert store._buckets["ip:testclient"][0] == pytest.approx(3 - 10 * 0.2)
+    assert client.post("/api/v1/styles").status_code == 429
+
+
+def test_callers_are_keyed_by_verified_subject_else_client_ip(clock):
+    middleware = RateLimitMiddleware(None, MemoryStore(), jwt_secret=SECRET)
+
+    def key(token=None, forwarded=None):
+        headers = []
+        if token:
+            headers.append((b"authorization", f"Bearer {token}".encode()))
+        if forwarded:
+            headers.append((b"x-forwarded-for", forwarded.encode()))
+        return middleware.client_key({"headers": headers, "client": ("10.0.0.9", 5000)})
+
+    valid = sign({"sub": "user-1", "exp": 2e9})
+    assert key(valid) == "user:user-1"
+    assert key(sign({"sub": "user-1", "exp": 2e9}, secret="forged")) == "ip:10.0.0.9"
+    assert key(sign({"sub": "user-1", "exp": 1})) == "ip:10.0.0.9"
+    assert key() == "ip:10.0.0.9"
+    assert key(forwarded="203.0.113.7") == "ip:10.0.0.9"
+    middleware.trust_forwarded_for = True
+    assert key(forwarded="203.0.113.7, 10.0.0.1") == "ip:203.0.113.7"
+    assert key(valid, forwarded="203.0.113.7") == "user:user-1"
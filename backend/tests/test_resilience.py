@@ -0,0 +1,165 @@
+"""Upstream guard (circuit breaker, admission slots) and StaleCache."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.resilience import CircuitBreaker, StaleCache, UpstreamGuard, UpstreamUnavailable, _GuardedTransport
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def slot_free(guard: UpstreamGuard) -> bool:
+    if not guard._slots.acquire(blocking=False):
+        return False
+    guard._slots.release()
+    return True
+
+
+def guarded_client(guard: UpstreamGuard, handler) -> httpx.Client:
+    return httpx.Client(base_url="http://upstream", transport=_GuardedTransport(httpx.MockTransport(handler), guard))
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=10, clock=clock)
+
+    assert breaker.record(False) == breaker.CLOSED
+    assert breaker.record(True) == breaker.CLOSED  # a success resets the count
+    for _ in range(2):
+        assert breaker.record(False) == breaker.CLOSED
+    assert breaker.record(False) == breaker.OPEN
+    assert breaker.retry_after() == 10
+
+    clock.now += 4
+    assert breaker.retry_after() == 6
+    clock.now += 6
+    assert breaker.retry_after() == 0  # the probe
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.retry_after() == 1.0  # only one probe at a time
+
+    assert breaker.record(False) == breaker.OPEN  # a failed probe opens it again
+    clock.now += 10
+    assert breaker.retry_after() == 0
+    assert breaker.record(True) == breaker.CLOSED
+    assert breaker.retry_after() == 0
+
+
+def test_a_probe_that_never_ran_lets_the_next_call_probe():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=1, clock=clock)
+    breaker.record(False)
+    clock.now += 1
+    assert breaker.retry_after() == 0
+    breaker.release_probe()
+    assert breaker.retry_after() == 0
+
+
+def test_refused_calls_while_open_hold_no_slot():
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=0.01, failure_threshold=1)
+    guard.record(False)
+    for _ in range(3):
+        with pytest.raises(UpstreamUnavailable) as error:
+            guard.admit()
+        assert error.value.reason == "circuit open"
+    assert slot_free(guard)
+
+
+def test_slot_is_given_back_when_the_transport_fails():
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=0.01)
+
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    with guarded_client(guard, handler) as client:
+        with pytest.raises(UpstreamUnavailable) as error:
+            client.get("/rows")
+    assert error.value.reason == "connection failed"
+    assert guard.breaker.failures == 1
+    assert slot_free(guard)
+
+
+@pytest.mark.parametrize("status, unavailable", [(503, True), (500, False), (404, False), (200, False)])
+def test_slot_is_given_back_after_any_answer(status, unavailable):
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=0.01)
+
+    with guarded_client(guard, lambda request: httpx.Response(status, json={"ok": status})) as client:
+        if unavailable:
+            with pytest.raises(UpstreamUnavailable):
+                client.get("/rows")
+        else:
+            assert client.get("/rows").status_code == status
+    assert guard.breaker.failures == (1 if status >= 500 else 0)
+    assert slot_free(guard)
+
+
+class Body(httpx.SyncByteStream):
+    """A response body read from the network, as the real transport returns it."""
+
+    def __iter__(self):
+        yield b"[]"
+
+
+def test_slot_is_held_until_a_streamed_body_is_closed():
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=0.01)
+
+    with guarded_client(guard, lambda request: httpx.Response(200, stream=Body())) as client:
+        with client.stream("GET", "/rows") as response:
+            assert not slot_free(guard)
+            assert response.read() == b"[]"
+    assert slot_free(guard)
+
+
+def test_blocking_admission_on_the_event_loop_does_not_wait():
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=5)
+    guard.admit()
+
+    async def admit_on_loop():
+        started = time.monotonic()
+        with pytest.raises(UpstreamUnavailable):
+            guard.admit()
+        return time.monotonic() - started
+
+    assert asyncio.run(admit_on_loop()) < 1
+    guard.release()
+
+
+def test_async_admission_waits_for_a_slot():
+    guard = UpstreamGuard("test", max_concurrency=1, queue_timeout=1)
+    guard.admit()
+
+    async def admit_when_released():
+        asyncio.get_running_loop().call_later(0.05, guard.release)
+        await guard.admit_async()
+
+    asyncio.run(admit_when_released())
+    assert not slot_free(guard)
+    guard.release()
+
+
+def test_stale_cache_evicts_the_least_recently_stored():
+    cache = StaleCache("test", max_bytes=10)
+    cache.put("a", b"aaaa", "1")
+    cache.put("b", b"bbbb", "1")
+    cache.put("a", b"aaa", "2")  # stored again: now the newest
+    cache.put("c", b"cccc", "1")
+
+    assert cache.get("b") is None
+    assert cache.get("a")[:2] == (b"aaa", "2")
+    assert cache.get("c")[:2] == (b"cccc", "1")
+    assert cache.size == 7
+
+    cache.put("huge", b"x" * 11, "1")  # larger than the whole cache: not kept
+    assert cache.get("huge") is None
+    assert cache.size == 7
+
+    cache.discard("a", "missing")
+    assert cache.get("a") is None
+    assert cache.size == 4
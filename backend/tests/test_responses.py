@@ -0,0 +1,75 @@
+"""orjson responses and style reads passed through from PostgREST."""
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import orjson
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from starlette.responses import Response
+from supabase import create_client
+
+from app.api.v1.routes import styles
+from app.core.responses import conditional, dumps, envelope, etag
+from app.factory import create_app
+from app.services.project_service import PROJECT_COLUMNS, ProjectService
+from benchmarks.fake_supabase import FakeSupabase
+
+
+def test_dumps_handles_what_the_stdlib_encoder_would():
+    assert orjson.loads(dumps({
+        "when": datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc),
+        "price": Decimal("1.50"), "sizes": {"M"}, 7: "seven",
+    })) == {"when": "2026-01-02T03:04:00+00:00", "price": 1.5, "sizes": ["M"], "7": "seven"}
+
+
+def test_envelope_wraps_encoded_json_without_parsing_it():
+    response = envelope(b'[{"id":"proj-1"}]', next_cursor=5)
+    assert response.body == b'{"data":[{"id":"proj-1"}],"next_cursor":5,"error":null}'
+    assert response.media_type == "application/json"
+
+
+def test_conditional_answers_304_for_a_known_tag():
+    def request(if_none_match=None):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+    body = b'{"data":1,"error":null}'
+    tag = etag(body)
+    assert conditional(request(), Response(body)).headers["etag"] == tag
+    # Compression weakens the tag on the way out; the client sends it back weak
+    for sent in (tag, f"W/{tag}", f'"other", W/{tag}', "*"):
+        assert conditional(request(sent), Response(body)).status_code == 304
+    assert conditional(request('"other"'), Response(body)).status_code == 200
+
+
+def stored(**values) -> dict:
+    """A projects row with every column, as the database keeps it."""
+    return {**{column: default() for _, column, default in PROJECT_COLUMNS.columns if default}, **values}
+
+
+def test_style_reads_pass_postgrest_json_through_in_the_api_shape():
+    fake = FakeSupabase().start()
+    try:
+        fake.seed("projects", [
+            stored(id="proj-1", title="Crew neck", po_numbers=[{"number": "PO-1"}],
+                   updated_at="2026-01-02T00:00:00+00:00"),
+            stored(id="proj-2", title="Cardigan", status="SAMPLING", updated_at="2026-01-03T00:00:00+00:00"),
+        ])
+        service = ProjectService(create_client(fake.url, "test-anon-key"))
+        app = create_app()
+        app.dependency_overrides[styles.get_project_service] = lambda: service
+        client = TestClient(app)
+
+        mapped = asyncio.run(service.get_all())
+        listed = client.get("/api/v1/styles")
+        assert listed.json() == {"data": mapped, "error": None}
+        assert [style["id"] for style in mapped] == ["proj-2", "proj-1"]
+        assert mapped[1]["poNumbers"] == [{"number": "PO-1"}]
+
+        one = client.get("/api/v1/styles/proj-1")
+        assert one.json() == {"data": asyncio.run(service.get_by_id("proj-1")), "error": None}
+        assert client.get("/api/v1/styles/proj-1", headers={"If-None-Match": one.headers["etag"]}).status_code == 304
+        assert client.get("/api/v1/styles/proj-9").status_code == 404
+    finally:
+        fake.stop()
@@ -0,0 +1,75 @@
+"""run_migration.py against a throwaway Postgres (see conftest.py)."""
+import json
+import shutil
+
+import pytest
+
+from run_migration import MIGRATIONS_DIR, discover, split_statements
+from tests.conftest import run_migrations
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+
+def test_split_statements_skips_quoted_semicolons():
+    sql = """
+    -- a comment; not a statement
+    CREATE FUNCTION f() RETURNS TEXT LANGUAGE sql AS $body$ SELECT 'a;b'; $body$;
+    SELECT "odd;name" FROM t /* ; */;
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 2
+    assert statements[0].endswith("$body$ SELECT 'a;b'; $body$")
+    assert statements[1] == 'SELECT "odd;name" FROM t /* ; */'
+
+
+def test_migrate_applies_every_migration_once(create_database):
+    url = create_database()
+
+    result = run_migrations(url, "migrate")
+    assert result.returncode == 0, result.stdout + result.stderr
+    with psycopg2.connect(url) as conn, conn.cursor() as cur:
+        cur.execute("SELECT version, state FROM public.schema_migrations ORDER BY version")
+        recorded = dict(cur.fetchall())
+    assert recorded == {m.version: "applied" for m in discover()}
+
+    again = run_migrations(url, "migrate")
+    assert again.returncode == 0
+    assert "Database is up to date." in again.stdout
+
+
+def test_backfill_moves_existing_sections(create_database):
+    url = create_database()
+    assert run_migrations(url, "migrate", "--to", "015").returncode == 0
+    comments = [{"id": "c1", "text": "first"}, {"id": "c2", "text": "second"}]
+    with psycopg2.connect(url) as conn, conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO public.projects (id, title, comments) VALUES ('proj-1', 'Old style', %s)",
+            (json.dumps(comments),),
+        )
+
+    result = run_migrations(url, "migrate")
+    assert result.returncode == 0, result.stdout + result.stderr
+    with psycopg2.connect(url) as conn, conn.cursor() as cur:
+        cur.execute("SELECT comments FROM public.projects WHERE id = 'proj-1'")
+        assert cur.fetchone()[0] is None
+        cur.execute("SELECT comments FROM public.projects_full WHERE id = 'proj-1'")
+        assert cur.fetchone()[0] == comments
+        cur.execute("SELECT state, backfill_cursor FROM public.schema_migrations WHERE version = '016'")
+        assert cur.fetchone() == ("applied", "proj-1")
+
+
+def test_edited_migration_is_refused(create_database, tmp_path):
+    url = create_database()
+    directory = tmp_path / "migrations"
+    shutil.copytree(MIGRATIONS_DIR, directory)
+    assert run_migrations(url, "--dir", str(directory), "migrate").returncode == 0
+
+    edited = directory / "012_activity_log.sql"
+    edited.write_text(edited.read_text() + "\nSELECT 1;\n")
+    status = run_migrations(url, "--dir", str(directory), "status")
+    assert "012      CHANGED" in status.stdout
+
+    refused = run_migrations(url, "--dir", str(directory), "migrate")
+    assert refused.returncode == 1
+    assert "Refusing to migrate" in refused.stdout
+
@@ -0,0 +1,133 @@
+"""save_style (migration 019) and the revisions the database records (013, 016)."""
+import json
+
+import pytest
+
+from tests.conftest import act_as, add_style, at_commit
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+USER_ID = "6f1c2e1a-0000-4000-8000-000000000001"
+
+
+def change_seq(cur, project_id: str) -> int:
+    cur.execute("SELECT change_seq FROM public.projects WHERE id = %s", (project_id,))
+    return cur.fetchone()[0]
+
+
+def save_style(cur, project_id: str, values: dict):
+    """One save, as if in its own transaction."""
+    cur.execute("SELECT public.save_style(%s, %s::jsonb)", (project_id, json.dumps(values)))
+    stored = cur.fetchone()[0]
+    at_commit(cur)
+    return stored
+
+
+def revisions_of(cur, project_id: str, section: str = None):
+    cur.execute("SELECT section, kind, depth, payload FROM public.style_revisions "
+                "WHERE project_id = %s AND (%s::text IS NULL OR section = %s) ORDER BY id",
+                (project_id, section, section))
+    return cur.fetchall()
+
+
+def test_saves_values_sections_and_their_revisions(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r1")
+    seq = change_seq(cur, "proj-r1")
+    act_as(cur, "anon")
+
+    stored = save_style(cur, "proj-r1", {"status": "SAMPLING", "comments": [{"id": "c1", "text": "hi"}]})
+    assert stored["status"] == "SAMPLING"
+    assert stored["comments"] == [{"id": "c1", "text": "hi"}]
+    assert stored["change_seq"] > seq
+    # The value each section replaced is kept as a baseline before the first change
+    # Sections are recorded at commit
+    assert revisions_of(cur, "proj-r1") == [
+        ("status", "snapshot", 0, "DRAFT"),
+        ("status", "snapshot", 0, "SAMPLING"),
+        ("comments", "snapshot", 0, []),
+        ("comments", "snapshot", 0, [{"id": "c1", "text": "hi"}]),
+    ]
+    assert save_style(cur, "proj-missing", {"status": "X"}) is None
+
+
+def test_later_changes_are_diffs_against_the_head(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r2")
+    comments = [{"id": f"c{i}", "text": "a long comment " * 5} for i in range(3)]
+    save_style(cur, "proj-r2", {"comments": comments})
+    save_style(cur, "proj-r2", {"comments": comments + [{"id": "c3", "text": "new"}]})
+    save_style(cur, "proj-r2", {"comments": comments[:1]})
+
+    assert revisions_of(cur, "proj-r2", "comments")[2:] == [
+        ("comments", "diff", 1, [["a", [], [{"id": "c3", "text": "new"}]]]),
+        ("comments", "diff", 2, [["t", [], 1]]),
+    ]
+
+
+def test_a_write_without_history_is_stored_as_a_snapshot(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r3")
+    save_style(cur, "proj-r3", {"po_numbers": [{"number": "PO-1", "quantity": 100}]})
+    # A write the triggers did not see (a bulk load with them disabled)
+    cur.execute("ALTER TABLE public.projects DISABLE TRIGGER trg_record_style_revisions")
+    cur.execute("""UPDATE public.projects SET po_numbers = '[{"number": "PO-1", "quantity": 80}]' """
+                "WHERE id = 'proj-r3'")
+    cur.execute("ALTER TABLE public.projects ENABLE TRIGGER trg_record_style_revisions")
+    save_style(cur, "proj-r3", {"po_numbers": [{"number": "PO-1", "quantity": 60}]})
+
+    # Not a diff against 100, which the replay would rebuild from
+    assert revisions_of(cur, "proj-r3", "po_numbers")[-1] == \
+        ("po_numbers", "snapshot", 0, [{"number": "PO-1", "quantity": 60}])
+
+
+def test_revisions_name_the_caller_from_its_jwt(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r4")
+    cur.execute("SELECT set_config('role', 'authenticated', true), set_config('request.jwt.claims', %s, true)",
+                (json.dumps({"role": "authenticated", "sub": USER_ID, "email": "qa@example.com"}),))
+    cur.execute("UPDATE public.projects SET status = 'SAMPLING' WHERE id = 'proj-r4'")
+
+    cur.execute("SELECT payload, actor_id::text, actor_email FROM public.style_revisions "
+                "WHERE project_id = 'proj-r4' ORDER BY id")
+    assert cur.fetchall() == [("DRAFT", None, None), ("SAMPLING", USER_ID, "qa@example.com")]
+
+
+def test_unknown_columns_write_nothing(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r5")
+    with pytest.raises(psycopg2.errors.UndefinedColumn):
+        save_style(cur, "proj-r5", {"status": "SAMPLING", "no_such_column": 1})
+
+
+def test_api_roles_can_only_read_history(db):
+    cur = db.cursor()
+    add_style(cur, "proj-r6")
+    act_as(cur, "anon")
+    save_style(cur, "proj-r6", {"status": "SAMPLING"})
+    cur.execute("SAVEPOINT saved")
+    for statement in ("UPDATE public.style_revisions SET payload = '\"forged\"'",
+                      "DELETE FROM public.style_revisions",
+                      "INSERT INTO public.style_revisions (project_id, section, kind) VALUES ('proj-r6', 's', 'diff')",
+                      "SELECT public.append_style_revision('proj-r6', 'status', '\"A\"', '\"B\"')"):
+        with pytest.raises(psycopg2.errors.InsufficientPrivilege):
+            cur.execute(statement)
+        cur.execute("ROLLBACK TO SAVEPOINT saved")
+    assert len(revisions_of(cur, "proj-r6")) == 2
+
+
+def test_history_follows_the_access_rules_of_its_style(db):
+    cur = db.cursor()
+    add_style(cur, "proj-open", "Open")
+    add_style(cur, "proj-hidden", "Hidden")
+    for project_id in ("proj-open", "proj-hidden"):
+        save_style(cur, project_id, {"status": "SAMPLING"})
+    cur.execute('DROP POLICY "Public access to projects" ON public.projects')
+    cur.execute("CREATE POLICY open_only ON public.projects FOR ALL TO anon USING (title = 'Open')")
+    act_as(cur, "anon")
+
+    cur.execute("SELECT DISTINCT project_id FROM public.style_revisions")
+    assert [row[0] for row in cur.fetchall()] == ["proj-open"]
+    cur.execute("SELECT count(*) FROM public.style_revisions_as_of('proj-hidden', now())")
+    assert cur.fetchone()[0] == 0
+    assert save_style(cur, "proj-hidden", {"status": "X"}) is None
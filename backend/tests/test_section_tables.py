@@ -0,0 +1,149 @@
+"""Section item tables (migration 016): access rules, item keys and locking."""
+import json
+
+import pytest
+
+from tests.conftest import act_as, add_style, at_commit
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+
+def save_sections(cur, project_id: str, sections: dict):
+    cur.execute("SELECT public.save_project_sections(%s, %s::jsonb)", (project_id, json.dumps(sections)))
+    return cur.fetchone()[0]
+
+
+def test_anon_saves_sections_of_a_style(db):
+    cur = db.cursor()
+    add_style(cur, "proj-s1")
+    act_as(cur, "anon")
+
+    stored = save_sections(cur, "proj-s1", {"comments": [{"id": "c1", "text": "hi"}]})
+    assert stored["comments"] == [{"id": "c1", "text": "hi"}]
+    assert stored["inspections"] == []
+    assert save_sections(cur, "proj-missing", {"comments": []}) is None
+
+
+def test_repeated_item_ids_are_all_kept(db):
+    cur = db.cursor()
+    add_style(cur, "proj-s2")
+    items = [{"id": "a", "n": 1}, {"id": "a", "n": 2}, {"n": 3}, {"id": "b", "n": 4}]
+
+    stored = save_sections(cur, "proj-s2", {"inspections": items})
+    assert stored["inspections"] == items
+    cur.execute("SELECT item_id FROM public.project_inspections WHERE project_id = 'proj-s2' ORDER BY position")
+    assert [row[0] for row in cur.fetchall()] == ["a", "#2", "#3", "b"]
+
+    # Resaving the same list rewrites no item row
+    locations = "SELECT array_agg(ctid::text ORDER BY position) FROM public.project_inspections WHERE project_id = 'proj-s2'"
+    cur.execute(locations)
+    before = cur.fetchone()[0]
+    save_sections(cur, "proj-s2", {"inspections": items})
+    cur.execute(locations)
+    assert cur.fetchone()[0] == before
+
+
+@pytest.mark.parametrize("role", ["anon", "authenticated"])
+def test_direct_item_writes_are_recorded_at_commit(db, role):
+    cur = db.cursor()
+    add_style(cur, "proj-s3")
+    comment = {"id": "c1", "text": "a long comment " * 5}
+    save_sections(cur, "proj-s3", {"comments": [comment]})
+    at_commit(cur)
+    act_as(cur, role)
+    cur.execute("""INSERT INTO public.project_comments (project_id, item_id, position, data) """
+                """VALUES ('proj-s3', 'c2', 1, '{"id": "c2"}')""")
+    cur.execute("UPDATE public.project_comments SET data = %s WHERE item_id = 'c1'",
+                (json.dumps({**comment, "done": True}),))
+    at_commit(cur)
+
+    cur.execute("SELECT kind, payload FROM public.style_revisions WHERE project_id = 'proj-s3' ORDER BY id DESC LIMIT 1")
+    assert cur.fetchone() == ("diff", [["r", [0, "done"], True], ["a", [], [{"id": "c2"}]]])
+    cur.execute("SELECT comments FROM public.projects_full WHERE id = 'proj-s3'")
+    assert cur.fetchone()[0] == [{**comment, "done": True}, {"id": "c2"}]
+
+
+@pytest.mark.parametrize("statement", [
+    "INSERT INTO public.style_section_changes (project_id, section) VALUES ('proj-s4', 'comments')",
+    "INSERT INTO public.style_section_edits (project_id, section, previous, updated_at) "
+    "VALUES ('proj-s4', 'comments', '[]', now())",
+    "SELECT count(*) FROM public.style_section_edits",
+])
+@pytest.mark.parametrize("role", ["anon", "authenticated"])
+def test_api_roles_cannot_write_the_bookkeeping(db, statement, role):
+    cur = db.cursor()
+    add_style(cur, "proj-s4")
+    act_as(cur, role)
+    with pytest.raises(psycopg2.errors.InsufficientPrivilege):
+        cur.execute(statement)
+
+
+def test_section_saves_bump_the_document_but_not_the_row(db):
+    cur = db.cursor()
+    add_style(cur, "proj-s5")
+    cur.execute("SELECT updated_at, change_seq FROM public.projects WHERE id = 'proj-s5'")
+    row_before = cur.fetchone()
+    cur.execute("SELECT public.save_style('proj-s5', %s::jsonb)",
+                (json.dumps({"comments": [{"id": "c1"}], "updated_at": "2030-01-01T00:00:00Z"}),))
+    at_commit(cur)
+
+    cur.execute("SELECT updated_at, change_seq FROM public.projects WHERE id = 'proj-s5'")
+    assert cur.fetchone() == row_before
+    cur.execute("SELECT updated_at::text, change_seq > %s FROM public.projects_full WHERE id = 'proj-s5'",
+                (row_before[1],))
+    assert cur.fetchone() == ("2030-01-01 00:00:00+00", True)
+    # Settled at once: NOW() is when the test's transaction began
+    cur.execute("SELECT project_id FROM public.style_changes_since(%s, 10, '-1 hour')", (row_before[1],))
+    assert [row[0] for row in cur.fetchall()] == ["proj-s5"]
+
+
+def test_a_section_save_does_not_wait_for_the_style_row(migrated_database):
+    holder = psycopg2.connect(migrated_database)
+    saver = psycopg2.connect(migrated_database)
+    try:
+        with holder.cursor() as cur:
+            add_style(cur, "proj-s6")
+        holder.commit()
+        with holder.cursor() as cur:
+            # Another save of the style's fields, still open
+            cur.execute("UPDATE public.projects SET status = 'SAMPLING' WHERE id = 'proj-s6'")
+        with saver.cursor() as cur:
+            act_as(cur, "anon")
+            cur.execute("SET LOCAL lock_timeout = '2s'")
+            cur.execute("SELECT public.save_style('proj-s6', %s::jsonb)",
+                        (json.dumps({"comments": [{"id": "c1"}], "updated_at": "2030-01-01T00:00:00Z"}),))
+            assert cur.fetchone()[0]["comments"] == [{"id": "c1"}]
+        saver.commit()
+        holder.commit()
+    finally:
+        for conn in (holder, saver):
+            conn.rollback()
+        with holder.cursor() as cur:
+            cur.execute("DELETE FROM public.projects WHERE id = 'proj-s6'")
+        holder.commit()
+        holder.close()
+        saver.close()
+
+
+def test_items_follow_the_access_rules_of_their_style(db):
+    cur = db.cursor()
+    add_style(cur, "proj-open", "Open")
+    add_style(cur, "proj-hidden", "Hidden")
+    save_sections(cur, "proj-open", {"comments": [{"id": "c1"}]})
+    save_sections(cur, "proj-hidden", {"comments": [{"id": "c2"}]})
+    # Narrow the projects policy for this transaction only
+    cur.execute('DROP POLICY "Public access to projects" ON public.projects')
+    cur.execute("CREATE POLICY open_only ON public.projects FOR ALL TO anon USING (title = 'Open')")
+    act_as(cur, "anon")
+
+    cur.execute("SELECT project_id FROM public.project_comments ORDER BY project_id")
+    assert [row[0] for row in cur.fetchall()] == ["proj-open"]
+    assert save_sections(cur, "proj-hidden", {"comments": []}) is None
+    cur.execute("SAVEPOINT hidden")
+    with pytest.raises(psycopg2.errors.InsufficientPrivilege):
+        cur.execute("INSERT INTO public.project_comments (project_id, item_id, position, data) "
+                    "VALUES ('proj-hidden', 'x', 0, '{}')")
+    cur.execute("ROLLBACK TO SAVEPOINT hidden")
+    act_as(cur, "service_role")
+    cur.execute("SELECT count(*) FROM public.project_comments WHERE project_id = 'proj-hidden'")
+    assert cur.fetchone()[0] == 1
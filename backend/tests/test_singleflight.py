@@ -0,0 +1,70 @@
+"""Coalescing of concurrent calls."""
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("style-1", lambda i=i: fetch(i)) for i in range(5)),
+                                       flight.do("style-2", lambda: fetch("other")))
+        return results, flight.in_flight()
+
+    results, in_flight = asyncio.run(run())
+    assert results == [0, 0, 0, 0, 0, "other"]
+    assert calls == [0, "other"]
+    assert in_flight == 0
+
+
+def test_an_exception_reaches_every_waiter_and_frees_the_key():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream is down")
+
+    async def run():
+        outcomes = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert flight.in_flight() == 0
+
+        async def recovered():
+            return "ok"
+
+        # The next call starts afresh instead of joining the failed one
+        return outcomes, await flight.do("key", recovered)
+
+    outcomes, after = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(o, RuntimeError) and str(o) == "upstream is down" for o in outcomes)
+    assert after == "ok"
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, flight.in_flight()
+
+    assert asyncio.run(run()) == ("done", 0)
@@ -0,0 +1,100 @@
+"""The offline-sync change feed (migration 014) and GET /styles/changes."""
+import pytest
+from fastapi.testclient import TestClient
+from supabase import create_client
+
+from app.api.v1.routes import styles
+from app.config import get_settings
+from app.factory import create_app
+from app.services.audit_service import AuditService, get_audit_service
+from app.services.project_service import ProjectService
+from benchmarks.fake_supabase import FakeSupabase
+from tests.conftest import add_style
+
+
+def changes(cur, since: int, limit: int = 500, settle: str = "-1 hour"):
+    """(id, deleted) of each change after `since`, and the cursor to continue from.
+    Inside one transaction NOW() stands still, so a negative settle lets its own writes through."""
+    cur.execute("SELECT change_seq, project_id, deleted FROM public.style_changes_since(%s, %s, %s::interval)",
+                (since, limit, settle))
+    rows = cur.fetchall()
+    return [(project_id, deleted) for _, project_id, deleted in rows], (rows[-1][0] if rows else since)
+
+
+def cursor_now(cur) -> int:
+    cur.execute("SELECT last_value FROM public.style_change_seq")
+    return cur.fetchone()[0]
+
+
+def test_a_cursor_sees_updates_and_deletes_once(db):
+    cur = db.cursor()
+    since = cursor_now(cur)
+    add_style(cur, "proj-c1")
+    add_style(cur, "proj-c2")
+    page, cursor = changes(cur, since)
+    assert page == [("proj-c1", False), ("proj-c2", False)]
+
+    cur.execute("UPDATE public.projects SET status = 'SAMPLING' WHERE id = 'proj-c1'")
+    cur.execute("DELETE FROM public.projects WHERE id = 'proj-c2'")
+    page, cursor = changes(cur, cursor)
+    assert page == [("proj-c1", False), ("proj-c2", True)]
+    assert changes(cur, cursor) == ([], cursor)
+
+    # A re-created id replaces its tombstone
+    add_style(cur, "proj-c2")
+    assert changes(cur, since)[0] == [("proj-c1", False), ("proj-c2", False)]
+
+
+def test_changes_younger_than_the_settle_time_are_held_back(db):
+    cur = db.cursor()
+    since = cursor_now(cur)
+    add_style(cur, "proj-c3")
+    cur.execute("DELETE FROM public.projects WHERE id = 'proj-c3'")
+    # Still in flight as far as a reader can tell: the cursor does not move past them
+    assert changes(cur, since, settle="0 seconds") == ([], since)
+    assert changes(cur, since)[0] == [("proj-c3", True)]
+
+
+def test_pages_interleave_styles_and_tombstones_in_sequence_order(db):
+    cur = db.cursor()
+    since = cursor_now(cur)
+    for project_id in ("proj-p1", "proj-p2", "proj-p3"):
+        add_style(cur, project_id)
+    cur.execute("DELETE FROM public.projects WHERE id = 'proj-p1'")
+    cur.execute("UPDATE public.projects SET status = 'SAMPLING' WHERE id = 'proj-p2'")
+
+    first, cursor = changes(cur, since, limit=2)
+    second, cursor = changes(cur, cursor, limit=2)
+    assert first + second == [("proj-p3", False), ("proj-p1", True), ("proj-p2", False)]
+    assert changes(cur, cursor, limit=2)[0] == []
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setenv("STYLE_CHANGES_SETTLE_SECONDS", "0")
+    get_settings.cache_clear()
+    fake = FakeSupabase().start()
+    yield fake
+    fake.stop()
+    get_settings.cache_clear()
+
+
+def test_the_route_pages_through_the_feed_in_the_api_shape(fake):
+    fake.seed("projects", [{"id": f"proj-{i}", "title": f"Style {i}", "style_number": f"ST-{i}"} for i in range(3)])
+    app = create_app()
+    app.dependency_overrides[styles.get_project_service] = \
+        lambda: ProjectService(create_client(fake.url, "test-anon-key"))
+    app.dependency_overrides[get_audit_service] = lambda: AuditService(enabled=False)
+    client = TestClient(app)
+
+    first = client.get("/api/v1/styles/changes", params={"since": 0, "limit": 2}).json()
+    assert [style["styleNumber"] for style in first["data"]] == ["ST-0", "ST-1"]
+    assert first["has_more"] is True
+
+    client.delete("/api/v1/styles/proj-0")
+    rest = client.get("/api/v1/styles/changes", params={"since": first["next_cursor"]}).json()
+    assert [style["id"] for style in rest["data"]] == ["proj-2"]
+    assert rest["deleted"] == ["proj-0"]
+    assert rest["has_more"] is False
+    assert client.get("/api/v1/styles/changes", params={"since": rest["next_cursor"]}).json()["data"] == []
+    assert client.get("/api/v1/styles/changes", params={"limit": 0}).status_code == 422
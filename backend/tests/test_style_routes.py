@@ -0,0 +1,48 @@
+"""Style write routes, against the fake Supabase."""
+import pytest
+from fastapi.testclient import TestClient
+from supabase import create_client
+
+from app.api.v1.routes import styles
+from app.factory import create_app
+from app.services import qc_analytics
+from app.services.audit_service import AuditService, get_audit_service
+from app.services.project_service import ProjectService
+from benchmarks.fake_supabase import FakeSupabase
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeSupabase().start()
+    fake.seed("projects", [{"id": "proj-1", "title": "Style", "status": "DRAFT"}])
+    app = create_app()
+    app.dependency_overrides[styles.get_project_service] = \
+        lambda: ProjectService(create_client(fake.url, "test-anon-key"))
+    app.dependency_overrides[get_audit_service] = lambda: AuditService(enabled=False)
+    # A failing background task must not turn the committed write into an error
+    yield TestClient(app, raise_server_exceptions=False)
+    fake.stop()
+
+
+def test_saves_are_answered_before_analytics_are_updated(client, monkeypatch):
+    seen = []
+
+    async def broken(*args):
+        seen.append(args)
+        raise RuntimeError("analytics store is gone")
+
+    monkeypatch.setattr(qc_analytics, "style_saved", broken)
+    monkeypatch.setattr(qc_analytics, "style_deleted", broken)
+
+    response = client.patch("/api/v1/styles/proj-1", json={"status": "SAMPLING"})
+    assert response.status_code == 200
+    assert response.json()["data"]["status"] == "SAMPLING"
+    assert client.delete("/api/v1/styles/proj-1").status_code == 200
+    assert [args[0] if isinstance(args[0], str) else args[0]["id"] for args in seen] == ["proj-1", "proj-1"]
+
+
+def test_a_past_version_is_not_served_without_revision_history(client):
+    response = client.get("/api/v1/styles/proj-1", params={"as_of": "2026-01-01T00:00:00Z"})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Revision history is disabled"
+    assert client.get("/api/v1/styles/proj-1").status_code == 200
@@ -3,7 +3,7 @@
  */
 import React, { createContext, useContext, useState, useCallback, useEffect, useRef, ReactNode } from 'react';
 import { Project, Inspection, Invoice, PackingInfo, TechPackData, PPMeeting as PPMeetingType, ConsumptionData, OrderSheet } from '../../types';
-import { projectService, mapFromDb } from '../services/projectService';
+import { projectService } from '../services/projectService';
 import { INITIAL_DATA } from '../../constants';
 import { useAuth } from './AuthContext';
 import { supabase } from '../../lib/supabase';
@@ -21,6 +21,11 @@ interface ProjectContextType {
 
 const ProjectContext = createContext<ProjectContextType | undefined>(undefined);
 
+// Realtime events of one style arriving within this window share one fetch
+const REALTIME_DEBOUNCE_MS = 300;
+
+const sameInstant = (a?: string, b?: string) => !!a && !!b && Date.parse(a) === Date.parse(b);
+
 // Default packing info
 const createDefaultPacking = (): PackingInfo => ({
     division: 'BLOQUE',
@@ -65,6 +70,11 @@ export const ProjectProvider: React.FC<{ children: ReactNode }> = ({ children })
     const [loading, setLoading] = useState(false);
     const { isAuthenticated, isLoading, user } = useAuth();
     const retriedRef = useRef(false);
+    const projectsRef = useRef<Project[]>(projects);
+
+    useEffect(() => {
+        projectsRef.current = projects;
+    }, [projects]);
 
     const refreshProjects = useCallback(async () => {
         setLoading(true);
@@ -113,6 +123,37 @@ export const ProjectProvider: React.FC<{ children: ReactNode }> = ({ children })
     useEffect(() => {
         if (!isAuthenticated || !user) return;
 
+        // Style id -> timer of its pending fetch
+        const pending = new Map<string, ReturnType<typeof setTimeout>>();
+
+        const loadChanged = async (id: string) => {
+            pending.delete(id);
+            // The row carries NULL for the list sections (they live in
+            // their own tables), so fetch the assembled document.
+            const { data: fresh, error } = await projectService.getProject(id);
+            if (error || !fresh) {
+                console.error('[ProjectContext] Error loading real-time change:', error);
+                return;
+            }
+            setProjects(prev => {
+                // Avoid duplicates (e.g. if we already added it optimistically)
+                if (prev.some(p => p.id === fresh.id)) {
+                    return prev.map(p => p.id === fresh.id ? fresh : p);
+                }
+                return [fresh, ...prev];
+            });
+        };
+
+        const changed = (id: string, updatedAt?: string) => {
+            // Our own save (or a change already loaded): the local copy is current
+            const local = projectsRef.current.find(p => p.id === id);
+            if (local && sameInstant(local.updatedAt, updatedAt)) return;
+
+            // A burst of saves of one style (e.g. autosave) is fetched once
+            clearTimeout(pending.get(id));
+            pending.set(id, setTimeout(() => loadChanged(id), REALTIME_DEBOUNCE_MS));
+        };
+
         const channel = supabase
             .channel('projects-realtime')
             .on(
@@ -120,34 +161,30 @@ export const ProjectProvider: React.FC<{ children: ReactNode }> = ({ children })
                 { event: '*', schema: 'public', table: 'projects' },
                 (payload: any) => {
 
-                    if (payload.eventType === 'UPDATE' && payload.new) {
-                        try {
-                            const updated = mapFromDb(payload.new);
-                            setProjects(prev => prev.map(p => p.id === updated.id ? updated : p));
-                        } catch (err) {
-                            console.error('[ProjectContext] Error mapping real-time update:', err);
-                        }
-                    } else if (payload.eventType === 'INSERT' && payload.new) {
-                        try {
-                            const newProj = mapFromDb(payload.new);
-                            setProjects(prev => {
-                                // Avoid duplicates (e.g. if we already added it optimistically)
-                                if (prev.some(p => p.id === newProj.id)) {
-                                    return prev.map(p => p.id === newProj.id ? newProj : p);
-                                }
-                                return [newProj, ...prev];
-                            });
-                        } catch (err) {
-                            console.error('[ProjectContext] Error mapping real-time insert:', err);
-                        }
+                    if ((payload.eventType === 'UPDATE' || payload.eventType === 'INSERT') && payload.new) {
+                        changed(payload.new.id, payload.new.updated_at);
                     } else if (payload.eventType === 'DELETE' && payload.old) {
+                        clearTimeout(pending.get(payload.old.id));
+                        pending.delete(payload.old.id);
                         setProjects(prev => prev.filter(p => p.id !== payload.old.id));
                     }
                 }
             )
+            // Saves of list sections leave the projects row alone and stamp
+            // the section instead (migration 016), with the save's updatedAt
+            .on(
+                'postgres_changes',
+                { event: '*', schema: 'public', table: 'style_section_changes' },
+                (payload: any) => {
+                    if ((payload.eventType === 'UPDATE' || payload.eventType === 'INSERT') && payload.new) {
+                        changed(payload.new.project_id, payload.new.updated_at);
+                    }
+                }
+            )
             .subscribe();
 
         return () => {
+            pending.forEach(timer => clearTimeout(timer));
             supabase.removeChannel(channel);
         };
     }, [isAuthenticated, user]);
@@ -200,18 +237,24 @@ export const ProjectProvider: React.FC<{ children: ReactNode }> = ({ children })
     }, []);
 
     const updateProject = useCallback(async (id: string, updates: Partial<Project>) => {
-        setProjects(prev => prev.map(p => p.id === id ? { ...p, ...updates } : p));
+        const payload = {
+            ...updates,
+            updatedAt: new Date().toISOString()
+        };
+        // With its updatedAt, so the realtime echo of this save is recognized
+        setProjects(prev => prev.map(p => p.id === id ? { ...p, ...payload } : p));
 
         try {
-            const payload = {
-                ...updates,
-                updatedAt: new Date().toISOString()
-            };
             const { data, error } = await projectService.updateProject(id, payload);
 
             if (error) {
                 throw new Error(error);
             }
+            if (data) {
+                // The stored document, unless a newer edit was made while saving
+                setProjects(prev => prev.map(p =>
+                    p.id === id && p.updatedAt === payload.updatedAt ? data : p));
+            }
         } catch (err: any) {
             console.error("[DB-SAVE-ERR] Database update failed:", err.message || JSON.stringify(err));
         }
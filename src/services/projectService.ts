@@ -128,6 +128,16 @@ const mapToDb = (proj: Partial<Project>): Record<string, any> => {
     return result;
 };
 
+/**
+ * Full documents are read from this view: comments, inspections, invoices,
+ * PP meetings and material control are stored one row per item in their own
+ * tables (migration 016), and a projects row holds NULL for them.
+ */
+const FULL_PROJECTS = 'projects_full';
+
+/** The list sections a written projects row returns as NULL */
+const SECTION_COLUMNS = ['comments', 'inspections', 'invoices', 'pp_meetings', 'material_control'];
+
 /**
  * Project service for Supabase operations
  */
@@ -143,7 +153,7 @@ export const projectService = {
             // production deployments like Vercel where timing differs).
             const { data: { session } } = await supabase.auth.getSession();
             const { data, error } = await supabase
-                .from('projects')
+                .from(FULL_PROJECTS)
                 .select('*')
                 .order('updated_at', { ascending: false });
 
@@ -167,7 +177,7 @@ export const projectService = {
     async getProject(id: string): Promise<{ data: Project | null; error: string | null }> {
         try {
             const { data, error } = await supabase
-                .from('projects')
+                .from(FULL_PROJECTS)
                 .select('*')
                 .eq('id', id)
                 .single();
@@ -209,14 +219,17 @@ export const projectService = {
             const { data, error } = await supabase
                 .from('projects')
                 .insert(dbData)
-                .select()
+                .select('*')
                 .single();
 
             if (error) {
                 return { data: null, error: error.message };
             }
 
-            return { data: mapFromDb(data), error: null };
+            // The sections were moved to their tables as given; the row holds NULL for them
+            const row = { ...data };
+            for (const column of SECTION_COLUMNS) row[column] = dbData[column];
+            return { data: mapFromDb(row), error: null };
         } catch (err: any) {
             return { data: null, error: err.message || 'Unknown error' };
         }
@@ -228,19 +241,21 @@ export const projectService = {
     async updateProject(id: string, updates: Partial<Project>): Promise<{ data: Project | null; error: string | null }> {
         try {
             const dbData = mapToDb(updates);
-            dbData.updated_at = new Date().toISOString();
+            // The caller's updatedAt is kept: realtime echoes of this save carry it
+            dbData.updated_at = dbData.updated_at ?? new Date().toISOString();
 
+            // save_style (migration 019) writes the row and its section tables in
+            // one transaction and returns the assembled document
             const { data, error } = await supabase
-                .from('projects')
-                .update(dbData)
-                .eq('id', id)
-                .select()
-                .single();
+                .rpc('save_style', { p_project_id: id, p_values: dbData });
 
             if (error) {
                 console.error('[DB-SVC-2] Supabase update ERROR:', error);
                 return { data: null, error: error.message };
             }
+            if (!data) {
+                return { data: null, error: `Project ${id} not found` };
+            }
 
             return { data: mapFromDb(data), error: null };
         } catch (err: any) {
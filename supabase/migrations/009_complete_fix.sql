@@ -59,24 +59,28 @@ VALUES (
 ON CONFLICT (id) DO NOTHING;
 
 -- Storage RLS: allow authenticated users to upload
-CREATE POLICY IF NOT EXISTS "Authenticated users can upload product images"
+DROP POLICY IF EXISTS "Authenticated users can upload product images" ON storage.objects;
+CREATE POLICY "Authenticated users can upload product images"
   ON storage.objects FOR INSERT
   TO authenticated
   WITH CHECK (bucket_id = 'product-images');
 
 -- Storage RLS: allow public read
-CREATE POLICY IF NOT EXISTS "Anyone can view product images"
+DROP POLICY IF EXISTS "Anyone can view product images" ON storage.objects;
+CREATE POLICY "Anyone can view product images"
   ON storage.objects FOR SELECT
   TO public
   USING (bucket_id = 'product-images');
 
 -- Storage RLS: allow authenticated users to update/delete their own uploads
-CREATE POLICY IF NOT EXISTS "Authenticated users can update product images"
+DROP POLICY IF EXISTS "Authenticated users can update product images" ON storage.objects;
+CREATE POLICY "Authenticated users can update product images"
   ON storage.objects FOR UPDATE
   TO authenticated
   USING (bucket_id = 'product-images');
 
-CREATE POLICY IF NOT EXISTS "Authenticated users can delete product images"
+DROP POLICY IF EXISTS "Authenticated users can delete product images" ON storage.objects;
+CREATE POLICY "Authenticated users can delete product images"
   ON storage.objects FOR DELETE
   TO authenticated
   USING (bucket_id = 'product-images');
@@ -0,0 +1,45 @@
+-- ============================================================
+-- MIGRATION 012: Append-only activity / audit log
+-- Records who changed which section of which style, plus the
+-- user-management actions performed through the backend API.
+-- Rows are written in batches by the backend (service role) and
+-- are never updated or deleted.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS public.activity_log (
+  id           BIGSERIAL PRIMARY KEY,
+  created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  actor_id     UUID,
+  actor_email  TEXT,
+  action       TEXT NOT NULL,
+  entity_type  TEXT NOT NULL,
+  entity_id    TEXT NOT NULL,
+  sections     TEXT[] NOT NULL DEFAULT '{}',
+  details      JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+-- Indexes backing the paginated queries (newest first, keyset on id)
+CREATE INDEX IF NOT EXISTS idx_activity_log_entity
+  ON public.activity_log(entity_type, entity_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_activity_log_actor
+  ON public.activity_log(actor_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_activity_log_created_at
+  ON public.activity_log(created_at DESC);
+
+-- ── RLS: admins read, nobody updates or deletes ─────────────
+ALTER TABLE public.activity_log ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins can view activity log" ON public.activity_log;
+CREATE POLICY "Admins can view activity log" ON public.activity_log
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM public.profiles
+      WHERE id = auth.uid()
+      AND role IN ('super_admin', 'admin')
+    )
+  );
+
+-- Inserts come from the backend service role, which bypasses RLS.
+-- Revoke UPDATE/DELETE so the log stays append-only even for
+-- authenticated clients talking to PostgREST directly.
+REVOKE UPDATE, DELETE, TRUNCATE ON public.activity_log FROM anon, authenticated;
@@ -0,0 +1,252 @@
+-- ============================================================
+-- MIGRATION 013: Per-section revision history for styles
+-- Each write to a projects column stores either a compact JSON
+-- diff against the previous value or (periodically) a full
+-- snapshot, so any section can be rebuilt at any timestamp by
+-- replaying at most style_revision_snapshot_interval() diffs.
+--
+-- The database records them itself: a trigger diffs every update
+-- of a style against the value it replaces, so the backend, the
+-- frontend and direct table writes all leave history, and no
+-- revision comes from a client. Each revision keeps the checksum
+-- of the value it leads to; a change whose previous value is not
+-- that value (history from before a restore, a trigger disabled
+-- for a bulk load) is stored as a full snapshot, so a replay
+-- never builds on the wrong base.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS public.style_revisions (
+  id           BIGSERIAL PRIMARY KEY,
+  project_id   TEXT NOT NULL,
+  section      TEXT NOT NULL,
+  created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  kind         TEXT NOT NULL CHECK (kind IN ('snapshot', 'diff')),
+  depth        INTEGER NOT NULL DEFAULT 0,   -- diffs since the last snapshot
+  payload      JSONB,
+  actor_id     UUID,
+  actor_email  TEXT,
+  checksum     TEXT                          -- md5 of the value after this revision
+);
+
+CREATE INDEX IF NOT EXISTS idx_style_revisions_project_section
+  ON public.style_revisions(project_id, section, id DESC);
+CREATE INDEX IF NOT EXISTS idx_style_revisions_snapshots
+  ON public.style_revisions(project_id, section, created_at DESC)
+  WHERE kind = 'snapshot';
+
+-- ── Access follows public.projects ──
+-- History is visible where its style is. Only the triggers below
+-- write it; the API roles can read it and nothing else.
+ALTER TABLE public.style_revisions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Revisions are visible with their style" ON public.style_revisions;
+CREATE POLICY "Revisions are visible with their style" ON public.style_revisions
+  FOR SELECT TO anon, authenticated
+  USING (EXISTS (SELECT 1 FROM public.projects p WHERE p.id = project_id));
+
+DROP POLICY IF EXISTS "Revisions are appended with their style" ON public.style_revisions;
+
+REVOKE ALL ON public.style_revisions FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON SEQUENCE public.style_revisions_id_seq FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON public.style_revisions TO anon, authenticated;
+GRANT ALL ON public.style_revisions TO service_role;
+GRANT USAGE ON SEQUENCE public.style_revisions_id_seq TO service_role;
+
+-- ── Diffs: the operations that turn one JSON value into another ──
+--   ["r", path, value]  set the value at path (empty path = whole value)
+--   ["d", path]         delete the object key at path
+--   ["t", path, n]      truncate the array at path to n items
+--   ["a", path, items]  append items to the array at path
+-- The same operations as json_diff in app/services/revision_service.py,
+-- which replays them.
+CREATE OR REPLACE FUNCTION public.jsonb_diff(
+  p_old  JSONB,
+  p_new  JSONB,
+  p_path JSONB DEFAULT '[]'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+  v_ops    JSONB := '[]'::jsonb;
+  v_key    TEXT;
+  v_common INTEGER;
+BEGIN
+  IF p_old IS NOT DISTINCT FROM p_new THEN
+    RETURN v_ops;
+  END IF;
+
+  IF jsonb_typeof(p_old) = 'object' AND jsonb_typeof(p_new) = 'object' THEN
+    FOR v_key IN SELECT k FROM jsonb_object_keys(p_old) AS k WHERE NOT p_new ? k
+    LOOP
+      v_ops := v_ops || jsonb_build_array(jsonb_build_array('d', p_path || to_jsonb(v_key)));
+    END LOOP;
+    FOR v_key IN SELECT jsonb_object_keys(p_new)
+    LOOP
+      IF p_old ? v_key THEN
+        v_ops := v_ops || public.jsonb_diff(p_old -> v_key, p_new -> v_key, p_path || to_jsonb(v_key));
+      ELSE
+        v_ops := v_ops || jsonb_build_array(jsonb_build_array('r', p_path || to_jsonb(v_key), p_new -> v_key));
+      END IF;
+    END LOOP;
+    RETURN v_ops;
+  END IF;
+
+  IF jsonb_typeof(p_old) = 'array' AND jsonb_typeof(p_new) = 'array' THEN
+    v_common := LEAST(jsonb_array_length(p_old), jsonb_array_length(p_new));
+    FOR i IN 0 .. v_common - 1
+    LOOP
+      v_ops := v_ops || public.jsonb_diff(p_old -> i, p_new -> i, p_path || to_jsonb(i));
+    END LOOP;
+    IF jsonb_array_length(p_old) > v_common THEN
+      v_ops := v_ops || jsonb_build_array(jsonb_build_array('t', p_path, v_common));
+    ELSIF jsonb_array_length(p_new) > v_common THEN
+      v_ops := v_ops || jsonb_build_array(jsonb_build_array('a', p_path, (
+        SELECT jsonb_agg(e.value ORDER BY e.ordinality)
+        FROM jsonb_array_elements(p_new) WITH ORDINALITY AS e(value, ordinality)
+        WHERE e.ordinality > v_common)));
+    END IF;
+    RETURN v_ops;
+  END IF;
+
+  RETURN jsonb_build_array(jsonb_build_array('r', p_path, p_new));
+END;
+$$;
+
+-- ── A full snapshot is stored at least every N revisions of a section ──
+-- Replace this function to change N.
+CREATE OR REPLACE FUNCTION public.style_revision_snapshot_interval()
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT 20;
+$$;
+
+-- ── Append the revision for one changed section ──
+-- Internal: called by the triggers, with the value before and after
+-- the change. The first change of a section with no history first
+-- stores the value it replaces (as of p_baseline_at) as a baseline.
+-- The actor is whoever the request's JWT names.
+CREATE OR REPLACE FUNCTION public.append_style_revision(
+  p_project_id  TEXT,
+  p_section     TEXT,
+  p_old         JSONB,
+  p_new         JSONB,
+  p_baseline_at TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_head   public.style_revisions%ROWTYPE;
+  v_depth  INTEGER;
+  v_ops    JSONB;
+BEGIN
+  p_old := COALESCE(p_old, 'null'::jsonb);
+  p_new := COALESCE(p_new, 'null'::jsonb);
+  IF p_old = p_new THEN
+    RETURN;
+  END IF;
+
+  SELECT * INTO v_head
+  FROM public.style_revisions r
+  WHERE r.project_id = p_project_id AND r.section = p_section
+  ORDER BY r.id DESC
+  LIMIT 1;
+
+  IF NOT FOUND AND p_baseline_at IS NOT NULL THEN
+    INSERT INTO public.style_revisions (project_id, section, created_at, kind, depth, payload, checksum)
+    VALUES (p_project_id, p_section, p_baseline_at, 'snapshot', 0, p_old, md5(p_old::text));
+    v_depth := 0;
+  ELSIF FOUND AND v_head.checksum = md5(p_old::text) THEN
+    v_depth := v_head.depth;
+  END IF;
+
+  -- v_depth is NULL when the history does not end with the replaced value
+  v_ops := public.jsonb_diff(p_old, p_new);
+  IF v_depth IS NULL
+     OR v_depth + 1 >= public.style_revision_snapshot_interval()
+     OR octet_length(v_ops::text) >= octet_length(p_new::text) THEN
+    INSERT INTO public.style_revisions
+      (project_id, section, kind, depth, payload, actor_id, actor_email, checksum)
+    VALUES (p_project_id, p_section, 'snapshot', 0, p_new, auth.uid(), auth.jwt() ->> 'email', md5(p_new::text));
+  ELSE
+    INSERT INTO public.style_revisions
+      (project_id, section, kind, depth, payload, actor_id, actor_email, checksum)
+    VALUES (p_project_id, p_section, 'diff', v_depth + 1, v_ops, auth.uid(), auth.jwt() ->> 'email', md5(p_new::text));
+  END IF;
+END;
+$$;
+
+-- ── Every update of a style records its changed columns ──
+-- Columns named in the trigger's arguments are not versioned.
+CREATE OR REPLACE FUNCTION public.record_style_revisions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_old    JSONB := to_jsonb(OLD);
+  v_new    JSONB := to_jsonb(NEW);
+  v_column TEXT;
+BEGIN
+  FOR v_column IN SELECT jsonb_object_keys(v_new)
+  LOOP
+    IF v_column <> ALL (TG_ARGV) AND v_old -> v_column IS DISTINCT FROM v_new -> v_column THEN
+      PERFORM public.append_style_revision(NEW.id, v_column, v_old -> v_column, v_new -> v_column, OLD.updated_at);
+    END IF;
+  END LOOP;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_record_style_revisions ON public.projects;
+CREATE TRIGGER trg_record_style_revisions
+  AFTER UPDATE ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.record_style_revisions('id', 'updated_at', 'created_at', 'change_seq', 'changed_at');
+
+REVOKE ALL ON FUNCTION public.append_style_revision(TEXT, TEXT, JSONB, JSONB, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.record_style_revisions() FROM PUBLIC, anon, authenticated;
+
+-- ── Replay chain per section: latest snapshot <= as_of plus the
+--    diffs after it. Sections whose history starts after as_of
+--    fall back to their earliest snapshot (oldest known value). ──
+CREATE OR REPLACE FUNCTION public.style_revisions_as_of(
+  p_project_id TEXT,
+  p_as_of      TIMESTAMPTZ,
+  p_sections   TEXT[] DEFAULT NULL
+)
+RETURNS SETOF public.style_revisions
+LANGUAGE sql STABLE
+AS $$
+  WITH sections AS (
+    SELECT DISTINCT r.section
+    FROM public.style_revisions r
+    WHERE r.project_id = p_project_id
+      AND (p_sections IS NULL OR r.section = ANY(p_sections))
+  ),
+  base AS (
+    SELECT s.section, COALESCE(
+      (SELECT r.id FROM public.style_revisions r
+        WHERE r.project_id = p_project_id AND r.section = s.section
+          AND r.kind = 'snapshot' AND r.created_at <= p_as_of
+        ORDER BY r.id DESC LIMIT 1),
+      (SELECT r.id FROM public.style_revisions r
+        WHERE r.project_id = p_project_id AND r.section = s.section
+          AND r.kind = 'snapshot'
+        ORDER BY r.id ASC LIMIT 1)
+    ) AS snapshot_id
+    FROM sections s
+  )
+  SELECT r.*
+  FROM public.style_revisions r
+  JOIN base b ON b.section = r.section
+  WHERE r.project_id = p_project_id
+    AND (r.id = b.snapshot_id OR (r.id > b.snapshot_id AND r.created_at <= p_as_of))
+  ORDER BY r.section, r.id;
+$$;
+
+-- Runs as the caller, so the policies above apply
+GRANT EXECUTE ON FUNCTION public.style_revisions_as_of(TEXT, TIMESTAMPTZ, TEXT[]) TO anon, authenticated, service_role;
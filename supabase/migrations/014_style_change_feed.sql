@@ -0,0 +1,110 @@
+-- ============================================================
+-- MIGRATION 014: Change feed for offline sync
+-- Every insert/update of a style takes the next value of a
+-- global change sequence and every delete leaves a tombstone
+-- with its own sequence value, so a client holding the last
+-- sequence it saw can fetch exactly what changed since
+-- (GET /api/v1/styles/changes?since=<cursor>).
+-- Triggers keep the feed complete for writes made directly
+-- from the frontend as well as through the backend.
+-- ============================================================
+
+CREATE SEQUENCE IF NOT EXISTS public.style_change_seq;
+
+-- Existing rows are numbered by the volatile default when the column is added
+ALTER TABLE public.projects
+  ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT nextval('public.style_change_seq');
+ALTER TABLE public.projects
+  ADD COLUMN IF NOT EXISTS changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_projects_change_seq
+  ON public.projects(change_seq);
+
+CREATE TABLE IF NOT EXISTS public.style_tombstones (
+  project_id   TEXT PRIMARY KEY,
+  change_seq   BIGINT NOT NULL DEFAULT nextval('public.style_change_seq'),
+  deleted_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_style_tombstones_change_seq
+  ON public.style_tombstones(change_seq);
+
+-- ── Stamp inserts and updates; a re-created id drops its tombstone ──
+CREATE OR REPLACE FUNCTION public.stamp_style_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  NEW.change_seq := nextval('public.style_change_seq');
+  NEW.changed_at := NOW();
+  IF TG_OP = 'INSERT' THEN
+    DELETE FROM public.style_tombstones WHERE project_id = NEW.id;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_stamp_style_change ON public.projects;
+CREATE TRIGGER trg_stamp_style_change
+  BEFORE INSERT OR UPDATE ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.stamp_style_change();
+
+-- ── Deletes leave a tombstone ──
+CREATE OR REPLACE FUNCTION public.record_style_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.style_tombstones (project_id)
+  VALUES (OLD.id)
+  ON CONFLICT (project_id) DO UPDATE
+    SET change_seq = nextval('public.style_change_seq'),
+        deleted_at = NOW();
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_record_style_tombstone ON public.projects;
+CREATE TRIGGER trg_record_style_tombstone
+  AFTER DELETE ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.record_style_tombstone();
+
+-- ── Changes after p_since in sequence order, styles and tombstones
+--    interleaved. A sequence value is taken before its transaction
+--    commits, so changes younger than p_settle are held back: a
+--    reader never moves its cursor past a write still in flight. ──
+CREATE OR REPLACE FUNCTION public.style_changes_since(
+  p_since  BIGINT,
+  p_limit  INTEGER DEFAULT 500,
+  p_settle INTERVAL DEFAULT '2 seconds'
+)
+RETURNS TABLE (change_seq BIGINT, project_id TEXT, deleted BOOLEAN, project JSONB)
+LANGUAGE sql STABLE
+AS $$
+  SELECT c.change_seq, c.project_id, c.deleted, c.project
+  FROM (
+    (SELECT p.change_seq, p.id AS project_id, FALSE AS deleted,
+            to_jsonb(p) - 'change_seq' - 'changed_at' AS project
+     FROM public.projects p
+     WHERE p.change_seq > p_since AND p.changed_at < NOW() - p_settle
+     ORDER BY p.change_seq
+     LIMIT p_limit)
+    UNION ALL
+    (SELECT t.change_seq, t.project_id, TRUE, NULL
+     FROM public.style_tombstones t
+     WHERE t.change_seq > p_since AND t.deleted_at < NOW() - p_settle
+     ORDER BY t.change_seq
+     LIMIT p_limit)
+  ) c
+  ORDER BY c.change_seq
+  LIMIT p_limit;
+$$;
+
+-- Access mirrors public.projects: the backend reads the feed with the
+-- same client it uses for the styles themselves (tombstones hold ids only).
+GRANT SELECT ON public.style_tombstones TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.style_changes_since(BIGINT, INTEGER, INTERVAL) TO anon, authenticated, service_role;
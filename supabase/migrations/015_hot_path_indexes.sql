@@ -0,0 +1,37 @@
+-- migrate:no-transaction
+-- ============================================================
+-- MIGRATION 015: Indexes for the queries the app issues
+-- Built CONCURRENTLY so live reads and writes are not blocked;
+-- the migration runner applies this file outside a transaction.
+-- A failed concurrent build leaves an INVALID index that IF NOT
+-- EXISTS would then keep: drop it before re-running.
+-- benchmarks/query_plans.py checks that each hot query uses them.
+--
+-- Already covered elsewhere: projects.id and profiles.id
+-- (primary keys), projects.change_seq (014), activity_log (012),
+-- style_revisions (013), login_activity (001).
+-- ============================================================
+
+-- Style list (backend and frontend): ORDER BY updated_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_projects_updated_at
+  ON public.projects(updated_at DESC);
+
+-- Dashboards by lifecycle stage: main_status = ? ORDER BY updated_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_projects_main_status_updated_at
+  ON public.projects(main_status, updated_at DESC);
+
+-- Newest styles first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_projects_created_at
+  ON public.projects(created_at DESC);
+
+-- User management: ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_profiles_created_at
+  ON public.profiles(created_at DESC);
+
+-- Role deletion guard (role = ? LIMIT 1) and admin checks by role
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_profiles_role
+  ON public.profiles(role);
+
+-- Refresh planner statistics for the new indexes
+ANALYZE public.projects;
+ANALYZE public.profiles;
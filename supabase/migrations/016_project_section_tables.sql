@@ -0,0 +1,476 @@
+-- ============================================================
+-- MIGRATION 016: Child tables for the list sections of a style
+-- comments, inspections, invoices, pp_meetings and
+-- material_control move out of the projects row into one row
+-- per item. Saving a section writes its changed item rows and
+-- the section's stamp in style_section_changes, never the
+-- projects row: the row (and its TOASTed pages) is not
+-- rewritten, and an edit of one section does not wait on the
+-- row lock held by a save of the style's other fields. Saves of
+-- the same section of one style take turns (an advisory lock),
+-- so each replaces the whole list.
+--
+-- public.projects_full assembles the old document shape and is
+-- what every full-style read uses; its updated_at, change_seq
+-- and changed_at are the latest of the row's and its sections'.
+-- Writes that still set a section column on projects (older
+-- clients) are diverted by a trigger into the child tables item
+-- by item, and the column is stored as NULL; those do lock the
+-- row, as any update of it does.
+--
+-- Access follows public.projects: item rows can be read and
+-- written where their style is visible. However an item is
+-- written, the section's revision (013) and stamp are recorded
+-- when the transaction commits.
+--
+-- Columns added to projects later must be added to the view.
+-- ============================================================
+
+-- ── One table per section, one row per list item ──
+-- Items are keyed by their "id" (or "#<position>" when they have
+-- none, or repeat an id already used earlier in the list);
+-- position keeps the order of the list. The parent key is
+-- checked at commit, so an INSERT on projects can write its items
+-- from a BEFORE trigger.
+DO $$
+DECLARE
+  v_section TEXT;
+BEGIN
+  FOREACH v_section IN ARRAY ARRAY['comments', 'inspections', 'invoices', 'pp_meetings', 'material_control']
+  LOOP
+    EXECUTE format($ddl$
+      CREATE TABLE IF NOT EXISTS public.%1$I (
+        project_id  TEXT NOT NULL
+                    REFERENCES public.projects(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        item_id     TEXT NOT NULL,
+        position    INTEGER NOT NULL,
+        data        JSONB NOT NULL,
+        updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (project_id, item_id)
+      )
+    $ddl$, 'project_' || v_section);
+  END LOOP;
+END;
+$$;
+
+-- ── When a section last changed: the change feed (014) for sections ──
+-- One row per changed section, written only when its items are.
+-- updated_at is the writer's (save_style's p_values.updated_at), so
+-- a client can recognise the realtime echo of its own save.
+CREATE TABLE IF NOT EXISTS public.style_section_changes (
+  project_id  TEXT NOT NULL
+              REFERENCES public.projects(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+  section     TEXT NOT NULL,
+  change_seq  BIGINT NOT NULL DEFAULT nextval('public.style_change_seq'),
+  changed_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (project_id, section)
+);
+
+CREATE INDEX IF NOT EXISTS idx_style_section_changes_change_seq
+  ON public.style_section_changes(change_seq);
+
+-- ── Sections touched by the open transaction, as they were before ──
+-- Internal: filled by the item triggers below on the first write to
+-- a section, emptied when the transaction commits.
+CREATE TABLE IF NOT EXISTS public.style_section_edits (
+  txid         BIGINT NOT NULL DEFAULT txid_current(),
+  project_id   TEXT NOT NULL,
+  section      TEXT NOT NULL,
+  previous     JSONB NOT NULL,
+  baseline_at  TIMESTAMPTZ,
+  updated_at   TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (txid, project_id, section)
+);
+
+-- ── Make a section's rows match a list, touching changed items only ──
+-- Runs as the caller, so the policies of the item tables decide.
+-- Concurrent syncs of one section of one style run one after the
+-- other; other sections and the projects row are not locked.
+CREATE OR REPLACE FUNCTION public.sync_project_section(
+  p_project_id TEXT,
+  p_section    TEXT,
+  p_items      JSONB
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF p_section NOT IN ('comments', 'inspections', 'invoices', 'pp_meetings', 'material_control') THEN
+    RAISE EXCEPTION 'Unknown project section: %', p_section;
+  END IF;
+  PERFORM pg_advisory_xact_lock(hashtext('style_section'), hashtext(p_project_id || '/' || p_section));
+
+  EXECUTE format($sync$
+    WITH listed AS (
+      SELECT e.value ->> 'id' AS id, e.ordinality, e.value
+      FROM jsonb_array_elements(
+             CASE WHEN jsonb_typeof($2) = 'array' THEN $2 ELSE '[]'::jsonb END
+           ) WITH ORDINALITY AS e(value, ordinality)
+    ),
+    items AS (
+      SELECT CASE WHEN l.id IS NOT NULL
+                   AND row_number() OVER (PARTITION BY l.id ORDER BY l.ordinality) = 1
+                  THEN l.id ELSE '#' || l.ordinality END AS item_id,
+             (l.ordinality - 1)::INTEGER AS position,
+             l.value AS data
+      FROM listed l
+    ),
+    removed AS (
+      DELETE FROM public.%1$I t
+      WHERE t.project_id = $1
+        AND NOT EXISTS (SELECT 1 FROM items i WHERE i.item_id = t.item_id)
+    )
+    INSERT INTO public.%1$I AS t (project_id, item_id, position, data)
+    SELECT $1, i.item_id, i.position, i.data FROM items i
+    ON CONFLICT (project_id, item_id) DO UPDATE
+      SET position = EXCLUDED.position, data = EXCLUDED.data, updated_at = NOW()
+      WHERE t.position IS DISTINCT FROM EXCLUDED.position
+         OR t.data IS DISTINCT FROM EXCLUDED.data
+  $sync$, 'project_' || p_section)
+  USING p_project_id, p_items;
+END;
+$$;
+
+-- ── The first write to a section in a transaction keeps its old value ──
+-- Its items, or the column not yet backfilled; the trigger argument
+-- names the section.
+CREATE OR REPLACE FUNCTION public.stage_section_edit()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_project_id TEXT;
+  v_previous   JSONB;
+  v_column     JSONB;
+  v_updated_at TIMESTAMPTZ;
+BEGIN
+  FOR v_project_id IN
+    SELECT DISTINCT x FROM unnest(ARRAY[
+      CASE WHEN TG_OP <> 'INSERT' THEN OLD.project_id END,
+      CASE WHEN TG_OP <> 'DELETE' THEN NEW.project_id END]) AS x
+    WHERE x IS NOT NULL
+  LOOP
+    CONTINUE WHEN EXISTS (
+      SELECT 1 FROM public.style_section_edits e
+      WHERE e.txid = txid_current() AND e.project_id = v_project_id AND e.section = TG_ARGV[0]);
+
+    EXECUTE format('SELECT jsonb_agg(t.data ORDER BY t.position) FROM public.%I t WHERE t.project_id = $1',
+                   TG_TABLE_NAME)
+      INTO v_previous USING v_project_id;
+    EXECUTE format('SELECT p.%I, p.updated_at FROM public.projects p WHERE p.id = $1', TG_ARGV[0])
+      INTO v_column, v_updated_at USING v_project_id;
+    INSERT INTO public.style_section_edits (project_id, section, previous, baseline_at, updated_at)
+    VALUES (v_project_id, TG_ARGV[0],
+            COALESCE(v_previous, NULLIF(v_column, 'null'::jsonb), '[]'::jsonb),
+            v_updated_at,
+            COALESCE(NULLIF(current_setting('app.section_updated_at', true), '')::timestamptz, NOW()));
+  END LOOP;
+  IF TG_OP = 'DELETE' THEN
+    RETURN OLD;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+-- ── At commit: the section's revision (013) and stamp ──
+CREATE OR REPLACE FUNCTION public.record_section_edit()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_current JSONB;
+BEGIN
+  -- Against the head another transaction may have just appended
+  PERFORM pg_advisory_xact_lock(hashtext('style_section'), hashtext(NEW.project_id || '/' || NEW.section));
+  DELETE FROM public.style_section_edits e
+  WHERE e.txid = NEW.txid AND e.project_id = NEW.project_id AND e.section = NEW.section;
+  IF NOT EXISTS (SELECT 1 FROM public.projects p WHERE p.id = NEW.project_id) THEN
+    RETURN NULL;
+  END IF;
+
+  EXECUTE format('SELECT jsonb_agg(t.data ORDER BY t.position) FROM public.%I t WHERE t.project_id = $1',
+                 'project_' || NEW.section)
+    INTO v_current USING NEW.project_id;
+  v_current := COALESCE(v_current, '[]'::jsonb);
+  IF v_current = NEW.previous THEN
+    RETURN NULL;
+  END IF;
+
+  PERFORM public.append_style_revision(NEW.project_id, NEW.section, NEW.previous, v_current, NEW.baseline_at);
+  INSERT INTO public.style_section_changes AS c (project_id, section, updated_at)
+  VALUES (NEW.project_id, NEW.section, NEW.updated_at)
+  ON CONFLICT (project_id, section) DO UPDATE
+    SET change_seq = nextval('public.style_change_seq'),
+        changed_at = NOW(),
+        updated_at = EXCLUDED.updated_at;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_record_section_edit ON public.style_section_edits;
+CREATE CONSTRAINT TRIGGER trg_record_section_edit
+  AFTER INSERT ON public.style_section_edits
+  DEFERRABLE INITIALLY DEFERRED
+  FOR EACH ROW EXECUTE FUNCTION public.record_section_edit();
+
+DO $$
+DECLARE
+  v_section TEXT;
+BEGIN
+  FOREACH v_section IN ARRAY ARRAY['comments', 'inspections', 'invoices', 'pp_meetings', 'material_control']
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_stage_section_edit ON public.%I', 'project_' || v_section);
+    EXECUTE format(
+      'CREATE TRIGGER trg_stage_section_edit BEFORE INSERT OR UPDATE OR DELETE ON public.%I '
+      'FOR EACH ROW EXECUTE FUNCTION public.stage_section_edit(%L)',
+      'project_' || v_section, v_section);
+  END LOOP;
+END;
+$$;
+
+-- ── Section columns written to projects are diverted to the child tables ──
+-- It runs as the owner, but only ever for a projects row the caller
+-- was allowed to insert or update.
+CREATE OR REPLACE FUNCTION public.divert_project_sections()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM set_config('app.section_updated_at', COALESCE(NEW.updated_at::text, ''), true);
+  IF NEW.comments IS NOT NULL THEN
+    PERFORM public.sync_project_section(NEW.id, 'comments', NEW.comments);
+    NEW.comments := NULL;
+  END IF;
+  IF NEW.inspections IS NOT NULL THEN
+    PERFORM public.sync_project_section(NEW.id, 'inspections', NEW.inspections);
+    NEW.inspections := NULL;
+  END IF;
+  IF NEW.invoices IS NOT NULL THEN
+    PERFORM public.sync_project_section(NEW.id, 'invoices', NEW.invoices);
+    NEW.invoices := NULL;
+  END IF;
+  IF NEW.pp_meetings IS NOT NULL THEN
+    PERFORM public.sync_project_section(NEW.id, 'pp_meetings', NEW.pp_meetings);
+    NEW.pp_meetings := NULL;
+  END IF;
+  IF NEW.material_control IS NOT NULL THEN
+    PERFORM public.sync_project_section(NEW.id, 'material_control', NEW.material_control);
+    NEW.material_control := NULL;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_divert_project_sections ON public.projects;
+CREATE TRIGGER trg_divert_project_sections
+  BEFORE INSERT OR UPDATE ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.divert_project_sections();
+
+-- The revisions of the sections are recorded as their items are synced;
+-- the column itself only ever changes to NULL
+DROP TRIGGER IF EXISTS trg_record_style_revisions ON public.projects;
+CREATE TRIGGER trg_record_style_revisions
+  AFTER UPDATE ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.record_style_revisions(
+    'id', 'updated_at', 'created_at', 'change_seq', 'changed_at',
+    'comments', 'inspections', 'invoices', 'pp_meetings', 'material_control');
+
+-- ── Backend section writes: sync the given sections of one style ──
+-- Returns all five sections as stored afterwards, or NULL when the
+-- style does not exist (or is not visible to the caller). Runs as
+-- the caller, so the policies of the item tables decide; the
+-- projects row is only read. A section left out keeps its items.
+CREATE OR REPLACE FUNCTION public.save_project_sections(
+  p_project_id TEXT,
+  p_sections   JSONB DEFAULT '{}'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_section TEXT;
+  v_items   JSONB;
+BEGIN
+  FOR v_section IN SELECT jsonb_object_keys(p_sections)
+  LOOP
+    IF v_section NOT IN ('comments', 'inspections', 'invoices', 'pp_meetings', 'material_control') THEN
+      RAISE EXCEPTION 'Unknown project section: %', v_section;
+    END IF;
+  END LOOP;
+
+  IF NOT EXISTS (SELECT 1 FROM public.projects p WHERE p.id = p_project_id) THEN
+    RETURN NULL;
+  END IF;
+  PERFORM set_config('app.section_updated_at', '', true);
+  FOR v_section, v_items IN SELECT key, value FROM jsonb_each(p_sections)
+  LOOP
+    PERFORM public.sync_project_section(p_project_id, v_section, v_items);
+  END LOOP;
+
+  RETURN jsonb_build_object(
+    'comments', COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+                          FROM public.project_comments c WHERE c.project_id = p_project_id), '[]'::jsonb),
+    'inspections', COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+                             FROM public.project_inspections c WHERE c.project_id = p_project_id), '[]'::jsonb),
+    'invoices', COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+                          FROM public.project_invoices c WHERE c.project_id = p_project_id), '[]'::jsonb),
+    'pp_meetings', COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+                             FROM public.project_pp_meetings c WHERE c.project_id = p_project_id), '[]'::jsonb),
+    'material_control', COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+                                  FROM public.project_material_control c WHERE c.project_id = p_project_id), '[]'::jsonb)
+  );
+END;
+$$;
+
+-- ── The full document, as projects looked before this migration ──
+-- A style not yet backfilled still has its section in the column.
+-- A style changed when its row or any of its sections last did.
+CREATE OR REPLACE VIEW public.projects_full
+WITH (security_invoker = true) AS
+SELECT
+  p.id, p.title, p.brand, p.team, p.main_status, p.factory_name,
+  p.product_image, p.product_colors, p.article_number, p.style_number,
+  p.description, p.po_receive_date, p.shipment_date, p.fob, p.po_numbers,
+  p.created_at, GREATEST(p.updated_at, s.updated_at) AS updated_at, p.status, p.tech_pack_files, p.pages,
+  COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+            FROM public.project_comments c WHERE c.project_id = p.id),
+           p.comments, '[]'::jsonb) AS comments,
+  COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+            FROM public.project_inspections c WHERE c.project_id = p.id),
+           p.inspections, '[]'::jsonb) AS inspections,
+  COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+            FROM public.project_pp_meetings c WHERE c.project_id = p.id),
+           p.pp_meetings, '[]'::jsonb) AS pp_meetings,
+  COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+            FROM public.project_material_control c WHERE c.project_id = p.id),
+           p.material_control, '[]'::jsonb) AS material_control,
+  COALESCE((SELECT jsonb_agg(c.data ORDER BY c.position)
+            FROM public.project_invoices c WHERE c.project_id = p.id),
+           p.invoices, '[]'::jsonb) AS invoices,
+  p.packing, p.order_sheet, p.consumption, p.material_remarks,
+  p.material_attachments, p.material_comments,
+  p.gauge, p.yarn, p.knitting_time, p.wash, p.embroidery_print,
+  p.special_trims, p.body_ply, p.cuff_bottom_ply, p.neck_ply, p.sample_comment,
+  p.machine_name, p.machine_no, p.machine_gauge, p.machine_type_no,
+  p.tech_pack_workflow, p.mq_control_workflow,
+  GREATEST(p.change_seq, s.change_seq) AS change_seq,
+  GREATEST(p.changed_at, s.changed_at) AS changed_at
+FROM public.projects p
+LEFT JOIN LATERAL (
+  SELECT max(c.updated_at) AS updated_at, max(c.change_seq) AS change_seq, max(c.changed_at) AS changed_at
+  FROM public.style_section_changes c
+  WHERE c.project_id = p.id
+) s ON true;
+
+-- ── The change feed (014) returns assembled documents ──
+-- and covers section changes, which leave the projects row alone.
+CREATE OR REPLACE FUNCTION public.style_changes_since(
+  p_since  BIGINT,
+  p_limit  INTEGER DEFAULT 500,
+  p_settle INTERVAL DEFAULT '2 seconds'
+)
+RETURNS TABLE (change_seq BIGINT, project_id TEXT, deleted BOOLEAN, project JSONB)
+LANGUAGE sql STABLE
+AS $$
+  SELECT c.change_seq, c.project_id, c.deleted, c.project
+  FROM (
+    (SELECT p.change_seq, p.id AS project_id, FALSE AS deleted,
+            to_jsonb(p) - 'change_seq' - 'changed_at' AS project
+     FROM public.projects_full p
+     WHERE p.id IN (SELECT r.id FROM public.projects r WHERE r.change_seq > p_since
+                    UNION
+                    SELECT c.project_id FROM public.style_section_changes c WHERE c.change_seq > p_since)
+       AND p.change_seq > p_since AND p.changed_at < NOW() - p_settle
+     ORDER BY p.change_seq
+     LIMIT p_limit)
+    UNION ALL
+    (SELECT t.change_seq, t.project_id, TRUE, NULL
+     FROM public.style_tombstones t
+     WHERE t.change_seq > p_since AND t.deleted_at < NOW() - p_settle
+     ORDER BY t.change_seq
+     LIMIT p_limit)
+  ) c
+  ORDER BY c.change_seq
+  LIMIT p_limit;
+$$;
+
+-- ── Access mirrors public.projects ──
+-- Item rows and section stamps are visible where their style is,
+-- and items can be written there too. The bookkeeping tables are
+-- written by the triggers only.
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['project_comments', 'project_inspections', 'project_invoices',
+                                 'project_pp_meetings', 'project_material_control']
+  LOOP
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_table);
+    EXECUTE format('DROP POLICY IF EXISTS "Items are visible with their style" ON public.%I', v_table);
+    EXECUTE format('DROP POLICY IF EXISTS "Items follow their style" ON public.%I', v_table);
+    EXECUTE format($policy$
+      CREATE POLICY "Items follow their style" ON public.%I
+        FOR ALL TO anon, authenticated
+        USING (EXISTS (SELECT 1 FROM public.projects p WHERE p.id = project_id))
+        WITH CHECK (EXISTS (SELECT 1 FROM public.projects p WHERE p.id = project_id))
+    $policy$, v_table);
+    EXECUTE format('REVOKE ALL ON public.%I FROM PUBLIC, anon, authenticated', v_table);
+    EXECUTE format('GRANT SELECT, INSERT, UPDATE, DELETE ON public.%I TO anon, authenticated', v_table);
+    EXECUTE format('GRANT ALL ON public.%I TO service_role', v_table);
+  END LOOP;
+END;
+$$;
+
+ALTER TABLE public.style_section_changes ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Section changes are visible with their style" ON public.style_section_changes;
+CREATE POLICY "Section changes are visible with their style" ON public.style_section_changes
+  FOR SELECT TO anon, authenticated
+  USING (EXISTS (SELECT 1 FROM public.projects p WHERE p.id = project_id));
+REVOKE ALL ON public.style_section_changes FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON public.style_section_changes TO anon, authenticated, service_role;
+
+ALTER TABLE public.style_section_edits ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.style_section_edits FROM PUBLIC, anon, authenticated, service_role;
+
+-- Clients follow section saves as they follow the projects row (007)
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime')
+     AND NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                     WHERE pubname = 'supabase_realtime' AND schemaname = 'public'
+                       AND tablename = 'style_section_changes') THEN
+    ALTER PUBLICATION supabase_realtime ADD TABLE public.style_section_changes;
+  END IF;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.sync_project_section(TEXT, TEXT, JSONB) FROM PUBLIC;
+-- Runs as the caller: no more than writing the item rows directly
+GRANT EXECUTE ON FUNCTION public.sync_project_section(TEXT, TEXT, JSONB) TO anon, authenticated, service_role;
+REVOKE ALL ON FUNCTION public.divert_project_sections() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.stage_section_edit() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.record_section_edit() FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON public.projects_full TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.save_project_sections(TEXT, JSONB) TO anon, authenticated, service_role;
+
+-- ── Move existing sections into the child tables ──
+-- Re-setting a column to itself hands its value to the trigger.
+-- migrate:backfill table=public.projects key=id batch_size=200
+UPDATE public.projects
+SET comments = comments,
+    inspections = inspections,
+    invoices = invoices,
+    pp_meetings = pp_meetings,
+    material_control = material_control
+WHERE id = ANY(%(ids)s)
+  AND (comments IS NOT NULL OR inspections IS NOT NULL OR invoices IS NOT NULL
+       OR pp_meetings IS NOT NULL OR material_control IS NOT NULL);
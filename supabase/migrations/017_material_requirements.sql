@@ -0,0 +1,234 @@
+-- ============================================================
+-- MIGRATION 017: Material requirements (MRP) rollup
+-- Yarn kg and accessory quantities every active style needs,
+-- from its consumption sheet times its order sheet quantities,
+-- with wastage. One row per consumption item and PO, kept by
+-- triggers: a style's rows are recomputed when its consumption,
+-- order sheet, POs, shipment date or stage change, and removed
+-- when it leaves PRE-PRODUCTION/PRODUCTION. Purchasing reads the
+-- totals through material_requirements_rollup (GET
+-- /api/v1/materials/requirements) without reading any style.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS public.material_requirements (
+  project_id         TEXT NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+  kind               TEXT NOT NULL CHECK (kind IN ('yarn', 'accessory')),
+  item               TEXT NOT NULL,
+  supplier           TEXT NOT NULL DEFAULT '',
+  unit               TEXT NOT NULL,
+  po_number          TEXT NOT NULL DEFAULT '',
+  delivery_week      DATE,
+  pieces             NUMERIC NOT NULL,
+  net_quantity       NUMERIC NOT NULL,
+  required_quantity  NUMERIC NOT NULL,
+  cost               NUMERIC NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_material_requirements_project
+  ON public.material_requirements(project_id);
+
+-- ── A number from free-form JSON ("12", 12, "", null, "n/a") ──
+CREATE OR REPLACE FUNCTION public.jsonb_to_numeric(p_value JSONB)
+RETURNS NUMERIC
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN jsonb_typeof(p_value) = 'number' THEN (p_value #>> '{}')::NUMERIC
+    WHEN jsonb_typeof(p_value) = 'string' AND btrim(p_value #>> '{}') ~ '^-?[0-9]+(\.[0-9]+)?$'
+      THEN btrim(p_value #>> '{}')::NUMERIC
+  END;
+$$;
+
+-- ── A date from free-form text ("2025-03-14", "2025-03-14T09:00"),
+--    NULL when it has none or it is no real day ("2025-02-30") ──
+CREATE OR REPLACE FUNCTION public.text_to_date(p_value TEXT)
+RETURNS DATE
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+BEGIN
+  IF p_value IS NULL OR p_value !~ '^\d{4}-\d{2}-\d{2}' THEN
+    RETURN NULL;
+  END IF;
+  RETURN left(p_value, 10)::DATE;
+EXCEPTION WHEN invalid_datetime_format OR datetime_field_overflow THEN
+  RETURN NULL;
+END;
+$$;
+
+-- ── Recompute the rows of one style ──
+-- Pieces per PO come from the order sheet breakdowns (a color row's
+-- total, or the sum of its sizes when the total was not filled in),
+-- falling back to the quantities of the style's PO numbers when the
+-- order sheet has none. A PO is delivered on its PO number's
+-- delivery date, else the order sheet's or the style's shipment date.
+CREATE OR REPLACE FUNCTION public.refresh_material_requirements(p_project_id TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_project public.projects%ROWTYPE;
+BEGIN
+  DELETE FROM public.material_requirements WHERE project_id = p_project_id;
+
+  SELECT * INTO v_project FROM public.projects WHERE id = p_project_id;
+  IF NOT FOUND OR v_project.main_status IS NULL
+     OR v_project.main_status NOT IN ('PRE-PRODUCTION', 'PRODUCTION') THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO public.material_requirements (
+    project_id, kind, item, supplier, unit, po_number, delivery_week,
+    pieces, net_quantity, required_quantity, cost
+  )
+  WITH po_dates AS (
+    SELECT DISTINCT ON (po_number) po_number, delivery_date
+    FROM (
+      SELECT btrim(po ->> 'number') AS po_number,
+             public.text_to_date(po ->> 'deliveryDate') AS delivery_date, 1 AS rank
+      FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.po_numbers) = 'array'
+                                     THEN v_project.po_numbers ELSE '[]'::jsonb END) po
+      UNION ALL
+      SELECT btrim(po ->> 'number'), public.text_to_date(po ->> 'deliveryDate'), 2
+      FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.order_sheet -> 'poNumbers') = 'array'
+                                     THEN v_project.order_sheet -> 'poNumbers' ELSE '[]'::jsonb END) po
+    ) listed
+    WHERE delivery_date IS NOT NULL
+    ORDER BY po_number, rank
+  ),
+  breakdowns AS (
+    SELECT COALESCE(btrim(b ->> 'poNumber'), '') AS po_number,
+           SUM(COALESCE(NULLIF(public.jsonb_to_numeric(r -> 'total'), 0),
+                        (SELECT SUM(public.jsonb_to_numeric(s.value))
+                         FROM jsonb_each(CASE WHEN jsonb_typeof(r -> 'sizes') = 'object'
+                                              THEN r -> 'sizes' ELSE '{}'::jsonb END) s),
+                        0)) AS pieces
+    FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.order_sheet -> 'breakdowns') = 'array'
+                                   THEN v_project.order_sheet -> 'breakdowns' ELSE '[]'::jsonb END) b
+    CROSS JOIN LATERAL jsonb_array_elements(CASE WHEN jsonb_typeof(b -> 'sizeRows') = 'array'
+                                                 THEN b -> 'sizeRows' ELSE '[]'::jsonb END) r
+    GROUP BY 1
+  ),
+  orders AS (
+    SELECT po_number, pieces FROM breakdowns
+    UNION ALL
+    SELECT COALESCE(btrim(po ->> 'number'), ''), public.jsonb_to_numeric(po -> 'quantity')
+    FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.po_numbers) = 'array'
+                                   THEN v_project.po_numbers ELSE '[]'::jsonb END) po
+    WHERE NOT EXISTS (SELECT 1 FROM breakdowns)
+  ),
+  deliveries AS (
+    SELECT o.po_number, o.pieces,
+           date_trunc('week', COALESCE(d.delivery_date,
+             public.text_to_date(v_project.order_sheet ->> 'shipmentDate'),
+             public.text_to_date(v_project.shipment_date)))::DATE AS delivery_week
+    FROM orders o
+    LEFT JOIN po_dates d ON d.po_number = o.po_number
+    WHERE o.pieces > 0
+  ),
+  items AS (
+    SELECT 'yarn' AS kind, btrim(y ->> 'yarnType') AS item,
+           COALESCE(btrim(y ->> 'supplier'), '') AS supplier, 'kg' AS unit,
+           public.jsonb_to_numeric(y -> 'weightPerPiece') / 1000 AS per_piece,
+           COALESCE(public.jsonb_to_numeric(y -> 'wastagePercent'), 0) AS wastage,
+           COALESCE(public.jsonb_to_numeric(y -> 'ratePerKg'), 0) AS rate
+    FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.consumption -> 'yarnItems') = 'array'
+                                   THEN v_project.consumption -> 'yarnItems' ELSE '[]'::jsonb END) y
+    UNION ALL
+    SELECT 'accessory', btrim(a ->> 'accessoryName'),
+           COALESCE(btrim(a ->> 'supplier'), ''), COALESCE(NULLIF(btrim(a ->> 'unit'), ''), 'Pcs'),
+           public.jsonb_to_numeric(a -> 'quantityPerGarment'),
+           COALESCE(public.jsonb_to_numeric(a -> 'wastagePercent'), 0),
+           COALESCE(public.jsonb_to_numeric(a -> 'ratePerUnit'), 0)
+    FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v_project.consumption -> 'accessoryItems') = 'array'
+                                   THEN v_project.consumption -> 'accessoryItems' ELSE '[]'::jsonb END) a
+  )
+  SELECT p_project_id, i.kind, i.item, i.supplier, i.unit, d.po_number, d.delivery_week,
+         d.pieces,
+         d.pieces * i.per_piece,
+         d.pieces * i.per_piece * (1 + i.wastage / 100),
+         d.pieces * i.per_piece * (1 + i.wastage / 100) * i.rate
+  FROM items i
+  CROSS JOIN deliveries d
+  WHERE COALESCE(i.item, '') <> '' AND i.per_piece > 0;
+END;
+$$;
+
+-- The rows are derived: if recomputing them fails, the style is saved
+-- anyway and its rows are dropped (with a warning) until its next save.
+CREATE OR REPLACE FUNCTION public.sync_material_requirements()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  BEGIN
+    PERFORM public.refresh_material_requirements(NEW.id);
+  EXCEPTION WHEN OTHERS THEN
+    RAISE WARNING 'Material requirements of style % not recomputed: %', NEW.id, SQLERRM;
+    DELETE FROM public.material_requirements WHERE project_id = NEW.id;
+  END;
+  RETURN NULL;
+END;
+$$;
+
+-- Only writes that can change a requirement recompute it
+DROP TRIGGER IF EXISTS trg_material_requirements_insert ON public.projects;
+CREATE TRIGGER trg_material_requirements_insert
+  AFTER INSERT ON public.projects
+  FOR EACH ROW EXECUTE FUNCTION public.sync_material_requirements();
+
+DROP TRIGGER IF EXISTS trg_material_requirements_update ON public.projects;
+CREATE TRIGGER trg_material_requirements_update
+  AFTER UPDATE ON public.projects
+  FOR EACH ROW
+  WHEN (OLD.main_status IS DISTINCT FROM NEW.main_status
+        OR OLD.consumption IS DISTINCT FROM NEW.consumption
+        OR OLD.order_sheet IS DISTINCT FROM NEW.order_sheet
+        OR OLD.po_numbers IS DISTINCT FROM NEW.po_numbers
+        OR OLD.shipment_date IS DISTINCT FROM NEW.shipment_date)
+  EXECUTE FUNCTION public.sync_material_requirements();
+
+-- ── Totals per item, supplier and unit, per delivery week or overall ──
+-- One JSON array, so a long horizon is not cut at PostgREST's row limit.
+CREATE OR REPLACE FUNCTION public.material_requirements_rollup(
+  p_by_week  BOOLEAN DEFAULT TRUE,
+  p_kind     TEXT DEFAULT NULL,
+  p_supplier TEXT DEFAULT NULL,
+  p_from     DATE DEFAULT NULL,
+  p_to       DATE DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+  SELECT COALESCE(jsonb_agg(to_jsonb(t) ORDER BY t.kind, t.item, t.supplier, t.unit, t.delivery_week), '[]'::jsonb)
+  FROM (
+    SELECT r.kind, r.item, r.supplier, r.unit,
+           CASE WHEN p_by_week THEN r.delivery_week END AS delivery_week,
+           COUNT(DISTINCT r.project_id) AS styles,
+           SUM(r.pieces) AS pieces,
+           ROUND(SUM(r.net_quantity), 3) AS net_quantity,
+           ROUND(SUM(r.required_quantity), 3) AS required_quantity,
+           ROUND(SUM(r.cost), 2) AS cost
+    FROM public.material_requirements r
+    WHERE (p_kind IS NULL OR r.kind = p_kind)
+      AND (p_supplier IS NULL OR r.supplier = p_supplier)
+      AND (p_from IS NULL OR r.delivery_week >= p_from)
+      AND (p_to IS NULL OR r.delivery_week <= p_to)
+    GROUP BY r.kind, r.item, r.supplier, r.unit, CASE WHEN p_by_week THEN r.delivery_week END
+  ) t;
+$$;
+
+-- Readable like public.projects; rows are written by the trigger only.
+GRANT SELECT ON public.material_requirements TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.material_requirements_rollup(BOOLEAN, TEXT, TEXT, DATE, DATE)
+  TO anon, authenticated, service_role;
+
+-- ── Compute the rows of existing active styles ──
+-- migrate:backfill table=public.projects key=id batch_size=200
+SELECT public.refresh_material_requirements(id)
+FROM public.projects
+WHERE id = ANY(%(ids)s)
+  AND main_status IN ('PRE-PRODUCTION', 'PRODUCTION');
@@ -0,0 +1,31 @@
+-- ============================================================
+-- MIGRATION 018: Knitting machine park
+-- The machines the knitting capacity plan (GET
+-- /api/v1/planning/knitting) assigns order quantities to. A
+-- style can only be knitted on machines of its gauge; capacity
+-- per day is hours_per_day at the machine's efficiency.
+-- Maintained by admins through PUT /api/v1/planning/machines.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS public.knitting_machines (
+  id               TEXT PRIMARY KEY,
+  name             TEXT NOT NULL DEFAULT '',
+  machine_no       TEXT,
+  machine_type_no  TEXT,
+  gauge            TEXT NOT NULL,
+  hours_per_day    NUMERIC NOT NULL DEFAULT 20 CHECK (hours_per_day > 0 AND hours_per_day <= 24),
+  efficiency       NUMERIC NOT NULL DEFAULT 0.85 CHECK (efficiency > 0 AND efficiency <= 1),
+  is_active        BOOLEAN NOT NULL DEFAULT TRUE,
+  updated_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ── RLS: signed-in users read; writes come from the backend ──
+ALTER TABLE public.knitting_machines ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Authenticated users can view knitting machines" ON public.knitting_machines;
+CREATE POLICY "Authenticated users can view knitting machines" ON public.knitting_machines
+  FOR SELECT USING (auth.role() = 'authenticated');
+
+-- The backend writes with the service role, which bypasses RLS.
+GRANT SELECT ON public.knitting_machines TO authenticated, service_role;
+GRANT INSERT, UPDATE, DELETE ON public.knitting_machines TO service_role;
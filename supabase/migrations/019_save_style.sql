@@ -0,0 +1,72 @@
+-- ============================================================
+-- MIGRATION 019: Save a style in one call
+-- save_style writes the given fields of a style and returns the
+-- stored document, as projects_full (016) assembles it, so a
+-- caller needs no second read. List sections are synced to their
+-- item tables directly: a save of sections alone (plus its
+-- updated_at) leaves the projects row, and its lock, alone. The
+-- revision of every changed field is recorded by the triggers of
+-- 013 and 016 in the same transaction.
+--
+-- Runs as the caller: the grants and policies of projects and of
+-- the item tables decide.
+-- ============================================================
+
+-- The earlier form also took the revisions to append; with it left
+-- in place a two-argument call would be ambiguous
+DROP FUNCTION IF EXISTS public.save_style(TEXT, JSONB, JSONB, BIGINT);
+
+CREATE OR REPLACE FUNCTION public.save_style(
+  p_project_id    TEXT,
+  p_values        JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_sections TEXT[] := ARRAY['comments', 'inspections', 'invoices', 'pp_meetings', 'material_control'];
+  v_fields   JSONB;
+  v_columns  TEXT;
+  v_updated  INTEGER;
+  v_section  TEXT;
+  v_items    JSONB;
+  v_row      JSONB;
+BEGIN
+  SELECT COALESCE(jsonb_object_agg(e.key, e.value), '{}'::jsonb) INTO v_fields
+  FROM jsonb_each(p_values) AS e
+  WHERE e.key <> ALL (v_sections);
+
+  IF v_fields - 'updated_at' <> '{}'::jsonb OR v_fields = p_values AND v_fields <> '{}'::jsonb THEN
+    -- Values are cast to the column types as PostgREST does; an unknown key is an error
+    SELECT string_agg(quote_ident(k), ', ') INTO v_columns
+    FROM jsonb_object_keys(v_fields) AS k;
+    EXECUTE format(
+      'UPDATE public.projects p SET (%1$s) = '
+      '(SELECT %1$s FROM jsonb_populate_record(NULL::public.projects, $2)) WHERE p.id = $1',
+      v_columns)
+    USING p_project_id, v_fields;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    IF v_updated = 0 THEN
+      RETURN NULL;
+    END IF;
+  ELSIF NOT EXISTS (SELECT 1 FROM public.projects p WHERE p.id = p_project_id) THEN
+    RETURN NULL;
+  END IF;
+
+  -- The sections' stamps carry the save's updated_at (016)
+  PERFORM set_config('app.section_updated_at', COALESCE((p_values ->> 'updated_at')::timestamptz::text, ''), true);
+  FOR v_section, v_items IN
+    SELECT e.key, e.value FROM jsonb_each(p_values) AS e WHERE e.key = ANY (v_sections)
+  LOOP
+    PERFORM public.sync_project_section(p_project_id, v_section, v_items);
+  END LOOP;
+
+  SELECT to_jsonb(f) INTO v_row
+  FROM public.projects_full f
+  WHERE f.id = p_project_id;
+  RETURN v_row;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.save_style(TEXT, JSONB) TO anon, authenticated, service_role;